@@ -19,7 +19,7 @@ import util
 
 def do_betweenness(graph):
     start_time = time.process_time()
-    (stats, betw) = graph.betweenness()
+    (stats, betw) = graph.betweenness(as_array=util.HAVE_NUMPY)
     end_time = time.process_time()
     stats["time"] = end_time - start_time
     return (stats,betw)
@@ -42,14 +42,14 @@ def betweenness(graph, set_attributes=True, time_out=0):
         timeout_betweenness = timeout.add_timeout(do_betweenness, time_out)
         timeout_betweenness(graph)
         while (not timeout_betweenness.ready) and (not timeout_betweenness.expired):
-            pass
+            time.sleep(timeout.POLL_INTERVAL)
         if timeout_betweenness.ready:
             (stats, betw) = timeout_betweenness.value
             logging.info("Betweenness computed in %s seconds", stats['time'])
             stats["timed_out"] = 0
         else:
             logging.info("Betweenness computation timer expired after %d seconds.", time_out)
-            betw = [0] * graph.vcount()
+            betw = util.zeros(graph.vcount())
             stats = {"time": time_out, "timed_out": 1, "forward_touched_edges": -1,
                     "backward_touched_edges": -1}
 
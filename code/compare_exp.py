@@ -67,6 +67,11 @@ def main():
     if args.exact:
         args.approximate = False
 
+    # Use the diameters cached for this graph
+    fingerprint = util.graph_fingerprint(args.graph, not args.undirected,
+            args.maxconn, args.pickle)
+    util.load_metadata(G, args.graph, fingerprint)
+
     if not args.resultfiles:
         (exact_stats, exact_betw) = brandes_exact.betweenness(G, args.write,
                 args.timeout)
@@ -98,6 +103,7 @@ def main():
     #Compute useful graph statistics (mainly diameter)
     if "diam" not in G.attributes():
         diameter.diameter(G)
+    util.save_metadata(G, args.graph, fingerprint)
 
     # If specified, write betweenness as vertex attributes, and time and
     # diameter as graph attributes back to file
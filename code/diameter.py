@@ -59,8 +59,15 @@ def main():
     else:
         G = converter.convert(args.graph, not args.undirected, args.maxconn)   # Read graph from file
 
-    # Compute the diameter
-    (elapsed_time, diam) = diameter(G)
+    # Compute the diameter, unless it is cached for this graph
+    fingerprint = util.graph_fingerprint(args.graph, not args.undirected,
+            args.maxconn, args.pickle)
+    util.load_metadata(G, args.graph, fingerprint)
+    if "diam_time" in G.attributes():
+        (elapsed_time, diam) = (G["diam_time"], G["diam"])
+    else:
+        (elapsed_time, diam) = diameter(G)
+        util.save_metadata(G, args.graph, fingerprint)
 
     # Print info
     print("{}, diameter={}, time={}".format(args.graph, diam,
@@ -1,7 +1,8 @@
 #! /usr/bin/env python3
 """ diameter_approximation_motwani.py
 
-Construct +++
+Compute the 2/3 approximation of the diameter of a graph by Aingworth et al.
+and the time needed to compute it.
 
 """
 import argparse
@@ -10,14 +11,22 @@ import time
 
 import util
 
-def diameter_approximation_motwani(graph):
+def diameter_approximation_motwani(graph, k=-1, threads=1):
+    """Compute the 2/3 approximation of the diameter and the time needed.
+
+    k is the number of vertices reached by the truncated breadth-first
+    searches (the default is the square root of n log n), and the searches
+    are run on the specified number of threads. Return a tuple
+    (elapsed_time, diam).
+
+    """
     logging.info("Computing diameter")
     # time.process_time() does not account for sleeping time. Seems the right
     # function to use. Alternative could be time.perf_counter()
     start_time = time.process_time()
     # Compute the diameter of the graph, i.e. the longest geodesic path within
     # a component.
-    diam = graph.diameter_approximation_motwani() # This is not the vertex-diameter !!! 
+    diam = graph.diameter_approximation_motwani(k, threads) # This is not the vertex-diameter !!! 
     end_time = time.process_time()
     elapsed_time = end_time - start_time
     logging.info("Diameter is %d, computed in %f seconds", diam, elapsed_time)
@@ -30,17 +39,23 @@ def main():
     parser = argparse.ArgumentParser()
     parser.description = "Compute an approximation of the diameter and output its value"
     parser.add_argument("graph", help="graph file")
+    parser.add_argument("-j", "--threads", type=util.positive_int, default=1,
+            help="number of threads running the searches (default 1)")
+    parser.add_argument("-k", "--partial", type=util.positive_int, default=None,
+            help="number of vertices reached by the truncated searches (default sqrt(n log n))")
     parser.add_argument("-v", "--verbose", action="count", default=0,
             help="increase verbosity (use multiple times for more verbosity)")
     args = parser.parse_args()
 
     # Set the desired level of logging
+    util.set_verbosity(args.verbose)
 
     # Read graph from file                                   
     G = util.read_graph(args.graph)
 
     # Compute the 2/3 approximation
-    (elapsed_time,diam) = diameter_approximation_motwani(G)
+    (elapsed_time,diam) = diameter_approximation_motwani(G,
+            args.partial or -1, args.threads)
 
     # Print info
     print("{}, diameter={}, time={}".format(args.graph, diam,
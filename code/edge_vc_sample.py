@@ -0,0 +1,233 @@
+#! /usr/bin/env python3
+"""edge_vc_sample.py
+
+Compute approximations of the betweenness centrality of all the edges in the
+graph using random sampling and the VC-dimension, and the time needed to
+compute them. The same samples can also estimate the betweenness of the
+vertices. These values are then written to output files.
+
+"""
+import argparse
+import logging
+import os.path
+import random
+import time
+
+import converter
+import timeout
+import util
+
+def do_betweenness(graph, epsilon, delta, sample_size=0, weights_list=None,
+        use_approx_diameter=True, threads=1, bidirectional=True,
+        group_sources=False, cutoff=None, landmarks=None, vertices=False):
+    # A diameter cached as a graph attribute (see util.load_metadata()) is
+    # used instead of computing it again
+    start_time = time.perf_counter()
+    start_cpu_time = time.process_time()
+    if sample_size:
+        result = graph.edge_betweenness_sample_vc_sample_size(sample_size,
+                cutoff=cutoff, weights=weights_list, threads=threads,
+                bidirectional=bidirectional, group_sources=group_sources,
+                landmarks=landmarks, vertex_estimates=vertices,
+                as_array=util.HAVE_NUMPY)
+    else:
+        if use_approx_diameter == 1:
+            diam = graph["approx_diam"] if "approx_diam" in graph.attributes() else -1
+        elif use_approx_diameter == 0:
+            diam = graph["diam"] if "diam" in graph.attributes() else graph.diameter()
+        else:
+            diam = use_approx_diameter
+        result = graph.edge_betweenness_sample_vc(epsilon, delta, diam,
+                cutoff=cutoff, weights=weights_list, threads=threads,
+                bidirectional=bidirectional, group_sources=group_sources,
+                landmarks=landmarks, vertex_estimates=vertices,
+                as_array=util.HAVE_NUMPY)
+    result[0]["time"] = time.perf_counter() - start_time
+    result[0]["cpu_time"] = time.process_time() - start_cpu_time
+    if not vertices:
+        result = result + (None,)
+    return result
+
+def betweenness(graph, epsilon, delta, sample_size=0, weights=None,
+        use_approx_diameter=True, set_attributes=True, time_out=0, threads=1,
+        bidirectional=True, group_sources=False, cutoff=None, landmarks=None,
+        vertices=False):
+    """Compute approximate edge betweenness using VC-Dimension.
+
+    Return a tuple with the statistics (a dictionary), the list of betweenness
+    values of the edges (one for each edge in the graph, in the order of the
+    edge ids) and, if vertices is True, the list of betweenness values of the
+    vertices estimated from the same samples, or None otherwise.
+
+    If sample_size is positive, it is the number of samples, and epsilon,
+    delta and the diameter are not used. Otherwise the sample size guarantees
+    accuracy epsilon with probability 1-delta for the edges and the vertices:
+    it depends on the number of edges of the shortest paths instead of their
+    internal vertices. The use_approx_diameter, threads,
+    bidirectional, group_sources, cutoff and landmarks parameters have the
+    same meaning as in vc_sample.betweenness().
+
+    If set_attributes is True (default), then set the values of the
+    betweenness as edge (and vertex) attributes, and the time as a graph
+    attribute. If the timeout expires, no estimate is returned.
+
+    """
+    logging.info("Computing approximate edge betweenness using VC-Dimension.")
+    if not time_out:
+        (stats, edge_betw, vertex_betw) = do_betweenness(graph, epsilon,
+                delta, sample_size, weights, use_approx_diameter, threads,
+                bidirectional, group_sources, cutoff, landmarks, vertices)
+    else:
+        timeout_betweenness = timeout.add_timeout(do_betweenness, time_out)
+        timeout_betweenness(graph, epsilon, delta, sample_size, weights,
+                use_approx_diameter, threads, bidirectional, group_sources,
+                cutoff, landmarks, vertices)
+        while (not timeout_betweenness.ready) and (not timeout_betweenness.expired):
+            time.sleep(timeout.POLL_INTERVAL)
+        if timeout_betweenness.ready:
+            (stats, edge_betw, vertex_betw) = timeout_betweenness.value
+            logging.info("Betweenness computed in %s seconds", stats['time'])
+            stats["timed_out"] = 0
+        else:
+            logging.info("Betweenness computation timer expired after %d seconds.", time_out)
+            timeout_betweenness.cancel()
+            edge_betw = []
+            vertex_betw = [] if vertices else None
+            stats = {"time": time_out, "timed_out": 1, "forward_touched_edges": -1,
+                    "backward_touched_edges": -1, "sample_size": -1,
+                    "diameter": -1, "diameter_touched_edges": -1 }
+    if not sample_size:
+        stats["delta"] = delta
+        stats["epsilon"] = epsilon
+        # Remember the diameter as a graph attribute, so that the following
+        # runs and util.save_metadata() find it
+        if int(use_approx_diameter) == 1:
+            stats["diam_type"] = "approx"
+            if stats["diameter"] > 0:
+                graph["approx_diam"] = stats["diameter"]
+        elif int(use_approx_diameter) == 0:
+            stats["diam_type"] = "exact"
+            if stats["diameter"] > 0:
+                graph["diam"] = stats["diameter"]
+        else:
+            stats["diam_type"] = "specif"
+    stats["cutoff"] = cutoff if cutoff is not None else -1
+
+    # Write attributes to graph, if specified
+    if set_attributes and not stats.get("timed_out", 0):
+        for key in stats:
+            graph["vc_edge_" + key] = stats[key]
+        graph.es["vc_edge_betw"] = edge_betw
+        if vertex_betw is not None:
+            graph.vs["vc_betw"] = vertex_betw
+
+    return (stats, edge_betw, vertex_betw)
+
+def main():
+    """Parse arguments, call betweenness(), write to file."""
+
+    # Parse arguments
+    parser = argparse.ArgumentParser()
+    parser.description = "Compute approximate betweenness centrality of all edges in a graph using sampling and VC-dimension, and the time to compute them, and write them to file"
+    parser.add_argument("epsilon", type=util.valid_interval_float,
+            help="accuracy parameter")
+    parser.add_argument("delta", type=util.valid_interval_float,
+            help="confidence parameter")
+    parser.add_argument("graph", help="graph file")
+    parser.add_argument("output", help="output file")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("-a", "--approximate", action="store_true",
+            default=True, help="use approximate diameter (default)")
+    group.add_argument("-d", "--diameter", type=util.positive_int, default=0,
+            help="value to use for the diameter")
+    group.add_argument("-e", "--exact", action="store_true", default=False,
+            help="use exact diameter")
+    parser.add_argument("-b", "--cutoff", type=util.positive_int, default=None,
+            help="only count the shortest paths of at most this length (number of edges, or total weight with -l), which also reduces the sample size")
+    parser.add_argument("-f", "--forward", action="store_true", default=False,
+            help="search the shortest paths only from the first vertex of each sampled pair")
+    parser.add_argument("-g", "--group", action="store_true", default=False,
+            help="run a single search from each distinct source of the sampled pairs")
+    parser.add_argument("-j", "--threads", type=util.positive_int, default=1,
+            help="number of threads sampling the pairs of vertices (default 1)")
+    parser.add_argument("-k", "--landmarks", type=util.positive_int, default=0,
+            help="with weights, guide the search of each sampled pair with this many landmarks, whose distances are cached in a file next to the graph")
+    parser.add_argument("-m", "--maxconn", action="store_true", default=False,
+            help="if the graph is not weakly connected, only save the largest connected component")
+    parser.add_argument("-p", "--pickle", action="store_true", default=False,
+            help="use pickle reader for input file")
+    parser.add_argument("-s", "--samplesize", type=util.positive_int,
+            default=0, help="use specified sample size. Overrides epsilon, delta, and diameter computation")
+    parser.add_argument("-t", "--timeout", type=util.positive_int, default=3600,
+            help="Timeout computation after specified number of seconds (default 3600 = 1h, 0 = no timeout)")
+    parser.add_argument("-u", "--undirected", action="store_true", default=False,
+            help="consider the graph as undirected ")
+    parser.add_argument("-v", "--verbose", action="count", default=0,
+            help="increase verbosity (use multiple times for more verbosity)")
+    parser.add_argument("-w", "--write", nargs="?", default=False, const="auto",
+            help="write graph (and computed attributes) to file.")
+    parser.add_argument("-x", "--vertexOutput", default=None,
+            help="also estimate the betweenness of the vertices from the same samples, and write it to this file as vc_sample.py does")
+    parser.add_argument("-l", "--weightFile", default="-",
+            help="random weights within the interval 0 to 1, must have as many entries as the number of edges: one per line, or a binary weight file from generate_random_weights.py")
+
+    args = parser.parse_args()
+
+    # Set the desired level of logging
+    util.set_verbosity(args.verbose)
+
+    # Seed the random number generator
+    random.seed()
+
+    # Read graph
+    if args.pickle:
+        G = util.read_graph(args.graph)
+    else:
+        G = converter.convert(args.graph, not args.undirected, args.maxconn)
+
+    if args.exact:
+        args.approximate = False
+
+    # Read the weights
+    weights_list = []
+    if args.weightFile != "-":
+        weights_list = util.read_weights(args.weightFile, G)
+
+    # Use the diameters cached for this graph and weights
+    fingerprint = util.graph_fingerprint(args.graph, not args.undirected,
+            args.maxconn, args.pickle,
+            args.weightFile if args.weightFile != "-" else None)
+    util.load_metadata(G, args.graph, fingerprint)
+
+    # Compute the landmark distances, or use the cached ones
+    landmarks = None
+    if args.landmarks and weights_list:
+        landmarks = util.load_landmarks(G, args.graph, fingerprint,
+                weights_list, args.landmarks)
+
+    # Compute betweenness
+    (stats, edge_betw, vertex_betw) = betweenness(G, args.epsilon, args.delta,
+            args.samplesize, weights_list or None,
+            args.diameter if args.diameter > 0 else args.approximate,
+            args.write, args.timeout, args.threads, not args.forward,
+            args.group, args.cutoff, landmarks, args.vertexOutput is not None)
+
+    util.save_metadata(G, args.graph, fingerprint)
+
+    # If specified, write betweenness as edge (and vertex) attributes, and
+    # time as graph attribute back to file
+    if args.write:
+        logging.info("Writing betweenness as edge attributes and stats as graph attribute")
+        if args.write == "auto":
+            filename = os.path.splitext(args.graph)[0] + ("-undir" if args.undirected else "dir") + ".picklez"
+            G.write(filename)
+        else:
+            G.write(args.write)
+
+    # Write stats and betweenness to output
+    util.write_to_output(stats, edge_betw, args.output)
+    if args.vertexOutput is not None:
+        util.write_to_output(stats, vertex_betw, args.vertexOutput)
+
+if __name__ == "__main__":
+    main()
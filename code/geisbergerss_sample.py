@@ -18,7 +18,8 @@ import util
 
 def do_betweenness_sample_size(graph, sample_size):
     start_time = time.process_time()
-    (stats, betw) = graph.betweenness_sample_gss_linear_sample_size(sample_size)
+    (stats, betw) = graph.betweenness_sample_gss_linear_sample_size(sample_size,
+            as_array=util.HAVE_NUMPY)
     end_time = time.process_time()
     stats["time"] = end_time - start_time
     return (stats, betw)
@@ -33,14 +34,14 @@ def betweenness_sample_size(graph, sample_size, set_attributes=True, time_out=0)
         timeout_betweenness = timeout.add_timeout(do_betweenness_sample_size, time_out)
         timeout_betweenness(graph, sample_size)
         while (not timeout_betweenness.ready) and (not timeout_betweenness.expired):
-            pass
+            time.sleep(timeout.POLL_INTERVAL)
         if timeout_betweenness.ready:
             (stats, betw) = timeout_betweenness.value
             logging.info("Betweenness computed in %s seconds", stats['time'])
             stats["timed_out"] = 0
         else:
             logging.info("Betweenness computation timer expired after %d seconds.", time_out)
-            betw = [0] * graph.vcount()
+            betw = util.zeros(graph.vcount())
             stats = {"time": time_out, "timed_out": 1, "forward_touched_edges": -1,
                     "backward_touched_edges": -1, "sample_size": sample_size}
     # Write attributes to graph, if specified
@@ -53,7 +54,8 @@ def betweenness_sample_size(graph, sample_size, set_attributes=True, time_out=0)
 
 def do_betweenness(graph, epsilon, delta):
     start_time = time.process_time()
-    (stats, betw) = graph.betweenness_sample_gss_linear(epsilon, delta)
+    (stats, betw) = graph.betweenness_sample_gss_linear(epsilon, delta,
+            as_array=util.HAVE_NUMPY)
     end_time = time.process_time()
     stats["time"] = end_time - start_time
     return (stats, betw)
@@ -81,14 +83,14 @@ def betweenness(graph, epsilon, delta, set_attributes=True, time_out=0):
         timeout_betweenness = timeout.add_timeout(do_betweenness, time_out)
         timeout_betweenness(graph, epsilon, delta)
         while (not timeout_betweenness.ready) and (not timeout_betweenness.expired):
-            pass
+            time.sleep(timeout.POLL_INTERVAL)
         if timeout_betweenness.ready:
             (stats, betw) = timeout_betweenness.value
             logging.info("Betweenness computed in %s seconds", stats['time'])
             stats["timed_out"] = 0
         else:
             logging.info("Betweenness computation timer expired after %d seconds.", time_out)
-            betw = [0] * graph.vcount()
+            betw = util.zeros(graph.vcount())
             stats = {"time": time_out, "timed_out": 1, "forward_touched_edges": -1,
                     "backward_touched_edges": -1, "sample_size": -1}
 
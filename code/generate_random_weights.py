@@ -1,40 +1,70 @@
 # -*- coding: iso-8859-1 -*-
 import argparse
+import array
 import logging
-import pickle
+import random
 import util
 import converter
-import random
 
-def generate_random_weights(path,pickle,undirected):
-    """Read number of nodes from the file path. Return int."""
+# Number of weights generated and written at a time
+CHUNK_SIZE = 1 << 22
+
+def random_chunks(count, typecode="d"):
+    """Generate count random weights within the interval 0 to 1, in arrays of
+    at most CHUNK_SIZE weights. NumPy generates them without a float object
+    per weight, if it is available."""
+    for start in range(0, count, CHUNK_SIZE):
+        size = min(CHUNK_SIZE, count - start)
+        if util.HAVE_NUMPY:
+            yield util.numpy.random.random(size).astype(typecode)
+        else:
+            yield array.array(typecode, (random.random() for i in range(size)))
+
+def generate_random_weights(path, pickle, undirected, text=False, typecode="d"):
+    """Write a random weight within the interval 0 to 1 for each edge of the
+    graph in the file path.
+
+    The weights are written to a binary weight file (see util.write_weights())
+    next to the graph, named after it with the suffix "_weights.bin", or, if
+    text is True, to a text file with one weight per line and the suffix
+    "_weights.txt". Return the path of the weight file.
+
+    """
     if pickle:
         G = util.read_graph(path)
     else:
         G = converter.convert(path, not undirected, False)
 
     print(G.ecount())
-    txt_dir=path[0:len(path)-4] + "_weights.txt"
-    file = open(txt_dir,'w')
-    file.write("")
-
-    for line in range(0,G.ecount()):
-       file.write(repr(random.random()) + '\n')
-
-    file.close()
-    return 0
+    if text:
+        weights_path = path[0:len(path)-4] + "_weights.txt"
+        with open(weights_path, 'w') as weight_file:
+            for chunk in random_chunks(G.ecount(), typecode):
+                weight_file.write("".join("{!r}\n".format(float(weight))
+                    for weight in chunk))
+    else:
+        weights_path = path[0:len(path)-4] + "_weights.bin"
+        util.write_weights(weights_path, G.ecount(),
+                random_chunks(G.ecount(), typecode), typecode)
+    logging.info("Weights written to %s", weights_path)
+    return weights_path
 
 
 def main():
-   # Parse arguments
+    # Parse arguments
     parser = argparse.ArgumentParser()
     parser.add_argument("path", help="path file")
+    parser.add_argument("-f", "--float", action="store_true", default=False,
+            help="write single precision weights, which halve the file")
     parser.add_argument("-p", "--pickle", action="store_true", default=False,
             help="use pickle reader for input file")
+    parser.add_argument("-t", "--text", action="store_true", default=False,
+            help="write the weights as text, one per line, instead of a binary weight file")
     parser.add_argument("-u", "--undirected", action="store_true", default=False,
             help="consider the graph as undirected ")
     args = parser.parse_args()
-    generate_random_weights(args.path,args.pickle,args.undirected)
+    generate_random_weights(args.path, args.pickle, args.undirected,
+            args.text, "f" if args.float else "d")
 
 if __name__ == "__main__":
   main()
@@ -99,7 +99,13 @@ int igraph_betweenness_sample_vc(const igraph_t *graph, igraph_vector_t *res,
                                  igraph_integer_t diameter, const igraph_vs_t vids, 
                                  igraph_bool_t directed, igraph_real_t cutoff, 
                                  const igraph_vector_t* weights, 
-                                 igraph_bool_t nobigint);
+                                 igraph_bool_t nobigint,
+                                 igraph_integer_t threads,
+                                 igraph_bool_t bidirectional,
+                                 igraph_bool_t group_sources,
+                                 const igraph_matrix_t *landmarks,
+                                 igraph_bool_t progressive,
+                                 igraph_real_t *snapshot);
 int igraph_betweenness_sample_vc_sample_size(const igraph_t *graph,
                                              igraph_vector_t *res,
                                              igraph_vector_t *stats,
@@ -109,9 +115,47 @@ int igraph_betweenness_sample_vc_sample_size(const igraph_t *graph,
                                              igraph_bool_t directed,
                                              igraph_real_t cutoff, 
                                              const igraph_vector_t* weights,
-                                             igraph_bool_t nobigint);
+                                             igraph_bool_t nobigint,
+                                             igraph_integer_t threads,
+                                             igraph_bool_t bidirectional,
+                                             igraph_bool_t group_sources,
+                                             const igraph_matrix_t *landmarks,
+                                             igraph_real_t *snapshot);
+int igraph_betweenness_landmarks(const igraph_t *graph, igraph_matrix_t *res,
+                                 igraph_vector_t *landmark_ids,
+                                 igraph_integer_t no_of_landmarks,
+                                 igraph_bool_t directed,
+                                 const igraph_vector_t *weights);
+int igraph_edge_betweenness_sample_vc(const igraph_t *graph,
+                                      igraph_vector_t *res,
+                                      igraph_vector_t *vertex_res,
+                                      igraph_vector_t *stats,
+                                      igraph_strvector_t *stats_names,
+                                      igraph_real_t epsilon, igraph_real_t delta,
+                                      igraph_integer_t diameter,
+                                      igraph_bool_t directed, igraph_real_t cutoff,
+                                      const igraph_vector_t* weights,
+                                      igraph_bool_t nobigint,
+                                      igraph_integer_t threads,
+                                      igraph_bool_t bidirectional,
+                                      igraph_bool_t group_sources,
+                                      const igraph_matrix_t *landmarks);
+int igraph_edge_betweenness_sample_vc_sample_size(const igraph_t *graph,
+                                                  igraph_vector_t *res,
+                                                  igraph_vector_t *vertex_res,
+                                                  igraph_vector_t *stats,
+                                                  igraph_strvector_t *stats_names,
+                                                  igraph_integer_t sample_size,
+                                                  igraph_bool_t directed,
+                                                  igraph_real_t cutoff,
+                                                  const igraph_vector_t* weights,
+                                                  igraph_bool_t nobigint,
+                                                  igraph_integer_t threads,
+                                                  igraph_bool_t bidirectional,
+                                                  igraph_bool_t group_sources,
+                                                  const igraph_matrix_t *landmarks);
 int igraph_betweenness_sample_vc_topk(const igraph_t *graph, 
-				      igraph_vector_t *res,
+				      igraph_matrix_t *res,
 				      igraph_vector_t *stats, 
 				      igraph_strvector_t *stats_names, 
 				      igraph_real_t epsilon, 
@@ -121,12 +165,34 @@ int igraph_betweenness_sample_vc_topk(const igraph_t *graph,
 				      igraph_bool_t directed, 
 				      igraph_real_t cutoff, 
 				      const igraph_vector_t* weights,
-				      igraph_bool_t nobigint);
-int igraph_diameter_approximation_motwani(const igraph_t *graph, igraph_integer_t *diameter );                                             
+				      igraph_bool_t nobigint,
+				      igraph_integer_t threads);
+int igraph_betweenness_sample_vc_query(const igraph_t *graph,
+                                       igraph_matrix_t *res,
+                                       igraph_vector_t *stats,
+                                       igraph_strvector_t *stats_names,
+                                       igraph_real_t epsilon,
+                                       igraph_real_t delta,
+                                       igraph_real_t threshold,
+                                       igraph_integer_t diameter,
+                                       const igraph_vs_t vids,
+                                       igraph_bool_t directed,
+                                       igraph_real_t cutoff,
+                                       const igraph_vector_t* weights,
+                                       igraph_bool_t nobigint,
+                                       igraph_integer_t threads);
+int igraph_diameter_approximation_motwani(const igraph_t *graph,
+                                          igraph_integer_t *diameter,
+                                          igraph_vector_t *stats,
+                                          igraph_strvector_t *stats_names,
+                                          igraph_integer_t k,
+                                          igraph_integer_t threads);
 // XXX TODO THIS REALLY DOES NOT BELONG HERE
 int igraph_diameter_approximation(const igraph_t *graph, igraph_integer_t *res,
                                   igraph_vector_t *stats, igraph_strvector_t *stats_names,
-                                  const igraph_vector_t *weights);
+                                  igraph_bool_t directed,
+                                  const igraph_vector_t *weights,
+                                  igraph_integer_t bfs_budget);
 int igraph_betweenness_estimate(const igraph_t *graph, igraph_vector_t *res, 
                                 igraph_vector_t *stats, igraph_strvector_t *stats_names,
 			        const igraph_vs_t vids, igraph_bool_t directed,
@@ -23,8 +23,10 @@
 */
 
 #include <math.h>
+#include <stdlib.h>    /* qsort */
 #include <string.h>    /* memset */
 #include <assert.h>
+#include <pthread.h>
 #include "igraph_centrality.h"
 #include "igraph_components.h"
 #include "igraph_math.h"
@@ -33,12 +35,15 @@
 #include "igraph_adjlist.h"
 #include "igraph_interface.h"
 #include "igraph_paths.h"
+#include "igraph_structural.h"
 #include "igraph_progress.h"
 #include "igraph_interrupt_internal.h"
 #include "igraph_topology.h"
 #include "igraph_types_internal.h"
 #include "igraph_stack.h"
 #include "igraph_dqueue.h"
+#include "igraph_heap.h"
+#include "igraph_qsort.h"
 #include "config.h"
 
 #include "bigint.h"
@@ -1446,6 +1451,243 @@ int igraph_personalized_pagerank(const igraph_t *graph, igraph_vector_t *vector,
   return 0;
 }
 
+/* Largest ratio between the largest and the smallest weight for which the
+ * weighted searches use a bucket queue instead of a binary heap */
+#define IGRAPH_I_SPQUEUE_MAX_RATIO 4096
+
+/*
+ * Queue of the vertices to settle in the weighted searches, picked by
+ * igraph_i_spqueue_init. It is either the binary heap igraph_2wheap_t,
+ * or a bucket queue (Dial) when the largest weight is at most
+ * IGRAPH_I_SPQUEUE_MAX_RATIO times the smallest one, which covers the
+ * integer weights in a small range. Only the buckets make the searches
+ * faster; with the heap, which real-valued weights such as uniform ones
+ * get, they cost as much as before the queue was introduced.
+ *
+ * The buckets are 'width' wide, half the smallest weight, and are reused
+ * circularly, as the distances in the queue span at most the largest
+ * weight. A vertex is only a predecessor of the vertices at least two
+ * buckets after its own, so the vertices of a bucket can be settled in
+ * any order without losing any shortest path: the counts of the shortest
+ * paths are exact as with the heap, and the searches pop the predecessors
+ * of every vertex before the vertex itself.
+ *
+ * Both queues have room for all the vertices from the start, so pushing
+ * never allocates and the VC sampling workers can use them from any
+ * thread. Both record the vertices pushed since the queue was last empty,
+ * so that clearing it takes time proportional to them and not to the
+ * number of vertices.
+ */
+typedef struct igraph_i_spqueue_t {
+  igraph_bool_t buckets;
+  igraph_2wheap_t heap;
+  igraph_real_t width;
+  long int no_of_buckets;
+  long int *head;               /* first vertex of each bucket, -1 if none */
+  long int *next, *prev;        /* the buckets are doubly linked lists */
+  long int *bucket;             /* bucket of each queued vertex, -1 if none */
+  igraph_real_t *dist;
+  long int *pushed;             /* the vertices pushed since the last clear */
+  long int no_of_pushed;
+  long int current;             /* bucket of the smallest distance */
+  igraph_real_t last;           /* distance of the last vertex popped;
+                                   'current' only moves on from its bucket */
+  long int size;
+} igraph_i_spqueue_t;
+
+void igraph_i_spqueue_destroy(igraph_i_spqueue_t *q) {
+  if (!q->buckets) {
+    igraph_2wheap_destroy(&q->heap);
+    igraph_Free(q->pushed);
+    return;
+  }
+  igraph_Free(q->head);
+  igraph_Free(q->next);
+  igraph_Free(q->prev);
+  igraph_Free(q->bucket);
+  igraph_Free(q->dist);
+  igraph_Free(q->pushed);
+}
+
+int igraph_i_spqueue_init(igraph_i_spqueue_t *q, long int size,
+                          const igraph_vector_t *weights) {
+  igraph_real_t min_weight=0, max_weight=0;
+  long int i;
+
+  memset(q, 0, sizeof(igraph_i_spqueue_t));
+  if (weights && igraph_vector_size(weights) > 0) {
+    min_weight=igraph_vector_min(weights);
+    max_weight=igraph_vector_max(weights);
+  }
+  q->buckets=min_weight > 0 &&
+    max_weight <= IGRAPH_I_SPQUEUE_MAX_RATIO * min_weight;
+  if (!q->buckets) {
+    IGRAPH_CHECK(igraph_2wheap_init(&q->heap, size));
+    IGRAPH_FINALLY(igraph_2wheap_destroy, &q->heap);
+    IGRAPH_CHECK(igraph_vector_reserve(&q->heap.data, size));
+    IGRAPH_CHECK(igraph_vector_long_reserve(&q->heap.index, size));
+    q->pushed=igraph_Calloc(size > 0 ? size : 1, long int);
+    if (!q->pushed) {
+      IGRAPH_ERROR("Cannot initialize heap", IGRAPH_ENOMEM);
+    }
+    IGRAPH_FINALLY_CLEAN(1);
+    return 0;
+  }
+
+  q->width=min_weight / 2.0;
+  q->no_of_buckets=(long int) floor(max_weight / q->width) + 3;
+  q->head=igraph_Calloc(q->no_of_buckets, long int);
+  q->next=igraph_Calloc(size > 0 ? size : 1, long int);
+  q->prev=igraph_Calloc(size > 0 ? size : 1, long int);
+  q->bucket=igraph_Calloc(size > 0 ? size : 1, long int);
+  q->dist=igraph_Calloc(size > 0 ? size : 1, igraph_real_t);
+  q->pushed=igraph_Calloc(size > 0 ? size : 1, long int);
+  if (!q->head || !q->next || !q->prev || !q->bucket || !q->dist ||
+      !q->pushed) {
+    igraph_i_spqueue_destroy(q);
+    IGRAPH_ERROR("Cannot initialize bucket queue", IGRAPH_ENOMEM);
+  }
+  for (i=0; i<q->no_of_buckets; i++) {
+    q->head[i]=-1;
+  }
+  for (i=0; i<size; i++) {
+    q->bucket[i]=-1;
+  }
+  return 0;
+}
+
+igraph_bool_t igraph_i_spqueue_empty(const igraph_i_spqueue_t *q) {
+  if (!q->buckets) {
+    return igraph_2wheap_empty(&q->heap);
+  }
+  return q->size == 0;
+}
+
+void igraph_i_spqueue_link(igraph_i_spqueue_t *q, long int idx,
+                           igraph_real_t dist) {
+  long int b=((long int) floor(dist / q->width)) % q->no_of_buckets;
+  q->dist[idx]=dist;
+  q->bucket[idx]=b;
+  q->prev[idx]=-1;
+  q->next[idx]=q->head[b];
+  if (q->head[b] != -1) {
+    q->prev[q->head[b]]=idx;
+  }
+  q->head[b]=idx;
+}
+
+void igraph_i_spqueue_unlink(igraph_i_spqueue_t *q, long int idx) {
+  long int b=q->bucket[idx];
+  if (q->prev[idx] != -1) {
+    q->next[q->prev[idx]]=q->next[idx];
+  } else {
+    q->head[b]=q->next[idx];
+  }
+  if (q->next[idx] != -1) {
+    q->prev[q->next[idx]]=q->prev[idx];
+  }
+  q->bucket[idx]=-1;
+}
+
+/* Adds vertex idx, which must not be in the queue, at distance dist */
+int igraph_i_spqueue_push(igraph_i_spqueue_t *q, long int idx,
+                          igraph_real_t dist) {
+  if (!q->buckets) {
+    q->pushed[q->no_of_pushed++]=idx;
+    return igraph_2wheap_push_with_index(&q->heap, idx, -dist);
+  }
+  /* Only a new search pushes a vertex closer than the last one popped */
+  if (q->size == 0 && dist < q->last) {
+    q->current=((long int) floor(dist / q->width)) % q->no_of_buckets;
+    q->last=dist;
+  }
+  igraph_i_spqueue_link(q, idx, dist);
+  q->pushed[q->no_of_pushed++]=idx;
+  q->size++;
+  return 0;
+}
+
+/* Moves vertex idx, which must be in the queue, to the smaller distance
+ * dist */
+int igraph_i_spqueue_decrease(igraph_i_spqueue_t *q, long int idx,
+                              igraph_real_t dist) {
+  if (!q->buckets) {
+    return igraph_2wheap_modify(&q->heap, idx, -dist);
+  }
+  igraph_i_spqueue_unlink(q, idx);
+  igraph_i_spqueue_link(q, idx, dist);
+  return 0;
+}
+
+/* Removes a vertex with the smallest distance (up to the width of a
+ * bucket) from the queue, which must not be empty, and returns it */
+long int igraph_i_spqueue_pop(igraph_i_spqueue_t *q, igraph_real_t *dist) {
+  long int idx;
+  if (!q->buckets) {
+    idx=igraph_2wheap_max_index(&q->heap);
+    *dist=-igraph_2wheap_delete_max(&q->heap);
+    if (igraph_2wheap_empty(&q->heap)) {
+      q->no_of_pushed=0;
+    }
+    return idx;
+  }
+  while (q->head[q->current] == -1) {
+    q->current=(q->current + 1) % q->no_of_buckets;
+  }
+  idx=q->head[q->current];
+  igraph_i_spqueue_unlink(q, idx);
+  if (--q->size == 0) {
+    q->no_of_pushed=0;
+  }
+  *dist=q->dist[idx];
+  q->last=*dist;
+  return idx;
+}
+
+/* Returns a lower bound to the distances in the queue, IGRAPH_INFINITY
+ * if it is empty. This is the smallest distance with the heap, and the
+ * start of the first bucket that is not empty with the buckets. */
+igraph_real_t igraph_i_spqueue_bound(igraph_i_spqueue_t *q) {
+  long int last_bucket;
+  if (igraph_i_spqueue_empty(q)) {
+    return IGRAPH_INFINITY;
+  }
+  if (!q->buckets) {
+    return -igraph_2wheap_max(&q->heap);
+  }
+  while (q->head[q->current] == -1) {
+    q->current=(q->current + 1) % q->no_of_buckets;
+  }
+  last_bucket=(long int) floor(q->last / q->width);
+  return (last_bucket + (q->current - last_bucket % q->no_of_buckets +
+        q->no_of_buckets) % q->no_of_buckets) * q->width;
+}
+
+/* Empties the queue, in time proportional to the number of vertices
+ * pushed since it was last empty */
+void igraph_i_spqueue_clear(igraph_i_spqueue_t *q) {
+  long int i;
+  if (!q->buckets) {
+    /* igraph_2wheap_clear would zero the positions of all the vertices */
+    for (i=0; i<q->no_of_pushed; i++) {
+      VECTOR(q->heap.index2)[q->pushed[i]]=0;
+    }
+    igraph_vector_clear(&q->heap.data);
+    igraph_vector_long_clear(&q->heap.index);
+    q->no_of_pushed=0;
+    return;
+  }
+  for (i=0; i<q->no_of_pushed; i++) {
+    long int idx=q->pushed[i];
+    if (q->bucket[idx] != -1) {
+      q->head[q->bucket[idx]]=-1;
+      q->bucket[idx]=-1;
+    }
+  }
+  q->no_of_pushed=0;
+  q->size=0;
+}
+
 int igraph_i_betweenness_estimate_weighted(const igraph_t *graph, 
 					 igraph_vector_t *res, 
            igraph_vector_t *stats,
@@ -1465,7 +1707,7 @@ int igraph_i_betweenness_estimate_weighted(const igraph_t *graph,
   long int forward_touched_edges = 0;
   long int backward_touched_edges = 0;
   //igraph_real_t linear_scaling_factor = 1.0;
-  igraph_2wheap_t Q;
+  igraph_i_spqueue_t Q;
   igraph_inclist_t inclist;
   igraph_adjlist_t fathers;
   long int vertex_index, source, j;
@@ -1493,8 +1735,8 @@ int igraph_i_betweenness_estimate_weighted(const igraph_t *graph,
     rng=igraph_rng_default();
   }
 
-  IGRAPH_CHECK(igraph_2wheap_init(&Q, no_of_nodes));
-  IGRAPH_FINALLY(igraph_2wheap_destroy, &Q);
+  IGRAPH_CHECK(igraph_i_spqueue_init(&Q, no_of_nodes, weights));
+  IGRAPH_FINALLY(igraph_i_spqueue_destroy, &Q);
   IGRAPH_CHECK(igraph_inclist_init(graph, &inclist, mode));  
   IGRAPH_FINALLY(igraph_inclist_destroy, &inclist);
   IGRAPH_CHECK(igraph_adjlist_init_empty(&fathers, no_of_nodes));
@@ -1524,13 +1766,13 @@ int igraph_i_betweenness_estimate_weighted(const igraph_t *graph,
       source = vertex_index;
     }
 
-    igraph_2wheap_push_with_index(&Q, source, 0);
+    igraph_i_spqueue_push(&Q, source, 0);
     VECTOR(dist)[source]=1.0;
     VECTOR(nrgeo)[source]=1;
     
-    while (!igraph_2wheap_empty(&Q)) {
-      long int minnei=igraph_2wheap_max_index(&Q);
-      igraph_real_t mindist=-igraph_2wheap_delete_max(&Q);
+    while (!igraph_i_spqueue_empty(&Q)) {
+      igraph_real_t mindist;
+      long int minnei=igraph_i_spqueue_pop(&Q, &mindist);
       igraph_vector_t *neis;
       long int nlen;
       
@@ -1547,6 +1789,7 @@ int igraph_i_betweenness_estimate_weighted(const igraph_t *graph,
 	long int to=IGRAPH_OTHER(graph, edge, minnei);
 	igraph_real_t altdist=mindist + VECTOR(*weights)[edge];
 	igraph_real_t curdist=VECTOR(dist)[to];
+	if (cutoff >= 0 && altdist > cutoff) { continue; }
 	if (curdist==0) {
 	  /* This is the first non-infinite distance */
 	  igraph_vector_t *v=igraph_adjlist_get(&fathers, to);
@@ -1556,7 +1799,7 @@ int igraph_i_betweenness_estimate_weighted(const igraph_t *graph,
     VECTOR(tmpscore)[to]=0;
 
 	  VECTOR(dist)[to]=altdist+1.0;
-	  IGRAPH_CHECK(igraph_2wheap_push_with_index(&Q, to, -altdist));
+	  IGRAPH_CHECK(igraph_i_spqueue_push(&Q, to, altdist));
 	} else if (altdist < curdist-1) {
 	  /* This is a shorter path */
 	  igraph_vector_t *v=igraph_adjlist_get(&fathers, to);
@@ -1565,7 +1808,7 @@ int igraph_i_betweenness_estimate_weighted(const igraph_t *graph,
 	  VECTOR(nrgeo)[to] = VECTOR(nrgeo)[minnei];
 
 	  VECTOR(dist)[to]=altdist+1.0;
-	  IGRAPH_CHECK(igraph_2wheap_modify(&Q, to, -altdist));
+	  IGRAPH_CHECK(igraph_i_spqueue_decrease(&Q, to, altdist));
 	} else if (altdist == curdist-1) {
 	  igraph_vector_t *v=igraph_adjlist_get(&fathers, to);
 	  igraph_vector_push_back(v, minnei);
@@ -1573,7 +1816,7 @@ int igraph_i_betweenness_estimate_weighted(const igraph_t *graph,
 	}
       }
       
-    } /* !igraph_2wheap_empty(&Q) */
+    } /* !igraph_i_spqueue_empty(&Q) */
 
     while (!igraph_stack_empty(&S)) {
       long int w=igraph_stack_pop(&S);
@@ -1638,7 +1881,7 @@ int igraph_i_betweenness_estimate_weighted(const igraph_t *graph,
   igraph_stack_destroy(&S);
   igraph_adjlist_destroy(&fathers);
   igraph_inclist_destroy(&inclist);
-  igraph_2wheap_destroy(&Q);
+  igraph_i_spqueue_destroy(&Q);
   IGRAPH_FINALLY_CLEAN(7);
   
   return 0;
@@ -2017,7 +2260,7 @@ int igraph_i_betweenness_weighted_sample_gss_linear(const igraph_t *graph,
   long int forward_touched_edges = 0;
   long int backward_touched_edges = 0;
   igraph_real_t linear_scaling_factor = 1.0;
-  igraph_2wheap_t Q;
+  igraph_i_spqueue_t Q;
   igraph_inclist_t inclist;
   igraph_inclist_t inclist_in;
   igraph_adjlist_t fathers;
@@ -2043,8 +2286,8 @@ int igraph_i_betweenness_weighted_sample_gss_linear(const igraph_t *graph,
     rng=igraph_rng_default();
   }
 
-  IGRAPH_CHECK(igraph_2wheap_init(&Q, no_of_nodes));
-  IGRAPH_FINALLY(igraph_2wheap_destroy, &Q);
+  IGRAPH_CHECK(igraph_i_spqueue_init(&Q, no_of_nodes, weights));
+  IGRAPH_FINALLY(igraph_i_spqueue_destroy, &Q);
   IGRAPH_CHECK(igraph_inclist_init(graph, &inclist, mode));  
   IGRAPH_FINALLY(igraph_inclist_destroy, &inclist);
   IGRAPH_CHECK(igraph_inclist_init(graph, &inclist_in, directed? IGRAPH_IN : IGRAPH_ALL));
@@ -2073,13 +2316,13 @@ int igraph_i_betweenness_weighted_sample_gss_linear(const igraph_t *graph,
 
     backwards = igraph_rng_get_integer(rng, 0, 1);
 
-    igraph_2wheap_push_with_index(&Q, source, 0);
+    igraph_i_spqueue_push(&Q, source, 0);
     VECTOR(dist)[source]=1.0;
     VECTOR(nrgeo)[source]=1;
     
-    while (!igraph_2wheap_empty(&Q)) {
-      long int minnei=igraph_2wheap_max_index(&Q);
-      igraph_real_t mindist=-igraph_2wheap_delete_max(&Q);
+    while (!igraph_i_spqueue_empty(&Q)) {
+      igraph_real_t mindist;
+      long int minnei=igraph_i_spqueue_pop(&Q, &mindist);
       igraph_vector_t *neis;
       long int nlen;
       
@@ -2109,7 +2352,7 @@ int igraph_i_betweenness_weighted_sample_gss_linear(const igraph_t *graph,
           VECTOR(tmpscore)[to]=0;
 
           VECTOR(dist)[to]=altdist+1.0;
-          IGRAPH_CHECK(igraph_2wheap_push_with_index(&Q, to, -altdist));
+          IGRAPH_CHECK(igraph_i_spqueue_push(&Q, to, altdist));
         } else if (altdist < curdist-1) {
           /* This is a shorter path */
           igraph_vector_t *v=igraph_adjlist_get(&fathers, to);
@@ -2118,7 +2361,7 @@ int igraph_i_betweenness_weighted_sample_gss_linear(const igraph_t *graph,
           VECTOR(nrgeo)[to] = VECTOR(nrgeo)[minnei];
 
           VECTOR(dist)[to]=altdist+1.0;
-          IGRAPH_CHECK(igraph_2wheap_modify(&Q, to, -altdist));
+          IGRAPH_CHECK(igraph_i_spqueue_decrease(&Q, to, altdist));
         } else if (altdist == curdist-1) {
           igraph_vector_t *v=igraph_adjlist_get(&fathers, to);
           igraph_vector_push_back(v, minnei);
@@ -2126,7 +2369,7 @@ int igraph_i_betweenness_weighted_sample_gss_linear(const igraph_t *graph,
         }
       }
       
-    } /* !igraph_2wheap_empty(&Q) */
+    } /* !igraph_i_spqueue_empty(&Q) */
 
     while (!igraph_stack_empty(&S)) {
       long int w=igraph_stack_pop(&S);
@@ -2193,7 +2436,7 @@ int igraph_i_betweenness_weighted_sample_gss_linear(const igraph_t *graph,
   igraph_adjlist_destroy(&fathers);
   igraph_inclist_destroy(&inclist);
   igraph_inclist_destroy(&inclist_in);
-  igraph_2wheap_destroy(&Q);
+  igraph_i_spqueue_destroy(&Q);
   IGRAPH_FINALLY_CLEAN(8);
   
   return 0;
@@ -2600,706 +2843,3091 @@ int igraph_betweenness_sample_bp(const igraph_t *graph, igraph_vector_t *res,
   return return_code;
 }
 
-int igraph_i_betweenness_sample_vc_weighted(const igraph_t *graph, igraph_vector_t *res,
-           igraph_vector_t *stats, igraph_strvector_t *stats_names,
-           igraph_integer_t no_of_samples, const igraph_vs_t vids,
-           igraph_bool_t directed, igraph_real_t cutoff, 
-           const igraph_vector_t* weights, igraph_bool_t nobigint) {
+/*
+ * One side of the bidirectional breadth-first search used by the VC
+ * sampling kernel: the search from the source follows out-edges, the
+ * search from the destination follows in-edges.
+ */
+typedef struct igraph_i_vc_bfs_side_t {
+  igraph_adjlist_t *adjlist;
+  long int *distance;               /* distance from the root, plus one */
+  unsigned long long int *nrgeo;    /* number of shortest paths from the root */
+  long int *order;                  /* visited vertices, in BFS order */
+  long int level_begin, level_end;  /* the frontier is order[level_begin..level_end) */
+  long int frontier_edges;          /* edges leaving the frontier */
+} igraph_i_vc_bfs_side_t;
+
+/*
+ * One side of the bidirectional Dijkstra search used by the weighted VC
+ * sampling kernel, with the same orientation as igraph_i_vc_bfs_side_t.
+ * The distances are stored as they are, IGRAPH_INFINITY for the vertices
+ * not reached, rather than plus one, so that no precision is lost when
+ * the lengths of the paths through both sides are compared.
+ */
+typedef struct igraph_i_vc_dijkstra_side_t {
+  igraph_inclist_t *inclist;
+  igraph_vector_t dist;             /* distance from the root */
+  igraph_vector_t nrgeo;            /* number of shortest paths from the root */
+  igraph_i_spqueue_t Q;
+  igraph_inclist_t fathers;         /* next edges towards the root */
+  long int *visited;                /* vertices reached */
+  long int no_of_visited;
+} igraph_i_vc_dijkstra_side_t;
+
+/*
+ * Workspace of a single worker of the VC sampling kernels. Each worker
+ * owns its search buffers, its random number generator and its
+ * accumulator, so that several workers can sample pairs in parallel
+ * without sharing any mutable state. The adjacency structures and the
+ * weights are shared and only read.
+ */
+typedef struct igraph_i_vc_worker_t {
+  const igraph_t *graph;
+  igraph_adjlist_t *adjlist_out;
+  igraph_adjlist_t *adjlist_in;
+  igraph_inclist_t *inclist;
+  igraph_inclist_t *inclist_in;
+  const igraph_vector_t *weights;
+  igraph_real_t max_weight;
+  /* landmark distances for the goal-directed weighted search, see
+   * igraph_betweenness_landmarks */
+  const igraph_matrix_t *landmarks;
+  igraph_bool_t directed;
+  igraph_real_t cutoff;
+  igraph_bool_t nobigint;
+  igraph_bool_t bidirectional;
+  igraph_bool_t group_sources;
+  /* Only the worker running in the calling thread reports progress and
+   * checks for interruption. */
+  igraph_bool_t main_thread;
+  long int no_of_samples;
+  igraph_rng_t *rng;
+  igraph_rng_t own_rng;
+  igraph_bool_t own_rng_initialized;
+  /* Number of sampled paths each vertex is internal to */
+  igraph_real_t *counts;
+  igraph_bool_t own_counts;
+  /* Number of sampled paths each edge is on, if count_edges is set */
+  igraph_bool_t count_edges;
+  igraph_real_t *edge_counts;
+  igraph_bool_t own_edge_counts;
+  long int forward_touched_edges;
+  long int backward_touched_edges;
+  long int distinct_sources;        /* searches run */
+  long int settled_vertices;        /* vertices expanded by the searches */
+  int ret;
+  /* vertices reached by the current search, to reset only those */
+  long int *visited;
+  long int no_of_visited;
+  /* destinations the current search must reach before stopping */
+  igraph_bool_t *pending;
+  long int no_of_pending;
+  /* sampled pairs, sorted by source, when grouping the pairs */
+  long int *pairs;
+  /* predecessors of the current path vertex and prefix sums of their
+   * number of shortest paths, for sampling the next step of a walk;
+   * max_preds is the largest number of predecessors of any vertex */
+  long int max_preds;
+  long int *preds;
+  igraph_real_t *prefix;
+  /* edges to the predecessors, when counting the edges of an unweighted
+   * walk */
+  long int *pred_edges;
+  /* unweighted search */
+  long int *distance;
+  unsigned long long int *nrgeo;  /* must be long long; consider grid
+				     graphs for example */
+  igraph_biguint_t *big_nrgeo;
+  igraph_dqueue_t q;
+  /* bidirectional unweighted search */
+  igraph_i_vc_bfs_side_t source_side;
+  igraph_i_vc_bfs_side_t destination_side;
+  /* weighted search */
+  igraph_vector_t dist;
+  igraph_vector_t wnrgeo;
+  igraph_i_spqueue_t Q;
+  /* edges to the predecessors on shortest paths, weighted search only */
+  igraph_inclist_t fathers;
+  /* lower bound to the distance to the destination of the vertices
+   * reached by the goal-directed search */
+  igraph_vector_t potential;
+  /* bidirectional weighted search */
+  igraph_i_vc_dijkstra_side_t source_wside;
+  igraph_i_vc_dijkstra_side_t destination_wside;
+  /* edges where the shortest paths cross from one side to the other,
+   * as pairs (vertex on the source side, edge), and prefix sums of the
+   * number of shortest paths through them */
+  igraph_vector_t crossing;
+  igraph_vector_t crossing_prefix;
+} igraph_i_vc_worker_t;
+
+typedef struct igraph_i_vc_workers_t {
+  igraph_i_vc_worker_t *workers;
+  long int no_of_workers;
+} igraph_i_vc_workers_t;
+
+void igraph_i_vc_bfs_side_destroy(igraph_i_vc_bfs_side_t *side) {
+  if (side->distance) {
+    igraph_Free(side->distance);
+  }
+  if (side->nrgeo) {
+    igraph_Free(side->nrgeo);
+  }
+  if (side->order) {
+    igraph_Free(side->order);
+  }
+}
 
-  igraph_rng_t *rng=igraph_rng_default();
-  long int no_of_nodes=igraph_vcount(graph);
-  long int no_of_edges=igraph_ecount(graph);
-  long int backward_touched_edges = 0;
-  long int forward_touched_edges = 0;
-  //double normalization_factor = ((double) no_of_nodes) * (no_of_nodes - 1) / no_of_samples;
-    double normalization_factor = 1.0 / no_of_samples;
+int igraph_i_vc_bfs_side_init(igraph_i_vc_bfs_side_t *side, 
+                              igraph_adjlist_t *adjlist, long int no_of_nodes) {
+  side->adjlist=adjlist;
+  side->distance=igraph_Calloc(no_of_nodes, long int);
+  side->nrgeo=igraph_Calloc(no_of_nodes, unsigned long long int);
+  side->order=igraph_Calloc(no_of_nodes, long int);
+  if (side->distance==0 || side->nrgeo==0 || side->order==0) {
+    IGRAPH_ERROR("betweenness failed", IGRAPH_ENOMEM);
+  }
+  return 0;
+}
 
-  igraph_inclist_t inclist;
-  igraph_adjlist_t fathers;
-  long int vertex_index, j;
-  /* igraph_stack_t S; */
-  directed = directed && igraph_is_directed(graph);
-  igraph_integer_t mode= directed ? IGRAPH_OUT : IGRAPH_ALL;
-  igraph_vector_t dist, nrgeo; //, tmpscore;
-  igraph_vector_t v_tmpres, *tmpres=&v_tmpres;
-  igraph_vit_t vit;
-  
-  if (igraph_vector_size(weights) != no_of_edges) {
-    IGRAPH_ERROR("Weight vector length does not match", IGRAPH_EINVAL);
+void igraph_i_vc_dijkstra_side_destroy(igraph_i_vc_dijkstra_side_t *side) {
+  if (side->visited) {
+    igraph_Free(side->visited);
   }
-  if (igraph_vector_min(weights) <= 0) {
-    IGRAPH_ERROR("Weight vector must be positive", IGRAPH_EINVAL);
+  igraph_vector_destroy(&side->dist);
+  igraph_vector_destroy(&side->nrgeo);
+  igraph_i_spqueue_destroy(&side->Q);
+  igraph_inclist_destroy(&side->fathers);
+}
+
+int igraph_i_vc_dijkstra_side_init(igraph_i_vc_dijkstra_side_t *side,
+                                   igraph_inclist_t *inclist,
+                                   long int no_of_nodes,
+                                   const igraph_vector_t *weights) {
+  side->inclist=inclist;
+  side->visited=igraph_Calloc(no_of_nodes, long int);
+  if (side->visited==0) {
+    IGRAPH_ERROR("betweenness failed", IGRAPH_ENOMEM);
   }
+  IGRAPH_CHECK(igraph_vector_init(&side->dist, no_of_nodes));
+  igraph_vector_fill(&side->dist, IGRAPH_INFINITY);
+  IGRAPH_CHECK(igraph_vector_init(&side->nrgeo, no_of_nodes));
+  IGRAPH_CHECK(igraph_inclist_init_empty(&side->fathers, no_of_nodes));
+  IGRAPH_CHECK(igraph_i_spqueue_init(&side->Q, no_of_nodes, weights));
+  return 0;
+}
 
-  if (no_of_samples < 1) {
-    IGRAPH_ERROR("Number of samples must be positive",
-        IGRAPH_EINVAL);
+void igraph_i_vc_workers_destroy(igraph_i_vc_workers_t *workers) {
+  long int i;
+  if (workers->workers == 0) {
+    return;
+  }
+  for (i=0; i<workers->no_of_workers; i++) {
+    igraph_i_vc_worker_t *w=&workers->workers[i];
+    if (w->own_rng_initialized) {
+      igraph_rng_destroy(&w->own_rng);
+    }
+    if (w->own_counts && w->counts) {
+      igraph_Free(w->counts);
+    }
+    if (w->own_edge_counts && w->edge_counts) {
+      igraph_Free(w->edge_counts);
+    }
+    if (w->pred_edges) {
+      igraph_Free(w->pred_edges);
+    }
+    if (w->visited) {
+      igraph_Free(w->visited);
+    }
+    if (w->pending) {
+      igraph_Free(w->pending);
+    }
+    if (w->pairs) {
+      igraph_Free(w->pairs);
+    }
+    if (w->preds) {
+      igraph_Free(w->preds);
+    }
+    if (w->prefix) {
+      igraph_Free(w->prefix);
+    }
+    if (w->distance) {
+      igraph_Free(w->distance);
+    }
+    if (w->nrgeo) {
+      igraph_Free(w->nrgeo);
+    }
+    if (w->big_nrgeo) {
+      igraph_i_destroy_biguints(w->big_nrgeo);
+    }
+    igraph_dqueue_destroy(&w->q);
+    igraph_i_vc_bfs_side_destroy(&w->source_side);
+    igraph_i_vc_bfs_side_destroy(&w->destination_side);
+    igraph_vector_destroy(&w->dist);
+    igraph_vector_destroy(&w->wnrgeo);
+    igraph_i_spqueue_destroy(&w->Q);
+    igraph_inclist_destroy(&w->fathers);
+    igraph_vector_destroy(&w->potential);
+    igraph_i_vc_dijkstra_side_destroy(&w->source_wside);
+    igraph_i_vc_dijkstra_side_destroy(&w->destination_wside);
+    igraph_vector_destroy(&w->crossing);
+    igraph_vector_destroy(&w->crossing_prefix);
+  }
+  igraph_Free(workers->workers);
+}
+
+/*
+ * Allocates the buffers of a worker. All the fields of 'w' must be zero
+ * when this is called; whatever was allocated before a failure is freed
+ * by igraph_i_vc_workers_destroy. The worker accumulates into 'counts'
+ * and 'edge_counts' if they are not null, and into its own buffers
+ * otherwise; the edges are only counted if w->count_edges is set.
+ */
+int igraph_i_vc_worker_init(igraph_i_vc_worker_t *w, igraph_real_t *counts,
+                            igraph_real_t *edge_counts) {
+  long int no_of_nodes=igraph_vcount(w->graph);
+  long int j;
+
+  if (counts) {
+    w->counts=counts;
+  } else {
+    w->counts=igraph_Calloc(no_of_nodes, igraph_real_t);
+    if (w->counts==0) {
+      IGRAPH_ERROR("betweenness failed", IGRAPH_ENOMEM);
+    }
+    w->own_counts=1;
+  }
+  w->preds=igraph_Calloc(w->max_preds, long int);
+  w->prefix=igraph_Calloc(w->max_preds, igraph_real_t);
+  if (w->preds==0 || w->prefix==0) {
+    IGRAPH_ERROR("betweenness failed", IGRAPH_ENOMEM);
+  }
+  if (w->count_edges) {
+    if (edge_counts) {
+      w->edge_counts=edge_counts;
+    } else {
+      w->edge_counts=igraph_Calloc(igraph_ecount(w->graph), igraph_real_t);
+      if (w->edge_counts==0) {
+        IGRAPH_ERROR("betweenness failed", IGRAPH_ENOMEM);
+      }
+      w->own_edge_counts=1;
+    }
+    w->pred_edges=igraph_Calloc(w->max_preds, long int);
+    if (w->pred_edges==0) {
+      IGRAPH_ERROR("betweenness failed", IGRAPH_ENOMEM);
+    }
   }
 
-  IGRAPH_CHECK(igraph_inclist_init(graph, &inclist, mode));  
-  IGRAPH_FINALLY(igraph_inclist_destroy, &inclist);
-  
-  IGRAPH_CHECK(igraph_adjlist_init_empty(&fathers, no_of_nodes));
-  IGRAPH_FINALLY(igraph_adjlist_destroy, &fathers);
+  if (!w->bidirectional) {
+    w->visited=igraph_Calloc(no_of_nodes, long int);
+    w->pending=igraph_Calloc(no_of_nodes, igraph_bool_t);
+    if (w->visited==0 || w->pending==0) {
+      IGRAPH_ERROR("betweenness failed", IGRAPH_ENOMEM);
+    }
+  }
+  if (w->group_sources) {
+    w->pairs=igraph_Calloc(2*w->no_of_samples, long int);
+    if (w->pairs==0) {
+      IGRAPH_ERROR("betweenness failed", IGRAPH_ENOMEM);
+    }
+  }
 
-  /* 
-  IGRAPH_CHECK(igraph_stack_init(&S, no_of_nodes));
-  IGRAPH_FINALLY(igraph_stack_destroy, &S);
-  */
-  IGRAPH_VECTOR_INIT_FINALLY(&dist, no_of_nodes);
-  /* IGRAPH_VECTOR_INIT_FINALLY(&tmpscore, no_of_nodes); */
-  IGRAPH_VECTOR_INIT_FINALLY(&nrgeo, no_of_nodes);
+  if (w->weights && w->bidirectional) {
+    w->max_weight=igraph_vector_max(w->weights);
+    IGRAPH_CHECK(igraph_i_vc_dijkstra_side_init(&w->source_wside, w->inclist,
+          no_of_nodes, w->weights));
+    IGRAPH_CHECK(igraph_i_vc_dijkstra_side_init(&w->destination_wside,
+          w->inclist_in, no_of_nodes, w->weights));
+    IGRAPH_CHECK(igraph_vector_init(&w->crossing, 0));
+    IGRAPH_CHECK(igraph_vector_init(&w->crossing_prefix, 0));
+    return 0;
+  }
 
-  if (igraph_vs_is_all(&vids)) {
-    IGRAPH_CHECK(igraph_vector_resize(res, no_of_nodes));
-    igraph_vector_null(res);
-    tmpres=res;
+  if (w->weights) {
+    IGRAPH_CHECK(igraph_inclist_init_empty(&w->fathers, no_of_nodes));
+    IGRAPH_CHECK(igraph_vector_init(&w->dist, no_of_nodes));
+    IGRAPH_CHECK(igraph_vector_init(&w->wnrgeo, no_of_nodes));
+    if (w->landmarks) {
+      /* The reduced weights of the goal-directed search can be as small
+       * as wanted: only the heap settles them in order */
+      IGRAPH_CHECK(igraph_vector_init(&w->potential, no_of_nodes));
+      IGRAPH_CHECK(igraph_i_spqueue_init(&w->Q, no_of_nodes, 0));
+    } else {
+      IGRAPH_CHECK(igraph_i_spqueue_init(&w->Q, no_of_nodes, w->weights));
+    }
+    return 0;
+  }
+
+  if (w->bidirectional) {
+    IGRAPH_CHECK(igraph_i_vc_bfs_side_init(&w->source_side, w->adjlist_out,
+          no_of_nodes));
+    IGRAPH_CHECK(igraph_i_vc_bfs_side_init(&w->destination_side, w->adjlist_in,
+          no_of_nodes));
+    return 0;
+  }
+
+  w->distance=igraph_Calloc(no_of_nodes, long int);
+  if (w->distance==0) {
+    IGRAPH_ERROR("betweenness failed", IGRAPH_ENOMEM);
+  }
+  if (w->nobigint) {
+    w->nrgeo=igraph_Calloc(no_of_nodes, unsigned long long int);
+    if (w->nrgeo==0) {
+      IGRAPH_ERROR("betweenness failed", IGRAPH_ENOMEM);
+    }
   } else {
-    IGRAPH_VECTOR_INIT_FINALLY(tmpres, no_of_nodes);
+    /* +1 is to have one containing zeros, when we free it, we stop
+       at the zero */
+    w->big_nrgeo=igraph_Calloc(no_of_nodes+1, igraph_biguint_t);
+    if (!w->big_nrgeo) {
+      IGRAPH_ERROR("betweenness failed", IGRAPH_ENOMEM);
+    }
+    for (j=0; j<no_of_nodes; j++) {
+      IGRAPH_CHECK(igraph_biguint_init(&w->big_nrgeo[j]));
+    }
+  }
+  /* A search queues every vertex at most once, so pushing never
+   * allocates */
+  IGRAPH_CHECK(igraph_dqueue_init(&w->q, no_of_nodes));
+  return 0;
+}
+
+/*
+ * IGRAPH_CHECK for the code run by the VC sampling workers, which returns
+ * the error code without raising it. The igraph error macros go through
+ * the process-global error handler and FINALLY stack, which are not
+ * thread-safe, so the workers only return their errors, and
+ * igraph_i_vc_run_workers raises them once all the threads are joined.
+ * Whatever the workers call must not raise errors either: the buffers
+ * they grow are grown by the helpers below.
+ */
+#define IGRAPH_I_VC_CHECK(expr) \
+  do { \
+    int igraph_i_vc_ret=(expr); \
+    if (igraph_i_vc_ret != 0) { \
+      return igraph_i_vc_ret; \
+    } \
+  } while (0)
+
+/*
+ * igraph_vector_push_back for the workers, returning IGRAPH_ENOMEM
+ * instead of raising it.
+ */
+int igraph_i_vc_push_back(igraph_vector_t *v, igraph_real_t e) {
+  if (v->end == v->stor_end) {
+    long int size=v->end - v->stor_begin;
+    long int alloc_size=size > 0 ? 2*size : 1;
+    igraph_real_t *tmp=igraph_Realloc(v->stor_begin, (size_t) alloc_size,
+                                      igraph_real_t);
+    if (tmp == 0) {
+      return IGRAPH_ENOMEM;
+    }
+    v->stor_begin=tmp;
+    v->stor_end=tmp + alloc_size;
+    v->end=tmp + size;
   }
+  *(v->end)=e;
+  v->end++;
+  return 0;
+}
 
-  igraph_2wheap_t Q;
-  IGRAPH_CHECK(igraph_2wheap_init(&Q, no_of_nodes));
-  IGRAPH_FINALLY(igraph_2wheap_destroy, &Q);
+/*
+ * Makes room for at least 'size' limbs in 'b' for the workers, returning
+ * IGRAPH_ENOMEM instead of raising it, so that the big integer
+ * arithmetic that follows never allocates.
+ */
+int igraph_i_vc_biguint_reserve(igraph_biguint_t *b, long int size) {
+  igraph_vector_limb_t *v=&b->v;
+  if (v->stor_end - v->stor_begin < size) {
+    long int len=v->end - v->stor_begin;
+    limb_t *tmp=igraph_Realloc(v->stor_begin, (size_t) size, limb_t);
+    if (tmp == 0) {
+      return IGRAPH_ENOMEM;
+    }
+    v->stor_begin=tmp;
+    v->stor_end=tmp + size;
+    v->end=tmp + len;
+  }
+  return 0;
+}
 
-  // setbuf(stdout, 0);
+/*
+ * Reports the progress of the worker running in the calling thread and
+ * checks for interruption, like IGRAPH_PROGRESS and
+ * IGRAPH_ALLOW_INTERRUPTION but without freeing the FINALLY stack, which
+ * still holds the buffers of the other workers. The other workers do
+ * nothing.
+ */
+int igraph_i_vc_progress(igraph_i_vc_worker_t *w, long int done) {
+  if (!w->main_thread) {
+    return 0;
+  }
+  if (igraph_progress("Betweenness centrality: ",
+                      100.0*done/w->no_of_samples, 0) != IGRAPH_SUCCESS) {
+    return IGRAPH_INTERRUPTED;
+  }
+  IGRAPH_ALLOW_INTERRUPTION();
+  return 0;
+}
 
-  for (vertex_index=0; vertex_index<no_of_samples; vertex_index++) {
-    IGRAPH_PROGRESS("Betweenness centrality: ", 100.0*vertex_index/no_of_samples, 0);
-    IGRAPH_ALLOW_INTERRUPTION();
-    // printf("vertex_index=%ld\n", vertex_index);
-    
-    /* Sample a pair of distinct vertices */
-    long int destination = 0;
-    long int source = igraph_rng_get_integer(rng, 0, no_of_nodes - 1);
-    do {
-      destination = igraph_rng_get_integer(rng, 0, no_of_nodes - 1);
-    } while (destination == source);
-    //printf("source=%ld,destination=%ld\n", source, destination);
+/*
+ * Samples an index in [0, len) with probability proportional to the 
+ * increments of the prefix sums prefix[0..len), using binary search.
+ * No random number is drawn if len is 1.
+ */
+long int igraph_i_vc_sample_prefix(igraph_rng_t *rng, 
+                                   const igraph_real_t *prefix, long int len) {
+  long int lo=0, hi=len-1, mid;
+  igraph_real_t sampled;
+  if (len == 1) {
+    return 0;
+  }
+  sampled=igraph_rng_get_unif(rng, 0, prefix[len-1]);
+  /* first index whose prefix sum exceeds the sampled value */
+  while (lo < hi) {
+    mid=lo+(hi-lo)/2;
+    if (prefix[mid] > sampled) {
+      hi=mid;
+    } else {
+      lo=mid+1;
+    }
+  }
+  return lo;
+}
+
+/*
+ * Marks 'destination' as a vertex the next search must settle.
+ */
+void igraph_i_vc_add_pending(igraph_i_vc_worker_t *w, long int destination) {
+  if (!w->pending[destination]) {
+    w->pending[destination]=1;
+    w->no_of_pending++;
+  }
+}
 
-    igraph_bool_t destination_is_reached = 0;
+/*
+ * Dijkstra search from 'source' on a weighted graph, recording the
+ * predecessors and the number of shortest paths of every vertex reached.
+ * The search stops as soon as all the pending vertices are settled, and
+ * never reaches the vertices farther than the cutoff.
+ */
+int igraph_i_vc_weighted_search(igraph_i_vc_worker_t *w, long int source) {
 
-    igraph_2wheap_push_with_index(&Q, source, 0);
-    VECTOR(dist)[source]=1.0;
-    VECTOR(nrgeo)[source]=1;
+  const igraph_t *graph=w->graph;
+  const igraph_vector_t *weights=w->weights;
+  igraph_real_t cutoff=w->cutoff;
+  long int j;
+
+  igraph_i_spqueue_push(&w->Q, source, 0);
+  VECTOR(w->dist)[source]=1.0;
+  VECTOR(w->wnrgeo)[source]=1;
+  w->visited[0]=source;
+  w->no_of_visited=1;
     
-    while (!igraph_2wheap_empty(&Q)) {
-      long int minnei=igraph_2wheap_max_index(&Q);
-      igraph_real_t mindist=-igraph_2wheap_delete_max(&Q);
-      igraph_vector_t *neis;
-      long int nlen;
-      // printf("minnei=%ld\n", minnei);
+  while (!igraph_i_spqueue_empty(&w->Q)) {
+    igraph_real_t mindist;
+    long int minnei=igraph_i_spqueue_pop(&w->Q, &mindist);
+    igraph_vector_t *neis;
+    long int nlen;
       
-      /* igraph_stack_push(&S, minnei); */
-      /* Set a flag if destination is reached */
-      if (minnei == destination) {
-        destination_is_reached=1;
+    w->settled_vertices++;
+    /* Stop once all the destinations are reached */
+    if (w->pending[minnei]) {
+      if (--w->no_of_pending == 0) {
         break;
       }
+    }
       
-      if (cutoff >=0 && VECTOR(dist)[minnei] >= cutoff+1.0) { continue; }
+    if (cutoff >=0 && VECTOR(w->dist)[minnei] >= cutoff+1.0) { continue; }
       
-      /* Now check all neighbors of 'minnei' for a shorter path */
-      neis=igraph_inclist_get(&inclist, minnei);
-      nlen=igraph_vector_size(neis);
-      for (j=0; j<nlen; j++) {
-        forward_touched_edges++;
-        long int edge=VECTOR(*neis)[j];
-        long int to=IGRAPH_OTHER(graph, edge, minnei);
-        // printf("to=%ld\n", to);
-        igraph_real_t altdist=mindist + VECTOR(*weights)[edge];
-        igraph_real_t curdist=VECTOR(dist)[to];
-        if (curdist==0) {
-          /* This is the first non-infinite distance */
-          igraph_vector_t *v=igraph_adjlist_get(&fathers, to);
-          igraph_vector_resize(v,1);
-          VECTOR(*v)[0]=minnei;
-          VECTOR(nrgeo)[to] = VECTOR(nrgeo)[minnei];
+    /* Now check all neighbors of 'minnei' for a shorter path */
+    neis=igraph_inclist_get(w->inclist, minnei);
+    nlen=igraph_vector_size(neis);
+    for (j=0; j<nlen; j++) {
+      w->forward_touched_edges++;
+      long int edge=VECTOR(*neis)[j];
+      long int to=IGRAPH_OTHER(graph, edge, minnei);
+      igraph_real_t altdist=mindist + VECTOR(*weights)[edge];
+      igraph_real_t curdist=VECTOR(w->dist)[to];
+      if (cutoff >= 0 && altdist > cutoff) {
+        /* Paths longer than the cutoff are not counted */
+        continue;
+      }
+      if (curdist==0) {
+        /* This is the first non-infinite distance */
+        igraph_vector_t *v=igraph_inclist_get(&w->fathers, to);
+        w->visited[w->no_of_visited++]=to;
+        igraph_vector_clear(v);
+        IGRAPH_I_VC_CHECK(igraph_i_vc_push_back(v, edge));
+        VECTOR(w->wnrgeo)[to] = VECTOR(w->wnrgeo)[minnei];
+
+        VECTOR(w->dist)[to]=altdist+1.0;
+        IGRAPH_I_VC_CHECK(igraph_i_spqueue_push(&w->Q, to, altdist));
+      } else if (altdist < curdist-1) {
+        /* This is a shorter path */
+        igraph_vector_t *v=igraph_inclist_get(&w->fathers, to);
+        igraph_vector_clear(v);
+        IGRAPH_I_VC_CHECK(igraph_i_vc_push_back(v, edge));
+        VECTOR(w->wnrgeo)[to] = VECTOR(w->wnrgeo)[minnei];
+
+        VECTOR(w->dist)[to]=altdist+1.0;
+        IGRAPH_I_VC_CHECK(igraph_i_spqueue_decrease(&w->Q, to, altdist));
+      } else if (altdist == curdist-1) {
+        igraph_vector_t *v=igraph_inclist_get(&w->fathers, to);
+        IGRAPH_I_VC_CHECK(igraph_i_vc_push_back(v, edge));
+        VECTOR(w->wnrgeo)[to] += VECTOR(w->wnrgeo)[minnei];
+      }
+    }
+      
+  } /* !igraph_i_spqueue_empty(&Q) */
+
+  igraph_i_spqueue_clear(&w->Q);
+  return 0;
+}
+
+/*
+ * Walks from 'vertex' to 'root' along the edges to the predecessors
+ * recorded by a weighted search, choosing each step with probability
+ * proportional to the number of shortest paths from the root through it,
+ * and increases the counter of every vertex met except the root and
+ * 'vertex', and of every edge crossed if edges are counted.
+ */
+void igraph_i_vc_weighted_walk_to(igraph_i_vc_worker_t *w,
+                                  igraph_inclist_t *fathers,
+                                  const igraph_vector_t *nrgeo,
+                                  long int root, long int vertex) {
+  long int j, edge, sampled_pred=vertex;
+
+  while (sampled_pred != root) {
+    /* Get list of edges to the predecessors of the current vertex */
+    igraph_vector_t *fatv=igraph_inclist_get(fathers, sampled_pred);
+    /* Weighted sampling of predecessor according to the number of paths
+     * passing through it.
+     */
+    long int fatv_len=igraph_vector_size(fatv);
+    igraph_real_t curr_limit=0;
+    for (j=0; j<fatv_len; j++) {
+      w->backward_touched_edges++;
+      long int f = IGRAPH_OTHER(w->graph, (long int) VECTOR(*fatv)[j],
+          sampled_pred);
+      curr_limit+=VECTOR(*nrgeo)[f];
+      w->prefix[j]=curr_limit;
+    }
+    edge=VECTOR(*fatv)[igraph_i_vc_sample_prefix(w->rng, w->prefix, fatv_len)];
+    sampled_pred=IGRAPH_OTHER(w->graph, edge, sampled_pred);
+    if (w->count_edges) {
+      w->edge_counts[edge] += 1.0;
+    }
+
+    /* Increase betweenness counter for internal node */
+    if (sampled_pred != root) {
+      w->counts[sampled_pred] += 1.0;
+    }
+  }
+}
+
+/*
+ * Walks backwards from 'destination' to 'source' after a weighted search,
+ * sampling a shortest path uniformly at random and increasing the counter
+ * of the vertices internal to it.
+ */
+void igraph_i_vc_weighted_walk(igraph_i_vc_worker_t *w, long int source,
+                               long int destination) {
+  igraph_i_vc_weighted_walk_to(w, &w->fathers, &w->wnrgeo, source, destination);
+}
+
+void igraph_i_vc_weighted_reset(igraph_i_vc_worker_t *w) {
+  long int j;
+  for (j=0; j<w->no_of_visited; j++) {
+    VECTOR(w->dist)[w->visited[j]]=0;
+  }
+}
+
+/* The goal-directed search scales the landmark bounds by this factor, so
+ * that every edge keeps a positive reduced weight */
+#define IGRAPH_I_VC_ALT_SCALE 0.999
+
+/*
+ * Lower bound to the distance from 'vertex' to 'target' from the triangle
+ * inequality on the landmark distances, IGRAPH_INFINITY if 'vertex'
+ * cannot reach 'target'. The first rows of the landmark matrix are the
+ * distances to the landmarks; if the search is directed, the second half
+ * are the distances from the landmarks.
+ */
+igraph_real_t igraph_i_vc_alt_bound(const igraph_matrix_t *landmarks,
+                                    igraph_bool_t directed, long int vertex,
+                                    long int target) {
+  long int no_of_rows=igraph_matrix_nrow(landmarks);
+  long int no_of_landmarks=directed ? no_of_rows/2 : no_of_rows;
+  const igraph_real_t *from=&MATRIX(*landmarks, 0, vertex);
+  const igraph_real_t *to=&MATRIX(*landmarks, 0, target);
+  igraph_real_t bound=0;
+  long int i;
+
+  for (i=0; i<no_of_landmarks; i++) {
+    if (to[i] == IGRAPH_INFINITY) {
+      continue;
+    }
+    /* d(v,t) >= d(v,L) - d(t,L), infinite if v cannot reach L */
+    if (from[i] - to[i] > bound) {
+      bound=from[i] - to[i];
+    }
+    /* d(v,t) >= d(L,t) - d(L,v) */
+    if (!directed && from[i] != IGRAPH_INFINITY && to[i] - from[i] > bound) {
+      bound=to[i] - from[i];
+    }
+  }
+  for (i=no_of_landmarks; i<no_of_rows; i++) {
+    if (to[i] != IGRAPH_INFINITY && from[i] != IGRAPH_INFINITY &&
+        to[i] - from[i] > bound) {
+      bound=to[i] - from[i];
+    }
+  }
+  return bound;
+}
+
+/*
+ * A* search from 'source' to 'destination' on a weighted graph, with the
+ * landmark bounds as potential, recording the same predecessors and
+ * numbers of shortest paths as igraph_i_vc_weighted_search for all the
+ * vertices on the shortest paths between the two. The potential is scaled
+ * by IGRAPH_I_VC_ALT_SCALE: every predecessor of a vertex then has a
+ * strictly smaller key and is settled before it, so the numbers of
+ * shortest paths are exact even though the unscaled bounds can make
+ * reduced weights zero. The vertices that cannot reach the destination
+ * are never queued.
+ */
+int igraph_i_vc_alt_search(igraph_i_vc_worker_t *w, long int source,
+                           long int destination) {
+
+  const igraph_t *graph=w->graph;
+  const igraph_vector_t *weights=w->weights;
+  igraph_bool_t directed=w->directed;
+  igraph_real_t cutoff=w->cutoff;
+  long int j;
+
+  VECTOR(w->potential)[source]=IGRAPH_I_VC_ALT_SCALE *
+    igraph_i_vc_alt_bound(w->landmarks, directed, source, destination);
+  if (VECTOR(w->potential)[source] == IGRAPH_INFINITY) {
+    w->no_of_visited=0;
+    return 0;
+  }
+  IGRAPH_I_VC_CHECK(igraph_i_spqueue_push(&w->Q, source, VECTOR(w->potential)[source]));
+  VECTOR(w->dist)[source]=1.0;
+  VECTOR(w->wnrgeo)[source]=1;
+  w->visited[0]=source;
+  w->no_of_visited=1;
+
+  while (!igraph_i_spqueue_empty(&w->Q)) {
+    igraph_real_t key, mindist;
+    long int minnei=igraph_i_spqueue_pop(&w->Q, &key);
+    igraph_vector_t *neis;
+    long int nlen;
+
+    w->settled_vertices++;
+    if (minnei == destination) {
+      break;
+    }
+
+    mindist=VECTOR(w->dist)[minnei]-1;
+    if (cutoff >=0 && mindist >= cutoff) { continue; }
+
+    neis=igraph_inclist_get(w->inclist, minnei);
+    nlen=igraph_vector_size(neis);
+    for (j=0; j<nlen; j++) {
+      w->forward_touched_edges++;
+      long int edge=VECTOR(*neis)[j];
+      long int to=IGRAPH_OTHER(graph, edge, minnei);
+      igraph_real_t altdist=mindist + VECTOR(*weights)[edge];
+      igraph_real_t curdist=VECTOR(w->dist)[to];
+      if (cutoff >= 0 && altdist > cutoff) {
+        /* Paths longer than the cutoff are not counted */
+        continue;
+      }
+      if (curdist==0) {
+        igraph_real_t potential=IGRAPH_I_VC_ALT_SCALE *
+          igraph_i_vc_alt_bound(w->landmarks, directed, to, destination);
+        igraph_vector_t *v;
+        if (potential == IGRAPH_INFINITY) {
+          continue;
+        }
+        v=igraph_inclist_get(&w->fathers, to);
+        w->visited[w->no_of_visited++]=to;
+        igraph_vector_clear(v);
+        IGRAPH_I_VC_CHECK(igraph_i_vc_push_back(v, edge));
+        VECTOR(w->wnrgeo)[to] = VECTOR(w->wnrgeo)[minnei];
+        VECTOR(w->potential)[to]=potential;
+        VECTOR(w->dist)[to]=altdist+1.0;
+        IGRAPH_I_VC_CHECK(igraph_i_spqueue_push(&w->Q, to, altdist + potential));
+      } else if (altdist < curdist-1) {
+        /* This is a shorter path */
+        igraph_vector_t *v=igraph_inclist_get(&w->fathers, to);
+        igraph_vector_clear(v);
+        IGRAPH_I_VC_CHECK(igraph_i_vc_push_back(v, edge));
+        VECTOR(w->wnrgeo)[to] = VECTOR(w->wnrgeo)[minnei];
+        VECTOR(w->dist)[to]=altdist+1.0;
+        IGRAPH_I_VC_CHECK(igraph_i_spqueue_decrease(&w->Q, to, 
+              altdist + VECTOR(w->potential)[to]));
+      } else if (altdist == curdist-1) {
+        igraph_vector_t *v=igraph_inclist_get(&w->fathers, to);
+        IGRAPH_I_VC_CHECK(igraph_i_vc_push_back(v, edge));
+        VECTOR(w->wnrgeo)[to] += VECTOR(w->wnrgeo)[minnei];
+      }
+    }
+  }
+
+  igraph_i_spqueue_clear(&w->Q);
+  return 0;
+}
+
+/*
+ * Breadth-first search from 'source', counting the shortest paths to
+ * every vertex reached. Predecessors are not stored: the walk recovers
+ * them from the distances. The search stops as soon as all the pending
+ * vertices are reached, and does not expand the vertices at depth cutoff.
+ */
+int igraph_i_vc_forward_search(igraph_i_vc_worker_t *w, long int source) {
+
+  igraph_real_t cutoff=w->cutoff;
+  igraph_bool_t nobigint=w->nobigint;
+  long int *distance=w->distance;
+  unsigned long long int *nrgeo=w->nrgeo;
+  igraph_biguint_t *big_nrgeo=w->big_nrgeo;
+  igraph_dqueue_t *q=&w->q;
+  long int j, nneis;
+  igraph_vector_t *neis;
+
+  IGRAPH_I_VC_CHECK(igraph_dqueue_push(q, source));
+  if (nobigint) { 
+    nrgeo[source]=1;
+  } else {
+    igraph_biguint_set_limb(&big_nrgeo[source], 1);
+  }
+  distance[source]=1;
+  w->visited[0]=source;
+  w->no_of_visited=1;
+    
+  while (!igraph_dqueue_empty(q)) {
+    long int actnode=igraph_dqueue_pop(q);
+
+    w->settled_vertices++;
+    /* Stop once all the destinations are reached */
+    if (w->pending[actnode]) {
+      if (--w->no_of_pending == 0) {
+        break;
+      }
+    }
+
+    if (cutoff >= 0 && distance[actnode] >= cutoff+1) { continue; }
+      
+    /* Now check all neighbors of 'actnode' for a shorter path */
+    neis = igraph_adjlist_get(w->adjlist_out, actnode);
+    nneis = igraph_vector_size(neis);
+    for (j=0; j<nneis; j++) {
+      w->forward_touched_edges++;
+      long int neighbor=VECTOR(*neis)[j];
+      if (distance[neighbor]==0) {
+        distance[neighbor]=distance[actnode]+1;
+        w->visited[w->no_of_visited++]=neighbor;
+        if (nobigint) {
+          nrgeo[neighbor] = 0;
+        } else {
+          igraph_biguint_set_limb(&big_nrgeo[neighbor], 0);
+        }
+        IGRAPH_I_VC_CHECK(igraph_dqueue_push(q, neighbor));
+      } 
+      if (distance[neighbor]==distance[actnode]+1) {
+        if (nobigint) { 
+          nrgeo[neighbor]+=nrgeo[actnode];
+        } else {
+          /* The sum has at most one more limb than the larger term, and
+           * the smaller term is widened to the larger one */
+          long int limbs=igraph_biguint_size(&big_nrgeo[neighbor]);
+          if (igraph_biguint_size(&big_nrgeo[actnode]) > limbs) {
+            limbs=igraph_biguint_size(&big_nrgeo[actnode]);
+          }
+          IGRAPH_I_VC_CHECK(igraph_i_vc_biguint_reserve(&big_nrgeo[neighbor],
+                limbs+1));
+          IGRAPH_I_VC_CHECK(igraph_i_vc_biguint_reserve(&big_nrgeo[actnode],
+                limbs));
+          IGRAPH_I_VC_CHECK(igraph_biguint_add(&big_nrgeo[neighbor],
+                &big_nrgeo[neighbor], &big_nrgeo[actnode]));
+        }
+      }
+    }
+  } /* while !igraph_dqueue_empty */
+
+  igraph_dqueue_clear(q);
+  return 0;
+}
+
+/*
+ * The neighbor of 'vertex' at position j of its list, which is the
+ * adjacency list of the walk, or its incidence list if the edges are
+ * counted. In the latter case the edge to the neighbor is stored in *edge.
+ */
+long int igraph_i_vc_walk_neighbor(igraph_i_vc_worker_t *w,
+                                   igraph_vector_t *neis, long int vertex,
+                                   long int j, long int *edge) {
+  if (w->count_edges) {
+    *edge=VECTOR(*neis)[j];
+    return IGRAPH_OTHER(w->graph, *edge, vertex);
+  }
+  return VECTOR(*neis)[j];
+}
+
+/*
+ * Walks backwards from 'destination' to 'source' after a breadth-first
+ * search, sampling a shortest path uniformly at random and increasing the
+ * counter of the vertices internal to it, and of its edges if they are
+ * counted.
+ */
+void igraph_i_vc_forward_walk(igraph_i_vc_worker_t *w, long int source, 
+                              long int destination) {
+  long int *distance=w->distance;
+  long int j, k, nneis, edge=-1, path_vertex, sampled_pred=destination;
+  igraph_vector_t *neis;
+
+  while (1) {
+    path_vertex = sampled_pred;
+    /* The predecessors of path_vertex are its in-neighbors one step
+     * closer to the source: they are recovered from the distances
+     * instead of being stored during the search. Weighted sampling of
+     * predecessor according to the number of paths passing through it.
+     */
+    neis=w->count_edges ? igraph_inclist_get(w->inclist_in, path_vertex) :
+      igraph_adjlist_get(w->adjlist_in, path_vertex);
+    nneis=igraph_vector_size(neis);
+    long int no_of_preds=0;
+    igraph_real_t curr_limit=0;
+    for (j=0; j<nneis; j++) {
+      w->backward_touched_edges++;
+      long int f=igraph_i_vc_walk_neighbor(w, neis, path_vertex, j, &edge);
+      if (distance[f] == distance[path_vertex]-1) {
+        if (w->nobigint) {
+          curr_limit+=w->nrgeo[f];
+        } else {
+          curr_limit+=igraph_biguint_get(&w->big_nrgeo[f]);
+        }
+        w->preds[no_of_preds]=f;
+        w->prefix[no_of_preds]=curr_limit;
+        if (w->count_edges) {
+          w->pred_edges[no_of_preds]=edge;
+        }
+        no_of_preds++;
+      }
+    }
+    k=igraph_i_vc_sample_prefix(w->rng, w->prefix, no_of_preds);
+    sampled_pred=w->preds[k];
+    if (w->count_edges) {
+      w->edge_counts[w->pred_edges[k]] += 1.0;
+    }
+
+    /* Increase betweenness counter for internal node */
+    if (sampled_pred != source) {
+      w->counts[sampled_pred] += 1.0;
+    } else {
+      break;
+    }
+  }
+}
+
+void igraph_i_vc_forward_reset(igraph_i_vc_worker_t *w) {
+  long int j;
+  for (j=0; j<w->no_of_visited; j++) {
+    w->distance[w->visited[j]]=0;
+  }
+}
+
+int igraph_i_vc_search(igraph_i_vc_worker_t *w, long int source) {
+  if (w->weights) {
+    return igraph_i_vc_weighted_search(w, source);
+  } else {
+    return igraph_i_vc_forward_search(w, source);
+  }
+}
+
+/*
+ * Whether the last search from the source reached 'destination'.
+ */
+igraph_bool_t igraph_i_vc_reached(igraph_i_vc_worker_t *w, long int destination) {
+  if (w->weights) {
+    return VECTOR(w->dist)[destination] != 0;
+  } else {
+    return w->distance[destination] != 0;
+  }
+}
+
+void igraph_i_vc_walk(igraph_i_vc_worker_t *w, long int source, 
+                      long int destination) {
+  if (w->weights) {
+    igraph_i_vc_weighted_walk(w, source, destination);
+  } else {
+    igraph_i_vc_forward_walk(w, source, destination);
+  }
+}
+
+void igraph_i_vc_reset(igraph_i_vc_worker_t *w) {
+  if (w->weights) {
+    igraph_i_vc_weighted_reset(w);
+  } else {
+    igraph_i_vc_forward_reset(w);
+  }
+}
+
+/*
+ * Samples w->no_of_samples pairs of vertices and, for each of them, runs
+ * a search from the source until the destination is reached, then
+ * increases the counter of each vertex internal to a shortest path
+ * sampled uniformly at random between the two vertices.
+ */
+int igraph_i_betweenness_sample_vc_worker(igraph_i_vc_worker_t *w) {
+
+  igraph_rng_t *rng=w->rng;
+  long int no_of_nodes=igraph_vcount(w->graph);
+  long int vertex_index;
+
+  for (vertex_index=0; vertex_index<w->no_of_samples; vertex_index++) {
+    IGRAPH_I_VC_CHECK(igraph_i_vc_progress(w, vertex_index));
+
+    /* Sample a pair of distinct vertices */
+    long int destination = 0;
+    long int source = igraph_rng_get_integer(rng, 0, no_of_nodes -1);
+    do {
+      destination = igraph_rng_get_integer(rng, 0, no_of_nodes -1);
+    } while (destination == source);
+
+    igraph_i_vc_add_pending(w, destination);
+    if (w->weights && w->landmarks) {
+      IGRAPH_I_VC_CHECK(igraph_i_vc_alt_search(w, source, destination));
+    } else {
+      IGRAPH_I_VC_CHECK(igraph_i_vc_search(w, source));
+    }
+    w->distinct_sources++;
+    /* If there is a path between the source and the destination, walk
+     * backwards from the destination, sampling a shortest path at random and
+     * updating the betweenness of vertices along this path
+     */
+    if (igraph_i_vc_reached(w, destination)) {
+      igraph_i_vc_walk(w, source, destination);
+    }
+    w->pending[destination]=0;
+    w->no_of_pending=0;
+    igraph_i_vc_reset(w);
+
+  } /* for vertex_index < no_of_samples */
+
+  return 0;
+}
+
+int igraph_i_vc_pair_cmp(const void *a, const void *b) {
+  const long int *pa=(const long int *) a, *pb=(const long int *) b;
+  if (pa[0] != pb[0]) {
+    return pa[0] < pb[0] ? -1 : 1;
+  }
+  return 0;
+}
+
+/*
+ * Same as igraph_i_betweenness_sample_vc_worker, but all the pairs are
+ * sampled first and sorted by source, so that a single search from each
+ * distinct source serves all the destinations drawn for it. Every pair,
+ * including repeated ones, gets its own independently sampled path.
+ */
+int igraph_i_betweenness_sample_vc_grouped_worker(igraph_i_vc_worker_t *w) {
+
+  igraph_rng_t *rng=w->rng;
+  long int no_of_nodes=igraph_vcount(w->graph);
+  long int *pairs=w->pairs;
+  long int vertex_index, first, last, j;
+
+  /* Sample all the pairs of distinct vertices */
+  for (vertex_index=0; vertex_index<w->no_of_samples; vertex_index++) {
+    long int destination = 0;
+    long int source = igraph_rng_get_integer(rng, 0, no_of_nodes -1);
+    do {
+      destination = igraph_rng_get_integer(rng, 0, no_of_nodes -1);
+    } while (destination == source);
+    pairs[2*vertex_index]=source;
+    pairs[2*vertex_index+1]=destination;
+  }
+  qsort(pairs, w->no_of_samples, 2*sizeof(long int), igraph_i_vc_pair_cmp);
+
+  for (first=0; first<w->no_of_samples; first=last) {
+    IGRAPH_I_VC_CHECK(igraph_i_vc_progress(w, first));
+
+    long int source=pairs[2*first];
+    for (last=first; last<w->no_of_samples && pairs[2*last]==source; last++) {
+      igraph_i_vc_add_pending(w, pairs[2*last+1]);
+    }
+
+    IGRAPH_I_VC_CHECK(igraph_i_vc_search(w, source));
+    w->distinct_sources++;
+    for (j=first; j<last; j++) {
+      long int destination=pairs[2*j+1];
+      if (igraph_i_vc_reached(w, destination)) {
+        igraph_i_vc_walk(w, source, destination);
+      }
+      w->pending[destination]=0;
+    }
+    w->no_of_pending=0;
+    igraph_i_vc_reset(w);
+  }
+
+  return 0;
+}
+
+/*
+ * Expands the whole frontier of one side of the bidirectional search.
+ * The newly reached vertices become the new frontier. Sets 'met' if any
+ * of them had already been reached by the other side.
+ */
+void igraph_i_vc_bfs_expand(igraph_i_vc_bfs_side_t *side, 
+                            const igraph_i_vc_bfs_side_t *other,
+                            long int *touched_edges, igraph_bool_t *met) {
+  long int i, j, nneis;
+  long int no_of_visited=side->level_end;
+  igraph_vector_t *neis;
+
+  side->frontier_edges=0;
+  for (i=side->level_begin; i<side->level_end; i++) {
+    long int actnode=side->order[i];
+    neis=igraph_adjlist_get(side->adjlist, actnode);
+    nneis=igraph_vector_size(neis);
+    *touched_edges += nneis;
+    for (j=0; j<nneis; j++) {
+      long int neighbor=VECTOR(*neis)[j];
+      if (side->distance[neighbor]==0) {
+        side->distance[neighbor]=side->distance[actnode]+1;
+        side->nrgeo[neighbor]=0;
+        side->order[no_of_visited++]=neighbor;
+        side->frontier_edges += 
+          igraph_vector_size(igraph_adjlist_get(side->adjlist, neighbor));
+        if (other->distance[neighbor]) {
+          *met=1;
+        }
+      }
+      if (side->distance[neighbor]==side->distance[actnode]+1) {
+        side->nrgeo[neighbor]+=side->nrgeo[actnode];
+      }
+    }
+  }
+  side->level_begin=side->level_end;
+  side->level_end=no_of_visited;
+}
+
+/*
+ * Walks from 'vertex' back to the root of one side of the bidirectional
+ * search, choosing each step with probability proportional to the number
+ * of shortest paths from the root through it, and increases the counter
+ * of every vertex met except the root, and of every edge crossed if the
+ * edges are counted. 'adjlist' and 'inclist' must follow the edges in the
+ * opposite direction of the search; the latter is only used to count the
+ * edges.
+ */
+void igraph_i_vc_bfs_walk(igraph_i_vc_worker_t *w, 
+                          const igraph_i_vc_bfs_side_t *side,
+                          igraph_adjlist_t *adjlist, igraph_inclist_t *inclist,
+                          long int vertex) {
+  long int j, k, nneis, no_of_preds, edge=-1;
+  igraph_real_t curr_limit;
+  igraph_vector_t *neis;
+
+  while (side->distance[vertex] > 1) {
+    neis=w->count_edges ? igraph_inclist_get(inclist, vertex) :
+      igraph_adjlist_get(adjlist, vertex);
+    nneis=igraph_vector_size(neis);
+    no_of_preds=0;
+    curr_limit=0;
+    for (j=0; j<nneis; j++) {
+      long int neighbor=igraph_i_vc_walk_neighbor(w, neis, vertex, j, &edge);
+      w->backward_touched_edges++;
+      if (side->distance[neighbor]==side->distance[vertex]-1) {
+        curr_limit+=side->nrgeo[neighbor];
+        w->preds[no_of_preds]=neighbor;
+        w->prefix[no_of_preds]=curr_limit;
+        if (w->count_edges) {
+          w->pred_edges[no_of_preds]=edge;
+        }
+        no_of_preds++;
+      }
+    }
+    k=igraph_i_vc_sample_prefix(w->rng, w->prefix, no_of_preds);
+    vertex=w->preds[k];
+    if (w->count_edges) {
+      w->edge_counts[w->pred_edges[k]] += 1.0;
+    }
+    if (side->distance[vertex] > 1) {
+      w->counts[vertex] += 1.0;
+    }
+  }
+}
+
+/*
+ * Unweighted VC sampling worker using a balanced bidirectional
+ * breadth-first search: at each step the side whose frontier has fewer
+ * outgoing edges is expanded by one level, until the two searches meet.
+ * The shortest paths between the pair are then those through the
+ * vertices where the searches met, and one of them is sampled uniformly
+ * at random by first sampling the meeting vertex and then walking back
+ * to the source and to the destination.
+ */
+int igraph_i_betweenness_sample_vc_bidir_worker(igraph_i_vc_worker_t *w) {
+
+  igraph_rng_t *rng=w->rng;
+  long int no_of_nodes=igraph_vcount(w->graph);
+  igraph_real_t cutoff=w->cutoff;
+  igraph_i_vc_bfs_side_t *src=&w->source_side, *dst=&w->destination_side;
+  igraph_i_vc_bfs_side_t *side, *other;
+  long int vertex_index, j;
+
+  for (vertex_index=0; vertex_index<w->no_of_samples; vertex_index++) {
+    IGRAPH_I_VC_CHECK(igraph_i_vc_progress(w, vertex_index));
+
+    /* Sample a pair of distinct vertices */
+    long int destination = 0;
+    long int source = igraph_rng_get_integer(rng, 0, no_of_nodes -1);
+    do {
+      destination = igraph_rng_get_integer(rng, 0, no_of_nodes -1);
+    } while (destination == source);
+
+    igraph_bool_t met = 0;
+    w->distinct_sources++;
+
+    src->distance[source]=1;
+    src->nrgeo[source]=1;
+    src->order[0]=source;
+    src->level_begin=0;
+    src->level_end=1;
+    src->frontier_edges=igraph_vector_size(igraph_adjlist_get(src->adjlist, source));
+    dst->distance[destination]=1;
+    dst->nrgeo[destination]=1;
+    dst->order[0]=destination;
+    dst->level_begin=0;
+    dst->level_end=1;
+    dst->frontier_edges=igraph_vector_size(igraph_adjlist_get(dst->adjlist, destination));
+
+    while (src->level_begin < src->level_end && 
+           dst->level_begin < dst->level_end) {
+      /* Length of the paths found by the next expansion */
+      if (cutoff >= 0 && src->distance[src->order[src->level_begin]] +
+          dst->distance[dst->order[dst->level_begin]] - 1 > cutoff) { 
+        break; 
+      }
+      if (src->frontier_edges <= dst->frontier_edges) {
+        side=src; other=dst;
+      } else {
+        side=dst; other=src;
+      }
+      w->settled_vertices += side->level_end - side->level_begin;
+      igraph_i_vc_bfs_expand(side, other, &w->forward_touched_edges, &met);
+      if (met) {
+        break;
+      }
+    }
+
+    /* If the searches met, sample the vertex where the sampled path 
+     * crosses the last expanded level, with probability proportional to
+     * the number of shortest paths through it, then walk to both ends
+     * updating the betweenness of vertices along the path.
+     */
+    if (met) {
+      double total=0, sampled, curr_limit=0;
+      long int meeting_vertex=-1;
+      for (j=side->level_begin; j<side->level_end; j++) {
+        long int v=side->order[j];
+        if (other->distance[v]) {
+          total += ((double) side->nrgeo[v]) * other->nrgeo[v];
+        }
+      }
+      sampled=igraph_rng_get_unif(rng, 0, total);
+      for (j=side->level_begin; j<side->level_end; j++) {
+        long int v=side->order[j];
+        if (other->distance[v]) {
+          meeting_vertex=v;
+          curr_limit += ((double) side->nrgeo[v]) * other->nrgeo[v];
+          if (curr_limit > sampled) {
+            break;
+          }
+        }
+      }
+      if (meeting_vertex != source && meeting_vertex != destination) {
+        w->counts[meeting_vertex] += 1.0;
+      }
+      igraph_i_vc_bfs_walk(w, src, dst->adjlist, w->inclist_in, meeting_vertex);
+      igraph_i_vc_bfs_walk(w, dst, src->adjlist, w->inclist, meeting_vertex);
+    }
+
+    /* cleanup: only the visited vertices */
+    for (j=0; j<src->level_end; j++) {
+      src->distance[src->order[j]]=0;
+    }
+    for (j=0; j<dst->level_end; j++) {
+      dst->distance[dst->order[j]]=0;
+    }
+
+  } /* for vertex_index < no_of_samples */
+
+  return 0;
+}
+
+/*
+ * Settles the closest vertex in the queue of one side of the bidirectional
+ * weighted search and relaxes its edges. *mu is the length of the
+ * shortest path found so far between the two roots, through an edge
+ * reached by both sides; 'forward' tells whether 'side' is the side of
+ * the source.
+ */
+int igraph_i_vc_dijkstra_side_step(igraph_i_vc_worker_t *w,
+                                   igraph_i_vc_dijkstra_side_t *side,
+                                   const igraph_i_vc_dijkstra_side_t *other,
+                                   igraph_bool_t forward, igraph_real_t *mu) {
+  const igraph_vector_t *weights=w->weights;
+  igraph_real_t cutoff=w->cutoff;
+  igraph_real_t mindist;
+  long int minnei=igraph_i_spqueue_pop(&side->Q, &mindist);
+  igraph_vector_t *neis=igraph_inclist_get(side->inclist, minnei);
+  long int j, nlen=igraph_vector_size(neis);
+
+  w->settled_vertices++;
+  for (j=0; j<nlen; j++) {
+    w->forward_touched_edges++;
+    long int edge=VECTOR(*neis)[j];
+    long int to=IGRAPH_OTHER(w->graph, edge, minnei);
+    igraph_real_t altdist=mindist + VECTOR(*weights)[edge];
+    igraph_real_t curdist=VECTOR(side->dist)[to];
+    igraph_real_t otherdist=VECTOR(other->dist)[to];
+    if (cutoff >= 0 && altdist > cutoff) {
+      /* Paths longer than the cutoff are not counted */
+      continue;
+    }
+    if (otherdist != IGRAPH_INFINITY) {
+      /* Always summed as (source side + weight) + destination side */
+      igraph_real_t length=forward ? altdist + otherdist :
+        (otherdist + VECTOR(*weights)[edge]) + mindist;
+      if (length < *mu) {
+        *mu=length;
+      }
+    }
+    if (curdist == IGRAPH_INFINITY) {
+      /* This is the first non-infinite distance */
+      igraph_vector_t *v=igraph_inclist_get(&side->fathers, to);
+      side->visited[side->no_of_visited++]=to;
+      igraph_vector_clear(v);
+      IGRAPH_I_VC_CHECK(igraph_i_vc_push_back(v, edge));
+      VECTOR(side->nrgeo)[to]=VECTOR(side->nrgeo)[minnei];
+      VECTOR(side->dist)[to]=altdist;
+      IGRAPH_I_VC_CHECK(igraph_i_spqueue_push(&side->Q, to, altdist));
+    } else if (altdist < curdist) {
+      /* This is a shorter path */
+      igraph_vector_t *v=igraph_inclist_get(&side->fathers, to);
+      igraph_vector_clear(v);
+      IGRAPH_I_VC_CHECK(igraph_i_vc_push_back(v, edge));
+      VECTOR(side->nrgeo)[to]=VECTOR(side->nrgeo)[minnei];
+      VECTOR(side->dist)[to]=altdist;
+      IGRAPH_I_VC_CHECK(igraph_i_spqueue_decrease(&side->Q, to, altdist));
+    } else if (altdist == curdist) {
+      igraph_vector_t *v=igraph_inclist_get(&side->fathers, to);
+      IGRAPH_I_VC_CHECK(igraph_i_vc_push_back(v, edge));
+      VECTOR(side->nrgeo)[to] += VECTOR(side->nrgeo)[minnei];
+    }
+  }
+  return 0;
+}
+
+/*
+ * Weighted VC sampling worker using a bidirectional Dijkstra search: at
+ * each step the side whose queue holds the closer vertex settles it,
+ * until the lower bounds lf and lb to the distances in the two queues
+ * add up to more than the length mu of the shortest path found. Then
+ * every vertex closer than lf to the source, and every vertex closer
+ * than lb to the destination, has its exact distance and number of
+ * shortest paths on that side.
+ *
+ * Each shortest path crosses exactly one edge (u,v) from the vertices
+ * closer than t=min(lf,mu) to the source to the others, and v is closer
+ * than mu-t < lb to the destination. The number of shortest paths
+ * through that edge is the product of the numbers of shortest paths of
+ * u from the source and of v to the destination, so one of them is
+ * sampled uniformly at random by first sampling the crossing edge and
+ * then walking from its ends back to the source and to the destination.
+ */
+int igraph_i_betweenness_sample_vc_weighted_bidir_worker(igraph_i_vc_worker_t *w) {
+
+  igraph_rng_t *rng=w->rng;
+  const igraph_t *graph=w->graph;
+  const igraph_vector_t *weights=w->weights;
+  long int no_of_nodes=igraph_vcount(graph);
+  igraph_real_t cutoff=w->cutoff;
+  igraph_i_vc_dijkstra_side_t *src=&w->source_wside, *dst=&w->destination_wside;
+  long int vertex_index, i, j;
+
+  for (vertex_index=0; vertex_index<w->no_of_samples; vertex_index++) {
+    IGRAPH_I_VC_CHECK(igraph_i_vc_progress(w, vertex_index));
+
+    /* Sample a pair of distinct vertices */
+    long int destination = 0;
+    long int source = igraph_rng_get_integer(rng, 0, no_of_nodes -1);
+    do {
+      destination = igraph_rng_get_integer(rng, 0, no_of_nodes -1);
+    } while (destination == source);
+
+    igraph_real_t mu=IGRAPH_INFINITY, limit, lf, lb, threshold;
+    igraph_real_t length, shortest;
+    long int u, v;
+    w->distinct_sources++;
+
+    VECTOR(src->dist)[source]=0;
+    VECTOR(src->nrgeo)[source]=1;
+    src->visited[0]=source;
+    src->no_of_visited=1;
+    IGRAPH_I_VC_CHECK(igraph_i_spqueue_push(&src->Q, source, 0));
+    VECTOR(dst->dist)[destination]=0;
+    VECTOR(dst->nrgeo)[destination]=1;
+    dst->visited[0]=destination;
+    dst->no_of_visited=1;
+    IGRAPH_I_VC_CHECK(igraph_i_spqueue_push(&dst->Q, destination, 0));
+
+    while (1) {
+      lf=igraph_i_spqueue_bound(&src->Q);
+      lb=igraph_i_spqueue_bound(&dst->Q);
+      limit=(cutoff >= 0 && cutoff < mu) ? cutoff : mu;
+      /* Both roots must be settled: the bounds are zero until then */
+      if (lf > 0 && lb > 0 && (lf + lb > limit || lf == IGRAPH_INFINITY ||
+            lb == IGRAPH_INFINITY)) {
+        break;
+      }
+      if (lf <= lb) {
+        IGRAPH_I_VC_CHECK(igraph_i_vc_dijkstra_side_step(w, src, dst, 1, &mu));
+      } else {
+        IGRAPH_I_VC_CHECK(igraph_i_vc_dijkstra_side_step(w, dst, src, 0, &mu));
+      }
+    }
+
+    /* If there is a path, sample the edge where the sampled path crosses
+     * from one side to the other, with probability proportional to the
+     * number of shortest paths through it, then walk to both ends
+     * updating the betweenness of vertices along the path. The crossing
+     * edges of the shortest paths are those of the shortest paths
+     * through all the candidate edges: comparing their lengths to mu
+     * would lose the paths whose length was rounded differently when mu
+     * was found through another of their edges.
+     */
+    igraph_vector_clear(&w->crossing);
+    igraph_vector_clear(&w->crossing_prefix);
+    shortest=IGRAPH_INFINITY;
+    if (mu != IGRAPH_INFINITY && (cutoff < 0 || mu <= cutoff)) {
+      igraph_real_t total=0;
+      threshold=lf < mu ? lf : mu;
+      for (i=0; i<src->no_of_visited; i++) {
+        long int from=src->visited[i];
+        igraph_real_t fromdist=VECTOR(src->dist)[from];
+        if (fromdist >= threshold || fromdist + w->max_weight < threshold) {
+          continue;
+        }
+        igraph_vector_t *neis=igraph_inclist_get(src->inclist, from);
+        long int nlen=igraph_vector_size(neis);
+        for (j=0; j<nlen; j++) {
+          w->backward_touched_edges++;
+          long int edge=VECTOR(*neis)[j];
+          long int to=IGRAPH_OTHER(graph, edge, from);
+          igraph_real_t todist=VECTOR(dst->dist)[to];
+          if (VECTOR(src->dist)[to] < threshold || todist >= lb) {
+            continue;
+          }
+          length=(fromdist + VECTOR(*weights)[edge]) + todist;
+          if (length < shortest) {
+            /* Not a shortest path after all */
+            shortest=length;
+            total=0;
+            igraph_vector_clear(&w->crossing);
+            igraph_vector_clear(&w->crossing_prefix);
+          }
+          if (length == shortest) {
+            total += VECTOR(src->nrgeo)[from] * VECTOR(dst->nrgeo)[to];
+            IGRAPH_I_VC_CHECK(igraph_i_vc_push_back(&w->crossing, from));
+            IGRAPH_I_VC_CHECK(igraph_i_vc_push_back(&w->crossing, edge));
+            IGRAPH_I_VC_CHECK(igraph_i_vc_push_back(&w->crossing_prefix, total));
+          }
+        }
+      }
+    }
+    if (cutoff >= 0 && shortest > cutoff) {
+      igraph_vector_clear(&w->crossing_prefix);
+    }
+    if (igraph_vector_size(&w->crossing_prefix) > 0) {
+      j=igraph_i_vc_sample_prefix(rng, VECTOR(w->crossing_prefix),
+          igraph_vector_size(&w->crossing_prefix));
+      u=VECTOR(w->crossing)[2*j];
+      v=IGRAPH_OTHER(graph, (long int) VECTOR(w->crossing)[2*j+1], u);
+      if (w->count_edges) {
+        w->edge_counts[(long int) VECTOR(w->crossing)[2*j+1]] += 1.0;
+      }
+      if (u != source) {
+        w->counts[u] += 1.0;
+      }
+      if (v != destination) {
+        w->counts[v] += 1.0;
+      }
+      igraph_i_vc_weighted_walk_to(w, &src->fathers, &src->nrgeo, source, u);
+      igraph_i_vc_weighted_walk_to(w, &dst->fathers, &dst->nrgeo, destination, v);
+    }
+
+    /* cleanup: only the visited vertices */
+    for (j=0; j<src->no_of_visited; j++) {
+      VECTOR(src->dist)[src->visited[j]]=IGRAPH_INFINITY;
+    }
+    for (j=0; j<dst->no_of_visited; j++) {
+      VECTOR(dst->dist)[dst->visited[j]]=IGRAPH_INFINITY;
+    }
+    igraph_i_spqueue_clear(&src->Q);
+    igraph_i_spqueue_clear(&dst->Q);
+
+  } /* for vertex_index < no_of_samples */
+
+  return 0;
+}
+
+int igraph_i_betweenness_sample_vc_run(igraph_i_vc_worker_t *w) {
+  if (w->group_sources) {
+    return igraph_i_betweenness_sample_vc_grouped_worker(w);
+  } else if (w->bidirectional && w->weights) {
+    return igraph_i_betweenness_sample_vc_weighted_bidir_worker(w);
+  } else if (w->bidirectional) {
+    return igraph_i_betweenness_sample_vc_bidir_worker(w);
+  } else {
+    return igraph_i_betweenness_sample_vc_worker(w);
+  }
+}
+
+void *igraph_i_betweenness_sample_vc_thread(void *arg) {
+  igraph_i_vc_worker_t *w=(igraph_i_vc_worker_t *) arg;
+  w->ret=igraph_i_betweenness_sample_vc_run(w);
+  return NULL;
+}
+
+/*
+ * Runs every worker on its w->no_of_samples pairs, the first one in the
+ * calling thread and the others in their own threads. The workers only
+ * return their errors (see IGRAPH_I_VC_CHECK), and the first one is
+ * raised here once no worker is running.
+ */
+int igraph_i_vc_run_workers(igraph_i_vc_workers_t *workers) {
+  long int threads=workers->no_of_workers;
+  pthread_t *thread_ids;
+  long int i, j;
+
+  if (threads == 1) {
+    igraph_i_betweenness_sample_vc_thread(&workers->workers[0]);
+  } else {
+    thread_ids=igraph_Calloc(threads, pthread_t);
+    if (thread_ids==0) {
+      IGRAPH_ERROR("betweenness failed", IGRAPH_ENOMEM);
+    }
+    IGRAPH_FINALLY(igraph_free, thread_ids);
+    for (i=1; i<threads; i++) {
+      if (pthread_create(&thread_ids[i], 0, 
+            igraph_i_betweenness_sample_vc_thread, &workers->workers[i])) {
+        /* Wait for the workers already started before bailing out */
+        for (j=1; j<i; j++) {
+          pthread_join(thread_ids[j], 0);
+        }
+        IGRAPH_ERROR("Cannot start sampling thread", IGRAPH_FAILURE);
+      }
+    }
+    /* The calling thread runs the first worker */
+    igraph_i_betweenness_sample_vc_thread(&workers->workers[0]);
+    for (i=1; i<threads; i++) {
+      pthread_join(thread_ids[i], 0);
+    }
+    igraph_Free(thread_ids);
+    IGRAPH_FINALLY_CLEAN(1);
+  }
+  for (i=0; i<threads; i++) {
+    /* Copied, as raising the error frees the workers */
+    int ret=workers->workers[i].ret;
+    if (ret != 0) {
+      IGRAPH_ERROR("betweenness sampling failed", ret);
+    }
+  }
+  return 0;
+}
+
+/*
+ * Massart's bound to the empirical Rademacher average of the betweenness
+ * estimators on no_of_samples samples, for a given value of the free
+ * parameter s. Each vertex is a 0/1 vector over the samples whose squared
+ * norm is its count; 'nonzero' holds the counts that are not zero, and
+ * the vertices never sampled all share the zero vector. The sum is
+ * computed relative to its largest term to avoid overflows.
+ */
+igraph_real_t igraph_i_vc_era_bound_at(const igraph_vector_t *nonzero,
+                                       igraph_real_t max_count, 
+                                       igraph_bool_t has_zero,
+                                       long int no_of_samples, 
+                                       igraph_real_t s) {
+  long int i, n=igraph_vector_size(nonzero);
+  igraph_real_t scale=s*s/(2.0*no_of_samples*no_of_samples);
+  igraph_real_t sum=has_zero ? exp(-scale*max_count) : 0.0;
+  for (i=0; i<n; i++) {
+    sum+=exp(scale*(VECTOR(*nonzero)[i]-max_count));
+  }
+  return (scale*max_count + log(sum)) / s;
+}
+
+/*
+ * Minimizes igraph_i_vc_era_bound_at over s with a golden section search
+ * on log(s), around the minimizer of the bound when all the nonzero
+ * counts are equal to the largest one.
+ */
+int igraph_i_vc_era_bound(const igraph_real_t *counts, long int no_of_nodes,
+                          long int no_of_samples, igraph_vector_t *nonzero,
+                          igraph_real_t *bound) {
+  const igraph_real_t ratio=0.6180339887498949;
+  igraph_real_t max_count=0, lo, hi, a, b, fa, fb;
+  igraph_bool_t has_zero=0;
+  long int i;
+
+  igraph_vector_clear(nonzero);
+  for (i=0; i<no_of_nodes; i++) {
+    if (counts[i] > 0) {
+      IGRAPH_CHECK(igraph_vector_push_back(nonzero, counts[i]));
+      if (counts[i] > max_count) {
+        max_count=counts[i];
+      }
+    } else {
+      has_zero=1;
+    }
+  }
+  if (max_count == 0) {
+    *bound=0.0;
+    return 0;
+  }
+
+  /* s* = m sqrt(2 ln N / max_count) */
+  lo=no_of_samples * sqrt(2.0 * log(no_of_nodes + 1.0) / max_count);
+  hi=log(lo) + log(100.0);
+  lo=log(lo) - log(100.0);
+  a=hi - ratio*(hi-lo);
+  b=lo + ratio*(hi-lo);
+  fa=igraph_i_vc_era_bound_at(nonzero, max_count, has_zero, no_of_samples, exp(a));
+  fb=igraph_i_vc_era_bound_at(nonzero, max_count, has_zero, no_of_samples, exp(b));
+  for (i=0; i<40; i++) {
+    if (fa < fb) {
+      hi=b; b=a; fb=fa;
+      a=hi - ratio*(hi-lo);
+      fa=igraph_i_vc_era_bound_at(nonzero, max_count, has_zero, no_of_samples, exp(a));
+    } else {
+      lo=a; a=b; fa=fb;
+      b=lo + ratio*(hi-lo);
+      fb=igraph_i_vc_era_bound_at(nonzero, max_count, has_zero, no_of_samples, exp(b));
+    }
+  }
+  *bound=fa < fb ? fa : fb;
+  return 0;
+}
+
+/*
+ * Bound to the largest deviation of the estimates from the exact
+ * betweenness, holding with probability at least 1-eta, from an upper
+ * bound 'era' to the empirical Rademacher average on no_of_samples
+ * samples (Riondato and Upfal, ABRA).
+ */
+igraph_real_t igraph_i_vc_deviation_bound(igraph_real_t era, 
+                                          long int no_of_samples,
+                                          igraph_real_t eta) {
+  igraph_real_t l=log(3.0/eta);
+  return 2.0*era + (l + sqrt((l + 4.0*no_of_samples*era)*l))/no_of_samples + 
+    sqrt(l/(2.0*no_of_samples));
+}
+
+/*
+ * Bound to the largest deviation of the estimates from the exact
+ * betweenness, holding with probability at least 1-eta, from the
+ * empirical Bernstein inequality of Maurer and Pontil applied to each
+ * vertex, with a union bound over the vertices. Unlike the Rademacher
+ * bound, it shrinks with the sample variance of the estimates, which is
+ * small when no vertex has a large betweenness.
+ */
+igraph_real_t igraph_i_vc_bernstein_bound(const igraph_real_t *counts,
+                                          long int no_of_nodes, 
+                                          long int no_of_samples,
+                                          igraph_real_t eta) {
+  igraph_real_t l=log(4.0*no_of_nodes/eta);
+  igraph_real_t m=no_of_samples, max_var=0, var;
+  long int i;
+  if (no_of_samples < 2) {
+    return 1.0;
+  }
+  for (i=0; i<no_of_nodes; i++) {
+    var=counts[i]*(m-counts[i])/(m*(m-1));
+    if (var > max_var) {
+      max_var=var;
+    }
+  }
+  return sqrt(2.0*max_var*l/m) + 7.0*l/(3.0*(m-1));
+}
+
+/*
+ * Publishes the raw counts of the workers, summed, and the number of
+ * samples they come from to 'snapshot', which holds:
+ *   snapshot[0]  index of the last complete slot, -1 if none;
+ *   snapshot[1]  number of samples the computation will take at most;
+ *   two slots of no_of_nodes+1 values each, from snapshot[2]: the number
+ *   of samples taken, then the counts of the vertices.
+ * The slot not marked as complete is written first, and marked as
+ * complete last, so a reader always finds a consistent slot even if the
+ * writer is killed halfway through. While the counts of a slot are
+ * written, its number of samples is -1, and it only grows from one
+ * publication to the next, so a reader running alongside the writer can
+ * read the mark, then the number of samples and the counts, and check
+ * that the number of samples is unchanged. The full barriers keep the
+ * compiler and the CPU from reordering these writes.
+ */
+void igraph_i_vc_publish(igraph_real_t *snapshot,
+                         const igraph_i_vc_workers_t *workers,
+                         long int no_of_nodes, long int taken) {
+  long int slot=(snapshot[0] == 0) ? 1 : 0;
+  volatile igraph_real_t *complete=snapshot;
+  volatile igraph_real_t *dst=snapshot + 2 + slot*(no_of_nodes+1);
+  igraph_real_t *counts=(igraph_real_t *) dst+1;
+  long int i, j;
+  dst[0]=-1;
+  __sync_synchronize();
+  memcpy(counts, workers->workers[0].counts,
+      no_of_nodes*sizeof(igraph_real_t));
+  for (i=1; i<workers->no_of_workers; i++) {
+    const igraph_real_t *w_counts=workers->workers[i].counts;
+    for (j=0; j<no_of_nodes; j++) {
+      counts[j] += w_counts[j];
+    }
+  }
+  __sync_synchronize();
+  dst[0]=taken;
+  __sync_synchronize();
+  *complete=slot;
+}
+
+/*
+ * Samples no_of_samples pairs of vertices and computes the fraction of
+ * sampled shortest paths each vertex is internal to. The samples are
+ * split among 'threads' workers, each with its own random number
+ * generator stream (seeded from the default generator) and its own
+ * accumulator; the accumulators are summed once all workers are done.
+ * With threads=1 the default random number generator is used directly.
+ * If 'bidirectional' is true, the graph is searched from both vertices of
+ * each pair at once, with a bidirectional Dijkstra search if there are
+ * weights; unweighted graphs need nobigint for this, otherwise the plain
+ * search from the source is used.
+ *
+ * If 'landmarks' is not null and there are weights, each pair is searched
+ * from the source only, with the goal-directed search of
+ * igraph_i_vc_alt_search; this overrides 'bidirectional', and
+ * 'group_sources' overrides it. The landmark distances must have been
+ * computed by igraph_betweenness_landmarks with the same graph, weights
+ * and 'directed'.
+ *
+ * If 'progressive' is true, the samples are taken in geometrically
+ * growing stages, and sampling stops at the first stage where the
+ * empirical Rademacher bound or the empirical Bernstein bound
+ * guarantees that all the estimates are within epsilon of the exact
+ * values, with probability 1-delta/2 over all stages. no_of_samples must then be the fixed sample size giving
+ * the same guarantee with probability 1-delta/2; it is the size of the
+ * last stage. The number of samples taken is stored in 'sampled', if
+ * not null.
+ *
+ * If 'snapshot' is not null, the raw counts are published there about
+ * every 1% of no_of_samples, so that another process sharing the memory
+ * can build an estimate from the samples taken so far if this one is
+ * killed. See igraph_i_vc_publish for the layout.
+ *
+ * If 'edge_res' is not null, it is resized to the number of edges and
+ * gets the fraction of sampled shortest paths each edge is on, from the
+ * same samples. The stopping rule of 'progressive' and the snapshot only
+ * consider the vertices.
+ */
+int igraph_i_betweenness_sample_vc(const igraph_t *graph, igraph_vector_t *res,
+           igraph_vector_t *edge_res, igraph_vector_t *stats, igraph_strvector_t *stats_names,
+           igraph_integer_t no_of_samples, const igraph_vs_t vids,
+           igraph_bool_t directed, igraph_real_t cutoff, 
+           const igraph_vector_t* weights, igraph_bool_t nobigint,
+           igraph_integer_t threads, igraph_bool_t bidirectional,
+           igraph_bool_t group_sources, const igraph_matrix_t *landmarks,
+           igraph_bool_t progressive, igraph_real_t epsilon, 
+           igraph_real_t delta, igraph_integer_t *sampled,
+           igraph_real_t *snapshot) {
+
+  long int no_of_nodes=igraph_vcount(graph);
+  long int no_of_edges=igraph_ecount(graph);
+  double normalization_factor;
+  double stage_ratio=1.2;
+  long int forward_touched_edges = 0;
+  long int backward_touched_edges = 0;
+  long int distinct_sources = 0;
+  long int settled_vertices = 0;
+  long int no_of_stages=1, stage, first_stage=no_of_samples;
+  long int taken=0, stage_size, chunk_end, publish_every=0;
+  igraph_real_t eta=0, era=0, era_bound=0, bernstein_bound=0, bound=0;
+  long int i, j, k;
+  igraph_vector_t v_tmpres, *tmpres=&v_tmpres;
+  igraph_vector_t nonzero;
+  igraph_vit_t vit;
+
+  igraph_adjlist_t adjlist_out, adjlist_in;
+  igraph_inclist_t inclist, inclist_in;
+  igraph_bool_t need_inclist, need_inclist_in;
+  igraph_i_vc_workers_t workers;
+  igraph_integer_t maxdeg;
+
+  if (no_of_samples < 1) {
+    IGRAPH_ERROR("Number of samples must be positive", IGRAPH_EINVAL);
+  }
+  if (threads < 1) {
+    IGRAPH_ERROR("Number of threads must be positive", IGRAPH_EINVAL);
+  }
+  if (threads > no_of_samples) {
+    threads = no_of_samples;
+  }
+  if (weights) { 
+    if (igraph_vector_size(weights) != no_of_edges) {
+      IGRAPH_ERROR("Weight vector length does not match", IGRAPH_EINVAL);
+    }
+    if (igraph_vector_min(weights) <= 0) {
+      IGRAPH_ERROR("Weight vector must be positive", IGRAPH_EINVAL);
+    }
+  }
+  if (!weights || group_sources) {
+    landmarks = 0;
+  }
+  if (landmarks) {
+    if (igraph_matrix_ncol(landmarks) != no_of_nodes || 
+        igraph_matrix_nrow(landmarks) < 1 ||
+        (directed && igraph_is_directed(graph) &&
+         igraph_matrix_nrow(landmarks) % 2 != 0)) {
+      IGRAPH_ERROR("Landmark distances do not match the graph", IGRAPH_EINVAL);
+    }
+  }
+  bidirectional = bidirectional && (weights || nobigint) && !group_sources &&
+    !landmarks;
+
+  if (progressive) {
+    /* The first stage is the smallest sample size for which the
+     * Bernstein bound can reach epsilon; delta/2 is split evenly among the
+     * stages, and each stage splits its share between the two bounds, so
+     * the number of stages and the size of the first one are computed
+     * together */
+    while (1) {
+      eta=delta/(4.0*no_of_stages);
+      first_stage=(long int) ceil(7.0*log(4.0*no_of_nodes/eta)/(3.0*epsilon)) + 1;
+      k=1;
+      if (first_stage < no_of_samples) {
+        k+=(long int) ceil(log((double) no_of_samples/first_stage)/log(stage_ratio));
+      }
+      if (k <= no_of_stages) {
+        break;
+      }
+      no_of_stages=k;
+    }
+  }
+
+  if (!igraph_vs_is_all(&vids)) {
+    /* subset */
+    IGRAPH_VECTOR_INIT_FINALLY(tmpres, no_of_nodes);
+  } else {
+    /* only  */
+    IGRAPH_CHECK(igraph_vector_resize(res, no_of_nodes));
+    igraph_vector_null(res);
+    tmpres=res;
+  }
+
+  if (edge_res) {
+    IGRAPH_CHECK(igraph_vector_resize(edge_res, no_of_edges));
+    igraph_vector_null(edge_res);
+  }
+
+  directed=directed && igraph_is_directed(graph);
+  /* The weighted searches follow the incident edges; the unweighted walks
+   * too, in both directions, to count the edges */
+  need_inclist=weights || edge_res;
+  need_inclist_in=directed && (weights ? bidirectional : edge_res != 0);
+  if (need_inclist) {
+    IGRAPH_CHECK(igraph_inclist_init(graph, &inclist, 
+          directed ? IGRAPH_OUT : IGRAPH_ALL));
+    IGRAPH_FINALLY(igraph_inclist_destroy, &inclist);
+    if (need_inclist_in) {
+      IGRAPH_CHECK(igraph_inclist_init(graph, &inclist_in, IGRAPH_IN));
+      IGRAPH_FINALLY(igraph_inclist_destroy, &inclist_in);
+    }
+  }
+  if (!weights) {
+    IGRAPH_CHECK(igraph_adjlist_init(graph, &adjlist_out, 
+          directed ? IGRAPH_OUT : IGRAPH_ALL));
+    IGRAPH_FINALLY(igraph_adjlist_destroy, &adjlist_out);
+    if (directed) {
+      IGRAPH_CHECK(igraph_adjlist_init(graph, &adjlist_in, IGRAPH_IN));
+      IGRAPH_FINALLY(igraph_adjlist_destroy, &adjlist_in);
+    }
+  }
+
+  /* A vertex has at most as many predecessors as incident edges */
+  IGRAPH_CHECK(igraph_maxdegree(graph, &maxdeg, igraph_vss_all(), IGRAPH_ALL,
+        IGRAPH_LOOPS));
+
+  workers.no_of_workers=threads;
+  workers.workers=igraph_Calloc(threads, igraph_i_vc_worker_t);
+  if (workers.workers==0) {
+    IGRAPH_ERROR("betweenness failed", IGRAPH_ENOMEM);
+  }
+  IGRAPH_FINALLY(igraph_i_vc_workers_destroy, &workers);
+
+  for (i=0; i<threads; i++) {
+    igraph_i_vc_worker_t *w=&workers.workers[i];
+    w->graph=graph;
+    w->adjlist_out=weights ? 0 : &adjlist_out;
+    w->adjlist_in=weights ? 0 : (directed ? &adjlist_in : &adjlist_out);
+    w->inclist=need_inclist ? &inclist : 0;
+    w->inclist_in=need_inclist ? (need_inclist_in ? &inclist_in : &inclist) : 0;
+    w->weights=weights;
+    w->landmarks=landmarks;
+    w->directed=directed;
+    w->cutoff=cutoff;
+    w->nobigint=nobigint;
+    w->bidirectional=bidirectional;
+    w->group_sources=group_sources;
+    w->count_edges=(edge_res != 0);
+    w->max_preds=maxdeg > 0 ? maxdeg : 1;
+    w->main_thread=(i == 0);
+    w->no_of_samples=no_of_samples / threads + (i < no_of_samples % threads);
+    if (threads == 1) {
+      w->rng=igraph_rng_default();
+    } else {
+      IGRAPH_CHECK(igraph_rng_init(&w->own_rng, &igraph_rngtype_mt19937));
+      w->own_rng_initialized=1;
+      /* Independent streams, seeded from the default generator so that
+       * seeding the default generator makes the result reproducible */
+      IGRAPH_CHECK(igraph_rng_seed(&w->own_rng, 
+            igraph_rng_get_integer(igraph_rng_default(), 0, 0x7fffffffL)));
+      w->rng=&w->own_rng;
+    }
+    /* The first worker accumulates directly into the result */
+    IGRAPH_CHECK(igraph_i_vc_worker_init(w, i == 0 ? VECTOR(*tmpres) : 0,
+          i == 0 && edge_res ? VECTOR(*edge_res) : 0));
+  }
+
+  /* here we go */
+
+  if (snapshot) {
+    snapshot[0]=-1;
+    snapshot[1]=no_of_samples;
+    publish_every=(long int) ceil(no_of_samples/100.0);
+  }
+
+  IGRAPH_VECTOR_INIT_FINALLY(&nonzero, 0);
+  for (stage=0; stage<no_of_stages; stage++) {
+    if (stage == no_of_stages-1) {
+      stage_size=no_of_samples;
+    } else {
+      stage_size=(long int) ceil(first_stage*pow(stage_ratio, stage));
+      if (stage_size > no_of_samples) {
+        stage_size=no_of_samples;
+      }
+    }
+    /* With a snapshot, the stage is run in chunks, publishing the counts
+     * after each one straight from the accumulators of the workers, which
+     * are only merged at the end of the stage */
+    while (taken < stage_size) {
+      chunk_end=stage_size;
+      if (snapshot && chunk_end > taken+publish_every) {
+        chunk_end=taken+publish_every;
+      }
+      for (i=0; i<threads; i++) {
+        workers.workers[i].no_of_samples=(chunk_end-taken) / threads +
+          (i < (chunk_end-taken) % threads);
+      }
+      IGRAPH_CHECK(igraph_i_vc_run_workers(&workers));
+      taken=chunk_end;
+      if (snapshot) {
+        igraph_i_vc_publish(snapshot, &workers, no_of_nodes, taken);
+      }
+    }
+
+    /* Merge the accumulators of the workers into the raw counts */
+    for (i=1; i<threads; i++) {
+      igraph_i_vc_worker_t *w=&workers.workers[i];
+      for (j=0; j<no_of_nodes; j++) {
+        VECTOR(*tmpres)[j] += w->counts[j];
+        w->counts[j] = 0;
+      }
+      for (j=0; edge_res && j<no_of_edges; j++) {
+        VECTOR(*edge_res)[j] += w->edge_counts[j];
+        w->edge_counts[j] = 0;
+      }
+    }
+
+    if (progressive) {
+      IGRAPH_CHECK(igraph_i_vc_era_bound(VECTOR(*tmpres), no_of_nodes, taken,
+            &nonzero, &era));
+      era_bound=igraph_i_vc_deviation_bound(era, taken, eta);
+      bernstein_bound=igraph_i_vc_bernstein_bound(VECTOR(*tmpres), no_of_nodes,
+          taken, eta);
+      bound=era_bound < bernstein_bound ? era_bound : bernstein_bound;
+      if (bound <= epsilon) {
+        break;
+      }
+    }
+  }
+  igraph_vector_destroy(&nonzero);
+  IGRAPH_FINALLY_CLEAN(1);
+
+  for (i=0; i<threads; i++) {
+    igraph_i_vc_worker_t *w=&workers.workers[i];
+    forward_touched_edges += w->forward_touched_edges;
+    backward_touched_edges += w->backward_touched_edges;
+    distinct_sources += w->distinct_sources;
+    settled_vertices += w->settled_vertices;
+  }
+  normalization_factor = 1.0 / taken;
+  for (j=0; j<no_of_nodes; j++) {
+    VECTOR(*tmpres)[j] *= normalization_factor;
+  }
+  if (edge_res) {
+    igraph_vector_scale(edge_res, normalization_factor);
+  }
+  if (sampled) {
+    *sampled=taken;
+  }
+
+  igraph_vector_push_back(stats, forward_touched_edges);
+  igraph_strvector_add(stats_names, "forward_touched_edges");
+  igraph_vector_push_back(stats, backward_touched_edges);
+  igraph_strvector_add(stats_names, "backward_touched_edges");
+  igraph_vector_push_back(stats, threads);
+  igraph_strvector_add(stats_names, "threads");
+  igraph_vector_push_back(stats, bidirectional);
+  igraph_strvector_add(stats_names, "bidirectional");
+  igraph_vector_push_back(stats, group_sources);
+  igraph_strvector_add(stats_names, "group_sources");
+  igraph_vector_push_back(stats, weights && (bidirectional ?
+        workers.workers[0].source_wside.Q.buckets : workers.workers[0].Q.buckets));
+  igraph_strvector_add(stats_names, "bucket_queue");
+  igraph_vector_push_back(stats, !landmarks ? 0 : directed ?
+      igraph_matrix_nrow(landmarks)/2 : igraph_matrix_nrow(landmarks));
+  igraph_strvector_add(stats_names, "landmarks");
+  igraph_vector_push_back(stats, distinct_sources);
+  igraph_strvector_add(stats_names, "distinct_sources");
+  igraph_vector_push_back(stats, settled_vertices);
+  igraph_strvector_add(stats_names, "settled_vertices");
+  igraph_vector_push_back(stats, (double) settled_vertices / taken);
+  igraph_strvector_add(stats_names, "settled_vertices_per_sample");
+  igraph_vector_push_back(stats, 
+      (double) (forward_touched_edges + backward_touched_edges) / taken);
+  igraph_strvector_add(stats_names, "touched_edges_per_sample");
+  igraph_vector_push_back(stats, progressive);
+  igraph_strvector_add(stats_names, "progressive");
+  if (progressive) {
+    igraph_vector_push_back(stats, no_of_stages);
+    igraph_strvector_add(stats_names, "stages");
+    igraph_vector_push_back(stats, stage < no_of_stages ? stage+1 : no_of_stages);
+    igraph_strvector_add(stats_names, "stopping_stage");
+    igraph_vector_push_back(stats, bound);
+    igraph_strvector_add(stats_names, "stopping_bound");
+    igraph_vector_push_back(stats, era);
+    igraph_strvector_add(stats_names, "rademacher_average");
+    igraph_vector_push_back(stats, era_bound);
+    igraph_strvector_add(stats_names, "rademacher_bound");
+    igraph_vector_push_back(stats, bernstein_bound);
+    igraph_strvector_add(stats_names, "bernstein_bound");
+    igraph_vector_push_back(stats, no_of_samples);
+    igraph_strvector_add(stats_names, "max_sample_size");
+  }
+
+  IGRAPH_PROGRESS("Betweenness centrality: ", 100.0, 0);
+
+  /* clean  */
+  igraph_i_vc_workers_destroy(&workers);
+  IGRAPH_FINALLY_CLEAN(1);
+  if (!weights) {
+    if (directed) {
+      igraph_adjlist_destroy(&adjlist_in);
+      IGRAPH_FINALLY_CLEAN(1);
+    }
+    igraph_adjlist_destroy(&adjlist_out);
+    IGRAPH_FINALLY_CLEAN(1);
+  }
+  if (need_inclist) {
+    if (need_inclist_in) {
+      igraph_inclist_destroy(&inclist_in);
+      IGRAPH_FINALLY_CLEAN(1);
+    }
+    igraph_inclist_destroy(&inclist);
+    IGRAPH_FINALLY_CLEAN(1);
+  }
+
+  /* Keep only the requested vertices */
+  if (!igraph_vs_is_all(&vids)) { 
+    IGRAPH_CHECK(igraph_vit_create(graph, vids, &vit));
+    IGRAPH_FINALLY(igraph_vit_destroy, &vit);
+    IGRAPH_CHECK(igraph_vector_resize(res, IGRAPH_VIT_SIZE(vit)));
+
+    for (k=0, IGRAPH_VIT_RESET(vit); !IGRAPH_VIT_END(vit);
+	 IGRAPH_VIT_NEXT(vit), k++) {
+      long int node=IGRAPH_VIT_GET(vit);
+      VECTOR(*res)[k] = VECTOR(*tmpres)[node];
+    }
+
+    igraph_vit_destroy(&vit);
+    igraph_vector_destroy(tmpres);
+    IGRAPH_FINALLY_CLEAN(2);
+  }     
+
+  return 0;
+}
+
+int igraph_betweenness_sample_vc_sample_size(const igraph_t *graph,
+           igraph_vector_t *res, igraph_vector_t *stats, 
+           igraph_strvector_t *stats_names, igraph_integer_t sample_size, 
+           const igraph_vs_t vids, igraph_bool_t directed, 
+           igraph_real_t cutoff, const igraph_vector_t* weights,
+           igraph_bool_t nobigint, igraph_integer_t threads,
+           igraph_bool_t bidirectional, igraph_bool_t group_sources,
+           const igraph_matrix_t *landmarks, igraph_real_t *snapshot) {
+  int ret_code = igraph_i_betweenness_sample_vc(graph, res, 0, stats,
+      stats_names, sample_size, vids, directed, cutoff, weights, nobigint, threads,
+      bidirectional, group_sources, landmarks, 0, 0, 0, 0, snapshot);
+  igraph_vector_push_back(stats, sample_size);
+  igraph_strvector_add(stats_names, "sample_size");
+  return ret_code;
+}
+
+/**
+ * \ingroup structural
+ * \function igraph_betweenness_landmarks
+ * \brief Landmark distances for the goal-directed weighted VC sampling.
+ * 
+ * </para><para>
+ * Picks the landmarks by farthest selection: the first one is the vertex
+ * farthest from a random vertex, and every other one the vertex farthest
+ * from the landmarks picked so far, preferring the vertices at a finite
+ * distance. The distances between the landmarks and all the vertices are
+ * the only preprocessing of the goal-directed search of
+ * \ref igraph_betweenness_sample_vc, and serve any number of sampling
+ * runs with the same graph, weights and \p directed.
+ *
+ * \param res Initialized matrix, resized to one column per vertex, so
+ *        that the distances of a vertex are contiguous. Row i holds the
+ *        distances to the i-th landmark; if the graph is directed and
+ *        \p directed is true, the next \p no_of_landmarks rows hold the
+ *        distances from the landmarks. Unreachable vertices are at
+ *        distance \c IGRAPH_INFINITY.
+ * \param landmark_ids If not null, resized to the ids of the landmarks.
+ * \param no_of_landmarks The number of landmarks, at least one; at most
+ *        the number of vertices are picked.
+ * \param weights The edge weights, which must be positive.
+ */
+int igraph_betweenness_landmarks(const igraph_t *graph, igraph_matrix_t *res,
+                                 igraph_vector_t *landmark_ids,
+                                 igraph_integer_t no_of_landmarks,
+                                 igraph_bool_t directed,
+                                 const igraph_vector_t *weights) {
+  long int no_of_nodes=igraph_vcount(graph);
+  long int no_of_rows, landmark, i, j;
+  igraph_matrix_t dist;
+  igraph_vector_t score;
+
+  if (!weights) {
+    IGRAPH_ERROR("Landmarks need edge weights", IGRAPH_EINVAL);
+  }
+  if (igraph_vector_size(weights) != igraph_ecount(graph)) {
+    IGRAPH_ERROR("Weight vector length does not match", IGRAPH_EINVAL);
+  }
+  if (igraph_ecount(graph) > 0 && igraph_vector_min(weights) <= 0) {
+    IGRAPH_ERROR("Weight vector must be positive", IGRAPH_EINVAL);
+  }
+  if (no_of_landmarks < 1) {
+    IGRAPH_ERROR("Number of landmarks must be positive", IGRAPH_EINVAL);
+  }
+  if (no_of_landmarks > no_of_nodes) {
+    no_of_landmarks=no_of_nodes;
+  }
+  directed=directed && igraph_is_directed(graph);
+  no_of_rows=directed ? 2*no_of_landmarks : no_of_landmarks;
+  IGRAPH_CHECK(igraph_matrix_resize(res, no_of_rows, no_of_nodes));
+  if (landmark_ids) {
+    IGRAPH_CHECK(igraph_vector_resize(landmark_ids, no_of_landmarks));
+  }
+  if (no_of_nodes == 0) {
+    return 0;
+  }
 
-          VECTOR(dist)[to]=altdist+1.0;
-          IGRAPH_CHECK(igraph_2wheap_push_with_index(&Q, to, -altdist));
-        } else if (altdist < curdist-1) {
-          /* This is a shorter path */
-          igraph_vector_t *v=igraph_adjlist_get(&fathers, to);
-          igraph_vector_resize(v,1);
-          VECTOR(*v)[0]=minnei;
-          VECTOR(nrgeo)[to] = VECTOR(nrgeo)[minnei];
+  IGRAPH_MATRIX_INIT_FINALLY(&dist, 0, 0);
+  IGRAPH_VECTOR_INIT_FINALLY(&score, no_of_nodes);
 
-          VECTOR(dist)[to]=altdist+1.0;
-          IGRAPH_CHECK(igraph_2wheap_modify(&Q, to, -altdist));
-        } else if (altdist == curdist-1) {
-          igraph_vector_t *v=igraph_adjlist_get(&fathers, to);
-          igraph_vector_push_back(v, minnei);
-          VECTOR(nrgeo)[to] += VECTOR(nrgeo)[minnei];
-        }
-      }
-      
-    } /* !igraph_2wheap_empty(&Q) */
+  /* score is the distance of each vertex from the landmarks, -1 for the
+   * landmarks themselves */
+  landmark=igraph_rng_get_integer(igraph_rng_default(), 0, no_of_nodes-1);
+  IGRAPH_CHECK(igraph_shortest_paths_dijkstra(graph, &dist,
+        igraph_vss_1(landmark), igraph_vss_all(), weights,
+        directed ? IGRAPH_OUT : IGRAPH_ALL));
+  for (j=0; j<no_of_nodes; j++) {
+    VECTOR(score)[j]=MATRIX(dist, 0, j);
+  }
 
-    /* If there is a path between the source and the destination, walk
-     * backwards from the destination, sampling a shortest path at random and
-     * updating the betweenness of vertices along this path
-     */
-    if (destination_is_reached) {
-      long int path_vertex, sampled_pred = destination;
-      igraph_2wheap_clear(&Q);
-      while (1) {
-        path_vertex = sampled_pred;
-        /* Get list of predecessors of path_vertex */
-        igraph_vector_t *fatv=igraph_adjlist_get(&fathers, path_vertex);
-        /* Weighted sampling of predecessor according to the number of paths
-         * passing through it.
-         */
-        long int fatv_len=igraph_vector_size(fatv);
-        int sampling_limits[fatv_len];
-        if (fatv_len > 1) {
-          //printf("sampling\n");
-          /*IGRAPH_CHECK(igraph_vector_init(&sampling_limits, fatv_len)); */
-          int curr_limit = -1;
-          for (j=0; j<fatv_len; j++) {
-            backward_touched_edges++;
-            long int f = VECTOR(*fatv)[j];
-            curr_limit+=VECTOR(nrgeo)[f];
-            sampling_limits[j]=curr_limit;
-          }
-          igraph_integer_t sampled=igraph_rng_get_integer(rng, 0, VECTOR(nrgeo)[path_vertex] - 1);
-          //printf("sampled=%d\n", sampled);
-          j=0;
-          while (sampling_limits[j] < sampled) {
-            j++;
-          }
-          sampled_pred=VECTOR(*fatv)[j];
-          //printf("sampled_pred=%ld\n", sampled_pred);
-        } else {
-          backward_touched_edges++;
-          sampled_pred=VECTOR(*fatv)[0];
-        }
-        //printf("%ld %ld %ld %ld\n", destination, path_vertex, sampled_pred, source);
+  for (i=0; i<no_of_landmarks; i++) {
+    landmark=-1;
+    for (j=0; j<no_of_nodes; j++) {
+      if (VECTOR(score)[j] > 0 && VECTOR(score)[j] != IGRAPH_INFINITY &&
+          (landmark < 0 || VECTOR(score)[j] > VECTOR(score)[landmark])) {
+        landmark=j;
+      }
+    }
+    /* Then the vertices no landmark reaches, then any other one */
+    for (j=0; landmark < 0 && j<no_of_nodes; j++) {
+      if (VECTOR(score)[j] == IGRAPH_INFINITY) {
+        landmark=j;
+      }
+    }
+    for (j=0; landmark < 0 && j<no_of_nodes; j++) {
+      if (VECTOR(score)[j] >= 0) {
+        landmark=j;
+      }
+    }
+    if (landmark_ids) {
+      VECTOR(*landmark_ids)[i]=landmark;
+    }
 
-        /* Increase betweenness counter for internal node */
-        if (sampled_pred != source) {
-          VECTOR(*tmpres)[sampled_pred]+= normalization_factor; 
-        } else {
-          break;
+    IGRAPH_CHECK(igraph_shortest_paths_dijkstra(graph, &dist,
+          igraph_vss_1(landmark), igraph_vss_all(), weights,
+          directed ? IGRAPH_IN : IGRAPH_ALL));
+    for (j=0; j<no_of_nodes; j++) {
+      MATRIX(*res, i, j)=MATRIX(dist, 0, j);
+      if (MATRIX(dist, 0, j) < VECTOR(score)[j]) {
+        VECTOR(score)[j]=MATRIX(dist, 0, j);
+      }
+    }
+    if (directed) {
+      IGRAPH_CHECK(igraph_shortest_paths_dijkstra(graph, &dist,
+            igraph_vss_1(landmark), igraph_vss_all(), weights, IGRAPH_OUT));
+      for (j=0; j<no_of_nodes; j++) {
+        MATRIX(*res, no_of_landmarks+i, j)=MATRIX(dist, 0, j);
+        if (MATRIX(dist, 0, j) < VECTOR(score)[j]) {
+          VECTOR(score)[j]=MATRIX(dist, 0, j);
         }
-      } /* while(1) */
-    } /* destination_is_reached */
-    
-    /* cleanup */
-    memset(VECTOR(dist), 0, no_of_nodes * sizeof(igraph_real_t));
-    //for (j=0; j<no_of_nodes; j++) {
-      //igraph_vector_clear(igraph_adjlist_get(&fathers, j));
-      //VECTOR(nrgeo)[j] = 0;
-      //VECTOR(dist)[j] = 0;
-    //}
-    /* end cleanup */
-
-    /* Computation of betweenness by Brandes
-    while (!igraph_stack_empty(&S)) {
-      long int w=igraph_stack_pop(&S);
-      igraph_vector_t *fatv=igraph_adjlist_get(&fathers, w);
-      long int fatv_len=igraph_vector_size(fatv);
-      for (j=0; j<fatv_len; j++) {
-	long int f=VECTOR(*fatv)[j];
-	VECTOR(tmpscore)[f] += VECTOR(nrgeo)[f]/VECTOR(nrgeo)[w] * (1+VECTOR(tmpscore)[w]);
       }
-      if (w!=source) { VECTOR(*tmpres)[w] += VECTOR(tmpscore)[w]; }
-
-      VECTOR(tmpscore)[w]=0;
-      VECTOR(dist)[w]=0;
-      VECTOR(nrgeo)[w]=0;
-      igraph_vector_clear(igraph_adjlist_get(&fathers, w));
-    } */
-    
-  } /* vertex_index < no_of_samples */
+    }
+    VECTOR(score)[landmark]=-1;
+  }
 
-  igraph_vector_push_back(stats, forward_touched_edges);
-  igraph_strvector_add(stats_names, "forward_touched_edges");
-  igraph_vector_push_back(stats, backward_touched_edges);
-  igraph_strvector_add(stats_names, "backward_touched_edges");
+  igraph_vector_destroy(&score);
+  igraph_matrix_destroy(&dist);
+  IGRAPH_FINALLY_CLEAN(2);
+  return 0;
+}
 
-  if (!igraph_vs_is_all(&vids)) {
-    IGRAPH_CHECK(igraph_vit_create(graph, vids, &vit));
-    IGRAPH_FINALLY(igraph_vit_destroy, &vit);
-    IGRAPH_CHECK(igraph_vector_resize(res, IGRAPH_VIT_SIZE(vit)));
-    
-    for (j=0, IGRAPH_VIT_RESET(vit); !IGRAPH_VIT_END(vit);
-	 IGRAPH_VIT_NEXT(vit), j++) {
-      long int node=IGRAPH_VIT_GET(vit);
-      VECTOR(*res)[j] = VECTOR(*tmpres)[node];
+/* Number of searches igraph_diameter_approximation spends tightening the
+ * bound when it is given a negative budget */
+#define IGRAPH_I_DIAMETER_BFS_BUDGET 64
+
+/*
+ * Breadth-first search from source for igraph_diameter_approximation,
+ * following the edges according to mode. If membership is not NULL, only
+ * the vertices with the same membership as the source are visited. order
+ * is filled with the reached vertices by nondecreasing distance, and
+ * distance[v] is set to the distance of v plus one; it must be all zeros on
+ * entry, and igraph_i_diameter_reset clears it again. If parent is not
+ * NULL, parent[v] is set to the predecessor of v.
+ */
+int igraph_i_diameter_bfs(const igraph_t *graph, long int source,
+    igraph_neimode_t mode, const igraph_vector_t *membership,
+    long int *distance, long int *parent, long int *order,
+    long int *no_of_order, igraph_vector_t *neis, long int *touched_edges) {
+  long int head = 0, tail = 0, j;
+
+  distance[source] = 1;
+  if (parent) {
+    parent[source] = source;
+  }
+  order[tail++] = source;
+  while (head < tail) {
+    long int act = order[head++];
+    IGRAPH_CHECK(igraph_neighbors(graph, neis, act, mode));
+    for (j = 0; j < igraph_vector_size(neis); j++) {
+      long int neighbor = (long int) VECTOR(*neis)[j];
+      (*touched_edges)++;
+      if (distance[neighbor] != 0 || (membership &&
+            VECTOR(*membership)[neighbor] != VECTOR(*membership)[source])) {
+        continue;
+      }
+      distance[neighbor] = distance[act] + 1;
+      if (parent) {
+        parent[neighbor] = act;
+      }
+      order[tail++] = neighbor;
     }
-    
-    no_of_nodes = j;
-    
-    igraph_2wheap_destroy(&Q);
-    igraph_vit_destroy(&vit);
-    igraph_vector_destroy(tmpres);
-    IGRAPH_FINALLY_CLEAN(3);
   }
-  
+  *no_of_order = tail;
+  return 0;
+}
 
-  IGRAPH_PROGRESS("Betweenness centrality: ", 100.0, 0);
+void igraph_i_diameter_reset(long int *distance, long int *order,
+    long int no_of_order) {
+  long int k;
+  for (k = 0; k < no_of_order; k++) {
+    distance[order[k]] = 0;
+  }
+}
 
-  /*
-  igraph_vector_destroy(&nrgeo);
-  igraph_vector_destroy(&tmpscore);
-  igraph_vector_destroy(&dist);
-   igraph_stack_destroy(&S); 
-  igraph_adjlist_destroy(&fathers);
-  */
-  igraph_inclist_destroy(&inclist);
-  IGRAPH_FINALLY_CLEAN(4); 
-  
+/*
+ * Sets sources to a random vertex of each component for
+ * igraph_diameter_approximation: the r-th vertex by id of the component,
+ * for a random r.
+ */
+int igraph_i_diameter_sources(const igraph_vector_t *membership,
+    const igraph_vector_t *csize, igraph_vector_t *sources) {
+  long int no_of_nodes = igraph_vector_size(membership);
+  long int no_of_components = igraph_vector_size(csize);
+  igraph_rng_t *rng = igraph_rng_default();
+  long int i, c;
+
+  /* A positive entry counts down the vertices to skip, a negative one -v-1
+   * is the chosen vertex v */
+  IGRAPH_CHECK(igraph_vector_resize(sources, no_of_components));
+  for (c = 0; c < no_of_components; c++) {
+    VECTOR(*sources)[c] = igraph_rng_get_integer(rng, 0, VECTOR(*csize)[c] - 1);
+  }
+  for (i = 0; i < no_of_nodes; i++) {
+    c = (long int) VECTOR(*membership)[i];
+    if (VECTOR(*sources)[c] == 0) {
+      VECTOR(*sources)[c] = -i - 1;
+    } else if (VECTOR(*sources)[c] > 0) {
+      VECTOR(*sources)[c] -= 1;
+    }
+  }
+  for (c = 0; c < no_of_components; c++) {
+    VECTOR(*sources)[c] = -VECTOR(*sources)[c] - 1;
+  }
   return 0;
 }
 
-int igraph_i_betweenness_sample_vc(const igraph_t *graph, igraph_vector_t *res,
-           igraph_vector_t *stats, igraph_strvector_t *stats_names,
-           igraph_integer_t no_of_samples, const igraph_vs_t vids,
-           igraph_bool_t directed, igraph_real_t cutoff, 
-           const igraph_vector_t* weights, igraph_bool_t nobigint) {
+/*
+ * The unweighted part of igraph_diameter_approximation. For each component,
+ * a search from the vertex in sources bounds the diameter by the sum of the
+ * two largest distances, and the largest one is a lower bound. The
+ * component with the largest bound is then refined with a double sweep and
+ * the iFUB algorithm, while bfs_budget allows.
+ */
+int igraph_i_diameter_unweighted(const igraph_t *graph,
+    igraph_vector_t *sources, const igraph_vector_t *csize,
+    igraph_vector_t *lower, igraph_vector_t *upper, long int bfs_budget,
+    long int *no_of_bfs, long int *touched_edges, long int *lower_bound) {
+  long int no_of_nodes = igraph_vcount(graph);
+  long int no_of_components = igraph_vector_size(sources);
+  long int *distance, *parent, *order, *central_order;
+  long int no_of_order, no_of_central_order, max_bfs, c, k;
+  igraph_vector_t neis;
 
-  igraph_rng_t *rng=igraph_rng_default();
-  long int no_of_nodes=igraph_vcount(graph);
-  //double normalization_factor = ((double) no_of_nodes) * (no_of_nodes - 1) / no_of_samples;
-  double normalization_factor = 1.0 / no_of_samples;
-  long int forward_touched_edges = 0;
-  long int backward_touched_edges = 0;
-  igraph_dqueue_t q=IGRAPH_DQUEUE_NULL;
-  long int *distance;
-  unsigned long long int *nrgeo=0;  /* must be long long; consider grid
-				       graphs for example */
-  igraph_biguint_t *big_nrgeo=0;
-  /* double *tmpscore; */
-  /* igraph_stack_t stack=IGRAPH_STACK_NULL; */
-  long int vertex_index;
-  long int j, k, nneis;
-  igraph_vector_t *neis;
-  igraph_vector_t v_tmpres, *tmpres=&v_tmpres;
-  igraph_vit_t vit;
+  IGRAPH_VECTOR_INIT_FINALLY(&neis, 0);
+  distance = igraph_Calloc(no_of_nodes, long int);
+  if (distance == 0) {
+    IGRAPH_ERROR("diameter approximation failed", IGRAPH_ENOMEM);
+  }
+  IGRAPH_FINALLY(igraph_free, distance);
+  order = igraph_Calloc(no_of_nodes, long int);
+  if (order == 0) {
+    IGRAPH_ERROR("diameter approximation failed", IGRAPH_ENOMEM);
+  }
+  IGRAPH_FINALLY(igraph_free, order);
 
-  igraph_adjlist_t adjlist_out, adjlist_in;
-  igraph_adjlist_t *adjlist_out_p, *adjlist_in_p;
+  /* One search per component. The components are disjoint, so they can
+   * share the same arrays. The source is replaced by the farthest vertex
+   * from it, where the double sweep starts. */
+  for (c = 0; c < no_of_components; c++) {
+    long int largest, second_largest;
 
-  igraph_biguint_t D, R, T;
+    IGRAPH_ALLOW_INTERRUPTION();
 
-  if (weights) { 
-    return igraph_i_betweenness_sample_vc_weighted(graph, res, stats, stats_names, no_of_samples,
-        vids, directed, cutoff, weights, nobigint);
+    IGRAPH_CHECK(igraph_i_diameter_bfs(graph, (long int) VECTOR(*sources)[c],
+          IGRAPH_ALL, 0, distance, 0, order, &no_of_order, &neis,
+          touched_edges));
+    (*no_of_bfs)++;
+    largest = distance[order[no_of_order - 1]] - 1;
+    second_largest = no_of_order > 1 ? distance[order[no_of_order - 2]] - 1 : 0;
+    VECTOR(*lower)[c] = largest;
+    VECTOR(*upper)[c] = largest + second_largest;
+    if (VECTOR(*upper)[c] > VECTOR(*csize)[c] - 1) {
+      VECTOR(*upper)[c] = VECTOR(*csize)[c] - 1;
+    }
+    VECTOR(*sources)[c] = order[no_of_order - 1];
+    igraph_i_diameter_reset(distance, order, no_of_order);
+    if (largest > *lower_bound) {
+      *lower_bound = largest;
+    }
   }
 
-  if (no_of_samples < 1) {
-    IGRAPH_ERROR("Number of samples must be positive", IGRAPH_EINVAL);
+  if (bfs_budget > 0) {
+    parent = igraph_Calloc(no_of_nodes, long int);
+    if (parent == 0) {
+      IGRAPH_ERROR("diameter approximation failed", IGRAPH_ENOMEM);
+    }
+    IGRAPH_FINALLY(igraph_free, parent);
+    central_order = igraph_Calloc(no_of_nodes, long int);
+    if (central_order == 0) {
+      IGRAPH_ERROR("diameter approximation failed", IGRAPH_ENOMEM);
+    }
+    IGRAPH_FINALLY(igraph_free, central_order);
+
+    max_bfs = *no_of_bfs + bfs_budget;
+    while (*no_of_bfs < max_bfs) {
+      long int farthest, central, level;
+
+      /* The component with the largest bound decides the result. Stop if
+       * no other component can exceed its lower bound. */
+      c = igraph_vector_which_max(upper);
+      if (VECTOR(*upper)[c] <= *lower_bound) {
+        break;
+      }
+
+      IGRAPH_ALLOW_INTERRUPTION();
+
+      /* Double sweep: the farthest vertex from the farthest vertex of the
+       * first search, and the middle of the path between them. */
+      IGRAPH_CHECK(igraph_i_diameter_bfs(graph, (long int) VECTOR(*sources)[c],
+            IGRAPH_ALL, 0, distance, parent, order, &no_of_order, &neis,
+            touched_edges));
+      (*no_of_bfs)++;
+      farthest = order[no_of_order - 1];
+      level = distance[farthest] - 1;
+      if (level > VECTOR(*lower)[c]) {
+        VECTOR(*lower)[c] = level;
+      }
+      igraph_i_diameter_reset(distance, order, no_of_order);
+      for (central = farthest, k = 0; k < level / 2; k++) {
+        central = parent[central];
+      }
+      if (VECTOR(*lower)[c] >= VECTOR(*upper)[c] || *no_of_bfs >= max_bfs) {
+        if (VECTOR(*lower)[c] > *lower_bound) {
+          *lower_bound = VECTOR(*lower)[c];
+        }
+        continue;
+      }
+
+      /* iFUB: once the eccentricities of all the vertices farther than
+       * level from the central vertex are known, the diameter is at most
+       * the largest of them or 2*level. The parent array holds the
+       * distances from the central vertex, by position in central_order. */
+      IGRAPH_CHECK(igraph_i_diameter_bfs(graph, central, IGRAPH_ALL, 0,
+            distance, 0, central_order, &no_of_central_order, &neis,
+            touched_edges));
+      (*no_of_bfs)++;
+      for (k = 0; k < no_of_central_order; k++) {
+        parent[k] = distance[central_order[k]] - 1;
+      }
+      igraph_i_diameter_reset(distance, central_order, no_of_central_order);
+      level = parent[no_of_central_order - 1];
+      if (level > VECTOR(*lower)[c]) {
+        VECTOR(*lower)[c] = level;
+      }
+      if (2 * level < VECTOR(*upper)[c]) {
+        VECTOR(*upper)[c] = 2 * level;
+      }
+      for (k = no_of_central_order - 1; k > 0 &&
+          VECTOR(*lower)[c] < VECTOR(*upper)[c] && *no_of_bfs < max_bfs; k--) {
+        IGRAPH_ALLOW_INTERRUPTION();
+        IGRAPH_CHECK(igraph_i_diameter_bfs(graph, central_order[k],
+              IGRAPH_ALL, 0, distance, 0, order, &no_of_order, &neis,
+              touched_edges));
+        (*no_of_bfs)++;
+        level = distance[order[no_of_order - 1]] - 1;
+        if (level > VECTOR(*lower)[c]) {
+          VECTOR(*lower)[c] = level;
+        }
+        igraph_i_diameter_reset(distance, order, no_of_order);
+        if (parent[k - 1] < parent[k] &&
+            2 * parent[k - 1] < VECTOR(*upper)[c]) {
+          VECTOR(*upper)[c] = VECTOR(*lower)[c] > 2 * parent[k - 1] ?
+            VECTOR(*lower)[c] : 2 * parent[k - 1];
+        }
+      }
+      if (VECTOR(*lower)[c] > *lower_bound) {
+        *lower_bound = VECTOR(*lower)[c];
+      }
+    }
+
+    igraph_free(central_order);
+    igraph_free(parent);
+    IGRAPH_FINALLY_CLEAN(2);
   }
 
-  if (!igraph_vs_is_all(&vids)) {
-    /* subset */
-    IGRAPH_VECTOR_INIT_FINALLY(tmpres, no_of_nodes);
-  } else {
-    /* only  */
-    IGRAPH_CHECK(igraph_vector_resize(res, no_of_nodes));
-    igraph_vector_null(res);
-    tmpres=res;
+
+  igraph_free(order);
+  igraph_free(distance);
+  igraph_vector_destroy(&neis);
+  IGRAPH_FINALLY_CLEAN(3);
+  return 0;
+}
+
+/*
+ * Dijkstra search from source for igraph_diameter_approximation. Like
+ * igraph_i_diameter_bfs, but distance[v] is the weighted distance of v plus
+ * one, and hops[v] is the largest number of edges of the shortest paths to
+ * v found by the search.
+ */
+int igraph_i_diameter_dijkstra(const igraph_t *graph,
+    const igraph_vector_t *weights, long int source, igraph_neimode_t mode,
+    const igraph_vector_t *membership, igraph_real_t *distance,
+    long int *hops, long int *parent, long int *order, long int *no_of_order,
+    igraph_2wheap_t *Q, igraph_vector_t *neis, long int *touched_edges) {
+  long int tail = 0, j;
+
+  IGRAPH_CHECK(igraph_2wheap_push_with_index(Q, source, 0));
+  distance[source] = 1.0;
+  hops[source] = 0;
+  if (parent) {
+    parent[source] = source;
+  }
+  while (!igraph_2wheap_empty(Q)) {
+    long int minnei = igraph_2wheap_max_index(Q);
+    igraph_real_t mindist = -igraph_2wheap_delete_max(Q);
+    order[tail++] = minnei;
+    IGRAPH_CHECK(igraph_incident(graph, neis, minnei, mode));
+    for (j = 0; j < igraph_vector_size(neis); j++) {
+      long int edge = (long int) VECTOR(*neis)[j];
+      long int to = IGRAPH_OTHER(graph, edge, minnei);
+      igraph_real_t altdist = mindist + VECTOR(*weights)[edge];
+      igraph_real_t curdist = distance[to];
+      (*touched_edges)++;
+      if (membership &&
+          VECTOR(*membership)[to] != VECTOR(*membership)[source]) {
+        continue;
+      }
+      if (curdist == 0) {
+        distance[to] = altdist + 1.0;
+        hops[to] = hops[minnei] + 1;
+        if (parent) {
+          parent[to] = minnei;
+        }
+        IGRAPH_CHECK(igraph_2wheap_push_with_index(Q, to, -altdist));
+      } else if (altdist < curdist - 1) {
+        distance[to] = altdist + 1.0;
+        hops[to] = hops[minnei] + 1;
+        if (parent) {
+          parent[to] = minnei;
+        }
+        IGRAPH_CHECK(igraph_2wheap_modify(Q, to, -altdist));
+      } else if (altdist == curdist - 1 && hops[to] < hops[minnei] + 1) {
+        hops[to] = hops[minnei] + 1;
+      }
+    }
   }
+  igraph_2wheap_clear(Q);
+  *no_of_order = tail;
+  return 0;
+}
 
-  directed=directed && igraph_is_directed(graph);
-  if (directed) {
-    IGRAPH_CHECK(igraph_adjlist_init(graph, &adjlist_out, IGRAPH_OUT));
-    IGRAPH_FINALLY(igraph_adjlist_destroy, &adjlist_out);
-    IGRAPH_CHECK(igraph_adjlist_init(graph, &adjlist_in, IGRAPH_IN));
-    IGRAPH_FINALLY(igraph_adjlist_destroy, &adjlist_in);
-    adjlist_out_p=&adjlist_out;
-    adjlist_in_p=&adjlist_in;
-  } else {
-    IGRAPH_CHECK(igraph_adjlist_init(graph, &adjlist_out, IGRAPH_ALL));
-    IGRAPH_FINALLY(igraph_adjlist_destroy, &adjlist_out);
-    IGRAPH_CHECK(igraph_adjlist_init(graph, &adjlist_in, IGRAPH_ALL));
-    IGRAPH_FINALLY(igraph_adjlist_destroy, &adjlist_in);
-    adjlist_out_p=&adjlist_out;
-    adjlist_in_p=&adjlist_in;
+/*
+ * Sets prefix to the prefix sums of the edge weights sorted in increasing
+ * order, for igraph_i_diameter_hops.
+ */
+int igraph_i_diameter_prefix(const igraph_vector_t *weights,
+    igraph_vector_t *prefix) {
+  long int k;
+  IGRAPH_CHECK(igraph_vector_update(prefix, weights));
+  igraph_vector_sort(prefix);
+  for (k = 1; k < igraph_vector_size(prefix); k++) {
+    VECTOR(*prefix)[k] += VECTOR(*prefix)[k - 1];
   }
-  for (j=0; j<no_of_nodes; j++) {
-    igraph_vector_clear(igraph_adjlist_get(adjlist_in_p, j));
+  return 0;
+}
+
+/*
+ * The largest number of edges of a path of weight at most length, given
+ * the prefix sums of the edge weights sorted in increasing order: a path
+ * with k edges weighs at least the sum of the k smallest weights.
+ */
+long int igraph_i_diameter_hops(const igraph_vector_t *prefix,
+    igraph_real_t length) {
+  long int lo = 0, hi = igraph_vector_size(prefix);
+  /* Leave room for the rounding errors of the sums */
+  length *= 1.0 + 1e-9;
+  while (lo < hi) {
+    long int mid = (lo + hi + 1) / 2;
+    if (VECTOR(*prefix)[mid - 1] <= length) {
+      lo = mid;
+    } else {
+      hi = mid - 1;
+    }
   }
-  
-  distance=igraph_Calloc(no_of_nodes, long int);
-  if (distance==0) {
-    IGRAPH_ERROR("betweenness failed", IGRAPH_ENOMEM);
+  return lo;
+}
+
+/*
+ * The weighted part of igraph_diameter_approximation. For each component,
+ * a Dijkstra search from the vertex in sources bounds the weighted
+ * diameter by the sum of the two largest distances, which bounds the
+ * number of edges of a shortest path through igraph_i_diameter_hops; the
+ * shortest paths found give a lower bound. The component with the largest
+ * bound is then searched again from the central vertex of a double sweep,
+ * while bfs_budget allows.
+ */
+int igraph_i_diameter_weighted(const igraph_t *graph,
+    const igraph_vector_t *weights, igraph_vector_t *sources,
+    const igraph_vector_t *csize, igraph_vector_t *lower,
+    igraph_vector_t *upper, long int bfs_budget, long int *no_of_bfs,
+    long int *touched_edges, long int *lower_bound) {
+  long int no_of_nodes = igraph_vcount(graph);
+  long int no_of_components = igraph_vector_size(sources);
+  long int no_of_order, max_bfs, c, k;
+  igraph_vector_t prefix, neis;
+  igraph_2wheap_t Q;
+  igraph_real_t *distance;
+  long int *hops, *parent, *order;
+
+  IGRAPH_VECTOR_INIT_FINALLY(&prefix, 0);
+  IGRAPH_CHECK(igraph_i_diameter_prefix(weights, &prefix));
+
+  IGRAPH_VECTOR_INIT_FINALLY(&neis, 0);
+  IGRAPH_CHECK(igraph_2wheap_init(&Q, no_of_nodes));
+  IGRAPH_FINALLY(igraph_2wheap_destroy, &Q);
+  distance = igraph_Calloc(no_of_nodes, igraph_real_t);
+  if (distance == 0) {
+    IGRAPH_ERROR("diameter approximation failed", IGRAPH_ENOMEM);
   }
   IGRAPH_FINALLY(igraph_free, distance);
-  if (nobigint) {
-    nrgeo=igraph_Calloc(no_of_nodes, unsigned long long int);
-    if (nrgeo==0) {
-      IGRAPH_ERROR("betweenness failed", IGRAPH_ENOMEM);
+  hops = igraph_Calloc(no_of_nodes, long int);
+  if (hops == 0) {
+    IGRAPH_ERROR("diameter approximation failed", IGRAPH_ENOMEM);
+  }
+  IGRAPH_FINALLY(igraph_free, hops);
+  parent = igraph_Calloc(no_of_nodes, long int);
+  if (parent == 0) {
+    IGRAPH_ERROR("diameter approximation failed", IGRAPH_ENOMEM);
+  }
+  IGRAPH_FINALLY(igraph_free, parent);
+  order = igraph_Calloc(no_of_nodes, long int);
+  if (order == 0) {
+    IGRAPH_ERROR("diameter approximation failed", IGRAPH_ENOMEM);
+  }
+  IGRAPH_FINALLY(igraph_free, order);
+
+  for (c = 0; c < no_of_components; c++) {
+    igraph_real_t largest, second_largest;
+
+    IGRAPH_ALLOW_INTERRUPTION();
+
+    IGRAPH_CHECK(igraph_i_diameter_dijkstra(graph, weights,
+          (long int) VECTOR(*sources)[c], IGRAPH_ALL, 0, distance, hops, 0,
+          order, &no_of_order, &Q, &neis, touched_edges));
+    (*no_of_bfs)++;
+    largest = distance[order[no_of_order - 1]] - 1;
+    second_largest = no_of_order > 1 ? distance[order[no_of_order - 2]] - 1 : 0;
+    VECTOR(*upper)[c] = igraph_i_diameter_hops(&prefix, largest + second_largest);
+    if (VECTOR(*upper)[c] > VECTOR(*csize)[c] - 1) {
+      VECTOR(*upper)[c] = VECTOR(*csize)[c] - 1;
     }
-    IGRAPH_FINALLY(igraph_free, nrgeo);
-  } else {
-    /* +1 is to have one containing zeros, when we free it, we stop
-       at the zero */
-    big_nrgeo=igraph_Calloc(no_of_nodes+1, igraph_biguint_t);
-    if (!big_nrgeo) {
-      IGRAPH_ERROR("betweenness failed", IGRAPH_ENOMEM);
+    for (k = 0; k < no_of_order; k++) {
+      if (hops[order[k]] > VECTOR(*lower)[c]) {
+        VECTOR(*lower)[c] = hops[order[k]];
+      }
+      distance[order[k]] = 0;
     }
-    IGRAPH_FINALLY(igraph_i_destroy_biguints, big_nrgeo);
-    for (j=0; j<no_of_nodes; j++) {
-      IGRAPH_CHECK(igraph_biguint_init(&big_nrgeo[j]));
+    if (VECTOR(*lower)[c] > *lower_bound) {
+      *lower_bound = VECTOR(*lower)[c];
     }
-    IGRAPH_CHECK(igraph_biguint_init(&D));
-    IGRAPH_FINALLY(igraph_biguint_destroy, &D);
-    IGRAPH_CHECK(igraph_biguint_init(&R));
-    IGRAPH_FINALLY(igraph_biguint_destroy, &R);
-    IGRAPH_CHECK(igraph_biguint_init(&T));
-    IGRAPH_FINALLY(igraph_biguint_destroy, &T);
-  }
-  /*
-  tmpscore=igraph_Calloc(no_of_nodes, double);
-  if (tmpscore==0) {
-    IGRAPH_ERROR("betweenness failed", IGRAPH_ENOMEM);
+    VECTOR(*sources)[c] = order[no_of_order - 1];
   }
-  IGRAPH_FINALLY(igraph_free, tmpscore);
 
-  IGRAPH_DQUEUE_INIT_FINALLY(&q, 100);
-  igraph_stack_init(&stack, no_of_nodes);
-  IGRAPH_FINALLY(igraph_stack_destroy, &stack);
-  */
-  IGRAPH_DQUEUE_INIT_FINALLY(&q, no_of_nodes);
-    
-  /* here we go */
+  /* A negative source marks a component that was already searched from
+   * its central vertex */
+  max_bfs = *no_of_bfs + bfs_budget;
+  while (*no_of_bfs + 2 <= max_bfs) {
+    igraph_real_t largest, second_largest;
+    long int central;
+
+    c = igraph_vector_which_max(upper);
+    if (VECTOR(*upper)[c] <= *lower_bound || VECTOR(*sources)[c] < 0) {
+      break;
+    }
 
-  //setbuf(stdout, NULL);
-  
-  for (vertex_index=0; vertex_index<no_of_samples; vertex_index++) {
-    IGRAPH_PROGRESS("Betweenness centrality: ", 100.0*vertex_index/no_of_samples, 0);
     IGRAPH_ALLOW_INTERRUPTION();
-    //printf("vertex_index=%ld", vertex_index);
 
-    /* Sample a pair of distinct vertices */
-    long int destination = 0;
-    long int source = igraph_rng_get_integer(rng, 0, no_of_nodes -1);
-    do {
-      destination = igraph_rng_get_integer(rng, 0, no_of_nodes -1);
-    } while (destination == source);
-    //printf("source=%ld, destination=%ld\n", source, destination);
+    /* The central vertex is the first one at most halfway from the
+     * farthest vertex of the first search, on the path to the vertex
+     * farthest from it */
+    IGRAPH_CHECK(igraph_i_diameter_dijkstra(graph, weights,
+          (long int) VECTOR(*sources)[c], IGRAPH_ALL, 0, distance, hops,
+          parent, order, &no_of_order, &Q, &neis, touched_edges));
+    (*no_of_bfs)++;
+    largest = distance[order[no_of_order - 1]] - 1;
+    central = order[no_of_order - 1];
+    while (distance[central] - 1 > largest / 2) {
+      central = parent[central];
+    }
+    for (k = 0; k < no_of_order; k++) {
+      if (hops[order[k]] > VECTOR(*lower)[c]) {
+        VECTOR(*lower)[c] = hops[order[k]];
+      }
+      distance[order[k]] = 0;
+    }
+
+    IGRAPH_CHECK(igraph_i_diameter_dijkstra(graph, weights, central,
+          IGRAPH_ALL, 0, distance, hops, 0, order, &no_of_order, &Q, &neis,
+          touched_edges));
+    (*no_of_bfs)++;
+    largest = distance[order[no_of_order - 1]] - 1;
+    second_largest = no_of_order > 1 ? distance[order[no_of_order - 2]] - 1 : 0;
+    k = igraph_i_diameter_hops(&prefix, largest + second_largest);
+    if (k < VECTOR(*upper)[c]) {
+      VECTOR(*upper)[c] = k;
+    }
+    for (k = 0; k < no_of_order; k++) {
+      if (hops[order[k]] > VECTOR(*lower)[c]) {
+        VECTOR(*lower)[c] = hops[order[k]];
+      }
+      distance[order[k]] = 0;
+    }
+    if (VECTOR(*lower)[c] > *lower_bound) {
+      *lower_bound = VECTOR(*lower)[c];
+    }
+    VECTOR(*sources)[c] = -1;
+  }
 
-    igraph_bool_t destination_is_reached = 0;
+  igraph_free(order);
+  igraph_free(parent);
+  igraph_free(hops);
+  igraph_free(distance);
+  igraph_2wheap_destroy(&Q);
+  igraph_vector_destroy(&neis);
+  igraph_vector_destroy(&prefix);
+  IGRAPH_FINALLY_CLEAN(7);
+  return 0;
+}
 
-    IGRAPH_CHECK(igraph_dqueue_push(&q, source));
-    if (nobigint) { 
-      nrgeo[source]=1;
-    } else {
-      igraph_biguint_set_limb(&big_nrgeo[source], 1);
+/*
+ * The directed part of igraph_diameter_approximation. A shortest path
+ * crosses the strongly connected components along a path of the
+ * condensation DAG, and its part inside each component is a shortest path
+ * of the component. So it has at most as many edges as the sum of the
+ * diameters of the components along the DAG path, plus one edge between
+ * each two of them. The diameter of a component is bounded by the sum of
+ * the largest distances from and to a random vertex of it, both measured
+ * within the component, and the largest of them is a lower bound. With
+ * weights, the bound on the number of edges comes from the weighted one
+ * through igraph_i_diameter_hops.
+ */
+int igraph_i_diameter_directed(const igraph_t *graph,
+    const igraph_vector_t *weights, long int *bound, long int *no_of_bfs,
+    long int *touched_edges, long int *lower_bound) {
+  long int no_of_nodes = igraph_vcount(graph);
+  long int no_of_edges = igraph_ecount(graph);
+  igraph_vector_t membership, csize, sources, upper, prefix, neis;
+  igraph_integer_t no_of_components;
+  igraph_2wheap_t Q;
+  igraph_real_t *wdistance = 0;
+  long int *distance = 0, *hops = 0, *order;
+  long int *offsets, *indegree, *targets, *queue, *best;
+  long int no_of_order, head, tail, c, d, e, k, j;
+
+  IGRAPH_VECTOR_INIT_FINALLY(&membership, 0);
+  IGRAPH_VECTOR_INIT_FINALLY(&csize, 0);
+  IGRAPH_CHECK(igraph_clusters(graph, &membership, &csize, &no_of_components,
+        IGRAPH_STRONG));
+  IGRAPH_VECTOR_INIT_FINALLY(&sources, 0);
+  IGRAPH_CHECK(igraph_i_diameter_sources(&membership, &csize, &sources));
+  IGRAPH_VECTOR_INIT_FINALLY(&upper, no_of_components);
+
+  IGRAPH_VECTOR_INIT_FINALLY(&neis, 0);
+  order = igraph_Calloc(no_of_nodes > 0 ? no_of_nodes : 1, long int);
+  if (order == 0) {
+    IGRAPH_ERROR("diameter approximation failed", IGRAPH_ENOMEM);
+  }
+  IGRAPH_FINALLY(igraph_free, order);
+  if (weights) {
+    IGRAPH_VECTOR_INIT_FINALLY(&prefix, 0);
+    IGRAPH_CHECK(igraph_i_diameter_prefix(weights, &prefix));
+    IGRAPH_CHECK(igraph_2wheap_init(&Q, no_of_nodes));
+    IGRAPH_FINALLY(igraph_2wheap_destroy, &Q);
+    wdistance = igraph_Calloc(no_of_nodes, igraph_real_t);
+    if (wdistance == 0) {
+      IGRAPH_ERROR("diameter approximation failed", IGRAPH_ENOMEM);
     }
-    distance[source]=1;
-    
-    while (!igraph_dqueue_empty(&q)) {
-      long int actnode=igraph_dqueue_pop(&q);
-      //printf("actnode=%ld\n", actnode);
-      /* IGRAPH_CHECK(igraph_stack_push(&stack, actnode)); */
+    IGRAPH_FINALLY(igraph_free, wdistance);
+    hops = igraph_Calloc(no_of_nodes, long int);
+    if (hops == 0) {
+      IGRAPH_ERROR("diameter approximation failed", IGRAPH_ENOMEM);
+    }
+    IGRAPH_FINALLY(igraph_free, hops);
+  } else {
+    distance = igraph_Calloc(no_of_nodes > 0 ? no_of_nodes : 1, long int);
+    if (distance == 0) {
+      IGRAPH_ERROR("diameter approximation failed", IGRAPH_ENOMEM);
+    }
+    IGRAPH_FINALLY(igraph_free, distance);
+  }
 
-      /* Set a flag if destination is reached */
-      if (actnode == destination) {
-        destination_is_reached = 1;
-        break;
-      }
+  for (c = 0; c < no_of_components; c++) {
+    long int source = (long int) VECTOR(sources)[c];
+    igraph_real_t length = 0;
 
-      if (cutoff >= 0 && distance[actnode] >= cutoff+1) { continue; }
-      
-      /* Now check all neighbors of 'actnode' for a shorter path */
-      neis = igraph_adjlist_get(adjlist_out_p, actnode);
-      nneis = igraph_vector_size(neis);
-      for (j=0; j<nneis; j++) {
-        forward_touched_edges++;
-        long int neighbor=VECTOR(*neis)[j];
-        if (distance[neighbor]==0) {
-          igraph_vector_clear(igraph_adjlist_get(adjlist_in_p, neighbor));
-          distance[neighbor]=distance[actnode]+1;
-          if (nobigint) {
-            nrgeo[neighbor] = 0;
-          } else {
-            igraph_biguint_set_limb(&big_nrgeo[neighbor], 0);
-          }
-          IGRAPH_CHECK(igraph_dqueue_push(&q, neighbor));
-        } 
-        if (distance[neighbor]==distance[actnode]+1) {
-          igraph_vector_t *v=igraph_adjlist_get(adjlist_in_p, neighbor);
-          igraph_vector_push_back(v, actnode);
-          //printf("%ld -> %ld\n", actnode, neighbor);
-          if (nobigint) { 
-            nrgeo[neighbor]+=nrgeo[actnode];
-          } else {
-            IGRAPH_CHECK(igraph_biguint_add(&big_nrgeo[neighbor],
-                    &big_nrgeo[neighbor], 
-                    &big_nrgeo[actnode]));
-          }
-        }
+    /* Components with one or two vertices need no search */
+    VECTOR(upper)[c] = VECTOR(csize)[c] - 1;
+    if (VECTOR(csize)[c] <= 2) {
+      if (VECTOR(upper)[c] > *lower_bound) {
+        *lower_bound = VECTOR(upper)[c];
       }
-    } /* while !igraph_dqueue_empty */
-    /* If there is a path between the source and the destination, walk
-     * backwards from the destination, sampling a shortest path at random and
-     * updating the betweenness of vertices along this path
-     */
-    if (destination_is_reached) {
-      //printf("destination is reached\n");
-      igraph_dqueue_clear(&q);
-
-      long int path_vertex, sampled_pred=destination;
-      igraph_vector_t *fatv=NULL;
-      while (1) {
-        path_vertex = sampled_pred;
-        /* Get list of predecessors of path_vertex */
-        fatv=igraph_adjlist_get(adjlist_in_p, path_vertex);
-        /* Weighted sampling of predecessor according to the number of paths
-         * passing through it.
-         */
-        long int fatv_len=igraph_vector_size(fatv);
-        if (fatv_len > 1) {
-          //printf("sampling\n");
-          int sampling_limits[fatv_len];
-          int curr_limit = -1;
-          for (j=0; j<fatv_len; j++) {
-            backward_touched_edges++;
-            long int f = VECTOR(*fatv)[j];
-            /* curr_limit+=VECTOR(nrgeo)[f]; */
-            curr_limit+=nrgeo[f];
-            sampling_limits[j] = curr_limit;
-          }
-          igraph_integer_t sampled=igraph_rng_get_integer(rng, 0, nrgeo[path_vertex] - 1);
-          j=0;
-          /* XXX we should have binary search here */
-          while (sampling_limits[j] < sampled) {
-            j++;
-          }
-          sampled_pred=VECTOR(*fatv)[j];
-        } else {
-          backward_touched_edges++;
-          sampled_pred=VECTOR(*fatv)[0];
-        }
-        //printf("%ld %ld %ld %ld\n", destination, path_vertex, sampled_pred, source);
-        //sleep(3);
+      continue;
+    }
 
-        /* Increase betweenness counter for internal node */
-        if (sampled_pred != source) {
-          VECTOR(*tmpres)[sampled_pred]+= normalization_factor; 
-        } else {
-          break;
-        }
-      } /* while(1) */
-    } /* destination_is_reached */
-    /* cleanup */ 
-    //printf("cleanup\n");
-    memset(distance, 0, no_of_nodes * sizeof(long int));
-    /* End of clean up */
-    
-    /* Brandes computation of betweenness */
-    /* Ok, we've the distance of each node and also the number of
-       shortest paths to them. Now we do an inverse search, starting
-       with the farthest nodes. */
-    /*
-    while (!igraph_stack_empty(&stack)) {
-      long int actnode=igraph_stack_pop(&stack);
-      neis = igraph_adjlist_get(adjlist_in_p, actnode);
-      nneis = igraph_vector_size(neis);
-      for (j=0; j<nneis; j++) {
-        long int neighbor=VECTOR(*neis)[j];
-	if (nobigint) {
-	  tmpscore[neighbor] +=  (tmpscore[actnode]+1)*
-	    ((double)(nrgeo[neighbor]))/nrgeo[actnode];
-	} else {
-	  if (!igraph_biguint_compare_limb(&big_nrgeo[actnode], 0)) {
-	    tmpscore[neighbor] = IGRAPH_INFINITY;
-	  } else {
-	    double div;
-	    int shift=1000000000L;
-	    IGRAPH_CHECK(igraph_biguint_mul_limb(&T, &big_nrgeo[neighbor], 
-						 shift));	  
-	    igraph_biguint_div(&D, &R, &T, &big_nrgeo[actnode]);
-	    div=igraph_biguint_get(&D) / shift;
-	    tmpscore[neighbor] += (tmpscore[actnode]+1) * div;
-	  }
-	}
-      }
-      
-      if (actnode != source) { VECTOR(*tmpres)[actnode] += tmpscore[actnode]; }
+    IGRAPH_ALLOW_INTERRUPTION();
 
-      distance[actnode]=0;
-      if (nobigint) { 
-	nrgeo[actnode]=0;
+    for (k = 0; k < 2; k++) {
+      igraph_neimode_t mode = k == 0 ? IGRAPH_OUT : IGRAPH_IN;
+      if (weights) {
+        IGRAPH_CHECK(igraph_i_diameter_dijkstra(graph, weights, source, mode,
+              &membership, wdistance, hops, 0, order, &no_of_order, &Q, &neis,
+              touched_edges));
+        length += wdistance[order[no_of_order - 1]] - 1;
+        for (j = 0; j < no_of_order; j++) {
+          if (hops[order[j]] > *lower_bound) {
+            *lower_bound = hops[order[j]];
+          }
+          wdistance[order[j]] = 0;
+        }
       } else {
-	igraph_biguint_set_limb(&big_nrgeo[actnode], 0);
+        IGRAPH_CHECK(igraph_i_diameter_bfs(graph, source, mode, &membership,
+              distance, 0, order, &no_of_order, &neis, touched_edges));
+        length += distance[order[no_of_order - 1]] - 1;
+        if (distance[order[no_of_order - 1]] - 1 > *lower_bound) {
+          *lower_bound = distance[order[no_of_order - 1]] - 1;
+        }
+        igraph_i_diameter_reset(distance, order, no_of_order);
       }
-      tmpscore[actnode]=0;
-      igraph_vector_clear(igraph_adjlist_get(adjlist_in_p, actnode));      
-    } */ 
-
-  } /* for vertex_index < no_of_samples */
-
-  igraph_vector_push_back(stats, forward_touched_edges);
-  igraph_strvector_add(stats_names, "forward_touched_edges");
-  igraph_vector_push_back(stats, backward_touched_edges);
-  igraph_strvector_add(stats_names, "backward_touched_edges");
-
-  IGRAPH_PROGRESS("Betweenness centrality: ", 100.0, 0);
+      (*no_of_bfs)++;
+    }
+    if (weights) {
+      length = igraph_i_diameter_hops(&prefix, length);
+    }
+    if (length < VECTOR(upper)[c]) {
+      VECTOR(upper)[c] = length;
+    }
+  }
 
-  /* clean  */
-  igraph_Free(distance);
-  if (nobigint) {
-    igraph_Free(nrgeo); 
+  if (weights) {
+    igraph_free(hops);
+    igraph_free(wdistance);
+    igraph_2wheap_destroy(&Q);
+    igraph_vector_destroy(&prefix);
+    IGRAPH_FINALLY_CLEAN(4);
   } else {
-    igraph_biguint_destroy(&T);
-    igraph_biguint_destroy(&R);
-    igraph_biguint_destroy(&D);
-    IGRAPH_FINALLY_CLEAN(3);
-    igraph_i_destroy_biguints(big_nrgeo);
+    igraph_free(distance);
+    IGRAPH_FINALLY_CLEAN(1);
   }
-  /* igraph_Free(tmpscore); */
-  
-  igraph_dqueue_destroy(&q);
-  /* igraph_stack_destroy(&stack); */
-  IGRAPH_FINALLY_CLEAN(3); 
-
-  /* Keep only the requested vertices */
-  if (!igraph_vs_is_all(&vids)) { 
-    IGRAPH_CHECK(igraph_vit_create(graph, vids, &vit));
-    IGRAPH_FINALLY(igraph_vit_destroy, &vit);
-    IGRAPH_CHECK(igraph_vector_resize(res, IGRAPH_VIT_SIZE(vit)));
+  igraph_free(order);
+  igraph_vector_destroy(&neis);
+  IGRAPH_FINALLY_CLEAN(2);
 
-    for (k=0, IGRAPH_VIT_RESET(vit); !IGRAPH_VIT_END(vit);
-	 IGRAPH_VIT_NEXT(vit), k++) {
-      long int node=IGRAPH_VIT_GET(vit);
-      VECTOR(*res)[k] = VECTOR(*tmpres)[node];
+  /* The edges of the condensation, stored by tail in
+   * targets[offsets[c]..offsets[c+1]) */
+  offsets = igraph_Calloc(no_of_components + 1, long int);
+  if (offsets == 0) {
+    IGRAPH_ERROR("diameter approximation failed", IGRAPH_ENOMEM);
+  }
+  IGRAPH_FINALLY(igraph_free, offsets);
+  indegree = igraph_Calloc(no_of_components + 1, long int);
+  if (indegree == 0) {
+    IGRAPH_ERROR("diameter approximation failed", IGRAPH_ENOMEM);
+  }
+  IGRAPH_FINALLY(igraph_free, indegree);
+  for (e = 0; e < no_of_edges; e++) {
+    c = (long int) VECTOR(membership)[(long int) IGRAPH_FROM(graph, e)];
+    d = (long int) VECTOR(membership)[(long int) IGRAPH_TO(graph, e)];
+    if (c != d) {
+      offsets[c + 1]++;
+      indegree[d]++;
+    }
+  }
+  for (c = 0; c < no_of_components; c++) {
+    offsets[c + 1] += offsets[c];
+  }
+  targets = igraph_Calloc(offsets[no_of_components] + 1, long int);
+  if (targets == 0) {
+    IGRAPH_ERROR("diameter approximation failed", IGRAPH_ENOMEM);
+  }
+  IGRAPH_FINALLY(igraph_free, targets);
+  queue = igraph_Calloc(no_of_components + 1, long int);
+  if (queue == 0) {
+    IGRAPH_ERROR("diameter approximation failed", IGRAPH_ENOMEM);
+  }
+  IGRAPH_FINALLY(igraph_free, queue);
+  best = igraph_Calloc(no_of_components + 1, long int);
+  if (best == 0) {
+    IGRAPH_ERROR("diameter approximation failed", IGRAPH_ENOMEM);
+  }
+  IGRAPH_FINALLY(igraph_free, best);
+  /* best counts the edges stored so far for each tail, at first */
+  for (e = 0; e < no_of_edges; e++) {
+    c = (long int) VECTOR(membership)[(long int) IGRAPH_FROM(graph, e)];
+    d = (long int) VECTOR(membership)[(long int) IGRAPH_TO(graph, e)];
+    if (c != d) {
+      targets[offsets[c] + best[c]++] = d;
     }
+  }
 
-    igraph_vit_destroy(&vit);
-    igraph_vector_destroy(tmpres);
-    IGRAPH_FINALLY_CLEAN(2);
-  }     
-  
-  igraph_adjlist_destroy(&adjlist_out);
-  igraph_adjlist_destroy(&adjlist_in);
-  IGRAPH_FINALLY_CLEAN(2);
+  /* Longest path of the condensation in topological order, each
+   * component counting for its bound plus one edge to leave it. best[c]
+   * is the longest path ending in c, plus one. */
+  tail = 0;
+  for (c = 0; c < no_of_components; c++) {
+    best[c] = 0;
+    if (indegree[c] == 0) {
+      queue[tail++] = c;
+    }
+  }
+  *bound = 0;
+  for (head = 0; head < tail; head++) {
+    c = queue[head];
+    best[c] += VECTOR(upper)[c] + 1;
+    if (best[c] - 1 > *bound) {
+      *bound = best[c] - 1;
+    }
+    for (k = offsets[c]; k < offsets[c + 1]; k++) {
+      d = targets[k];
+      if (best[c] > best[d]) {
+        best[d] = best[c];
+      }
+      if (--indegree[d] == 0) {
+        queue[tail++] = d;
+      }
+    }
+  }
 
+  igraph_free(best);
+  igraph_free(queue);
+  igraph_free(targets);
+  igraph_free(indegree);
+  igraph_free(offsets);
+  igraph_vector_destroy(&upper);
+  igraph_vector_destroy(&sources);
+  igraph_vector_destroy(&csize);
+  igraph_vector_destroy(&membership);
+  IGRAPH_FINALLY_CLEAN(9);
   return 0;
 }
 
-int igraph_betweenness_sample_vc_sample_size(const igraph_t *graph,
-           igraph_vector_t *res, igraph_vector_t *stats, 
-           igraph_strvector_t *stats_names, igraph_integer_t sample_size, 
-           const igraph_vs_t vids, igraph_bool_t directed, 
-           igraph_real_t cutoff, const igraph_vector_t* weights,
-           igraph_bool_t nobigint) {
-  int ret_code = igraph_i_betweenness_sample_vc(graph, res, stats, stats_names,
-      sample_size, vids, directed, cutoff, weights, nobigint);
-  igraph_vector_push_back(stats, sample_size);
-  igraph_strvector_add(stats_names, "sample_size");
-  return ret_code;
-}
-
 /**
  * \ingroup structural
  * \function igraph_diameter_approximation
- * \brief TODO
+ * \brief Upper bound to the diameter of a graph, for the VC sample size.
  *  
  * </para><para>
- * TODO
+ * The weakly connected components are labeled in a single pass, then a
+ * breadth-first search is run from a random vertex of each component, on
+ * the original graph. The sum of the two largest distances from the source
+ * bounds the diameter of the component, and the largest distance is a lower
+ * bound.
+ *
+ * </para><para>
+ * The bound of the component with the largest one is then tightened with a
+ * double sweep, which finds a central vertex, followed by the iFUB
+ * algorithm: the eccentricities of the vertices farthest from the central
+ * vertex are computed level by level, until the bounds meet or \p
+ * bfs_budget more searches have been run. The bound is exact when the
+ * bounds meet.
+ *
+ * </para><para>
+ * With weights, the diameter bounded is the largest number of edges of a
+ * shortest path, which is what the VC sample size depends on. Dijkstra
+ * searches bound the weighted diameter as above, and a shortest path of
+ * weight at most W has at most as many edges as the smallest weights
+ * summing to at most W. The bound of the largest component is tightened by
+ * a search from the central vertex of a double sweep. The searches also
+ * give a lower bound: the most edges of the shortest paths they found.
+ *
+ * </para><para>
+ * On directed graphs, if \p directed is true, the diameter of each
+ * strongly connected component is bounded with a search from and a search
+ * to a random vertex of it, within the component. The bounds are combined
+ * along the longest paths of the condensation DAG, since a shortest path
+ * visits the components in topological order. The bound is at most the
+ * size of the largest weakly connected component minus one. \p bfs_budget
+ * is not used. Otherwise the edge directions are ignored, as above.
+ *
+ * </para><para>
+ * The number of edges touched by the searches, the number of searches and
+ * the lower bound are added to \p stats as "diameter_touched_edges",
+ * "diameter_bfs" and "diameter_lower_bound", if it is not \c NULL.
+ *
+ * \param directed Whether to bound the diameter of the directed paths.
+ *        Ignored for undirected graphs.
+ * \param bfs_budget The largest number of searches used to tighten the
+ *        bound. If negative, a default of 64 is used.
  */
 
 int igraph_diameter_approximation(const igraph_t *graph, 
                                   igraph_integer_t *diameter, 
                                   igraph_vector_t *stats, 
                                   igraph_strvector_t *stats_names,
-                                  const igraph_vector_t *weights) {
-  igraph_bool_t do_computation = 1;
-  igraph_bool_t component_is_strongly_connected;
-  int component_size, component_diameter = 0;
-  *diameter=0;
-  int i,j=0;
-  int max_component_size = 0;
-  igraph_rng_t *rng = NULL;
-  igraph_vector_ptr_t components;
-  igraph_vector_ptr_init(&components, 0);
-  IGRAPH_FINALLY(igraph_vector_ptr_destroy, &components);
-  igraph_decompose(graph, &components, IGRAPH_WEAK, -1, 2);
+                                  igraph_bool_t directed,
+                                  const igraph_vector_t *weights,
+                                  igraph_integer_t bfs_budget) {
+  igraph_vector_t membership, csize, sources;
+  igraph_vector_t lower, upper;
+  igraph_integer_t no_of_components;
+  long int max_component_size = 0;
+  long int diameter_touched_edges = 0;
+  long int no_of_bfs = 0;
+  long int lower_bound = 0;
+  long int c;
+
   if (weights) {
-    do_computation = 0;
-  } else {
-    rng = igraph_rng_default();
-  }
-  //setbuf(stdout, 0);
-  for (j=0; j < igraph_vector_ptr_size(&components); j++) {
-    // igraph_t *component = (igraph_t *) VECTOR(components)[j];
-    igraph_t *component = VECTOR(components)[j];
-    component_size = igraph_vcount(component);
-    if (max_component_size < component_size - 1) {
-      max_component_size = component_size - 1;
-    }
-    //printf("%d\n", j);
-    // Were all connected components we found until now strongly connected?
-    if (do_computation) { 
-      //printf("do_computation\n");
-      igraph_is_connected(component, &component_is_strongly_connected, IGRAPH_STRONG);
-      if (component_is_strongly_connected) {
-        //printf("strongly connected\n");
-        igraph_matrix_t sp_res;
-        IGRAPH_CHECK(igraph_matrix_init(&sp_res, 1, component_size));
-        IGRAPH_FINALLY(igraph_matrix_destroy, &sp_res);
-        igraph_integer_t sampled_source = igraph_rng_get_integer(rng, 0, component_size - 1);
-        // Compute shortest paths from sampled source
-        //printf("pre-ssp\n");
-        igraph_shortest_paths_stats(component, &sp_res, stats, stats_names,
-            igraph_vss_1(sampled_source), igraph_vss_all(), IGRAPH_ALL);
-        //printf("post-ssp\n");
-        // Perform computation of diameter
-        igraph_real_t largest = 0;
-        igraph_real_t second_largest = 0;
-        for (i=0; i<component_size; i++) {
-          //printf("%d %d %ld %lf\n", i, component_size, igraph_matrix_size(&sp_res), MATRIX(sp_res, 0, 1));
-          if (MATRIX(sp_res, 0, i) == IGRAPH_INFINITY)  {
-            //printf("infinity\n");
-            continue;
-          }
-          if (MATRIX(sp_res, 0, i) >= largest) {
-            //printf("largest\n");
-            second_largest = largest;
-            largest = MATRIX(sp_res, 0, i);
-          }
-        }
-        //printf("computed max\n");
-        component_diameter = (igraph_integer_t) largest + second_largest;
-        if (component_diameter > *diameter) {
-          *diameter = component_diameter;
-        }
-        igraph_matrix_destroy(&sp_res);
-        IGRAPH_FINALLY_CLEAN(1);
-      } else { // component not strongly connected
-        do_computation = 0;
-      }
-    } // and if do_computation
-  } // end for connected components
-  igraph_decompose_destroy(&components);
-  IGRAPH_FINALLY_CLEAN(1);
-  if (! do_computation) {
-    *diameter = max_component_size - 1;
+    if (igraph_vector_size(weights) != igraph_ecount(graph)) {
+      IGRAPH_ERROR("Weight vector length does not match", IGRAPH_EINVAL);
+    }
+    if (igraph_ecount(graph) > 0 && igraph_vector_min(weights) <= 0) {
+      IGRAPH_ERROR("Weight vector must be positive", IGRAPH_EINVAL);
+    }
+  }
+  if (bfs_budget < 0) {
+    bfs_budget = IGRAPH_I_DIAMETER_BFS_BUDGET;
+  }
+
+  *diameter = 0;
+  IGRAPH_VECTOR_INIT_FINALLY(&membership, 0);
+  IGRAPH_VECTOR_INIT_FINALLY(&csize, 0);
+  IGRAPH_CHECK(igraph_clusters(graph, &membership, &csize, &no_of_components,
+        IGRAPH_WEAK));
+  for (c = 0; c < no_of_components; c++) {
+    if (max_component_size < VECTOR(csize)[c] - 1) {
+      max_component_size = VECTOR(csize)[c] - 1;
+    }
+  }
+
+  if (directed && igraph_is_directed(graph)) {
+    long int bound;
+    IGRAPH_CHECK(igraph_i_diameter_directed(graph, weights, &bound,
+          &no_of_bfs, &diameter_touched_edges, &lower_bound));
+    *diameter = bound < max_component_size ? bound : max_component_size;
+  } else if (no_of_components > 0) {
+    IGRAPH_VECTOR_INIT_FINALLY(&sources, 0);
+    IGRAPH_CHECK(igraph_i_diameter_sources(&membership, &csize, &sources));
+    IGRAPH_VECTOR_INIT_FINALLY(&lower, no_of_components);
+    IGRAPH_VECTOR_INIT_FINALLY(&upper, no_of_components);
+    if (weights) {
+      IGRAPH_CHECK(igraph_i_diameter_weighted(graph, weights, &sources, &csize,
+            &lower, &upper, bfs_budget, &no_of_bfs, &diameter_touched_edges,
+            &lower_bound));
+    } else {
+      IGRAPH_CHECK(igraph_i_diameter_unweighted(graph, &sources, &csize,
+            &lower, &upper, bfs_budget, &no_of_bfs, &diameter_touched_edges,
+            &lower_bound));
+    }
+    *diameter = igraph_vector_max(&upper);
+    igraph_vector_destroy(&upper);
+    igraph_vector_destroy(&lower);
+    igraph_vector_destroy(&sources);
+    IGRAPH_FINALLY_CLEAN(3);
+  }
+
+  igraph_vector_destroy(&csize);
+  igraph_vector_destroy(&membership);
+  IGRAPH_FINALLY_CLEAN(2);
+  if (stats && stats_names) {
+    igraph_vector_push_back(stats, diameter_touched_edges);
+    igraph_strvector_add(stats_names, "diameter_touched_edges");
+    igraph_vector_push_back(stats, no_of_bfs);
+    igraph_strvector_add(stats_names, "diameter_bfs");
+    igraph_vector_push_back(stats, lower_bound);
+    igraph_strvector_add(stats_names, "diameter_lower_bound");
   }
   return 0;
 }
 
+/*
+ * Bound to the number of edges of the shortest paths that are counted with
+ * the given cutoff, which is what the VC-dimension of the sampled paths
+ * depends on, from the bound 'diameter' to the number of edges of all the
+ * shortest paths. A path no longer than the cutoff has at most cutoff
+ * edges, or at most the cutoff divided by the smallest weight. The bound
+ * is at least 2, the smallest one the sample size is defined for.
+ */
+igraph_integer_t igraph_i_vc_length_bound(igraph_integer_t diameter,
+                                          igraph_real_t cutoff,
+                                          const igraph_vector_t *weights) {
+  igraph_integer_t bound=diameter;
+  igraph_real_t edges=cutoff;
+  if (cutoff >= 0) {
+    if (weights && igraph_vector_size(weights) > 0) {
+      if (igraph_vector_min(weights) > 0) {
+        edges=floor(cutoff / igraph_vector_min(weights));
+      } else {
+        edges=bound;
+      }
+    }
+    if (edges < bound) {
+      bound=(igraph_integer_t) edges;
+    }
+  }
+  return bound < 2 ? 2 : bound;
+}
+
 /**
  * \ingroup structural
  * \function igraph_betweenness_sample_vc
  * \brief Approximate betweenness centrality of some vertices using sampling and VC-Dimension.
  * 
  * </para><para>
- * TODO
+ * Pairs of vertices are sampled, a shortest path between the vertices of
+ * each pair is drawn uniformly at random, and the betweenness of a vertex
+ * is estimated as the fraction of the sampled paths it is internal to.
+ * The sample size comes from the bound to the VC-dimension of the
+ * shortest paths given by \p diameter, so that all the estimates are
+ * within \p epsilon of the exact values with probability 1-\p delta.
+ *
+ * \param diameter An upper bound to the number of edges of the shortest
+ *        paths, or -1 to use \ref igraph_diameter_approximation.
+ * \param threads The number of threads taking the samples, at least 1.
+ *        Each thread has its own random number generator, seeded from the
+ *        default one, so the result is reproducible for a given seed and
+ *        number of threads.
+ * \param bidirectional Whether to search the graph from both vertices of
+ *        each pair at once, which explores a much smaller part of
+ *        small-world graphs. With weights this is a bidirectional Dijkstra
+ *        search; unweighted graphs need \p nobigint.
+ * \param group_sources Whether to sample all the pairs first and run a
+ *        single search from each distinct source for all the destinations
+ *        sampled with it. This overrides \p bidirectional and \p
+ *        landmarks.
+ * \param landmarks The landmark distances computed by \ref
+ *        igraph_betweenness_landmarks with the same graph, weights and \p
+ *        directed, or \c NULL. With weights, each pair is then searched
+ *        with an A* search guided by them, which overrides \p
+ *        bidirectional. Ignored without weights.
+ * \param progressive Whether to take the samples in geometrically growing
+ *        stages, and stop at the first stage where an empirical bound
+ *        guarantees the accuracy. Half of \p delta goes to the stopping
+ *        rule, and the last stage is the fixed sample size for the other
+ *        half. The number of samples taken is the "sample_size" entry of
+ *        \p stats.
+ * \param snapshot An array of at least 2*(n+1)+2 doubles, n being the
+ *        number of vertices, where the raw counts are published about
+ *        every 1% of the samples, or \c NULL. Another process sharing the
+ *        memory can then build an estimate if this one is killed. See
+ *        igraph_i_vc_publish for the layout.
  */
 int igraph_betweenness_sample_vc(const igraph_t *graph, igraph_vector_t *res,
            igraph_vector_t *stats, igraph_strvector_t *stats_names,
            igraph_real_t epsilon, igraph_real_t delta, 
            igraph_integer_t diameter, const igraph_vs_t vids, 
            igraph_bool_t directed, igraph_real_t cutoff, 
-           const igraph_vector_t* weights, igraph_bool_t nobigint) {
+           const igraph_vector_t* weights, igraph_bool_t nobigint,
+           igraph_integer_t threads, igraph_bool_t bidirectional,
+           igraph_bool_t group_sources, const igraph_matrix_t *landmarks,
+           igraph_bool_t progressive, igraph_real_t *snapshot) {
   double sample_size_constant=0.5;
   igraph_integer_t my_diameter = diameter;
-  igraph_integer_t no_of_samples;
+  igraph_integer_t length_bound;
+  igraph_integer_t no_of_samples, sampled=0;
+  /* With progressive sampling, half of delta goes to the stopping rule
+   * and the fixed sample size is only the last stage */
+  igraph_real_t vc_delta = progressive ? delta/2.0 : delta;
   /* Check values of epsilon and delta */
   if (delta >= 1.0 || delta <= 0.0) {
     IGRAPH_ERROR("delta must be greater than 0 and smaller than 1", IGRAPH_EINVAL);
@@ -3311,115 +5939,254 @@ int igraph_betweenness_sample_vc(const igraph_t *graph, igraph_vector_t *res,
    * undirected graphs).
    */
   if (my_diameter == -1) {
-    igraph_diameter_approximation(graph, &my_diameter, stats, stats_names, weights);
+    IGRAPH_CHECK(igraph_diameter_approximation(graph, &my_diameter, stats,
+          stats_names, directed, weights, -1));
+  } else {
+    igraph_vector_push_back(stats, 0.0);
+    igraph_strvector_add(stats_names, "diameter_touched_edges");
+  }
+  /* Compute sample size, from the paths that the cutoff keeps */
+  length_bound=igraph_i_vc_length_bound(my_diameter, cutoff, weights);
+  no_of_samples=(igraph_integer_t) ceil((sample_size_constant / pow(epsilon,
+          2)) * (floor(log2(length_bound - 1)) + 1 - log(vc_delta)));
+  
+  int ret_code = igraph_i_betweenness_sample_vc(graph, res, 0, stats, stats_names, no_of_samples, vids, directed, cutoff, weights, nobigint, threads, bidirectional, group_sources, landmarks, progressive, epsilon, delta, &sampled, snapshot);
+  igraph_vector_push_back(stats, my_diameter);
+  igraph_strvector_add(stats_names, "diameter");
+  igraph_vector_push_back(stats, length_bound);
+  igraph_strvector_add(stats_names, "length_bound");
+  igraph_vector_push_back(stats, sampled);
+  igraph_strvector_add(stats_names, "sample_size");
+  return ret_code;
+}
+
+/*
+ * The edge estimates of igraph_edge_betweenness_sample_vc and
+ * igraph_edge_betweenness_sample_vc_sample_size, with the vertex
+ * estimates of the same samples in vertex_res, or in a local vector if it
+ * is null.
+ */
+int igraph_i_edge_betweenness_sample_vc(const igraph_t *graph,
+           igraph_vector_t *res, igraph_vector_t *vertex_res,
+           igraph_vector_t *stats, igraph_strvector_t *stats_names,
+           igraph_integer_t no_of_samples, igraph_bool_t directed,
+           igraph_real_t cutoff, const igraph_vector_t* weights,
+           igraph_bool_t nobigint, igraph_integer_t threads,
+           igraph_bool_t bidirectional, igraph_bool_t group_sources,
+           const igraph_matrix_t *landmarks) {
+  igraph_vector_t v_vertex_res;
+
+  if (vertex_res) {
+    return igraph_i_betweenness_sample_vc(graph, vertex_res, res, stats,
+        stats_names, no_of_samples, igraph_vss_all(), directed, cutoff,
+        weights, nobigint, threads, bidirectional, group_sources, landmarks,
+        0, 0, 0, 0, 0);
+  }
+  IGRAPH_VECTOR_INIT_FINALLY(&v_vertex_res, 0);
+  IGRAPH_CHECK(igraph_i_betweenness_sample_vc(graph, &v_vertex_res, res,
+        stats, stats_names, no_of_samples, igraph_vss_all(), directed,
+        cutoff, weights, nobigint, threads, bidirectional, group_sources,
+        landmarks, 0, 0, 0, 0, 0));
+  igraph_vector_destroy(&v_vertex_res);
+  IGRAPH_FINALLY_CLEAN(1);
+  return 0;
+}
+
+/**
+ * \ingroup structural
+ * \function igraph_edge_betweenness_sample_vc
+ * \brief Approximate edge betweenness centrality using sampling and VC-Dimension.
+ * 
+ * </para><para>
+ * Samples pairs of vertices and one shortest path between each pair, as
+ * \ref igraph_betweenness_sample_vc does, and credits the edges of the
+ * sampled path during the same backward walk that credits its internal
+ * vertices. The estimate of an edge is the fraction of sampled paths it
+ * is on. A shortest path has one more edge than internal vertices, so the
+ * sample size depends on floor(log2(L))+1 instead of floor(log2(L-1))+1,
+ * where L bounds the number of edges of the counted shortest paths; with
+ * this sample size the vertex estimates of the same samples are within
+ * \p epsilon too.
+ *
+ * \param res Initialized vector, resized to the estimates of the edges,
+ *        in the order of the edge ids.
+ * \param vertex_res If not null, resized to the estimates of the
+ *        vertices from the same samples.
+ * \param diameter A bound to the number of edges of the shortest paths,
+ *        or -1 to use \ref igraph_diameter_approximation.
+ *
+ * The other arguments are as in \ref igraph_betweenness_sample_vc.
+ * Progressive sampling and the snapshot are only available for the
+ * vertices.
+ */
+int igraph_edge_betweenness_sample_vc(const igraph_t *graph,
+           igraph_vector_t *res, igraph_vector_t *vertex_res,
+           igraph_vector_t *stats, igraph_strvector_t *stats_names,
+           igraph_real_t epsilon, igraph_real_t delta,
+           igraph_integer_t diameter, igraph_bool_t directed,
+           igraph_real_t cutoff, const igraph_vector_t* weights,
+           igraph_bool_t nobigint, igraph_integer_t threads,
+           igraph_bool_t bidirectional, igraph_bool_t group_sources,
+           const igraph_matrix_t *landmarks) {
+  double sample_size_constant=0.5;
+  igraph_integer_t my_diameter = diameter;
+  igraph_integer_t length_bound;
+  igraph_integer_t no_of_samples;
+
+  if (delta >= 1.0 || delta <= 0.0) {
+    IGRAPH_ERROR("delta must be greater than 0 and smaller than 1", IGRAPH_EINVAL);
+  }
+  if (epsilon >= 1.0 || epsilon <= 0.0) {
+    IGRAPH_ERROR("epsilon must be greater than 0 and smaller than 1", IGRAPH_EINVAL);
+  }
+  if (my_diameter == -1) {
+    IGRAPH_CHECK(igraph_diameter_approximation(graph, &my_diameter, stats,
+          stats_names, directed, weights, -1));
   } else {
     igraph_vector_push_back(stats, 0.0);
     igraph_strvector_add(stats_names, "diameter_touched_edges");
   }
-  /* Compute sample size */
+  /* Every edge of a path is counted, not only the internal vertices */
+  length_bound=igraph_i_vc_length_bound(my_diameter, cutoff, weights);
   no_of_samples=(igraph_integer_t) ceil((sample_size_constant / pow(epsilon,
-          2)) * (floor(log2(my_diameter - 1)) + 1 - log(delta)));
-  
-  int ret_code = igraph_i_betweenness_sample_vc(graph, res, stats, stats_names, no_of_samples, vids, directed, cutoff, weights, nobigint);
+          2)) * (floor(log2(length_bound)) + 1 - log(delta)));
+
+  IGRAPH_CHECK(igraph_i_edge_betweenness_sample_vc(graph, res, vertex_res,
+        stats, stats_names, no_of_samples, directed, cutoff, weights,
+        nobigint, threads, bidirectional, group_sources, landmarks));
   igraph_vector_push_back(stats, my_diameter);
   igraph_strvector_add(stats_names, "diameter");
+  igraph_vector_push_back(stats, length_bound);
+  igraph_strvector_add(stats_names, "length_bound");
   igraph_vector_push_back(stats, no_of_samples);
   igraph_strvector_add(stats_names, "sample_size");
-  return ret_code;
+  return 0;
 }
 
-int sel_recur(igraph_vector_t *vector, int *indexes, int start, int end, int k)
-{
-  int pivot, i, tmp;
-  igraph_real_t tmpval;
-        
-  if (start==end-1) {
-    return indexes[start];
-  }
-    
-  pivot = start;
-    
-  for(i=start+1; i<end; i++) {
-    /* put all entries greater than V[pivot] to the left of pivot*/
-    if (VECTOR(*vector)[i]>VECTOR(*vector)[pivot]) {
-      /* first move pivot value up one index */
-      tmp = indexes[pivot];
-      tmpval = VECTOR(*vector)[pivot];
-      indexes[pivot] = indexes[pivot+1];
-      VECTOR(*vector)[pivot] = VECTOR(*vector)[pivot+1];
-      indexes[pivot+1] = tmp;
-      VECTOR(*vector)[pivot+1] = tmpval;
-          
-      if (i>pivot+1) {
-          /* now we need to swap i th with pivot-1 th */
-          tmp = indexes[pivot];
-          tmpval = VECTOR(*vector)[pivot];
-          indexes[pivot] = indexes[i];
-          VECTOR(*vector)[pivot] = VECTOR(*vector)[i];
-          indexes[i] = tmp;
-          VECTOR(*vector)[i] = tmpval;
-      }
-      pivot++;            
-    }
-        
-  }
-  if (pivot==k) {
-    return indexes[pivot];
-  } else {
-    if (pivot > k) {
-      return sel_recur(vector,indexes,start,pivot,k);
-    } else {
-      return sel_recur(vector,indexes,pivot+1,end,k);
-    }
-  }
+int igraph_edge_betweenness_sample_vc_sample_size(const igraph_t *graph,
+           igraph_vector_t *res, igraph_vector_t *vertex_res,
+           igraph_vector_t *stats, igraph_strvector_t *stats_names,
+           igraph_integer_t sample_size, igraph_bool_t directed,
+           igraph_real_t cutoff, const igraph_vector_t* weights,
+           igraph_bool_t nobigint, igraph_integer_t threads,
+           igraph_bool_t bidirectional, igraph_bool_t group_sources,
+           const igraph_matrix_t *landmarks) {
+  IGRAPH_CHECK(igraph_i_edge_betweenness_sample_vc(graph, res, vertex_res,
+        stats, stats_names, sample_size, directed, cutoff, weights,
+        nobigint, threads, bidirectional, group_sources, landmarks));
+  igraph_vector_push_back(stats, sample_size);
+  igraph_strvector_add(stats_names, "sample_size");
+  return 0;
 }
 
-int quickselect(igraph_vector_t *vector, igraph_integer_t n, igraph_integer_t k)
-{
-  /* returns the index of the kth greatest value in vector */
-  igraph_vector_t v_vector_copy, *vector_copy=&v_vector_copy;
-  int i, *indexes, ret;
+/*
+ * Grows the sample behind the estimates in res from *taken to
+ * no_of_samples pairs of vertices, for igraph_betweenness_sample_vc_topk.
+ * Only the missing pairs are sampled, and their estimates are merged with
+ * the old ones, each weighted by its number of samples. The samples are
+ * split among 'threads' workers, and the touched edges are added to the
+ * two counters.
+ */
+int igraph_i_betweenness_sample_vc_top_up(const igraph_t *graph,
+           igraph_vector_t *res, igraph_integer_t *taken,
+           igraph_integer_t no_of_samples, const igraph_vs_t vids,
+           igraph_bool_t directed, igraph_real_t cutoff,
+           const igraph_vector_t* weights, igraph_bool_t nobigint,
+           igraph_integer_t threads, igraph_real_t *forward_touched_edges,
+           igraph_real_t *backward_touched_edges) {
+  igraph_integer_t missing = no_of_samples - *taken;
+  igraph_vector_t extra, stats;
+  igraph_strvector_t stats_names;
+  long int i;
 
-  if (k>=n) {
-      return -1;
-  }
-  if (k<0) {
-      return -1;
+  if (missing <= 0) {
+    return 0;
   }
-  
-  IGRAPH_VECTOR_INIT_FINALLY(vector_copy, n);
-  indexes = (int*)malloc(n*sizeof(int));
-  
-  for (i=0; i<n; i++) {
-      VECTOR(*vector_copy)[i] = VECTOR(*vector)[i];
-      indexes[i] = i;
+  IGRAPH_VECTOR_INIT_FINALLY(&extra, 0);
+  IGRAPH_VECTOR_INIT_FINALLY(&stats, 0);
+  IGRAPH_CHECK(igraph_strvector_init(&stats_names, 0));
+  IGRAPH_FINALLY(igraph_strvector_destroy, &stats_names);
+  IGRAPH_CHECK(igraph_i_betweenness_sample_vc(graph, &extra, 0, &stats,
+        &stats_names, missing, vids, directed, cutoff, weights, nobigint,
+        threads, 1, 0, 0, 0, 0, 0, 0, 0));
+  for (i = 0; i < igraph_vector_size(&extra); i++) {
+    VECTOR(*res)[i] = (VECTOR(*res)[i] * (*taken) +
+        VECTOR(extra)[i] * missing) / no_of_samples;
+  }
+  /* The touched edges are the first two statistics */
+  *forward_touched_edges += VECTOR(stats)[0];
+  *backward_touched_edges += VECTOR(stats)[1];
+  *taken = no_of_samples;
+  igraph_strvector_destroy(&stats_names);
+  igraph_vector_destroy(&stats);
+  igraph_vector_destroy(&extra);
+  IGRAPH_FINALLY_CLEAN(3);
+  return 0;
+}
+
+/*
+ * Sets *kth to the k-th largest of the estimates in res, keeping the k
+ * largest ones seen so far in a min-heap, for
+ * igraph_betweenness_sample_vc_topk. k must be between 1 and the length
+ * of res.
+ */
+int igraph_i_vc_topk_kth(const igraph_vector_t *res, long int k,
+    igraph_real_t *kth) {
+  igraph_heap_min_t leaders;
+  long int i, n = igraph_vector_size(res);
+
+  IGRAPH_CHECK(igraph_heap_min_init(&leaders, k));
+  IGRAPH_FINALLY(igraph_heap_min_destroy, &leaders);
+  for (i = 0; i < n; i++) {
+    if (igraph_heap_min_size(&leaders) < k) {
+      IGRAPH_CHECK(igraph_heap_min_push(&leaders, VECTOR(*res)[i]));
+    } else if (VECTOR(*res)[i] > igraph_heap_min_top(&leaders)) {
+      igraph_heap_min_delete_top(&leaders);
+      IGRAPH_CHECK(igraph_heap_min_push(&leaders, VECTOR(*res)[i]));
+    }
   }
-  
-  ret = sel_recur(vector_copy,indexes,0,n,k);
-  
-  free(indexes);
-  igraph_vector_destroy(vector_copy);
+  *kth = igraph_heap_min_top(&leaders);
+  igraph_heap_min_destroy(&leaders);
   IGRAPH_FINALLY_CLEAN(1);
-  return ret;
+  return 0;
+}
+
+/* Orders vertex ids by decreasing estimate, for igraph_qsort_r */
+int igraph_i_vc_topk_cmp(void *estimates, const void *a, const void *b) {
+  igraph_real_t ea = VECTOR(*(igraph_vector_t *) estimates)[(long int) *(igraph_real_t *) a];
+  igraph_real_t eb = VECTOR(*(igraph_vector_t *) estimates)[(long int) *(igraph_real_t *) b];
+  return ea < eb ? 1 : (ea > eb ? -1 : 0);
 }
 
 /**
  * \ingroup structural
  * \function igraph_betweenness_sample_vc_topk
- * \brief Approximate betweenness centrality of some vertices using sampling and VC-Dimension.
+ * \brief Candidates to the k vertices with the highest betweenness, using sampling and VC-Dimension.
  * 
  * </para><para>
- * TODO
+ * A first sample bounds the k-th highest betweenness from below, and a
+ * second one estimates the betweenness of the vertices above that bound
+ * within a relative error \p epsilon. The result only holds the vertices
+ * that may be among the top k, so its size does not depend on the number
+ * of vertices; the k-th highest estimate is found with a heap of size k.
+ *
+ * \param res Initialized matrix, resized to one row per candidate, by
+ *        decreasing estimate. The columns are the vertex id, the estimate,
+ *        and the lower and upper bounds to the betweenness of the vertex.
+ * \param threads The number of threads taking the samples of both
+ *        phases, at least 1.
  */
-int igraph_betweenness_sample_vc_topk(const igraph_t *graph, igraph_vector_t *res,
+int igraph_betweenness_sample_vc_topk(const igraph_t *graph, igraph_matrix_t *res,
            igraph_vector_t *stats, igraph_strvector_t *stats_names,
            igraph_real_t epsilon, igraph_real_t delta, 
            igraph_integer_t k,
            igraph_integer_t diameter, const igraph_vs_t vids, 
            igraph_bool_t directed, igraph_real_t cutoff, 
-           const igraph_vector_t* weights, igraph_bool_t nobigint) {
+           const igraph_vector_t* weights, igraph_bool_t nobigint,
+           igraph_integer_t threads) {
   double sample_size_constant=0.5;
   igraph_integer_t my_diameter = diameter;
+  igraph_integer_t length_bound;
   igraph_integer_t no_of_samples;
   igraph_integer_t i;
   long int no_of_nodes = igraph_vcount(graph);
@@ -3433,49 +6200,54 @@ int igraph_betweenness_sample_vc_topk(const igraph_t *graph, igraph_vector_t *re
   if (k <= 0) {
     IGRAPH_ERROR("k must be greater than 0", IGRAPH_EINVAL);
   }
+  if (threads < 1) {
+    IGRAPH_ERROR("Number of threads must be positive", IGRAPH_EINVAL);
+  }
+  if (k > no_of_nodes) {
+    k = no_of_nodes;
+  }
   /* If diameter is -1, compute approximation of diameter */
   if (my_diameter == -1) {
-    igraph_diameter_approximation(graph, &my_diameter, stats, stats_names, weights);
+    IGRAPH_CHECK(igraph_diameter_approximation(graph, &my_diameter, stats,
+          stats_names, directed, weights, -1));
   } else {
     igraph_vector_push_back(stats, 0.0);
     igraph_strvector_add(stats_names, "diameter_touched_edges");
   }
   igraph_vector_push_back(stats, my_diameter);
   igraph_strvector_add(stats_names, "diameter");
+  length_bound=igraph_i_vc_length_bound(my_diameter, cutoff, weights);
+  igraph_vector_push_back(stats, length_bound);
+  igraph_strvector_add(stats_names, "length_bound");
 
   /* Compute delta_1 and delta_2 */
   igraph_real_t delta_partial = 1.0 - sqrt(1- delta);
 
-  /* Compute sample size for first phase */
+  /* Compute sample size for first phase. Each time epsilon_1 is halved,
+   * the sample taken so far is grown to the new size instead of being
+   * drawn again. */
   igraph_real_t epsilon_1 = epsilon;
   igraph_real_t top_k_betw, top_k_betw_lb;
+  igraph_real_t forward_touched_edges = 0, backward_touched_edges = 0;
+  igraph_integer_t taken = 0;
+  long int iterations = 0;
+  igraph_vector_t v_tmpres, *tmpres=&v_tmpres;
 
-  int ret_code;
+  IGRAPH_VECTOR_INIT_FINALLY(tmpres, no_of_nodes);
   for (;;) {
     no_of_samples=(igraph_integer_t) ceil((sample_size_constant / pow(epsilon_1,
-            2)) * (floor(log2(my_diameter - 1)) + 1 - log(delta_partial)));
+            2)) * (floor(log2(length_bound - 1)) + 1 - log(delta_partial)));
     /* Perform first phase */
-    igraph_vector_t v_tmpres, *tmpres=&v_tmpres;
-    IGRAPH_VECTOR_INIT_FINALLY(tmpres, no_of_nodes);
-    ret_code = igraph_i_betweenness_sample_vc(graph, tmpres, stats, stats_names, no_of_samples, vids, directed, cutoff, weights, nobigint);
-    if (ret_code != 0) {
-      return ret_code;
-    }
-    /*
-     * XXX TODO should save the touched edges values with a different name (or
-     * just use a different stats structure above...)
-     */
+    IGRAPH_CHECK(igraph_i_betweenness_sample_vc_top_up(graph, tmpres, &taken,
+          no_of_samples, vids, directed, cutoff, weights, nobigint, threads,
+          &forward_touched_edges, &backward_touched_edges));
+    iterations++;
 
     /* Compute lower bound to top-kth betweenness) */
-    top_k_betw = VECTOR(*tmpres)[quickselect(tmpres, no_of_nodes, k)];
+    IGRAPH_CHECK(igraph_i_vc_topk_kth(tmpres, k, &top_k_betw));
     top_k_betw_lb = top_k_betw - epsilon_1;
-    igraph_vector_destroy(tmpres);
-    IGRAPH_FINALLY_CLEAN(1);
     if (top_k_betw_lb <= 0.0) {
-      //IGRAPH_ERROR("negative lower bound to top-k betweenness. Decrease epsilon or k.", IGRAPH_EINVAL);
-      //setbuf(stdout,0);
       epsilon_1 = top_k_betw / 2.0;
-      //printf("epsilon_1=%f\n", epsilon_1);
     } else {
       break;
     }
@@ -3484,300 +6256,580 @@ int igraph_betweenness_sample_vc_topk(const igraph_t *graph, igraph_vector_t *re
   igraph_strvector_add(stats_names, "sample_size_1");
   igraph_vector_push_back(stats, epsilon_1);
   igraph_strvector_add(stats_names, "epsilon_1");
-
-  /* Compute sample size for the second phase */
-  no_of_samples=(igraph_integer_t) (ceil((sample_size_constant / (pow(epsilon,2)*top_k_betw_lb)) * ((floor(log2(my_diameter - 1)) + 1)*log(1 / top_k_betw_lb) - log(delta_partial)))); 
-  ret_code = igraph_i_betweenness_sample_vc(graph, res, stats, stats_names, no_of_samples, vids, directed, cutoff, weights, nobigint);
+  igraph_vector_push_back(stats, iterations);
+  igraph_strvector_add(stats_names, "iterations_1");
+
+  /* Compute the sample size for the second phase. The sample is a new
+   * one: its size depends on the estimates of the first phase, so the
+   * samples of the first phase cannot be part of it. */
+  no_of_samples=(igraph_integer_t) (ceil((sample_size_constant / (pow(epsilon,2)*top_k_betw_lb)) * ((floor(log2(length_bound - 1)) + 1)*log(1 / top_k_betw_lb) - log(delta_partial)))); 
+  taken = 0;
+  igraph_vector_null(tmpres);
+  IGRAPH_CHECK(igraph_i_betweenness_sample_vc_top_up(graph, tmpres, &taken,
+        no_of_samples, vids, directed, cutoff, weights, nobigint, threads,
+        &forward_touched_edges, &backward_touched_edges));
 
   igraph_vector_push_back(stats, no_of_samples);
   igraph_strvector_add(stats_names, "sample_size_2");
+  igraph_vector_push_back(stats, forward_touched_edges);
+  igraph_strvector_add(stats_names, "forward_touched_edges");
+  igraph_vector_push_back(stats, backward_touched_edges);
+  igraph_strvector_add(stats_names, "backward_touched_edges");
  
-  /* Identify superset of the top_k */
-  igraph_real_t plus_coeff = (1 + epsilon);
-  igraph_real_t top_k_betw_2 = VECTOR(*res)[quickselect(res, no_of_nodes, k)];
-  igraph_real_t top_k_betw_lb_2 = top_k_betw_2 / plus_coeff;
-  igraph_real_t candidate_lb;
-  for (i=0; i < no_of_nodes; i++) {
-    if (VECTOR(*res)[i] >= top_k_betw_2) { 
-      candidate_lb = VECTOR(*res)[i] / plus_coeff;
-      if (candidate_lb < top_k_betw_lb_2) {
-        top_k_betw_lb_2 = candidate_lb;
-      }
-    }
-  }
-  igraph_real_t scale_coeff = plus_coeff / ( 1 - epsilon);
+  /* Identify superset of the top_k: the vertices whose betweenness may be
+   * at least the lower bound top_k_betw_2/(1+epsilon) to the k-th one.
+   * Each gets the interval that the relative error epsilon allows. */
+  igraph_real_t top_k_betw_2, threshold;
+  igraph_vector_t candidates;
+  IGRAPH_CHECK(igraph_i_vc_topk_kth(tmpres, k, &top_k_betw_2));
+  threshold = top_k_betw_2 * (1 - epsilon) / ((1 + epsilon) * (1 + epsilon));
+  IGRAPH_VECTOR_INIT_FINALLY(&candidates, 0);
   for (i=0; i < no_of_nodes; i++) {
-    if (VECTOR(*res)[i] * scale_coeff < top_k_betw_lb_2) {
-        VECTOR(*res)[i] = -1.0;
+    if (VECTOR(*tmpres)[i] >= threshold) {
+      IGRAPH_CHECK(igraph_vector_push_back(&candidates, i));
     }
   }
-  return ret_code;
+  igraph_qsort_r(VECTOR(candidates), igraph_vector_size(&candidates),
+      sizeof(igraph_real_t), tmpres, igraph_i_vc_topk_cmp);
+  IGRAPH_CHECK(igraph_matrix_resize(res, igraph_vector_size(&candidates), 4));
+  for (i=0; i < igraph_vector_size(&candidates); i++) {
+    igraph_real_t estimate = VECTOR(*tmpres)[(long int) VECTOR(candidates)[i]];
+    MATRIX(*res, i, 0) = VECTOR(candidates)[i];
+    MATRIX(*res, i, 1) = estimate;
+    MATRIX(*res, i, 2) = estimate / (1 + epsilon);
+    MATRIX(*res, i, 3) = estimate / (1 - epsilon);
+  }
+  igraph_vector_push_back(stats, igraph_vector_size(&candidates));
+  igraph_strvector_add(stats_names, "candidates");
+  igraph_vector_destroy(&candidates);
+  igraph_vector_destroy(tmpres);
+  IGRAPH_FINALLY_CLEAN(2);
+  return 0;
 }
 
-int igraph_diameter_approximation_motwani(const igraph_t *graph, igraph_integer_t *diameter ){    
-    
-    igraph_vector_t ret_nodes;
-    igraph_integer_t ret_depth;
-    
-    igraph_vector_t ret_nodes_part_MAX;
-    igraph_integer_t ret_depth_part_MAX = -1;
-    igraph_integer_t ret_vid_part_MAX = -1;
-    
-    long int s,a_1=1,b_1=0;
-    long int no_of_nodes = igraph_vcount(graph);
-    
-    
-    // The paper suggests to have a O(sqrt{nlogn}) number of nodes for the pBFS
-    s = a_1*sqrt(no_of_nodes*log10(no_of_nodes)/log10(2)) + b_1 ;
-    s = s + 1; //s not including the source
+/*
+ * Half-width of the empirical Bernstein confidence interval (Maurer and
+ * Pontil) around the estimate count/no_of_samples of a single vertex, for
+ * the logarithmic term l=ln(4/eta) of a two-sided bound holding with
+ * probability at least 1-eta.
+ */
+igraph_real_t igraph_i_vc_bernstein_width(igraph_real_t count,
+                                          long int no_of_samples,
+                                          igraph_real_t l) {
+  igraph_real_t m=no_of_samples, var;
+  if (no_of_samples < 2) {
+    return 1.0;
+  }
+  var=count*(m-count)/(m*(m-1));
+  return sqrt(2.0*var*l/m) + 7.0*l/(3.0*(m-1));
+}
 
-    igraph_vs_t vs;
-    igraph_vit_t vit;
-    
-    igraph_vs_all(&vs);
-    igraph_vit_create(graph, vs, &vit);
-    
-    
-    //Create a deep copy of graph, add edges as \hat{G} suggests.
-    //We wil use that in step 5
-    
-    igraph_t graph_augm;
-    igraph_copy(&graph_augm,graph);
-
-    //
-    // Line 1 of the algorithm: Compute s-partial-BFS from each vertex
-    //
-        
-    igraph_vector_t edges_2_add_total;
-    igraph_vector_init(&edges_2_add_total,0);
-    
-    igraph_vector_t edges_2_add_current;
-    igraph_vector_init(&edges_2_add_current,(int) 2*(s-1));
-    
-    int i;
-    
-    while (!IGRAPH_VIT_END(vit)) {
-        
-        igraph_vector_fill (&edges_2_add_current, (igraph_integer_t) IGRAPH_VIT_GET(vit));
-        
-        igraph_kBFS(graph, &graph_augm, &ret_nodes, &ret_depth, (igraph_integer_t) IGRAPH_VIT_GET(vit) ,(igraph_integer_t) s);
-        IGRAPH_VIT_NEXT(vit);
-        
-        for (i=1; i < igraph_vector_size(&ret_nodes); i++){
-            VECTOR(edges_2_add_current)[2*i-1] = (int) VECTOR(ret_nodes)[i];
-        }
-        
-    
-        
-        igraph_vector_append(&edges_2_add_total,&edges_2_add_current);
-        // Line 2 of the algorithm: Compute the maximum out of all pBFS
-        
-        if (ret_depth>ret_depth_part_MAX){
-            ret_vid_part_MAX = (igraph_integer_t) IGRAPH_VIT_GET(vit);
-            ret_depth_part_MAX = ret_depth;
-            ret_nodes_part_MAX=ret_nodes;
-        }
-        
-        
-                
-    }
-    
-    igraph_integer_t ret_depth_total_MAX = -1;
-    igraph_integer_t current_depth = -1;
+/**
+ * \ingroup structural
+ * \function igraph_betweenness_sample_vc_query
+ * \brief Betweenness of a few vertices within a relative error, using sampling and VC-Dimension.
+ * 
+ * </para><para>
+ * Pairs of vertices are sampled in geometrically growing stages. After
+ * each stage, every query vertex that is not settled yet gets an
+ * empirical Bernstein confidence interval, with a union bound over the
+ * query vertices and the stages. A vertex is settled once its interval
+ * is within a relative error \p epsilon of its lower end, or lies below
+ * \p threshold, and sampling stops when all the query vertices are
+ * settled. The last stage is the VC sample size for an additive error of
+ * \p epsilon times \p threshold, which settles every vertex whose
+ * betweenness is not too close to the threshold. Only the rows of the
+ * query vertices are kept, and the cost only depends on how hard they
+ * are to settle, not on the accuracy of the other vertices.
+ *
+ * \param res Initialized matrix, resized to one row per query vertex, in
+ *        the order of \p vids. The columns are the vertex id, the
+ *        estimate, the lower and upper bounds to the betweenness of the
+ *        vertex, and its status: 1 if the relative error was reached, 0
+ *        if the betweenness is below \p threshold, -1 if neither could be
+ *        guaranteed within the largest sample size. The values of a
+ *        vertex are those of the stage it was settled in.
+ * \param threshold The betweenness below which the query vertices are not
+ *        estimated within a relative error, in (0,1).
+ */
+int igraph_betweenness_sample_vc_query(const igraph_t *graph,
+           igraph_matrix_t *res, igraph_vector_t *stats,
+           igraph_strvector_t *stats_names, igraph_real_t epsilon,
+           igraph_real_t delta, igraph_real_t threshold,
+           igraph_integer_t diameter, const igraph_vs_t vids,
+           igraph_bool_t directed, igraph_real_t cutoff,
+           const igraph_vector_t* weights, igraph_bool_t nobigint,
+           igraph_integer_t threads) {
+  double sample_size_constant=0.5;
+  double stage_ratio=1.2;
+  igraph_integer_t my_diameter = diameter;
+  igraph_integer_t length_bound;
+  igraph_integer_t no_of_samples, stage_size, taken=0;
+  igraph_real_t forward_touched_edges = 0, backward_touched_edges = 0;
+  igraph_real_t additive, eta=0, l=0, width, estimate;
+  long int no_of_stages=1, stage, first_stage, pending;
+  long int no_of_queries, resolved=0, below=0;
+  long int k;
+  igraph_vector_t estimates;
+  igraph_vit_t vit;
 
+  if (delta >= 1.0 || delta <= 0.0) {
+    IGRAPH_ERROR("delta must be greater than 0 and smaller than 1", IGRAPH_EINVAL);
+  }
+  if (epsilon >= 1.0 || epsilon <= 0.0) {
+    IGRAPH_ERROR("epsilon must be greater than 0 and smaller than 1", IGRAPH_EINVAL);
+  }
+  if (threshold >= 1.0 || threshold <= 0.0) {
+    IGRAPH_ERROR("threshold must be greater than 0 and smaller than 1", IGRAPH_EINVAL);
+  }
+  if (threads < 1) {
+    IGRAPH_ERROR("Number of threads must be positive", IGRAPH_EINVAL);
+  }
+  /* If diameter is -1, compute approximation of diameter */
+  if (my_diameter == -1) {
+    IGRAPH_CHECK(igraph_diameter_approximation(graph, &my_diameter, stats,
+          stats_names, directed, weights, -1));
+  } else {
+    igraph_vector_push_back(stats, 0.0);
+    igraph_strvector_add(stats_names, "diameter_touched_edges");
+  }
+  igraph_vector_push_back(stats, my_diameter);
+  igraph_strvector_add(stats_names, "diameter");
+  length_bound=igraph_i_vc_length_bound(my_diameter, cutoff, weights);
+  igraph_vector_push_back(stats, length_bound);
+  igraph_strvector_add(stats_names, "length_bound");
 
-    //
-    // Line 3a: Compute a BFS-tree from w
-    //
-       
-    
-    igraph_vector_t ord,rank, dist, father, pred, succ;
-    igraph_vector_init(&ord, no_of_nodes-1);
-    igraph_vector_init(&rank, no_of_nodes-1);
-    igraph_vector_init(&father, no_of_nodes-1);
-    igraph_vector_init(&pred, no_of_nodes-1);
-    igraph_vector_init(&succ, no_of_nodes-1);
-    igraph_vector_init(&dist, no_of_nodes-1);
-    
-    igraph_bfs(graph, /*root=*/ ret_vid_part_MAX, /*roots=*/ NULL, /*neimode=*/ IGRAPH_OUT,/*unreachable=*/ NULL, /*restricted=*/ NULL,
-               /*order*/ &ord, /*rank*/ &rank, &father, &pred, &succ, /*distance*/ &dist, NULL, NULL);
+  IGRAPH_CHECK(igraph_vit_create(graph, vids, &vit));
+  IGRAPH_FINALLY(igraph_vit_destroy, &vit);
+  no_of_queries=IGRAPH_VIT_SIZE(vit);
+  IGRAPH_CHECK(igraph_matrix_resize(res, no_of_queries, 5));
+  for (k=0, IGRAPH_VIT_RESET(vit); !IGRAPH_VIT_END(vit);
+       IGRAPH_VIT_NEXT(vit), k++) {
+    MATRIX(*res, k, 0) = IGRAPH_VIT_GET(vit);
+    MATRIX(*res, k, 1) = 0.0;
+    MATRIX(*res, k, 2) = 0.0;
+    MATRIX(*res, k, 3) = 1.0;
+    MATRIX(*res, k, 4) = -1;
+  }
+  igraph_vit_destroy(&vit);
+  IGRAPH_FINALLY_CLEAN(1);
 
-    current_depth = igraph_vector_max(&dist);
- 
-    igraph_vector_destroy(&rank);
-    igraph_vector_destroy(&dist);
-    igraph_vector_destroy(&father);
-    igraph_vector_destroy(&pred);
-    igraph_vector_destroy(&succ);
-    
-    
-    if (current_depth > ret_depth_total_MAX){
-        ret_depth_total_MAX = current_depth;
+  /* Half of delta goes to the VC bound of the last stage, the other half
+   * to the Bernstein bounds of all the stages, as in the progressive
+   * mode of igraph_betweenness_sample_vc */
+  additive=epsilon*threshold;
+  no_of_samples=(igraph_integer_t) ceil((sample_size_constant / pow(additive,
+          2)) * (floor(log2(length_bound - 1)) + 1 - log(delta/2.0)));
+  while (1) {
+    eta=delta/(2.0*no_of_stages);
+    l=log(4.0*(no_of_queries > 0 ? no_of_queries : 1)/eta);
+    first_stage=(long int) ceil(7.0*l/(3.0*additive)) + 1;
+    k=1;
+    if (first_stage < no_of_samples) {
+      k+=(long int) ceil(log((double) no_of_samples/first_stage)/log(stage_ratio));
     }
-    
-    //
-    // Line 3b: Compute a BFS-tree(inverse edges) from each vertex in pBFS of w
-    //
-    
-
+    if (k <= no_of_stages) {
+      break;
+    }
+    no_of_stages=k;
+  }
 
-    for( i=0 ; i < igraph_vector_size(&ret_nodes_part_MAX) ; i++){
-                
-        igraph_vector_t ord,rank, dist, father, pred, succ;
-        igraph_vector_init(&ord, no_of_nodes-1);
-        igraph_vector_init(&rank, no_of_nodes-1);
-        igraph_vector_init(&father, no_of_nodes-1);
-        igraph_vector_init(&pred, no_of_nodes-1);
-        igraph_vector_init(&succ, no_of_nodes-1);
-        igraph_vector_init(&dist, no_of_nodes-1);
-        
-        igraph_bfs(graph, /*root=*/ (igraph_integer_t) VECTOR(ret_nodes_part_MAX)[i], /*roots=*/ NULL, /*neimode=*/ IGRAPH_IN,/*unreachable=*/ NULL, /*restricted=*/ NULL ,/*order*/ &ord, /*rank*/ &rank, &father, &pred, &succ, /*distance*/ &dist, NULL, NULL);
-        current_depth = igraph_vector_max(&dist);
-        
-        
-        igraph_vector_destroy(&rank);
-        igraph_vector_destroy(&dist);
-        igraph_vector_destroy(&father);
-        igraph_vector_destroy(&pred);
-        igraph_vector_destroy(&succ);
-        
-        
-        if (current_depth > ret_depth_total_MAX){
-             ret_depth_total_MAX = current_depth;
-        }
+  IGRAPH_VECTOR_INIT_FINALLY(&estimates, no_of_queries);
+  pending=no_of_queries;
+  for (stage=0; stage<no_of_stages && pending > 0; stage++) {
+    if (stage == no_of_stages-1) {
+      stage_size=no_of_samples;
+    } else {
+      stage_size=(igraph_integer_t) ceil(first_stage*pow(stage_ratio, stage));
+      if (stage_size > no_of_samples) {
+        stage_size=no_of_samples;
+      }
     }
-    
-    
-    
-    //
-    // Line 4: Compute augmented graph G_aug
-    //
-    
-    
-    igraph_add_edges(&graph_augm,&edges_2_add_total,0);
-    igraph_simplify(&graph_augm, 1, 1,NULL);
+    IGRAPH_CHECK(igraph_i_betweenness_sample_vc_top_up(graph, &estimates,
+          &taken, stage_size, vids, directed, cutoff, weights, nobigint,
+          threads, &forward_touched_edges, &backward_touched_edges));
 
-   
-   
-    //
-    // Line 5: Compute an out-dominating set D in G
-    //
+    for (k=0; k<no_of_queries; k++) {
+      if (MATRIX(*res, k, 4) != -1) {
+        continue;
+      }
+      estimate=VECTOR(estimates)[k];
+      width=igraph_i_vc_bernstein_width(estimate*taken, taken, l);
+      if (stage == no_of_stages-1 && width > additive) {
+        width=additive;
+      }
+      MATRIX(*res, k, 1) = estimate;
+      MATRIX(*res, k, 2) = estimate > width ? estimate-width : 0.0;
+      MATRIX(*res, k, 3) = estimate+width < 1.0 ? estimate+width : 1.0;
+      if (MATRIX(*res, k, 3) < threshold) {
+        MATRIX(*res, k, 4) = 0;
+        below++;
+        pending--;
+      } else if (MATRIX(*res, k, 2) > 0 && width <= epsilon*MATRIX(*res, k, 2)) {
+        MATRIX(*res, k, 4) = 1;
+        resolved++;
+        pending--;
+      }
+    }
+  }
+  igraph_vector_destroy(&estimates);
+  IGRAPH_FINALLY_CLEAN(1);
 
+  igraph_vector_push_back(stats, forward_touched_edges);
+  igraph_strvector_add(stats_names, "forward_touched_edges");
+  igraph_vector_push_back(stats, backward_touched_edges);
+  igraph_strvector_add(stats_names, "backward_touched_edges");
+  igraph_vector_push_back(stats, threads);
+  igraph_strvector_add(stats_names, "threads");
+  igraph_vector_push_back(stats, no_of_stages);
+  igraph_strvector_add(stats_names, "stages");
+  igraph_vector_push_back(stats, stage);
+  igraph_strvector_add(stats_names, "stopping_stage");
+  igraph_vector_push_back(stats, no_of_samples);
+  igraph_strvector_add(stats_names, "max_sample_size");
+  igraph_vector_push_back(stats, taken);
+  igraph_strvector_add(stats_names, "sample_size");
+  igraph_vector_push_back(stats, resolved);
+  igraph_strvector_add(stats_names, "resolved");
+  igraph_vector_push_back(stats, below);
+  igraph_strvector_add(stats_names, "below_threshold");
+  igraph_vector_push_back(stats, pending);
+  igraph_strvector_add(stats_names, "unresolved");
+  return 0;
+}
 
+/*
+ * A worker of igraph_diameter_approximation_motwani. It runs a
+ * breadth-first search from every step-th source, starting from the
+ * first one, and keeps the largest depth reached and its source.
+ */
+typedef struct igraph_i_motwani_worker_t {
+  igraph_adjlist_t *adjlist;
+  const long int *sources;      /* all the vertices if 0 */
+  long int no_of_sources;
+  long int first;
+  long int step;
+  long int k;                   /* truncate the searches if positive */
+  /* Only the worker running in the calling thread checks for
+   * interruption. */
+  igraph_bool_t main_thread;
+  long int *distance;           /* distance plus one, 0 if not reached */
+  long int *order;
+  long int no_of_order;
+  long int max_depth;
+  long int max_source;
+  long int touched_edges;
+  int ret;
+} igraph_i_motwani_worker_t;
+
+typedef struct igraph_i_motwani_workers_t {
+  igraph_i_motwani_worker_t *workers;
+  long int no_of_workers;
+} igraph_i_motwani_workers_t;
+
+void igraph_i_motwani_workers_destroy(igraph_i_motwani_workers_t *workers) {
+  long int i;
+  if (workers->workers == 0) {
+    return;
+  }
+  for (i=0; i<workers->no_of_workers; i++) {
+    if (workers->workers[i].distance) {
+      igraph_Free(workers->workers[i].distance);
+    }
+    if (workers->workers[i].order) {
+      igraph_Free(workers->workers[i].order);
+    }
+  }
+  igraph_Free(workers->workers);
+}
 
-    igraph_vector_t D;
-    long int number_samples,a_2=1,b_2=0;    
-    
-    long int no_of_nodes_augm = igraph_vcount(&graph_augm);
+/*
+ * Breadth-first search from source. If k is positive, the search stops as
+ * soon as k vertices are reached, even halfway through a neighbor list, so
+ * it visits the k vertices closest to source (ties broken by the search
+ * order). The reached vertices are left in w->order[0..w->no_of_order) and
+ * the depth of the search, the distance of the last of them, is returned.
+ * Only the reached vertices are reset, so the buffers are reused by the
+ * next search.
+ */
+long int igraph_i_motwani_bfs(igraph_i_motwani_worker_t *w, long int source,
+    long int k) {
+  long int *distance=w->distance, *order=w->order;
+  long int head=0, tail=0, depth, j, nneis;
+  igraph_vector_t *neis;
 
-    
-    // The paper suggests to have a Î¸(sqrt{nlogn}) samples from the augmented graph G'
-    number_samples=a_2*sqrt(no_of_nodes_augm*log10(no_of_nodes_augm)/log10(2)) + b_2 ;
-    
-    igraph_vector_t sampled_graph_augm;
-    igraph_vector_init(&sampled_graph_augm,number_samples);
-    
-    igraph_rng_t *rng = NULL;
-    rng = igraph_rng_default();
-    
-    for ( i = 0; i < number_samples ; i++){
-        VECTOR(sampled_graph_augm)[i] = igraph_rng_get_integer(rng, 0, no_of_nodes_augm -1);
-    }    
-    
-    //
-    // Line 6: Compute a BFS tree from each vertex in D in G_aug
-    //
-    
-    
-    for( i=0 ; i < igraph_vector_size(&sampled_graph_augm) ; i++){
-        
-        igraph_vector_t dist;
-        igraph_vector_init(&dist, no_of_nodes-1);
-        
-        
-        //NOT SURE WHETHER IT IS ON G OR G'
-        igraph_bfs(&graph_augm, /*root=*/ (igraph_integer_t) VECTOR(sampled_graph_augm)[i], /*roots=*/ NULL, /*neimode=*/ IGRAPH_OUT,/*unreachable=*/ NULL, /*restricted=*/ NULL ,/*order*/ NULL, /*rank*/ NULL, NULL, NULL, NULL, /*distance*/ &dist, NULL, NULL);
-        
-        current_depth = igraph_vector_max(&dist);
-        
-        igraph_vector_destroy(&dist);
-        
-        if (current_depth > ret_depth_total_MAX){
-            ret_depth_total_MAX = current_depth;
+  distance[source]=1;
+  order[tail++]=source;
+  while (head < tail && (k <= 0 || tail < k)) {
+    long int act=order[head++];
+    neis=igraph_adjlist_get(w->adjlist, act);
+    nneis=igraph_vector_size(neis);
+    for (j=0; j<nneis; j++) {
+      long int nei=(long int) VECTOR(*neis)[j];
+      w->touched_edges++;
+      if (distance[nei] == 0) {
+        distance[nei]=distance[act] + 1;
+        order[tail++]=nei;
+        if (tail == k) {
+          break;
         }
+      }
     }
-    
-    // Return
+  }
+  depth=distance[order[tail-1]] - 1;
+  for (j=0; j<tail; j++) {
+    distance[order[j]]=0;
+  }
+  w->no_of_order=tail;
+  return depth;
+}
 
-    *diameter = ret_depth_total_MAX;
+int igraph_i_motwani_worker(igraph_i_motwani_worker_t *w) {
+  long int i, source, depth;
+  for (i=w->first; i<w->no_of_sources; i+=w->step) {
+    if (w->main_thread) {
+      IGRAPH_ALLOW_INTERRUPTION();
+    }
+    source=w->sources ? w->sources[i] : i;
+    depth=igraph_i_motwani_bfs(w, source, w->k);
+    if (depth > w->max_depth) {
+      w->max_depth=depth;
+      w->max_source=source;
+    }
+  }
+  return 0;
+}
 
-    return 0;
-   
+void *igraph_i_motwani_thread(void *arg) {
+  igraph_i_motwani_worker_t *w=(igraph_i_motwani_worker_t *) arg;
+  w->ret=igraph_i_motwani_worker(w);
+  return NULL;
 }
 
-igraph_bool_t bfs_callback(const igraph_t *graph,
-                           igraph_integer_t vid,
-                           igraph_integer_t pred,
-                           igraph_integer_t succ,
-                           igraph_integer_t rank,
-                           igraph_integer_t dist,
-                           igraph_vector_t *vec) {
-        
-    igraph_integer_t k_number_of_nodes = VECTOR(*vec)[0];
-    
-    VECTOR(*vec)[1] = rank;
-   
-    if(rank < (long int) k_number_of_nodes){
-        return 0;
+/*
+ * Runs a search from each of the sources (all the vertices if 0) on the
+ * workers, the first one in the calling thread and the others in their own
+ * threads, and returns the largest depth and its source in *max_depth and
+ * *max_source.
+ */
+int igraph_i_motwani_run(igraph_i_motwani_workers_t *workers,
+    igraph_adjlist_t *adjlist, const long int *sources, long int no_of_sources,
+    long int k, long int *max_depth, long int *max_source) {
+  long int threads=workers->no_of_workers;
+  pthread_t *thread_ids;
+  long int i, j;
+
+  for (i=0; i<threads; i++) {
+    igraph_i_motwani_worker_t *w=&workers->workers[i];
+    w->adjlist=adjlist;
+    w->sources=sources;
+    w->no_of_sources=no_of_sources;
+    w->first=i;
+    w->step=threads;
+    w->k=k;
+    w->max_depth=-1;
+    w->max_source=-1;
+  }
+
+  if (threads == 1) {
+    IGRAPH_CHECK(igraph_i_motwani_worker(&workers->workers[0]));
+  } else {
+    thread_ids=igraph_Calloc(threads, pthread_t);
+    if (thread_ids==0) {
+      IGRAPH_ERROR("diameter approximation failed", IGRAPH_ENOMEM);
     }
-    
-}
+    IGRAPH_FINALLY(igraph_free, thread_ids);
+    for (i=1; i<threads; i++) {
+      if (pthread_create(&thread_ids[i], 0, igraph_i_motwani_thread,
+            &workers->workers[i])) {
+        /* Wait for the workers already started before bailing out */
+        for (j=1; j<i; j++) {
+          pthread_join(thread_ids[j], 0);
+        }
+        IGRAPH_ERROR("Cannot start diameter approximation thread",
+            IGRAPH_FAILURE);
+      }
+    }
+    /* The calling thread runs the first worker */
+    igraph_i_motwani_thread(&workers->workers[0]);
+    for (i=1; i<threads; i++) {
+      pthread_join(thread_ids[i], 0);
+    }
+    igraph_Free(thread_ids);
+    IGRAPH_FINALLY_CLEAN(1);
+    for (i=0; i<threads; i++) {
+      IGRAPH_CHECK(workers->workers[i].ret);
+    }
+  }
 
-int igraph_kBFS(const igraph_t *graph, igraph_t *graph_augm, igraph_vector_t *ret_nodes, igraph_integer_t *ret_depth, igraph_integer_t root_index, const igraph_integer_t k_number_of_nodes){
+  *max_depth=-1;
+  *max_source=-1;
+  for (i=0; i<threads; i++) {
+    if (workers->workers[i].max_depth > *max_depth) {
+      *max_depth=workers->workers[i].max_depth;
+      *max_source=workers->workers[i].max_source;
+    }
+  }
+  return 0;
+}
 
-    long int no_of_nodes=igraph_vcount(graph);
+/**
+ * \ingroup structural
+ * \function igraph_diameter_approximation_motwani
+ * \brief Approximation of the diameter within a factor 2/3.
+ *
+ * </para><para>
+ * The algorithm of Aingworth, Chekuri, Indyk and Motwani, with the random
+ * hitting set of Roditty and Williams. A search truncated after \p k
+ * vertices is run from every vertex, and w is the vertex whose truncated
+ * search goes deepest. Full searches are then run from w, to w from each of
+ * the \p k vertices closest to w, and from a random set of vertices that
+ * hits the \p k closest vertices of every vertex with high probability.
+ * The largest eccentricity found is at least 2/3 of the diameter (minus
+ * one) with high probability, and never larger than the diameter. Each
+ * phase runs its searches on \p threads threads, with buffers allocated
+ * once per thread.
+ *
+ * </para><para>
+ * The number of edges touched by the searches, the number of full
+ * searches, the number of truncated ones and \p k are added to \p stats as
+ * "diameter_touched_edges", "diameter_bfs", "diameter_partial_bfs" and
+ * "diameter_k", if it is not \c NULL.
+ *
+ * \param graph The graph object. Directed graphs are searched along the
+ *        edges from w and from the random vertices, and against them to w.
+ * \param diameter Pointer to an integer, the result is stored here.
+ * \param k The number of vertices reached by the truncated searches. If not
+ *        positive, the square root of n log n is used, for n vertices.
+ * \param threads The number of threads running the searches.
+ * \return Error code.
+ *
+ * Time complexity: O(n k + (k + n/k log n) m), for n vertices and m edges.
+ */
 
-    igraph_vector_t ord,rank, dist, father, pred, succ;
-    igraph_vector_init(&ord, no_of_nodes-1);
-    igraph_vector_init(&rank, no_of_nodes-1);
-    igraph_vector_init(&father, no_of_nodes-1);
-    igraph_vector_init(&pred, no_of_nodes-1);
-    igraph_vector_init(&succ, no_of_nodes-1);
-    igraph_vector_init(&dist, no_of_nodes-1);
+int igraph_diameter_approximation_motwani(const igraph_t *graph,
+                                          igraph_integer_t *diameter,
+                                          igraph_vector_t *stats,
+                                          igraph_strvector_t *stats_names,
+                                          igraph_integer_t k,
+                                          igraph_integer_t threads) {
+  long int no_of_nodes=igraph_vcount(graph);
+  igraph_bool_t directed=igraph_is_directed(graph);
+  igraph_adjlist_t adjlist_out, adjlist_in;
+  igraph_i_motwani_workers_t workers;
+  igraph_rng_t *rng=igraph_rng_default();
+  long int *sources;
+  long int no_of_sources, no_of_hitting;
+  long int depth, source, w, partial;
+  long int touched_edges=0, no_of_bfs=0;
+  long int i;
 
-    igraph_vector_t vec;
-    igraph_vector_init(&vec,2);
-    VECTOR(vec)[0]=k_number_of_nodes;
-    
-    igraph_integer_t actual_rank=-1;
-    
-    VECTOR(vec)[1] = actual_rank;
-    
-    //igraph_bfs(graph, /*root=*/ root_index, /*roots=*/ NULL, /*neimode=*/ IGRAPH_OUT,/*unreachable=*/ NULL, /*restricted=*/ NULL,
-    //           /*order*/ &ord, /*rank*/ &rank, &father, &pred, &succ, /*distance*/ &dist, &bfs_callback, &k_number_of_nodes);
-    igraph_bfs(graph, /*root=*/ root_index, /*roots=*/ NULL, /*neimode=*/ IGRAPH_OUT,/*unreachable=*/ NULL, /*restricted=*/ NULL,
-                          /*order*/ &ord, /*rank*/ &rank, &father, &pred, &succ, /*distance*/ &dist, &bfs_callback, &vec);
-    
-    
-    actual_rank = VECTOR(vec)[1]+1;
-    
-    
-    igraph_vector_resize(&ord, actual_rank);
-    
-    *ret_nodes = ord;
+  if (threads < 1) {
+    IGRAPH_ERROR("the number of threads must be positive", IGRAPH_EINVAL);
+  }
+  *diameter=0;
+  if (k <= 0) {
+    k=no_of_nodes > 1 ?
+      (igraph_integer_t) ceil(sqrt(no_of_nodes * log2(no_of_nodes))) : 1;
+  }
+  if (k > no_of_nodes) {
+    k=no_of_nodes;
+  }
+  /* The k closest vertices of each vertex miss all the no_of_hitting
+   * random vertices with probability (1-k/n)^no_of_hitting < 1/n */
+  no_of_hitting=no_of_nodes;
+  if (no_of_nodes > 1 && ceil(no_of_nodes * log(no_of_nodes) / k) < no_of_nodes) {
+    no_of_hitting=(long int) ceil(no_of_nodes * log(no_of_nodes) / k);
+  }
 
-    *ret_depth=VECTOR(dist)[(int)igraph_vector_tail(ret_nodes)];
+  IGRAPH_CHECK(igraph_adjlist_init(graph, &adjlist_out, IGRAPH_OUT));
+  IGRAPH_FINALLY(igraph_adjlist_destroy, &adjlist_out);
+  if (directed) {
+    IGRAPH_CHECK(igraph_adjlist_init(graph, &adjlist_in, IGRAPH_IN));
+    IGRAPH_FINALLY(igraph_adjlist_destroy, &adjlist_in);
+  }
 
-    igraph_vector_destroy(&rank);
-    igraph_vector_destroy(&dist);
-    igraph_vector_destroy(&father);
-    igraph_vector_destroy(&pred);
-    igraph_vector_destroy(&succ);
+  workers.no_of_workers=threads;
+  workers.workers=igraph_Calloc(threads, igraph_i_motwani_worker_t);
+  if (workers.workers==0) {
+    IGRAPH_ERROR("diameter approximation failed", IGRAPH_ENOMEM);
+  }
+  IGRAPH_FINALLY(igraph_i_motwani_workers_destroy, &workers);
+  for (i=0; i<threads; i++) {
+    igraph_i_motwani_worker_t *worker=&workers.workers[i];
+    worker->main_thread=(i == 0);
+    worker->distance=igraph_Calloc(no_of_nodes, long int);
+    worker->order=igraph_Calloc(no_of_nodes, long int);
+    if (worker->distance==0 || worker->order==0) {
+      IGRAPH_ERROR("diameter approximation failed", IGRAPH_ENOMEM);
+    }
+  }
+  sources=igraph_Calloc((k > no_of_hitting ? k : no_of_hitting) + 1, long int);
+  if (sources==0) {
+    IGRAPH_ERROR("diameter approximation failed", IGRAPH_ENOMEM);
+  }
+  IGRAPH_FINALLY(igraph_free, sources);
+
+  /* Truncated searches from every vertex: w goes deepest */
+  IGRAPH_CHECK(igraph_i_motwani_run(&workers, &adjlist_out, 0, no_of_nodes, k,
+        &partial, &w));
+
+  /* Full search from w; its first k vertices are the k closest to w, and
+   * the full searches to w start from them */
+  no_of_sources=0;
+  if (w >= 0) {
+    *diameter=igraph_i_motwani_bfs(&workers.workers[0], w, 0);
+    no_of_bfs++;
+    no_of_sources=workers.workers[0].no_of_order < k ?
+      workers.workers[0].no_of_order : k;
+    for (i=0; i<no_of_sources; i++) {
+      sources[i]=workers.workers[0].order[i];
+    }
+  }
+  IGRAPH_CHECK(igraph_i_motwani_run(&workers,
+        directed ? &adjlist_in : &adjlist_out, sources, no_of_sources, 0,
+        &depth, &source));
+  no_of_bfs+=no_of_sources;
+  if (depth > *diameter) {
+    *diameter=depth;
+  }
 
-    return 0;
-}
+  /* Full searches from the random hitting set */
+  for (i=0; i<no_of_hitting; i++) {
+    sources[i]=igraph_rng_get_integer(rng, 0, no_of_nodes - 1);
+  }
+  IGRAPH_CHECK(igraph_i_motwani_run(&workers, &adjlist_out, sources,
+        no_of_hitting, 0, &depth, &source));
+  no_of_bfs+=no_of_hitting;
+  if (depth > *diameter) {
+    *diameter=depth;
+  }
 
+  for (i=0; i<threads; i++) {
+    touched_edges+=workers.workers[i].touched_edges;
+  }
+  igraph_Free(sources);
+  igraph_i_motwani_workers_destroy(&workers);
+  IGRAPH_FINALLY_CLEAN(2);
+  if (directed) {
+    igraph_adjlist_destroy(&adjlist_in);
+    IGRAPH_FINALLY_CLEAN(1);
+  }
+  igraph_adjlist_destroy(&adjlist_out);
+  IGRAPH_FINALLY_CLEAN(1);
 
+  if (stats && stats_names) {
+    igraph_vector_push_back(stats, touched_edges);
+    igraph_strvector_add(stats_names, "diameter_touched_edges");
+    igraph_vector_push_back(stats, no_of_bfs);
+    igraph_strvector_add(stats_names, "diameter_bfs");
+    igraph_vector_push_back(stats, no_of_nodes);
+    igraph_strvector_add(stats_names, "diameter_partial_bfs");
+    igraph_vector_push_back(stats, k);
+    igraph_strvector_add(stats_names, "diameter_k");
+  }
+  return 0;
+}
 
 /**
  * \ingroup structural
@@ -1382,6 +1382,64 @@ PyObject *igraphmodule_Graph_get_eids(igraphmodule_GraphObject * self,
   return result;
 }
 
+/**
+ * \ingroup python_interface_graph
+ * \brief Converts the edge weights of the VC sampling functions.
+ *
+ * A C-contiguous buffer of doubles or floats with one entry per edge (e.g.
+ * the memoryview of a memory-mapped weight file, or a NumPy array) is copied
+ * straight into the vector, without creating a Python float per edge. Any
+ * other object is converted by \c igraphmodule_attrib_to_vector_t, and the
+ * result must be freed in the same way.
+ */
+int igraphmodule_PyObject_to_edge_weights(PyObject *o,
+    igraphmodule_GraphObject *self, igraph_vector_t **vptr) {
+  Py_buffer view;
+  igraph_vector_t *weights;
+  char format;
+  long int no_of_edges = (long int) igraph_ecount(&self->g), i;
+
+  if (o == Py_None || !PyObject_CheckBuffer(o))
+    return igraphmodule_attrib_to_vector_t(o, self, vptr, ATTRIBUTE_TYPE_EDGE);
+
+  if (PyObject_GetBuffer(o, &view, PyBUF_FORMAT | PyBUF_C_CONTIGUOUS))
+    return 1;
+  format = view.format ? view.format[strlen(view.format)-1] : 'B';
+  if (!((format == 'd' && view.itemsize == sizeof(double)) ||
+        (format == 'f' && view.itemsize == sizeof(float)))) {
+    PyBuffer_Release(&view);
+    return igraphmodule_attrib_to_vector_t(o, self, vptr, ATTRIBUTE_TYPE_EDGE);
+  }
+  if (view.len / view.itemsize != no_of_edges) {
+    PyErr_SetString(PyExc_ValueError,
+        "weight buffer does not match the number of edges");
+    PyBuffer_Release(&view);
+    return 1;
+  }
+
+  weights = (igraph_vector_t *) calloc(1, sizeof(igraph_vector_t));
+  if (weights == 0) {
+    PyBuffer_Release(&view);
+    PyErr_NoMemory();
+    return 1;
+  }
+  if (igraph_vector_init(weights, no_of_edges)) {
+    free(weights);
+    PyBuffer_Release(&view);
+    igraphmodule_handle_igraph_error();
+    return 1;
+  }
+  if (format == 'd') {
+    memcpy(VECTOR(*weights), view.buf, no_of_edges * sizeof(double));
+  } else {
+    for (i = 0; i < no_of_edges; i++)
+      VECTOR(*weights)[i] = ((float *) view.buf)[i];
+  }
+  PyBuffer_Release(&view);
+  *vptr = weights;
+  return 0;
+}
+
 /** \ingroup python_interface_graph
  * \brief Calculates the diameter of an \c igraph.Graph
  *  TODO
@@ -1398,19 +1456,27 @@ PyObject *igraphmodule_Graph_get_eids(igraphmodule_GraphObject * self,
 PyObject *igraphmodule_Graph_diameter_approximation(igraphmodule_GraphObject *self,
                                       PyObject * args, PyObject * kwds)
 {
-  PyObject *weights_o = Py_None;
+  PyObject *weights_o = Py_None, *dir = Py_True;
   igraph_vector_t *weights = 0;
+  int bfs_budget = -1;
 
-  static char *kwlist[] = {"weights", NULL };
+  static char *kwlist[] = {"weights", "bfs_budget", "directed", NULL };
 
-  if (!PyArg_ParseTupleAndKeywords(args, kwds, "|O", kwlist, &weights_o))
+  if (!PyArg_ParseTupleAndKeywords(args, kwds, "|OiO", kwlist, &weights_o,
+        &bfs_budget, &dir))
     return NULL;
 
-  if (igraphmodule_attrib_to_vector_t(weights_o, self, &weights,
-	  ATTRIBUTE_TYPE_EDGE)) return NULL;
+  if (igraphmodule_PyObject_to_edge_weights(weights_o, self, &weights)) return NULL;
 
   igraph_integer_t i;
-  igraph_diameter_approximation(&self->g, &i, NULL, NULL, weights);
+  if (igraph_diameter_approximation(&self->g, &i, NULL, NULL,
+        PyObject_IsTrue(dir), weights, bfs_budget)) {
+    igraphmodule_handle_igraph_error();
+    if (weights) {
+      igraph_vector_destroy(weights); free(weights);
+    }
+    return NULL;
+  }
   if (weights) {
     igraph_vector_destroy(weights); free(weights);
   }
@@ -1420,19 +1486,21 @@ PyObject *igraphmodule_Graph_diameter_approximation(igraphmodule_GraphObject *se
 PyObject *igraphmodule_Graph_diameter_approximation_motwani(igraphmodule_GraphObject *self,
                                   PyObject * args, PyObject * kwds)
 {
-    
-    
-    static char *kwlist[] = { NULL };
-    
-    if (!PyArg_ParseTupleAndKeywords(args, kwds, "|", kwlist))
-        return NULL;
-    
-    igraph_integer_t ret_diameter;
-    
-    igraph_diameter_approximation_motwani(&self->g, &ret_diameter);
-        
-    return PyInt_FromLong((long)ret_diameter);
+  int k = -1, threads = 1;
+  igraph_integer_t ret_diameter;
 
+  static char *kwlist[] = { "k", "threads", NULL };
+
+  if (!PyArg_ParseTupleAndKeywords(args, kwds, "|ii", kwlist, &k, &threads))
+    return NULL;
+
+  if (igraph_diameter_approximation_motwani(&self->g, &ret_diameter, NULL,
+        NULL, k, threads)) {
+    igraphmodule_handle_igraph_error();
+    return NULL;
+  }
+
+  return PyInt_FromLong((long)ret_diameter);
 }
 
 /** \ingroup python_interface_graph
@@ -3458,6 +3526,105 @@ PyObject *igraphmodule_Graph_average_path_length(igraphmodule_GraphObject *
   return PyFloat_FromDouble(res);
 }
 
+/**
+ * \ingroup python_interface_graph
+ * \brief A minimal object exporting the storage of an \c igraph_vector_t
+ * through the buffer protocol.
+ *
+ * Used to hand the result vectors of the betweenness functions over to
+ * NumPy without copying them: the object takes ownership of the storage
+ * and frees it when the last array viewing it goes away.
+ */
+typedef struct {
+  PyObject_HEAD
+  igraph_vector_t data;
+  Py_ssize_t shape;             /* number of elements of data */
+  Py_ssize_t stride;
+} igraphmodule_RealBufferObject;
+
+void igraphmodule_RealBuffer_dealloc(igraphmodule_RealBufferObject *self) {
+  igraph_vector_destroy(&self->data);
+  PyObject_Del((PyObject*)self);
+}
+
+int igraphmodule_RealBuffer_getbuffer(igraphmodule_RealBufferObject *self,
+    Py_buffer *view, int flags) {
+  if (view == NULL) {
+    PyErr_SetString(PyExc_ValueError, "NULL view in getbuffer");
+    return -1;
+  }
+  self->shape = igraph_vector_size(&self->data);
+  self->stride = sizeof(igraph_real_t);
+  if (PyBuffer_FillInfo(view, (PyObject*)self, VECTOR(self->data),
+        self->shape * self->stride, 0, flags))
+    return -1;
+  /* A one-dimensional array of doubles; the shape and the strides count
+   * elements of itemsize bytes, so they are not the ones filled in for
+   * bytes. Without them, the consumer reads the buffer as bytes. */
+  view->itemsize = self->stride;
+  view->format = (flags & PyBUF_FORMAT) ? "d" : NULL;
+  view->shape = ((flags & PyBUF_ND) == PyBUF_ND) ? &self->shape : NULL;
+  view->strides = ((flags & PyBUF_STRIDES) == PyBUF_STRIDES) ?
+    &self->stride : NULL;
+  return 0;
+}
+
+PyBufferProcs igraphmodule_RealBuffer_as_buffer;
+
+PyTypeObject igraphmodule_RealBufferType = {
+  PyVarObject_HEAD_INIT(0, 0)
+  "igraph._RealBuffer",         /* tp_name */
+  sizeof(igraphmodule_RealBufferObject), /* tp_basicsize */
+  0,                            /* tp_itemsize */
+  (destructor) igraphmodule_RealBuffer_dealloc, /* tp_dealloc */
+};
+
+/**
+ * \ingroup python_interface_graph
+ * \brief Converts an igraph \c igraph_vector_t to a NumPy array of doubles
+ * without copying it.
+ *
+ * The storage of \c v is moved into the returned array, so \c v is left
+ * empty (destroying it afterwards is still safe). Raises \c ImportError if
+ * NumPy is not available.
+ */
+PyObject* igraphmodule_vector_t_to_numpy(igraph_vector_t *v) {
+  igraphmodule_RealBufferObject *owner;
+  PyObject *numpy, *result;
+
+  if (igraphmodule_RealBufferType.tp_as_buffer == 0) {
+    igraphmodule_RealBuffer_as_buffer.bf_getbuffer =
+      (getbufferproc) igraphmodule_RealBuffer_getbuffer;
+    igraphmodule_RealBufferType.tp_as_buffer = &igraphmodule_RealBuffer_as_buffer;
+#ifdef Py_TPFLAGS_HAVE_NEWBUFFER
+    igraphmodule_RealBufferType.tp_flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_HAVE_NEWBUFFER;
+#else
+    igraphmodule_RealBufferType.tp_flags = Py_TPFLAGS_DEFAULT;
+#endif
+    if (PyType_Ready(&igraphmodule_RealBufferType)) {
+      igraphmodule_RealBufferType.tp_as_buffer = 0;
+      return NULL;
+    }
+  }
+
+  numpy = PyImport_ImportModule("numpy");
+  if (numpy == NULL)
+    return NULL;
+
+  owner = PyObject_New(igraphmodule_RealBufferObject, &igraphmodule_RealBufferType);
+  if (owner == NULL) {
+    Py_DECREF(numpy);
+    return NULL;
+  }
+  owner->data = *v;
+  v->stor_begin = v->stor_end = v->end = NULL;
+
+  result = PyObject_CallMethod(numpy, "frombuffer", "Os", (PyObject*)owner, "float64");
+  Py_DECREF(owner);
+  Py_DECREF(numpy);
+  return result;
+}
+
 /** \ingroup python_interface_graph
  * \brief Calculates the betweennesses of some vertices in a graph.
  * \return the betweennesses as a list (or a single float)
@@ -3467,12 +3634,13 @@ PyObject *igraphmodule_Graph_betweenness(igraphmodule_GraphObject * self,
                                          PyObject * args, PyObject * kwds)
 {
   static char *kwlist[] = { "vertices", "directed", "cutoff", "weights",
-    "nobigint", NULL };
+    "nobigint", "as_array", NULL };
   PyObject *directed = Py_True;
   PyObject *vobj = Py_None, *list;
   PyObject *cutoff = Py_None;
   PyObject *weights_o = Py_None;
   PyObject *nobigint = Py_True;
+  PyObject *as_array = Py_False;
   PyObject *stats_dict;
   igraph_vector_t res, *weights = 0;
   igraph_bool_t return_single = 0;
@@ -3482,9 +3650,9 @@ PyObject *igraphmodule_Graph_betweenness(igraphmodule_GraphObject * self,
   int j;
 
 
-  if (!PyArg_ParseTupleAndKeywords(args, kwds, "|OOOOO", kwlist,
+  if (!PyArg_ParseTupleAndKeywords(args, kwds, "|OOOOOO", kwlist,
                                    &vobj, &directed, &cutoff, &weights_o,
-                                   &nobigint)) {
+                                   &nobigint, &as_array)) {
     return NULL;
   }
 
@@ -3553,13 +3721,24 @@ PyObject *igraphmodule_Graph_betweenness(igraphmodule_GraphObject * self,
     return NULL;
   }
 
-  if (!return_single)
-    list = igraphmodule_vector_t_to_PyList(&res, IGRAPHMODULE_TYPE_FLOAT);
-  else
+  if (return_single)
     list = PyFloat_FromDouble(VECTOR(res)[0]);
+  else if (PyObject_IsTrue(as_array))
+    list = igraphmodule_vector_t_to_numpy(&res);
+  else
+    list = igraphmodule_vector_t_to_PyList(&res, IGRAPHMODULE_TYPE_FLOAT);
+  if (list == NULL) {
+    igraph_vs_destroy(&vs);
+    igraph_vector_destroy(&res);
+    igraph_vector_destroy(&stats);
+    igraph_strvector_destroy(&stats_names);
+    if (weights) { igraph_vector_destroy(weights); free(weights); }
+    return NULL;
+  }
 
   stats_dict = PyDict_New();
   if (! stats_dict) {
+    Py_DECREF(list);
     igraph_vs_destroy(&vs);
     igraph_vector_destroy(&res);
     igraph_vector_destroy(&stats);
@@ -3590,12 +3769,13 @@ PyObject *igraphmodule_Graph_betweenness_sample_gss_linear_sample_size(igraphmod
                                          PyObject * args, PyObject * kwds)
 {
   static char *kwlist[] = { "sample_size", "vertices", "directed", "cutoff", "weights",
-    "nobigint", NULL };
+    "nobigint", "as_array", NULL };
   PyObject *directed = Py_True;
   PyObject *vobj = Py_None, *list;
   PyObject *cutoff = Py_None;
   PyObject *weights_o = Py_None;
   PyObject *nobigint = Py_True;
+  PyObject *as_array = Py_False;
   PyObject *stats_dict;
   igraph_integer_t sample_size = 0;
   igraph_vector_t res, *weights = 0;
@@ -3605,9 +3785,9 @@ PyObject *igraphmodule_Graph_betweenness_sample_gss_linear_sample_size(igraphmod
   igraph_strvector_t stats_names;
   int j;
 
-  if (!PyArg_ParseTupleAndKeywords(args, kwds, "i|OOOOO", kwlist,
+  if (!PyArg_ParseTupleAndKeywords(args, kwds, "i|OOOOOO", kwlist,
                                    &sample_size, &vobj, &directed, &cutoff, &weights_o,
-                                   &nobigint)) {
+                                   &nobigint, &as_array)) {
     return NULL;
   }
 
@@ -3685,13 +3865,24 @@ PyObject *igraphmodule_Graph_betweenness_sample_gss_linear_sample_size(igraphmod
     return NULL;
   }
 
-  if (!return_single)
-    list = igraphmodule_vector_t_to_PyList(&res, IGRAPHMODULE_TYPE_FLOAT);
-  else
+  if (return_single)
     list = PyFloat_FromDouble(VECTOR(res)[0]);
+  else if (PyObject_IsTrue(as_array))
+    list = igraphmodule_vector_t_to_numpy(&res);
+  else
+    list = igraphmodule_vector_t_to_PyList(&res, IGRAPHMODULE_TYPE_FLOAT);
+  if (list == NULL) {
+    igraph_vs_destroy(&vs);
+    igraph_vector_destroy(&res);
+    igraph_vector_destroy(&stats);
+    igraph_strvector_destroy(&stats_names);
+    if (weights) { igraph_vector_destroy(weights); free(weights); }
+    return NULL;
+  }
 
   stats_dict = PyDict_New();
   if (! stats_dict) {
+    Py_DECREF(list);
     igraph_vs_destroy(&vs);
     igraph_vector_destroy(&res);
     igraph_vector_destroy(&stats);
@@ -3722,12 +3913,13 @@ PyObject *igraphmodule_Graph_betweenness_sample_bp_sample_size(igraphmodule_Grap
                                          PyObject * args, PyObject * kwds)
 {
   static char *kwlist[] = { "sample_size", "vertices", "directed", "cutoff", "weights",
-    "nobigint", NULL };
+    "nobigint", "as_array", NULL };
   PyObject *directed = Py_True;
   PyObject *vobj = Py_None, *list;
   PyObject *cutoff = Py_None;
   PyObject *weights_o = Py_None;
   PyObject *nobigint = Py_True;
+  PyObject *as_array = Py_False;
   PyObject *stats_dict;
   igraph_integer_t sample_size = 0;
   igraph_vector_t res, *weights = 0;
@@ -3737,9 +3929,9 @@ PyObject *igraphmodule_Graph_betweenness_sample_bp_sample_size(igraphmodule_Grap
   igraph_strvector_t stats_names;
   int j;
 
-  if (!PyArg_ParseTupleAndKeywords(args, kwds, "i|OOOOO", kwlist,
+  if (!PyArg_ParseTupleAndKeywords(args, kwds, "i|OOOOOO", kwlist,
                                    &sample_size, &vobj, &directed, &cutoff, &weights_o,
-                                   &nobigint)) {
+                                   &nobigint, &as_array)) {
     return NULL;
   }
 
@@ -3817,13 +4009,24 @@ PyObject *igraphmodule_Graph_betweenness_sample_bp_sample_size(igraphmodule_Grap
     return NULL;
   }
 
-  if (!return_single)
-    list = igraphmodule_vector_t_to_PyList(&res, IGRAPHMODULE_TYPE_FLOAT);
-  else
+  if (return_single)
     list = PyFloat_FromDouble(VECTOR(res)[0]);
+  else if (PyObject_IsTrue(as_array))
+    list = igraphmodule_vector_t_to_numpy(&res);
+  else
+    list = igraphmodule_vector_t_to_PyList(&res, IGRAPHMODULE_TYPE_FLOAT);
+  if (list == NULL) {
+    igraph_vs_destroy(&vs);
+    igraph_vector_destroy(&res);
+    igraph_vector_destroy(&stats);
+    igraph_strvector_destroy(&stats_names);
+    if (weights) { igraph_vector_destroy(weights); free(weights); }
+    return NULL;
+  }
 
   stats_dict = PyDict_New();
   if (! stats_dict) {
+    Py_DECREF(list);
     igraph_vs_destroy(&vs);
     igraph_vector_destroy(&res);
     igraph_vector_destroy(&stats);
@@ -3854,12 +4057,13 @@ PyObject *igraphmodule_Graph_betweenness_sample_gss_linear(igraphmodule_GraphObj
                                          PyObject * args, PyObject * kwds)
 {
   static char *kwlist[] = { "epsilon", "delta", "vertices", "directed", "cutoff", "weights",
-    "nobigint", NULL };
+    "nobigint", "as_array", NULL };
   PyObject *directed = Py_True;
   PyObject *vobj = Py_None, *list;
   PyObject *cutoff = Py_None;
   PyObject *weights_o = Py_None;
   PyObject *nobigint = Py_True;
+  PyObject *as_array = Py_False;
   PyObject *stats_dict;
   igraph_real_t delta = 0.0;
   igraph_real_t epsilon = 0.0;
@@ -3871,9 +4075,9 @@ PyObject *igraphmodule_Graph_betweenness_sample_gss_linear(igraphmodule_GraphObj
   int j;
 
 
-  if (!PyArg_ParseTupleAndKeywords(args, kwds, "dd|OOOOO", kwlist,
+  if (!PyArg_ParseTupleAndKeywords(args, kwds, "dd|OOOOOO", kwlist,
                                    &epsilon, &delta, &vobj, &directed, &cutoff, &weights_o,
-                                   &nobigint)) {
+                                   &nobigint, &as_array)) {
     return NULL;
   }
 
@@ -3943,13 +4147,24 @@ PyObject *igraphmodule_Graph_betweenness_sample_gss_linear(igraphmodule_GraphObj
     return NULL;
   }
 
-  if (!return_single)
-    list = igraphmodule_vector_t_to_PyList(&res, IGRAPHMODULE_TYPE_FLOAT);
-  else
+  if (return_single)
     list = PyFloat_FromDouble(VECTOR(res)[0]);
+  else if (PyObject_IsTrue(as_array))
+    list = igraphmodule_vector_t_to_numpy(&res);
+  else
+    list = igraphmodule_vector_t_to_PyList(&res, IGRAPHMODULE_TYPE_FLOAT);
+  if (list == NULL) {
+    igraph_vs_destroy(&vs);
+    igraph_vector_destroy(&res);
+    igraph_vector_destroy(&stats);
+    igraph_strvector_destroy(&stats_names);
+    if (weights) { igraph_vector_destroy(weights); free(weights); }
+    return NULL;
+  }
 
   stats_dict = PyDict_New();
   if (! stats_dict) {
+    Py_DECREF(list);
     igraph_vs_destroy(&vs);
     igraph_vector_destroy(&res);
     igraph_vector_destroy(&stats);
@@ -3980,12 +4195,13 @@ PyObject *igraphmodule_Graph_betweenness_sample_bp(igraphmodule_GraphObject * se
                                          PyObject * args, PyObject * kwds)
 {
   static char *kwlist[] = { "epsilon", "delta", "vertices", "directed", "cutoff", "weights",
-    "nobigint", NULL };
+    "nobigint", "as_array", NULL };
   PyObject *directed = Py_True;
   PyObject *vobj = Py_None, *list;
   PyObject *cutoff = Py_None;
   PyObject *weights_o = Py_None;
   PyObject *nobigint = Py_True;
+  PyObject *as_array = Py_False;
   PyObject *stats_dict;
   igraph_real_t delta = 0.0;
   igraph_real_t epsilon = 0.0;
@@ -3997,9 +4213,9 @@ PyObject *igraphmodule_Graph_betweenness_sample_bp(igraphmodule_GraphObject * se
   int j;
 
 
-  if (!PyArg_ParseTupleAndKeywords(args, kwds, "dd|OOOOO", kwlist,
+  if (!PyArg_ParseTupleAndKeywords(args, kwds, "dd|OOOOOO", kwlist,
                                    &epsilon, &delta, &vobj, &directed, &cutoff, &weights_o,
-                                   &nobigint)) {
+                                   &nobigint, &as_array)) {
     return NULL;
   }
 
@@ -4069,13 +4285,24 @@ PyObject *igraphmodule_Graph_betweenness_sample_bp(igraphmodule_GraphObject * se
     return NULL;
   }
 
-  if (!return_single)
-    list = igraphmodule_vector_t_to_PyList(&res, IGRAPHMODULE_TYPE_FLOAT);
-  else
+  if (return_single)
     list = PyFloat_FromDouble(VECTOR(res)[0]);
+  else if (PyObject_IsTrue(as_array))
+    list = igraphmodule_vector_t_to_numpy(&res);
+  else
+    list = igraphmodule_vector_t_to_PyList(&res, IGRAPHMODULE_TYPE_FLOAT);
+  if (list == NULL) {
+    igraph_vs_destroy(&vs);
+    igraph_vector_destroy(&res);
+    igraph_vector_destroy(&stats);
+    igraph_strvector_destroy(&stats_names);
+    if (weights) { igraph_vector_destroy(weights); free(weights); }
+    return NULL;
+  }
 
   stats_dict = PyDict_New();
   if (! stats_dict) {
+    Py_DECREF(list);
     igraph_vs_destroy(&vs);
     igraph_vector_destroy(&res);
     igraph_vector_destroy(&stats);
@@ -4097,36 +4324,406 @@ PyObject *igraphmodule_Graph_betweenness_sample_bp(igraphmodule_GraphObject * se
   return Py_BuildValue("(NN)", stats_dict, list);
 }
 
+/**
+ * \ingroup python_interface_graph
+ * \brief Gets the memory of a writable buffer of doubles where the VC
+ * sampling functions publish their partial counts.
+ *
+ * The buffer must hold at least 2*(n+1)+2 doubles, n being the number of
+ * vertices. If \c o is \c None, \c *snapshot is set to \c NULL and no
+ * buffer is acquired; otherwise the buffer must be released with
+ * \c PyBuffer_Release once the sampling is done.
+ */
+int igraphmodule_PyObject_to_snapshot(PyObject *o, igraph_t *graph,
+    Py_buffer *view, igraph_real_t **snapshot) {
+  Py_ssize_t needed = 2 * ((Py_ssize_t) igraph_vcount(graph) + 1) + 2;
+
+  *snapshot = NULL;
+  if (o == Py_None)
+    return 0;
+
+  if (PyObject_GetBuffer(o, view, PyBUF_WRITABLE | PyBUF_FORMAT | PyBUF_C_CONTIGUOUS))
+    return 1;
+  if (view->itemsize != sizeof(igraph_real_t) || view->format == NULL ||
+      view->format[strlen(view->format)-1] != 'd') {
+    PyErr_SetString(PyExc_TypeError, "snapshot must be a buffer of doubles");
+    PyBuffer_Release(view);
+    return 1;
+  }
+  if (view->len < needed * (Py_ssize_t) sizeof(igraph_real_t)) {
+    PyErr_SetString(PyExc_ValueError, "snapshot buffer is too small");
+    PyBuffer_Release(view);
+    return 1;
+  }
+  *snapshot = (igraph_real_t *) view->buf;
+  return 0;
+}
+
+/**
+ * \ingroup python_interface_graph
+ * \brief Gets the landmark distances of the goal-directed VC sampling from
+ * a buffer of doubles.
+ *
+ * The buffer must be laid out as the matrix computed by
+ * \c igraph_betweenness_landmarks, i.e. as returned by
+ * \c Graph.betweenness_landmarks(): the distances of each vertex are
+ * contiguous, so the number of doubles is a positive multiple of the number
+ * of vertices. If \c o is \c None, \c *landmarks is set to \c NULL and no
+ * buffer is acquired; otherwise \c *landmarks is a view of the buffer in
+ * \c matrix, and the buffer must be released with \c PyBuffer_Release once
+ * the sampling is done.
+ */
+int igraphmodule_PyObject_to_landmarks(PyObject *o, igraph_t *graph,
+    Py_buffer *view, igraph_matrix_t *matrix, igraph_matrix_t **landmarks) {
+  Py_ssize_t no_of_nodes = (Py_ssize_t) igraph_vcount(graph);
+  Py_ssize_t no_of_values;
+
+  *landmarks = NULL;
+  if (o == Py_None)
+    return 0;
+
+  if (PyObject_GetBuffer(o, view, PyBUF_FORMAT | PyBUF_C_CONTIGUOUS))
+    return 1;
+  if (view->itemsize != sizeof(igraph_real_t) || view->format == NULL ||
+      view->format[strlen(view->format)-1] != 'd') {
+    PyErr_SetString(PyExc_TypeError, "landmarks must be a buffer of doubles");
+    PyBuffer_Release(view);
+    return 1;
+  }
+  no_of_values = view->len / (Py_ssize_t) sizeof(igraph_real_t);
+  if (no_of_nodes == 0 || no_of_values == 0 || no_of_values % no_of_nodes) {
+    PyErr_SetString(PyExc_ValueError,
+        "landmarks buffer does not match the number of vertices");
+    PyBuffer_Release(view);
+    return 1;
+  }
+  igraph_matrix_view(matrix, (igraph_real_t *) view->buf,
+      no_of_values / no_of_nodes, no_of_nodes);
+  *landmarks = matrix;
+  return 0;
+}
+
+/** \ingroup python_interface_graph
+ * \brief Picks the landmarks of the goal-directed VC sampling and computes
+ * their distances to all the vertices
+ * \return a tuple with the ids of the landmarks and the distances as bytes
+ * \sa igraph_betweenness_landmarks
+ */
+PyObject *igraphmodule_Graph_betweenness_landmarks(igraphmodule_GraphObject *
+                                                   self, PyObject * args,
+                                                   PyObject * kwds)
+{
+  static char *kwlist[] = { "landmarks", "directed", "weights", NULL };
+  PyObject *directed = Py_True;
+  PyObject *weights_o = Py_None;
+  PyObject *ids_o, *data_o;
+  igraph_integer_t no_of_landmarks = 16;
+  igraph_vector_t *weights = 0, ids;
+  igraph_matrix_t res;
+
+  if (!PyArg_ParseTupleAndKeywords(args, kwds, "|iOO", kwlist,
+                                   &no_of_landmarks, &directed, &weights_o)) {
+    return NULL;
+  }
+
+  if (igraphmodule_PyObject_to_edge_weights(weights_o, self, &weights)) {
+    return NULL;
+  }
+
+  if (igraph_matrix_init(&res, 0, 0)) {
+    if (weights) { igraph_vector_destroy(weights); free(weights); }
+    return igraphmodule_handle_igraph_error();
+  }
+
+  if (igraph_vector_init(&ids, 0)) {
+    igraph_matrix_destroy(&res);
+    if (weights) { igraph_vector_destroy(weights); free(weights); }
+    return igraphmodule_handle_igraph_error();
+  }
+
+  if (igraph_betweenness_landmarks(&self->g, &res, &ids, no_of_landmarks,
+        PyObject_IsTrue(directed), weights)) {
+    igraph_vector_destroy(&ids);
+    igraph_matrix_destroy(&res);
+    if (weights) { igraph_vector_destroy(weights); free(weights); }
+    igraphmodule_handle_igraph_error();
+    return NULL;
+  }
+
+  ids_o = igraphmodule_vector_t_to_PyList(&ids, IGRAPHMODULE_TYPE_INT);
+  data_o = PyBytes_FromStringAndSize((const char *) &MATRIX(res, 0, 0),
+      (Py_ssize_t) igraph_matrix_size(&res) * sizeof(igraph_real_t));
+
+  igraph_vector_destroy(&ids);
+  igraph_matrix_destroy(&res);
+  if (weights) { igraph_vector_destroy(weights); free(weights); }
+
+  if (ids_o == NULL || data_o == NULL) {
+    Py_XDECREF(ids_o);
+    Py_XDECREF(data_o);
+    return NULL;
+  }
+
+  return Py_BuildValue("(NN)", ids_o, data_o);
+}
+
 PyObject
 *igraphmodule_Graph_betweenness_sample_vc_sample_size(igraphmodule_GraphObject
     *self, PyObject *args, PyObject *kwds) {
   static char *kwlist[] = { "sample_size", "vertices", "directed", "cutoff", "weights",
-    "nobigint", NULL };
+    "nobigint", "threads", "bidirectional", "group_sources",
+    "landmarks", "snapshot", "as_array", NULL };
   PyObject *directed = Py_True;
   PyObject *vobj = Py_None, *list;
   PyObject *cutoff = Py_None;
   PyObject *weights_o = Py_None;
   PyObject *nobigint = Py_True;
+  PyObject *as_array = Py_False;
+  PyObject *bidirectional = Py_True;
+  PyObject *group_sources = Py_False;
+  PyObject *landmarks_o = Py_None;
+  PyObject *snapshot_o = Py_None;
   PyObject *stats_dict;
   igraph_integer_t sample_size = 0;
+  int threads = 1;
   igraph_vector_t res, *weights = 0;
   igraph_vector_t stats;
   igraph_strvector_t stats_names;
   igraph_bool_t return_single = 0;
   igraph_vs_t vs;
+  igraph_real_t *snapshot;
+  Py_buffer snapshot_view;
+  igraph_matrix_t landmarks_matrix, *landmarks;
+  Py_buffer landmarks_view;
   int j;
 
-  if (!PyArg_ParseTupleAndKeywords(args, kwds, "i|OOOOO", kwlist,
+  if (!PyArg_ParseTupleAndKeywords(args, kwds, "i|OOOOOiOOOOO", kwlist,
                                    &sample_size, &vobj, &directed, &cutoff, &weights_o,
-                                   &nobigint)) {
+                                   &nobigint, &threads, &bidirectional,
+                                   &group_sources, &landmarks_o, &snapshot_o, &as_array)) {
     return NULL;
   }
 
-  if (igraphmodule_attrib_to_vector_t(weights_o, self, &weights,
-	  ATTRIBUTE_TYPE_EDGE)) return NULL;
+  if (igraphmodule_PyObject_to_snapshot(snapshot_o, &self->g, &snapshot_view,
+        &snapshot)) return NULL;
+
+  if (igraphmodule_PyObject_to_landmarks(landmarks_o, &self->g,
+        &landmarks_view, &landmarks_matrix, &landmarks)) {
+    if (snapshot) PyBuffer_Release(&snapshot_view);
+    return NULL;
+  }
+
+  if (igraphmodule_PyObject_to_edge_weights(weights_o, self, &weights)) {
+    if (landmarks) PyBuffer_Release(&landmarks_view);
+    if (snapshot) PyBuffer_Release(&snapshot_view);
+    return NULL;
+  }
+
+  if (igraphmodule_PyObject_to_vs_t(vobj, &vs, &self->g, &return_single, 0)) {
+    if (weights) { igraph_vector_destroy(weights); free(weights); }
+    if (landmarks) PyBuffer_Release(&landmarks_view);
+    if (snapshot) PyBuffer_Release(&snapshot_view);
+    igraphmodule_handle_igraph_error();
+    return NULL;
+  }
+
+  if (igraph_vector_init(&res, 0)) {
+    igraph_vs_destroy(&vs);
+    if (weights) { igraph_vector_destroy(weights); free(weights); }
+    if (landmarks) PyBuffer_Release(&landmarks_view);
+    if (snapshot) PyBuffer_Release(&snapshot_view);
+    return igraphmodule_handle_igraph_error();
+  }
+
+  if (igraph_vector_init(&stats, 0)) {
+    igraph_vs_destroy(&vs);
+    igraph_vector_destroy(&res);
+    if (weights) { igraph_vector_destroy(weights); free(weights); }
+    if (landmarks) PyBuffer_Release(&landmarks_view);
+    if (snapshot) PyBuffer_Release(&snapshot_view);
+    return igraphmodule_handle_igraph_error();
+  }
+
+  if (igraph_strvector_init(&stats_names, 0)) {
+    igraph_vs_destroy(&vs);
+    igraph_vector_destroy(&res);
+    if (weights) { igraph_vector_destroy(weights); free(weights); }
+    if (landmarks) PyBuffer_Release(&landmarks_view);
+    if (snapshot) PyBuffer_Release(&snapshot_view);
+    return igraphmodule_handle_igraph_error();
+  }
+
+
+  if (cutoff == Py_None) {
+    if (igraph_betweenness_sample_vc_sample_size(&self->g, &res, &stats,
+          &stats_names, sample_size, vs, PyObject_IsTrue(directed), -1,
+          weights, PyObject_IsTrue(nobigint), threads,
+          PyObject_IsTrue(bidirectional), PyObject_IsTrue(group_sources),
+          landmarks, snapshot)) {
+      igraph_vs_destroy(&vs);
+      igraph_vector_destroy(&res);
+      igraph_vector_destroy(&stats);
+      igraph_strvector_destroy(&stats_names);
+      if (weights) { igraph_vector_destroy(weights); free(weights); }
+      if (landmarks) PyBuffer_Release(&landmarks_view);
+      if (snapshot) PyBuffer_Release(&snapshot_view);
+    if (snapshot) PyBuffer_Release(&snapshot_view);
+      igraphmodule_handle_igraph_error();
+      return NULL;
+    }
+  } else if (PyNumber_Check(cutoff)) {
+    PyObject *cutoff_num = PyNumber_Int(cutoff);
+    if (cutoff_num == NULL) {
+      igraph_vs_destroy(&vs);
+      igraph_vector_destroy(&res);
+      igraph_vector_destroy(&stats);
+      igraph_strvector_destroy(&stats_names);
+      if (weights) { igraph_vector_destroy(weights); free(weights); }
+      if (landmarks) PyBuffer_Release(&landmarks_view);
+      if (snapshot) PyBuffer_Release(&snapshot_view);
+    if (snapshot) PyBuffer_Release(&snapshot_view);
+      return NULL;
+    }
+    if (igraph_betweenness_sample_vc_sample_size(&self->g, &res, &stats,
+          &stats_names, sample_size, vs, PyObject_IsTrue(directed),
+          (igraph_integer_t)PyInt_AsLong(cutoff_num), weights,
+          PyObject_IsTrue(nobigint), threads,
+          PyObject_IsTrue(bidirectional), PyObject_IsTrue(group_sources),
+          landmarks, snapshot)) {
+      igraph_vs_destroy(&vs);
+      igraph_vector_destroy(&res);
+      igraph_vector_destroy(&stats);
+      igraph_strvector_destroy(&stats_names);
+      if (weights) { igraph_vector_destroy(weights); free(weights); }
+      if (landmarks) PyBuffer_Release(&landmarks_view);
+      if (snapshot) PyBuffer_Release(&snapshot_view);
+    if (snapshot) PyBuffer_Release(&snapshot_view);
+      Py_DECREF(cutoff_num);
+      igraphmodule_handle_igraph_error();
+      return NULL;
+    }
+    Py_DECREF(cutoff_num);
+  } else {
+    PyErr_SetString(PyExc_TypeError, "cutoff value must be None or integer");
+    igraph_vs_destroy(&vs);
+    igraph_vector_destroy(&res);
+    igraph_vector_destroy(&stats);
+    igraph_strvector_destroy(&stats_names);
+    if (weights) { igraph_vector_destroy(weights); free(weights); }
+    if (landmarks) PyBuffer_Release(&landmarks_view);
+    if (snapshot) PyBuffer_Release(&snapshot_view);
+    return NULL;
+  }
+
+  if (return_single)
+    list = PyFloat_FromDouble(VECTOR(res)[0]);
+  else if (PyObject_IsTrue(as_array))
+    list = igraphmodule_vector_t_to_numpy(&res);
+  else
+    list = igraphmodule_vector_t_to_PyList(&res, IGRAPHMODULE_TYPE_FLOAT);
+  if (list == NULL) {
+    igraph_vs_destroy(&vs);
+    igraph_vector_destroy(&res);
+    igraph_vector_destroy(&stats);
+    igraph_strvector_destroy(&stats_names);
+    if (weights) { igraph_vector_destroy(weights); free(weights); }
+    if (landmarks) PyBuffer_Release(&landmarks_view);
+    if (snapshot) PyBuffer_Release(&snapshot_view);
+    return NULL;
+  }
+
+  stats_dict = PyDict_New();
+  if (! stats_dict) {
+    Py_DECREF(list);
+    igraph_vs_destroy(&vs);
+    igraph_vector_destroy(&res);
+    igraph_vector_destroy(&stats);
+    igraph_strvector_destroy(&stats_names);
+    if (weights) { igraph_vector_destroy(weights); free(weights); }
+    if (landmarks) PyBuffer_Release(&landmarks_view);
+    if (snapshot) PyBuffer_Release(&snapshot_view);
+    return NULL;
+  }
+
+  for (j=0; j < igraph_strvector_size(&stats_names); j++) {
+    PyDict_SetItemString(stats_dict, STR(stats_names, j), PyFloat_FromDouble(VECTOR(stats)[j]));
+  }
+
+  igraph_strvector_destroy(&stats_names);
+  igraph_vector_destroy(&stats);
+  igraph_vector_destroy(&res);
+  igraph_vs_destroy(&vs);
+  if (weights) { igraph_vector_destroy(weights); free(weights); }
+  if (landmarks) PyBuffer_Release(&landmarks_view);
+  if (snapshot) PyBuffer_Release(&snapshot_view);
+
+  return Py_BuildValue("(NN)", stats_dict, list);
+}
+
+/** \ingroup python_interface_graph
+ * \brief Approximates the betweennesses of some vertices in a graph with sampling (VC-Dimension)
+ * \return the betweennesses as a list (or a single float)
+ * \sa igraph_betweenness_sample_vc
+ */
+PyObject *igraphmodule_Graph_betweenness_sample_vc(igraphmodule_GraphObject * self,
+                                         PyObject * args, PyObject * kwds)
+{
+  static char *kwlist[] = { "epsilon", "delta", "diameter", "vertices", "directed", "cutoff", "weights",
+    "nobigint", "threads", "bidirectional", "group_sources", "progressive",
+    "landmarks", "snapshot", "as_array", NULL };
+  PyObject *directed = Py_True;
+  PyObject *vobj = Py_None, *list;
+  PyObject *cutoff = Py_None;
+  PyObject *weights_o = Py_None;
+  PyObject *nobigint = Py_True;
+  PyObject *as_array = Py_False;
+  PyObject *bidirectional = Py_True;
+  PyObject *group_sources = Py_False;
+  PyObject *progressive = Py_False;
+  PyObject *landmarks_o = Py_None;
+  PyObject *snapshot_o = Py_None;
+  PyObject *stats_dict, *tuple;
+  igraph_integer_t diameter = 0;
+  igraph_real_t delta = 0.0;
+  igraph_real_t epsilon = 0.0;
+  int threads = 1;
+  igraph_vector_t res, *weights = NULL;
+  igraph_bool_t return_single = 0;
+  igraph_vs_t vs;
+  igraph_vector_t stats;
+  igraph_strvector_t stats_names;
+  igraph_real_t *snapshot;
+  Py_buffer snapshot_view;
+  igraph_matrix_t landmarks_matrix, *landmarks;
+  Py_buffer landmarks_view;
+  int j;
+
+  if (!PyArg_ParseTupleAndKeywords(args, kwds, "ddi|OOOOOiOOOOOO", kwlist,
+                                   &epsilon, &delta, &diameter, &vobj, &directed, &cutoff, &weights_o,
+                                   &nobigint, &threads, &bidirectional,
+                                   &group_sources, &progressive, &landmarks_o, &snapshot_o, &as_array)) {
+    return NULL;
+  }
+
+  if (igraphmodule_PyObject_to_snapshot(snapshot_o, &self->g, &snapshot_view,
+        &snapshot)) return NULL;
+
+  if (igraphmodule_PyObject_to_landmarks(landmarks_o, &self->g,
+        &landmarks_view, &landmarks_matrix, &landmarks)) {
+    if (snapshot) PyBuffer_Release(&snapshot_view);
+    return NULL;
+  }
+
+  if (igraphmodule_PyObject_to_edge_weights(weights_o, self, &weights)) {
+    if (landmarks) PyBuffer_Release(&landmarks_view);
+    if (snapshot) PyBuffer_Release(&snapshot_view);
+    return NULL;
+  }
 
   if (igraphmodule_PyObject_to_vs_t(vobj, &vs, &self->g, &return_single, 0)) {
     if (weights) { igraph_vector_destroy(weights); free(weights); }
+    if (landmarks) PyBuffer_Release(&landmarks_view);
+    if (snapshot) PyBuffer_Release(&snapshot_view);
     igraphmodule_handle_igraph_error();
     return NULL;
   }
@@ -4134,6 +4731,8 @@ PyObject
   if (igraph_vector_init(&res, 0)) {
     igraph_vs_destroy(&vs);
     if (weights) { igraph_vector_destroy(weights); free(weights); }
+    if (landmarks) PyBuffer_Release(&landmarks_view);
+    if (snapshot) PyBuffer_Release(&snapshot_view);
     return igraphmodule_handle_igraph_error();
   }
 
@@ -4141,6 +4740,8 @@ PyObject
     igraph_vs_destroy(&vs);
     igraph_vector_destroy(&res);
     if (weights) { igraph_vector_destroy(weights); free(weights); }
+    if (landmarks) PyBuffer_Release(&landmarks_view);
+    if (snapshot) PyBuffer_Release(&snapshot_view);
     return igraphmodule_handle_igraph_error();
   }
 
@@ -4148,19 +4749,25 @@ PyObject
     igraph_vs_destroy(&vs);
     igraph_vector_destroy(&res);
     if (weights) { igraph_vector_destroy(weights); free(weights); }
+    if (landmarks) PyBuffer_Release(&landmarks_view);
+    if (snapshot) PyBuffer_Release(&snapshot_view);
     return igraphmodule_handle_igraph_error();
   }
 
-
   if (cutoff == Py_None) {
-    if (igraph_betweenness_sample_vc_sample_size(&self->g, &res, &stats,
-          &stats_names, sample_size, vs, PyObject_IsTrue(directed), -1,
-          weights, PyObject_IsTrue(nobigint))) {
+    if (igraph_betweenness_sample_vc(&self->g, &res, &stats, &stats_names,
+          epsilon, delta, diameter, vs, PyObject_IsTrue(directed), -1, weights,
+          PyObject_IsTrue(nobigint), threads,
+          PyObject_IsTrue(bidirectional), PyObject_IsTrue(group_sources),
+          landmarks, PyObject_IsTrue(progressive), snapshot)) {
       igraph_vs_destroy(&vs);
       igraph_vector_destroy(&res);
       igraph_vector_destroy(&stats);
       igraph_strvector_destroy(&stats_names);
       if (weights) { igraph_vector_destroy(weights); free(weights); }
+      if (landmarks) PyBuffer_Release(&landmarks_view);
+      if (snapshot) PyBuffer_Release(&snapshot_view);
+    if (snapshot) PyBuffer_Release(&snapshot_view);
       igraphmodule_handle_igraph_error();
       return NULL;
     }
@@ -4172,17 +4779,25 @@ PyObject
       igraph_vector_destroy(&stats);
       igraph_strvector_destroy(&stats_names);
       if (weights) { igraph_vector_destroy(weights); free(weights); }
+      if (landmarks) PyBuffer_Release(&landmarks_view);
+      if (snapshot) PyBuffer_Release(&snapshot_view);
+    if (snapshot) PyBuffer_Release(&snapshot_view);
       return NULL;
     }
-    if (igraph_betweenness_sample_vc_sample_size(&self->g, &res, &stats,
-          &stats_names, sample_size, vs, PyObject_IsTrue(directed),
+    if (igraph_betweenness_sample_vc(&self->g, &res, &stats, &stats_names,
+          epsilon, delta, diameter, vs, PyObject_IsTrue(directed),
           (igraph_integer_t)PyInt_AsLong(cutoff_num), weights,
-          PyObject_IsTrue(nobigint))) {
+          PyObject_IsTrue(nobigint), threads,
+          PyObject_IsTrue(bidirectional), PyObject_IsTrue(group_sources),
+          landmarks, PyObject_IsTrue(progressive), snapshot)) {
       igraph_vs_destroy(&vs);
       igraph_vector_destroy(&res);
       igraph_vector_destroy(&stats);
       igraph_strvector_destroy(&stats_names);
       if (weights) { igraph_vector_destroy(weights); free(weights); }
+      if (landmarks) PyBuffer_Release(&landmarks_view);
+      if (snapshot) PyBuffer_Release(&snapshot_view);
+    if (snapshot) PyBuffer_Release(&snapshot_view);
       Py_DECREF(cutoff_num);
       igraphmodule_handle_igraph_error();
       return NULL;
@@ -4195,21 +4810,38 @@ PyObject
     igraph_vector_destroy(&stats);
     igraph_strvector_destroy(&stats_names);
     if (weights) { igraph_vector_destroy(weights); free(weights); }
+    if (landmarks) PyBuffer_Release(&landmarks_view);
+    if (snapshot) PyBuffer_Release(&snapshot_view);
     return NULL;
   }
 
-  if (!return_single)
-    list = igraphmodule_vector_t_to_PyList(&res, IGRAPHMODULE_TYPE_FLOAT);
-  else
+  if (return_single)
     list = PyFloat_FromDouble(VECTOR(res)[0]);
+  else if (PyObject_IsTrue(as_array))
+    list = igraphmodule_vector_t_to_numpy(&res);
+  else
+    list = igraphmodule_vector_t_to_PyList(&res, IGRAPHMODULE_TYPE_FLOAT);
+  if (list == NULL) {
+    igraph_vs_destroy(&vs);
+    igraph_vector_destroy(&res);
+    igraph_vector_destroy(&stats);
+    igraph_strvector_destroy(&stats_names);
+    if (weights) { igraph_vector_destroy(weights); free(weights); }
+    if (landmarks) PyBuffer_Release(&landmarks_view);
+    if (snapshot) PyBuffer_Release(&snapshot_view);
+    return NULL;
+  }
 
   stats_dict = PyDict_New();
   if (! stats_dict) {
+    Py_DECREF(list);
     igraph_vs_destroy(&vs);
     igraph_vector_destroy(&res);
     igraph_vector_destroy(&stats);
     igraph_strvector_destroy(&stats_names);
     if (weights) { igraph_vector_destroy(weights); free(weights); }
+    if (landmarks) PyBuffer_Release(&landmarks_view);
+    if (snapshot) PyBuffer_Release(&snapshot_view);
     return NULL;
   }
 
@@ -4222,20 +4854,23 @@ PyObject
   igraph_vector_destroy(&res);
   igraph_vs_destroy(&vs);
   if (weights) { igraph_vector_destroy(weights); free(weights); }
+  if (landmarks) PyBuffer_Release(&landmarks_view);
+  if (snapshot) PyBuffer_Release(&snapshot_view);
 
-  return Py_BuildValue("(NN)", stats_dict, list);
+  tuple = Py_BuildValue("(NN)", stats_dict, list);
+  return tuple;
 }
 
 /** \ingroup python_interface_graph
  * \brief Approximates the betweennesses of some vertices in a graph with sampling (VC-Dimension)
  * \return the betweennesses as a list (or a single float)
- * \sa igraph_betweenness_sample_vc
+ * \sa igraph_betweenness_sample_vc_topk
  */
-PyObject *igraphmodule_Graph_betweenness_sample_vc(igraphmodule_GraphObject * self,
+PyObject *igraphmodule_Graph_betweenness_sample_vc_topk(igraphmodule_GraphObject * self,
                                          PyObject * args, PyObject * kwds)
 {
-  static char *kwlist[] = { "epsilon", "delta", "diameter", "vertices", "directed", "cutoff", "weights",
-    "nobigint", NULL };
+  static char *kwlist[] = { "epsilon", "delta", "k", "diameter", "vertices", "directed", "cutoff", "weights",
+    "nobigint", "threads", NULL };
   PyObject *directed = Py_True;
   PyObject *vobj = Py_None, *list;
   PyObject *cutoff = Py_None;
@@ -4243,23 +4878,26 @@ PyObject *igraphmodule_Graph_betweenness_sample_vc(igraphmodule_GraphObject * se
   PyObject *nobigint = Py_True;
   PyObject *stats_dict, *tuple;
   igraph_integer_t diameter = 0;
+  igraph_integer_t k = 0;
+  igraph_integer_t threads = 1;
   igraph_real_t delta = 0.0;
   igraph_real_t epsilon = 0.0;
-  igraph_vector_t res, *weights = NULL;
+  igraph_matrix_t res;
+  igraph_vector_t *weights = NULL;
   igraph_bool_t return_single = 0;
   igraph_vs_t vs;
   igraph_vector_t stats;
   igraph_strvector_t stats_names;
+  long int i;
   int j;
 
-  if (!PyArg_ParseTupleAndKeywords(args, kwds, "ddi|OOOOO", kwlist,
-                                   &epsilon, &delta, &diameter, &vobj, &directed, &cutoff, &weights_o,
-                                   &nobigint)) {
+  if (!PyArg_ParseTupleAndKeywords(args, kwds, "ddii|OOOOOi", kwlist,
+                                   &epsilon, &delta, &k, &diameter, &vobj, &directed, &cutoff, &weights_o,
+                                   &nobigint, &threads)) {
     return NULL;
   }
 
-  if (igraphmodule_attrib_to_vector_t(weights_o, self, &weights,
-	  ATTRIBUTE_TYPE_EDGE)) return NULL;
+  if (igraphmodule_PyObject_to_edge_weights(weights_o, self, &weights)) return NULL;
 
   if (igraphmodule_PyObject_to_vs_t(vobj, &vs, &self->g, &return_single, 0)) {
     if (weights) { igraph_vector_destroy(weights); free(weights); }
@@ -4267,7 +4905,7 @@ PyObject *igraphmodule_Graph_betweenness_sample_vc(igraphmodule_GraphObject * se
     return NULL;
   }
 
-  if (igraph_vector_init(&res, 0)) {
+  if (igraph_matrix_init(&res, 0, 0)) {
     igraph_vs_destroy(&vs);
     if (weights) { igraph_vector_destroy(weights); free(weights); }
     return igraphmodule_handle_igraph_error();
@@ -4275,24 +4913,24 @@ PyObject *igraphmodule_Graph_betweenness_sample_vc(igraphmodule_GraphObject * se
 
   if (igraph_vector_init(&stats, 0)) {
     igraph_vs_destroy(&vs);
-    igraph_vector_destroy(&res);
+    igraph_matrix_destroy(&res);
     if (weights) { igraph_vector_destroy(weights); free(weights); }
     return igraphmodule_handle_igraph_error();
   }
 
   if (igraph_strvector_init(&stats_names, 0)) {
     igraph_vs_destroy(&vs);
-    igraph_vector_destroy(&res);
+    igraph_matrix_destroy(&res);
     if (weights) { igraph_vector_destroy(weights); free(weights); }
     return igraphmodule_handle_igraph_error();
   }
 
   if (cutoff == Py_None) {
-    if (igraph_betweenness_sample_vc(&self->g, &res, &stats, &stats_names,
-          epsilon, delta, diameter, vs, PyObject_IsTrue(directed), -1, weights,
-          PyObject_IsTrue(nobigint))) {
+    if (igraph_betweenness_sample_vc_topk(&self->g, &res, &stats, &stats_names,
+          epsilon, delta, k, diameter, vs, PyObject_IsTrue(directed), -1, weights,
+          PyObject_IsTrue(nobigint), threads)) {
       igraph_vs_destroy(&vs);
-      igraph_vector_destroy(&res);
+      igraph_matrix_destroy(&res);
       igraph_vector_destroy(&stats);
       igraph_strvector_destroy(&stats_names);
       if (weights) { igraph_vector_destroy(weights); free(weights); }
@@ -4303,18 +4941,18 @@ PyObject *igraphmodule_Graph_betweenness_sample_vc(igraphmodule_GraphObject * se
     PyObject *cutoff_num = PyNumber_Int(cutoff);
     if (cutoff_num == NULL) {
       igraph_vs_destroy(&vs);
-      igraph_vector_destroy(&res);
+      igraph_matrix_destroy(&res);
       igraph_vector_destroy(&stats);
       igraph_strvector_destroy(&stats_names);
       if (weights) { igraph_vector_destroy(weights); free(weights); }
       return NULL;
     }
-    if (igraph_betweenness_sample_vc(&self->g, &res, &stats, &stats_names,
-          epsilon, delta, diameter, vs, PyObject_IsTrue(directed),
+    if (igraph_betweenness_sample_vc_topk(&self->g, &res, &stats, &stats_names,
+          epsilon, delta, k, diameter, vs, PyObject_IsTrue(directed),
           (igraph_integer_t)PyInt_AsLong(cutoff_num), weights,
-          PyObject_IsTrue(nobigint))) {
+          PyObject_IsTrue(nobigint), threads)) {
       igraph_vs_destroy(&vs);
-      igraph_vector_destroy(&res);
+      igraph_matrix_destroy(&res);
       igraph_vector_destroy(&stats);
       igraph_strvector_destroy(&stats_names);
       if (weights) { igraph_vector_destroy(weights); free(weights); }
@@ -4326,22 +4964,33 @@ PyObject *igraphmodule_Graph_betweenness_sample_vc(igraphmodule_GraphObject * se
   } else {
     PyErr_SetString(PyExc_TypeError, "cutoff value must be None or integer");
     igraph_vs_destroy(&vs);
-    igraph_vector_destroy(&res);
+    igraph_matrix_destroy(&res);
     igraph_vector_destroy(&stats);
     igraph_strvector_destroy(&stats_names);
     if (weights) { igraph_vector_destroy(weights); free(weights); }
     return NULL;
   }
 
-  if (!return_single)
-    list = igraphmodule_vector_t_to_PyList(&res, IGRAPHMODULE_TYPE_FLOAT);
-  else
-    list = PyFloat_FromDouble(VECTOR(res)[0]);
+  /* One (vertex, estimate, lower bound, upper bound) tuple per candidate */
+  list = PyList_New(igraph_matrix_nrow(&res));
+  if (!list) {
+    igraph_vs_destroy(&vs);
+    igraph_matrix_destroy(&res);
+    igraph_vector_destroy(&stats);
+    igraph_strvector_destroy(&stats_names);
+    if (weights) { igraph_vector_destroy(weights); free(weights); }
+    return NULL;
+  }
+  for (i = 0; i < igraph_matrix_nrow(&res); i++) {
+    PyList_SET_ITEM(list, i, Py_BuildValue("(lddd)", (long) MATRIX(res, i, 0),
+          MATRIX(res, i, 1), MATRIX(res, i, 2), MATRIX(res, i, 3)));
+  }
 
   stats_dict = PyDict_New();
   if (! stats_dict) {
+    Py_DECREF(list);
     igraph_vs_destroy(&vs);
-    igraph_vector_destroy(&res);
+    igraph_matrix_destroy(&res);
     igraph_vector_destroy(&stats);
     igraph_strvector_destroy(&stats_names);
     if (weights) { igraph_vector_destroy(weights); free(weights); }
@@ -4354,7 +5003,7 @@ PyObject *igraphmodule_Graph_betweenness_sample_vc(igraphmodule_GraphObject * se
 
   igraph_strvector_destroy(&stats_names);
   igraph_vector_destroy(&stats);
-  igraph_vector_destroy(&res);
+  igraph_matrix_destroy(&res);
   igraph_vs_destroy(&vs);
   if (weights) { igraph_vector_destroy(weights); free(weights); }
 
@@ -4363,15 +5012,15 @@ PyObject *igraphmodule_Graph_betweenness_sample_vc(igraphmodule_GraphObject * se
 }
 
 /** \ingroup python_interface_graph
- * \brief Approximates the betweennesses of some vertices in a graph with sampling (VC-Dimension)
- * \return the betweennesses as a list (or a single float)
- * \sa igraph_betweenness_sample_vc_topk
+ * \brief Estimates the betweennesses of some vertices within a relative error with sampling (VC-Dimension)
+ * \return the estimates and bounds of the vertices as a list of tuples
+ * \sa igraph_betweenness_sample_vc_query
  */
-PyObject *igraphmodule_Graph_betweenness_sample_vc_topk(igraphmodule_GraphObject * self,
+PyObject *igraphmodule_Graph_betweenness_sample_vc_query(igraphmodule_GraphObject * self,
                                          PyObject * args, PyObject * kwds)
 {
-  static char *kwlist[] = { "epsilon", "delta", "k", "diameter", "vertices", "directed", "cutoff", "weights",
-    "nobigint", NULL };
+  static char *kwlist[] = { "epsilon", "delta", "threshold", "diameter", "vertices", "directed", "cutoff", "weights",
+    "nobigint", "threads", NULL };
   PyObject *directed = Py_True;
   PyObject *vobj = Py_None, *list;
   PyObject *cutoff = Py_None;
@@ -4379,24 +5028,26 @@ PyObject *igraphmodule_Graph_betweenness_sample_vc_topk(igraphmodule_GraphObject
   PyObject *nobigint = Py_True;
   PyObject *stats_dict, *tuple;
   igraph_integer_t diameter = 0;
-  igraph_integer_t k = 0;
+  igraph_integer_t threads = 1;
   igraph_real_t delta = 0.0;
   igraph_real_t epsilon = 0.0;
-  igraph_vector_t res, *weights = NULL;
+  igraph_real_t threshold = 0.0;
+  igraph_matrix_t res;
+  igraph_vector_t *weights = NULL;
   igraph_bool_t return_single = 0;
   igraph_vs_t vs;
   igraph_vector_t stats;
   igraph_strvector_t stats_names;
+  long int i;
   int j;
 
-  if (!PyArg_ParseTupleAndKeywords(args, kwds, "ddii|OOOOO", kwlist,
-                                   &epsilon, &delta, &k, &diameter, &vobj, &directed, &cutoff, &weights_o,
-                                   &nobigint)) {
+  if (!PyArg_ParseTupleAndKeywords(args, kwds, "dddi|OOOOOi", kwlist,
+                                   &epsilon, &delta, &threshold, &diameter, &vobj, &directed, &cutoff, &weights_o,
+                                   &nobigint, &threads)) {
     return NULL;
   }
 
-  if (igraphmodule_attrib_to_vector_t(weights_o, self, &weights,
-	  ATTRIBUTE_TYPE_EDGE)) return NULL;
+  if (igraphmodule_PyObject_to_edge_weights(weights_o, self, &weights)) return NULL;
 
   if (igraphmodule_PyObject_to_vs_t(vobj, &vs, &self->g, &return_single, 0)) {
     if (weights) { igraph_vector_destroy(weights); free(weights); }
@@ -4404,7 +5055,7 @@ PyObject *igraphmodule_Graph_betweenness_sample_vc_topk(igraphmodule_GraphObject
     return NULL;
   }
 
-  if (igraph_vector_init(&res, 0)) {
+  if (igraph_matrix_init(&res, 0, 0)) {
     igraph_vs_destroy(&vs);
     if (weights) { igraph_vector_destroy(weights); free(weights); }
     return igraphmodule_handle_igraph_error();
@@ -4412,24 +5063,25 @@ PyObject *igraphmodule_Graph_betweenness_sample_vc_topk(igraphmodule_GraphObject
 
   if (igraph_vector_init(&stats, 0)) {
     igraph_vs_destroy(&vs);
-    igraph_vector_destroy(&res);
+    igraph_matrix_destroy(&res);
     if (weights) { igraph_vector_destroy(weights); free(weights); }
     return igraphmodule_handle_igraph_error();
   }
 
   if (igraph_strvector_init(&stats_names, 0)) {
     igraph_vs_destroy(&vs);
-    igraph_vector_destroy(&res);
+    igraph_matrix_destroy(&res);
+    igraph_vector_destroy(&stats);
     if (weights) { igraph_vector_destroy(weights); free(weights); }
     return igraphmodule_handle_igraph_error();
   }
 
   if (cutoff == Py_None) {
-    if (igraph_betweenness_sample_vc_topk(&self->g, &res, &stats, &stats_names,
-          epsilon, delta, k, diameter, vs, PyObject_IsTrue(directed), -1, weights,
-          PyObject_IsTrue(nobigint))) {
+    if (igraph_betweenness_sample_vc_query(&self->g, &res, &stats, &stats_names,
+          epsilon, delta, threshold, diameter, vs, PyObject_IsTrue(directed), -1,
+          weights, PyObject_IsTrue(nobigint), threads)) {
       igraph_vs_destroy(&vs);
-      igraph_vector_destroy(&res);
+      igraph_matrix_destroy(&res);
       igraph_vector_destroy(&stats);
       igraph_strvector_destroy(&stats_names);
       if (weights) { igraph_vector_destroy(weights); free(weights); }
@@ -4440,18 +5092,18 @@ PyObject *igraphmodule_Graph_betweenness_sample_vc_topk(igraphmodule_GraphObject
     PyObject *cutoff_num = PyNumber_Int(cutoff);
     if (cutoff_num == NULL) {
       igraph_vs_destroy(&vs);
-      igraph_vector_destroy(&res);
+      igraph_matrix_destroy(&res);
       igraph_vector_destroy(&stats);
       igraph_strvector_destroy(&stats_names);
       if (weights) { igraph_vector_destroy(weights); free(weights); }
       return NULL;
     }
-    if (igraph_betweenness_sample_vc_topk(&self->g, &res, &stats, &stats_names,
-          epsilon, delta, k, diameter, vs, PyObject_IsTrue(directed),
+    if (igraph_betweenness_sample_vc_query(&self->g, &res, &stats, &stats_names,
+          epsilon, delta, threshold, diameter, vs, PyObject_IsTrue(directed),
           (igraph_integer_t)PyInt_AsLong(cutoff_num), weights,
-          PyObject_IsTrue(nobigint))) {
+          PyObject_IsTrue(nobigint), threads)) {
       igraph_vs_destroy(&vs);
-      igraph_vector_destroy(&res);
+      igraph_matrix_destroy(&res);
       igraph_vector_destroy(&stats);
       igraph_strvector_destroy(&stats_names);
       if (weights) { igraph_vector_destroy(weights); free(weights); }
@@ -4463,22 +5115,35 @@ PyObject *igraphmodule_Graph_betweenness_sample_vc_topk(igraphmodule_GraphObject
   } else {
     PyErr_SetString(PyExc_TypeError, "cutoff value must be None or integer");
     igraph_vs_destroy(&vs);
-    igraph_vector_destroy(&res);
+    igraph_matrix_destroy(&res);
     igraph_vector_destroy(&stats);
     igraph_strvector_destroy(&stats_names);
     if (weights) { igraph_vector_destroy(weights); free(weights); }
     return NULL;
   }
 
-  if (!return_single)
-    list = igraphmodule_vector_t_to_PyList(&res, IGRAPHMODULE_TYPE_FLOAT);
-  else
-    list = PyFloat_FromDouble(VECTOR(res)[0]);
+  /* One (vertex, estimate, lower bound, upper bound, status) tuple per
+   * query vertex */
+  list = PyList_New(igraph_matrix_nrow(&res));
+  if (!list) {
+    igraph_vs_destroy(&vs);
+    igraph_matrix_destroy(&res);
+    igraph_vector_destroy(&stats);
+    igraph_strvector_destroy(&stats_names);
+    if (weights) { igraph_vector_destroy(weights); free(weights); }
+    return NULL;
+  }
+  for (i = 0; i < igraph_matrix_nrow(&res); i++) {
+    PyList_SET_ITEM(list, i, Py_BuildValue("(ldddi)", (long) MATRIX(res, i, 0),
+          MATRIX(res, i, 1), MATRIX(res, i, 2), MATRIX(res, i, 3),
+          (int) MATRIX(res, i, 4)));
+  }
 
   stats_dict = PyDict_New();
   if (! stats_dict) {
+    Py_DECREF(list);
     igraph_vs_destroy(&vs);
-    igraph_vector_destroy(&res);
+    igraph_matrix_destroy(&res);
     igraph_vector_destroy(&stats);
     igraph_strvector_destroy(&stats_names);
     if (weights) { igraph_vector_destroy(weights); free(weights); }
@@ -4491,7 +5156,7 @@ PyObject *igraphmodule_Graph_betweenness_sample_vc_topk(igraphmodule_GraphObject
 
   igraph_strvector_destroy(&stats_names);
   igraph_vector_destroy(&stats);
-  igraph_vector_destroy(&res);
+  igraph_matrix_destroy(&res);
   igraph_vs_destroy(&vs);
   if (weights) { igraph_vector_destroy(weights); free(weights); }
 
@@ -5106,6 +5771,228 @@ PyObject *igraphmodule_Graph_edge_betweenness(igraphmodule_GraphObject * self,
   return list;
 }
 
+/** \ingroup python_interface_graph
+ * \brief Runs the edge betweenness sampling for
+ * \c igraphmodule_Graph_edge_betweenness_sample_vc and
+ * \c igraphmodule_Graph_edge_betweenness_sample_vc_sample_size, with the
+ * sample size from \c epsilon and \c delta if \c sample_size is zero.
+ * \return a tuple with the stats, the edge estimates and, if
+ * \c vertex_estimates is true, the vertex estimates of the same samples
+ */
+PyObject *igraphmodule_i_Graph_edge_betweenness_sample_vc(
+    igraphmodule_GraphObject *self, igraph_real_t epsilon,
+    igraph_real_t delta, igraph_integer_t diameter,
+    igraph_integer_t sample_size, PyObject *directed, PyObject *cutoff,
+    PyObject *weights_o, PyObject *nobigint, int threads,
+    PyObject *bidirectional, PyObject *group_sources, PyObject *landmarks_o,
+    PyObject *vertex_estimates, PyObject *as_array) {
+  PyObject *stats_dict, *edge_list, *vertex_list = NULL, *value;
+  igraph_vector_t res, vertex_res, *weights = 0;
+  igraph_vector_t stats;
+  igraph_strvector_t stats_names;
+  igraph_real_t cutoff_value = -1;
+  igraph_matrix_t landmarks_matrix, *landmarks;
+  Py_buffer landmarks_view;
+  int j, retval;
+
+  if (cutoff != Py_None) {
+    PyObject *cutoff_num;
+    if (!PyNumber_Check(cutoff)) {
+      PyErr_SetString(PyExc_TypeError, "cutoff value must be None or integer");
+      return NULL;
+    }
+    cutoff_num = PyNumber_Int(cutoff);
+    if (cutoff_num == NULL)
+      return NULL;
+    cutoff_value = (igraph_integer_t)PyInt_AsLong(cutoff_num);
+    Py_DECREF(cutoff_num);
+  }
+
+  if (igraphmodule_PyObject_to_landmarks(landmarks_o, &self->g,
+        &landmarks_view, &landmarks_matrix, &landmarks)) return NULL;
+
+  if (igraphmodule_PyObject_to_edge_weights(weights_o, self, &weights)) {
+    if (landmarks) PyBuffer_Release(&landmarks_view);
+    return NULL;
+  }
+
+  if (igraph_vector_init(&res, 0)) {
+    if (weights) { igraph_vector_destroy(weights); free(weights); }
+    if (landmarks) PyBuffer_Release(&landmarks_view);
+    return igraphmodule_handle_igraph_error();
+  }
+
+  if (igraph_vector_init(&vertex_res, 0)) {
+    igraph_vector_destroy(&res);
+    if (weights) { igraph_vector_destroy(weights); free(weights); }
+    if (landmarks) PyBuffer_Release(&landmarks_view);
+    return igraphmodule_handle_igraph_error();
+  }
+
+  if (igraph_vector_init(&stats, 0)) {
+    igraph_vector_destroy(&vertex_res);
+    igraph_vector_destroy(&res);
+    if (weights) { igraph_vector_destroy(weights); free(weights); }
+    if (landmarks) PyBuffer_Release(&landmarks_view);
+    return igraphmodule_handle_igraph_error();
+  }
+
+  if (igraph_strvector_init(&stats_names, 0)) {
+    igraph_vector_destroy(&stats);
+    igraph_vector_destroy(&vertex_res);
+    igraph_vector_destroy(&res);
+    if (weights) { igraph_vector_destroy(weights); free(weights); }
+    if (landmarks) PyBuffer_Release(&landmarks_view);
+    return igraphmodule_handle_igraph_error();
+  }
+
+  if (sample_size > 0) {
+    retval = igraph_edge_betweenness_sample_vc_sample_size(&self->g, &res,
+        PyObject_IsTrue(vertex_estimates) ? &vertex_res : 0, &stats,
+        &stats_names, sample_size, PyObject_IsTrue(directed), cutoff_value,
+        weights, PyObject_IsTrue(nobigint), threads,
+        PyObject_IsTrue(bidirectional), PyObject_IsTrue(group_sources),
+        landmarks);
+  } else {
+    retval = igraph_edge_betweenness_sample_vc(&self->g, &res,
+        PyObject_IsTrue(vertex_estimates) ? &vertex_res : 0, &stats,
+        &stats_names, epsilon, delta, diameter, PyObject_IsTrue(directed),
+        cutoff_value, weights, PyObject_IsTrue(nobigint), threads,
+        PyObject_IsTrue(bidirectional), PyObject_IsTrue(group_sources),
+        landmarks);
+  }
+  if (weights) { igraph_vector_destroy(weights); free(weights); }
+  if (landmarks) PyBuffer_Release(&landmarks_view);
+  if (retval) {
+    igraph_strvector_destroy(&stats_names);
+    igraph_vector_destroy(&stats);
+    igraph_vector_destroy(&vertex_res);
+    igraph_vector_destroy(&res);
+    return igraphmodule_handle_igraph_error();
+  }
+
+  if (PyObject_IsTrue(as_array))
+    edge_list = igraphmodule_vector_t_to_numpy(&res);
+  else
+    edge_list = igraphmodule_vector_t_to_PyList(&res, IGRAPHMODULE_TYPE_FLOAT);
+  if (edge_list != NULL && PyObject_IsTrue(vertex_estimates)) {
+    if (PyObject_IsTrue(as_array))
+      vertex_list = igraphmodule_vector_t_to_numpy(&vertex_res);
+    else
+      vertex_list = igraphmodule_vector_t_to_PyList(&vertex_res,
+          IGRAPHMODULE_TYPE_FLOAT);
+    if (vertex_list == NULL) {
+      Py_DECREF(edge_list);
+      edge_list = NULL;
+    }
+  }
+  igraph_vector_destroy(&vertex_res);
+  igraph_vector_destroy(&res);
+
+  stats_dict = edge_list == NULL ? NULL : PyDict_New();
+  for (j=0; stats_dict && j < igraph_strvector_size(&stats_names); j++) {
+    value = PyFloat_FromDouble(VECTOR(stats)[j]);
+    if (value == NULL || PyDict_SetItemString(stats_dict, STR(stats_names, j), value)) {
+      Py_XDECREF(value);
+      Py_DECREF(stats_dict);
+      stats_dict = NULL;
+    } else {
+      Py_DECREF(value);
+    }
+  }
+  igraph_strvector_destroy(&stats_names);
+  igraph_vector_destroy(&stats);
+
+  if (stats_dict == NULL) {
+    Py_XDECREF(edge_list);
+    Py_XDECREF(vertex_list);
+    return NULL;
+  }
+
+  if (vertex_list != NULL)
+    return Py_BuildValue("(NNN)", stats_dict, edge_list, vertex_list);
+  return Py_BuildValue("(NN)", stats_dict, edge_list);
+}
+
+/** \ingroup python_interface_graph
+ * \brief Approximates the edge betweennesses in a graph with sampling (VC-Dimension)
+ * \return the stats and the edge betweennesses, and optionally the vertex
+ * betweennesses from the same samples
+ * \sa igraph_edge_betweenness_sample_vc
+ */
+PyObject *igraphmodule_Graph_edge_betweenness_sample_vc(
+    igraphmodule_GraphObject *self, PyObject *args, PyObject *kwds) {
+  static char *kwlist[] = { "epsilon", "delta", "diameter", "directed",
+    "cutoff", "weights", "nobigint", "threads", "bidirectional",
+    "group_sources", "landmarks", "vertex_estimates", "as_array", NULL };
+  PyObject *directed = Py_True;
+  PyObject *cutoff = Py_None;
+  PyObject *weights_o = Py_None;
+  PyObject *nobigint = Py_True;
+  PyObject *bidirectional = Py_True;
+  PyObject *group_sources = Py_False;
+  PyObject *landmarks_o = Py_None;
+  PyObject *vertex_estimates = Py_False;
+  PyObject *as_array = Py_False;
+  igraph_integer_t diameter = 0;
+  igraph_real_t delta = 0.0;
+  igraph_real_t epsilon = 0.0;
+  int threads = 1;
+
+  if (!PyArg_ParseTupleAndKeywords(args, kwds, "ddi|OOOOiOOOOO", kwlist,
+                                   &epsilon, &delta, &diameter, &directed,
+                                   &cutoff, &weights_o, &nobigint, &threads,
+                                   &bidirectional, &group_sources,
+                                   &landmarks_o, &vertex_estimates, &as_array)) {
+    return NULL;
+  }
+
+  return igraphmodule_i_Graph_edge_betweenness_sample_vc(self, epsilon,
+      delta, diameter, 0, directed, cutoff, weights_o, nobigint, threads,
+      bidirectional, group_sources, landmarks_o, vertex_estimates, as_array);
+}
+
+/** \ingroup python_interface_graph
+ * \brief Approximates the edge betweennesses in a graph from a given number of samples
+ * \return the stats and the edge betweennesses, and optionally the vertex
+ * betweennesses from the same samples
+ * \sa igraph_edge_betweenness_sample_vc_sample_size
+ */
+PyObject *igraphmodule_Graph_edge_betweenness_sample_vc_sample_size(
+    igraphmodule_GraphObject *self, PyObject *args, PyObject *kwds) {
+  static char *kwlist[] = { "sample_size", "directed", "cutoff", "weights",
+    "nobigint", "threads", "bidirectional", "group_sources", "landmarks",
+    "vertex_estimates", "as_array", NULL };
+  PyObject *directed = Py_True;
+  PyObject *cutoff = Py_None;
+  PyObject *weights_o = Py_None;
+  PyObject *nobigint = Py_True;
+  PyObject *bidirectional = Py_True;
+  PyObject *group_sources = Py_False;
+  PyObject *landmarks_o = Py_None;
+  PyObject *vertex_estimates = Py_False;
+  PyObject *as_array = Py_False;
+  igraph_integer_t sample_size = 0;
+  int threads = 1;
+
+  if (!PyArg_ParseTupleAndKeywords(args, kwds, "i|OOOOiOOOOO", kwlist,
+                                   &sample_size, &directed, &cutoff,
+                                   &weights_o, &nobigint, &threads,
+                                   &bidirectional, &group_sources,
+                                   &landmarks_o, &vertex_estimates, &as_array)) {
+    return NULL;
+  }
+
+  if (sample_size < 1) {
+    PyErr_SetString(PyExc_ValueError, "sample size must be positive");
+    return NULL;
+  }
+
+  return igraphmodule_i_Graph_edge_betweenness_sample_vc(self, 0, 0, 0,
+      sample_size, directed, cutoff, weights_o, nobigint, threads,
+      bidirectional, group_sources, landmarks_o, vertex_estimates, as_array);
+}
+
 /** \ingroup python_interface_graph
  * \brief Calculates the edge connectivity of the graph
  * \return the edge connectivity
@@ -12755,7 +13642,7 @@ struct PyMethodDef igraphmodule_Graph_methods[] = {
   /* interface to igraph_betweenness[_estimate] */
   {"betweenness", (PyCFunction) igraphmodule_Graph_betweenness,
    METH_VARARGS | METH_KEYWORDS,
-   "betweenness(vertices=None, directed=True, cutoff=None, weights=None, nobigint=True)\n\n"
+   "betweenness(vertices=None, directed=True, cutoff=None, weights=None, nobigint=True, as_array=False)\n\n"
    "Calculates or estimates the betweenness of vertices in a graph.\n\n"
    "Keyword arguments:\n"
    "@param vertices: the vertices for which the betweennesses must be returned.\n"
@@ -12773,12 +13660,14 @@ struct PyMethodDef igraphmodule_Graph_methods[] = {
    "  To prevent this, use C{nobigint=False}, which forces igraph to use\n"
    "  arbitrary precision integers at the expense of increased computation\n"
    "  time.\n"
+   "@param as_array: if C{True}, the betweennesses are returned in a NumPy\n"
+   "  array that shares the memory of the result instead of a list.\n"
    "@return: the (possibly estimated) betweenness of the given vertices in a list\n"},
 
   /* interface to igraph_betweenness_sample_gss_linear_sample_size */
   {"betweenness_sample_gss_linear_sample_size", (PyCFunction) igraphmodule_Graph_betweenness_sample_gss_linear_sample_size,
   METH_VARARGS | METH_KEYWORDS,
-  "betweenness_sample_gss_linear_sample_size(sample_size, vertices=None, directed=True, cutoff=None, weights=None, nobigint=True)\n\n"
+  "betweenness_sample_gss_linear_sample_size(sample_size, vertices=None, directed=True, cutoff=None, weights=None, nobigint=True, as_array=False)\n\n"
   "Estimates the betweennesses of some vertices in a graph with sampling (Geisberger et al., linear scaling)\n\n"
   "@param sample_size: the sample size to use.\n"
   "Keyword arguments:\n"
@@ -12795,12 +13684,14 @@ struct PyMethodDef igraphmodule_Graph_methods[] = {
    "  To prevent this, use C{nobigint=False}, which forces igraph to use\n"
    "  arbitrary precision integers at the expense of increased computation\n"
    "  time.\n"
+   "@param as_array: if C{True}, the betweennesses are returned in a NumPy\n"
+   "  array that shares the memory of the result instead of a list.\n"
    "@return: the estimated betweenness of the given vertices in a list\n" },
 
   /* interface to igraph_betweenness_sample_gss_linear */
   {"betweenness_sample_gss_linear", (PyCFunction) igraphmodule_Graph_betweenness_sample_gss_linear,
   METH_VARARGS | METH_KEYWORDS,
-  "betweenness_sample_gss_linear(epsilon, delta, vertices=None, directed=True, cutoff=None, weights=None, nobigint=True)\n\n"
+  "betweenness_sample_gss_linear(epsilon, delta, vertices=None, directed=True, cutoff=None, weights=None, nobigint=True, as_array=False)\n\n"
   "Estimates the betweennesses of some vertices in a graph with sampling (Geisberger et al, linear scaling)\n\n"
   "@param epsilon: the accuracy parameter for the estimations.\n"
   "@param delta: the confidence parameter for the estimations.\n"
@@ -12818,12 +13709,14 @@ struct PyMethodDef igraphmodule_Graph_methods[] = {
    "  To prevent this, use C{nobigint=False}, which forces igraph to use\n"
    "  arbitrary precision integers at the expense of increased computation\n"
    "  time.\n"
+   "@param as_array: if C{True}, the betweennesses are returned in a NumPy\n"
+   "  array that shares the memory of the result instead of a list.\n"
    "@return: the estimated betweenness of the given vertices in a list\n" },
 
   /* interface to igraph_betweenness_sample_bp_sample_size */
   {"betweenness_sample_bp_sample_size", (PyCFunction) igraphmodule_Graph_betweenness_sample_bp_sample_size,
   METH_VARARGS | METH_KEYWORDS,
-  "betweenness_sample_bp_sample_size(sample_size, vertices=None, directed=True, cutoff=None, weights=None, nobigint=True)\n\n"
+  "betweenness_sample_bp_sample_size(sample_size, vertices=None, directed=True, cutoff=None, weights=None, nobigint=True, as_array=False)\n\n"
   "Estimates the betweennesses of some vertices in a graph with sampling (Barnes and Pich)\n\n"
   "@param sample_size: the sample size to use.\n"
   "Keyword arguments:\n"
@@ -12840,12 +13733,14 @@ struct PyMethodDef igraphmodule_Graph_methods[] = {
    "  To prevent this, use C{nobigint=False}, which forces igraph to use\n"
    "  arbitrary precision integers at the expense of increased computation\n"
    "  time.\n"
+   "@param as_array: if C{True}, the betweennesses are returned in a NumPy\n"
+   "  array that shares the memory of the result instead of a list.\n"
    "@return: the estimated betweenness of the given vertices in a list\n" },
 
   /* interface to igraph_betweenness_sample_bp */
   {"betweenness_sample_bp", (PyCFunction) igraphmodule_Graph_betweenness_sample_bp,
   METH_VARARGS | METH_KEYWORDS,
-  "betweenness_sample_bp(epsilon, delta, vertices=None, directed=True, cutoff=None, weights=None, nobigint=True)\n\n"
+  "betweenness_sample_bp(epsilon, delta, vertices=None, directed=True, cutoff=None, weights=None, nobigint=True, as_array=False)\n\n"
   "Estimates the betweennesses of some vertices in a graph with sampling (Barnes and Pich)\n\n"
   "@param epsilon: the accuracy parameter for the estimations.\n"
   "@param delta: the confidence parameter for the estimations.\n"
@@ -12863,12 +13758,32 @@ struct PyMethodDef igraphmodule_Graph_methods[] = {
    "  To prevent this, use C{nobigint=False}, which forces igraph to use\n"
    "  arbitrary precision integers at the expense of increased computation\n"
    "  time.\n"
+   "@param as_array: if C{True}, the betweennesses are returned in a NumPy\n"
+   "  array that shares the memory of the result instead of a list.\n"
    "@return: the estimated betweenness of the given vertices in a list\n" },
 
+  /* interface to igraph_betweenness_landmarks */
+  {"betweenness_landmarks", (PyCFunction) igraphmodule_Graph_betweenness_landmarks,
+  METH_VARARGS | METH_KEYWORDS,
+  "betweenness_landmarks(landmarks=16, directed=True, weights=None)\n\n"
+  "Picks landmarks and computes their distances to all the vertices, for the\n"
+  "goal-directed search of the VC sampling on weighted graphs\n\n"
+  "The landmarks are picked by farthest selection. The distances only\n"
+  "depend on the graph, the weights and C{directed}, and can be reused by\n"
+  "any number of sampling runs.\n\n"
+  "@param landmarks: the number of landmarks.\n"
+  "@param directed: whether to consider directed paths.\n"
+  "@param weights: edge weights to be used, which must be positive. Can be\n"
+  "  a sequence or iterable or even an edge attribute name.\n"
+  "@return: a tuple with the list of the landmarks and their distances as\n"
+  "  C{bytes}: the distances of each vertex are contiguous doubles, to the\n"
+  "  landmarks and then, on directed graphs, from them. The C{bytes} are\n"
+  "  passed as the C{landmarks} argument of L{betweenness_sample_vc()}.\n" },
+
   /* interface to igraph_betweenness_sample_vc_sample_size */
   {"betweenness_sample_vc_sample_size", (PyCFunction) igraphmodule_Graph_betweenness_sample_vc_sample_size,
   METH_VARARGS | METH_KEYWORDS,
-  "betweenness_sample_vc_sample_size(sample_size, vertices=None, directed=True, cutoff=None, weights=None, nobigint=True)\n\n"
+  "betweenness_sample_vc_sample_size(sample_size, vertices=None, directed=True, cutoff=None, weights=None, nobigint=True, threads=1, bidirectional=True, group_sources=False, landmarks=None, snapshot=None, as_array=False)\n\n"
   "Estimates the betweennesses of some vertices in a graph with sampling (VC-Dimension)\n\n"
   "@param sample_size: the sample size to use.\n"
   "Keyword arguments:\n"
@@ -12885,12 +13800,38 @@ struct PyMethodDef igraphmodule_Graph_methods[] = {
    "  To prevent this, use C{nobigint=False}, which forces igraph to use\n"
    "  arbitrary precision integers at the expense of increased computation\n"
    "  time.\n"
+   "@param threads: the number of threads sampling the pairs of vertices.\n"
+   "  Each thread uses its own random number generator, seeded from the\n"
+   "  default one.\n"
+   "@param bidirectional: whether to search for the shortest paths between\n"
+   "  a sampled pair of vertices from both vertices at once, with a\n"
+   "  bidirectional Dijkstra search on weighted graphs. Unweighted graphs\n"
+   "  need C{nobigint=True} for this.\n"
+   "@param group_sources: whether to sample all the pairs of vertices first\n"
+   "  and to run a single search from each distinct source for all the\n"
+   "  destinations sampled with it. Overrides C{bidirectional}.\n"
+   "@param landmarks: the landmark distances returned by\n"
+   "  L{betweenness_landmarks()} for the same weights and C{directed}. On\n"
+   "  weighted graphs, each sampled pair is then searched with an A* search\n"
+   "  guided by them, which overrides C{bidirectional}.\n"
+   "@param snapshot: a writable buffer of at least 2*(n+1)+2 doubles, n being\n"
+   "  the number of vertices (e.g. a C{multiprocessing.RawArray('d', ...)}),\n"
+   "  where the raw counts are published about every 1% of the samples, so\n"
+   "  that another process can build an estimate if this one is killed.\n"
+   "  C{snapshot[0]} is the index of the last complete slot (-1 if none) and\n"
+   "  C{snapshot[1]} the largest number of samples that will be taken; slot\n"
+   "  C{i} starts at C{2+i*(n+1)} with the number of samples taken, followed\n"
+   "  by the number of sampled paths each vertex is internal to. The number\n"
+   "  of samples of a slot is -1 while it is rewritten, so a reader can read\n"
+   "  it before and after the counts to check that they are consistent.\n"
+   "@param as_array: if C{True}, the betweennesses are returned in a NumPy\n"
+   "  array that shares the memory of the result instead of a list.\n"
    "@return: the estimated betweenness of the given vertices in a list\n" },
 
   /* interface to igraph_betweenness_sample_vc */
   {"betweenness_sample_vc", (PyCFunction) igraphmodule_Graph_betweenness_sample_vc,
   METH_VARARGS | METH_KEYWORDS,
-  "betweenness_sample_vc(epsilon, delta, diameter, vertices=None, directed=True, cutoff=None, weights=None, nobigint=True)\n\n"
+  "betweenness_sample_vc(epsilon, delta, diameter, vertices=None, directed=True, cutoff=None, weights=None, nobigint=True, threads=1, bidirectional=True, group_sources=False, progressive=False, landmarks=None, snapshot=None, as_array=False)\n\n"
   "Estimates the betweennesses of some vertices in a graph with sampling (VC-Dimension)\n\n"
   "@param epsilon: the accuracy parameter for the estimations.\n"
   "@param delta: the confidence parameter for the estimations.\n"
@@ -12901,7 +13842,9 @@ struct PyMethodDef igraphmodule_Graph_methods[] = {
    "  If C{None}, assumes all of the vertices in the graph.\n"
    "@param directed: whether to consider directed paths.\n"
    "@param cutoff: if it is an integer, only paths less than or equal to this\n"
-   "  length are considered,  If C{None}, all paths are considered.\n"
+   "  length are considered,  If C{None}, all paths are considered. The\n"
+   "  sample size is computed from the smaller of the diameter and the\n"
+   "  largest number of edges of such a path.\n"
    "@param weights: edge weights to be used. Can be a sequence or iterable or\n"
    "  even an edge attribute name.\n"
    "@param nobigint: if C{True}, igraph uses the longest available integer\n"
@@ -12910,13 +13853,43 @@ struct PyMethodDef igraphmodule_Graph_methods[] = {
    "  To prevent this, use C{nobigint=False}, which forces igraph to use\n"
    "  arbitrary precision integers at the expense of increased computation\n"
    "  time.\n"
+   "@param threads: the number of threads sampling the pairs of vertices.\n"
+   "  Each thread uses its own random number generator, seeded from the\n"
+   "  default one.\n"
+   "@param bidirectional: whether to search for the shortest paths between\n"
+   "  a sampled pair of vertices from both vertices at once, with a\n"
+   "  bidirectional Dijkstra search on weighted graphs. Unweighted graphs\n"
+   "  need C{nobigint=True} for this.\n"
+   "@param group_sources: whether to sample all the pairs of vertices first\n"
+   "  and to run a single search from each distinct source for all the\n"
+   "  destinations sampled with it. Overrides C{bidirectional}.\n"
+   "@param progressive: whether to sample in growing stages and to stop as\n"
+   "  soon as a data-dependent bound (empirical Rademacher or empirical\n"
+   "  Bernstein) guarantees the accuracy. The sample size computed from the\n"
+   "  diameter is only used for the last stage.\n"
+   "@param landmarks: the landmark distances returned by\n"
+   "  L{betweenness_landmarks()} for the same weights and C{directed}. On\n"
+   "  weighted graphs, each sampled pair is then searched with an A* search\n"
+   "  guided by them, which overrides C{bidirectional}.\n"
+   "@param snapshot: a writable buffer of at least 2*(n+1)+2 doubles, n being\n"
+   "  the number of vertices (e.g. a C{multiprocessing.RawArray('d', ...)}),\n"
+   "  where the raw counts are published about every 1% of the samples, so\n"
+   "  that another process can build an estimate if this one is killed.\n"
+   "  C{snapshot[0]} is the index of the last complete slot (-1 if none) and\n"
+   "  C{snapshot[1]} the largest number of samples that will be taken; slot\n"
+   "  C{i} starts at C{2+i*(n+1)} with the number of samples taken, followed\n"
+   "  by the number of sampled paths each vertex is internal to. The number\n"
+   "  of samples of a slot is -1 while it is rewritten, so a reader can read\n"
+   "  it before and after the counts to check that they are consistent.\n"
+   "@param as_array: if C{True}, the betweennesses are returned in a NumPy\n"
+   "  array that shares the memory of the result instead of a list.\n"
    "@return: the estimated betweenness of the given vertices in a list\n" },
 
    /* interface to igraph_betweenness_sample_vc_topk*/
   {"betweenness_sample_vc_topk", (PyCFunction) igraphmodule_Graph_betweenness_sample_vc_topk,
   METH_VARARGS | METH_KEYWORDS,
-  "betweenness_sample_vc_topk(epsilon, delta, k, diameter, vertices=None, directed=True, cutoff=None, weights=None, nobigint=True)\n\n"
-  "Estimates the betweennesses of some vertices in a graph with sampling (VC-Dimension)\n\n"
+  "betweenness_sample_vc_topk(epsilon, delta, k, diameter, vertices=None, directed=True, cutoff=None, weights=None, nobigint=True, threads=1)\n\n"
+  "Finds the candidates to the k vertices with the highest betweenness with sampling (VC-Dimension)\n\n"
   "@param epsilon: the accuracy parameter for the estimations.\n"
   "@param delta: the confidence parameter for the estimations.\n"
   "@param k: the number of vertices to consider.\n"
@@ -12927,7 +13900,9 @@ struct PyMethodDef igraphmodule_Graph_methods[] = {
    "  If C{None}, assumes all of the vertices in the graph.\n"
    "@param directed: whether to consider directed paths.\n"
    "@param cutoff: if it is an integer, only paths less than or equal to this\n"
-   "  length are considered,  If C{None}, all paths are considered.\n"
+   "  length are considered,  If C{None}, all paths are considered. The\n"
+   "  sample size is computed from the smaller of the diameter and the\n"
+   "  largest number of edges of such a path.\n"
    "@param weights: edge weights to be used. Can be a sequence or iterable or\n"
    "  even an edge attribute name.\n"
    "@param nobigint: if C{True}, igraph uses the longest available integer\n"
@@ -12936,14 +13911,57 @@ struct PyMethodDef igraphmodule_Graph_methods[] = {
    "  To prevent this, use C{nobigint=False}, which forces igraph to use\n"
    "  arbitrary precision integers at the expense of increased computation\n"
    "  time.\n"
-   "@return: the estimated betweenness of the given vertices in a list\n" },
+   "@param threads: the number of threads sampling the paths.\n"
+   "@return: the candidates to the top k vertices by decreasing estimate, as\n"
+   "  a list of (vertex, estimate, lower bound, upper bound) tuples. Its size\n"
+   "  does not depend on the number of vertices.\n" },
+
+   /* interface to igraph_betweenness_sample_vc_query*/
+  {"betweenness_sample_vc_query", (PyCFunction) igraphmodule_Graph_betweenness_sample_vc_query,
+  METH_VARARGS | METH_KEYWORDS,
+  "betweenness_sample_vc_query(epsilon, delta, threshold, diameter, vertices=None, directed=True, cutoff=None, weights=None, nobigint=True, threads=1)\n\n"
+  "Estimates the betweenness of some vertices within a relative error with sampling (VC-Dimension)\n\n"
+  "Sampling stops as soon as every given vertex either has an estimate\n"
+  "within a relative error C{epsilon} or is known to have a betweenness\n"
+  "below C{threshold}, according to an empirical Bernstein bound.\n\n"
+  "@param epsilon: the relative error of the estimations.\n"
+  "@param delta: the confidence parameter for the estimations.\n"
+  "@param threshold: the betweenness below which the vertices are not\n"
+  "  estimated within a relative error.\n"
+  "@param diameter: the diameter of the network. -1 for approx. computation.\n"
+  "Keyword arguments:\n"
+   "@param vertices: the vertices to estimate. They should be a few, as the\n"
+   "  sample grows until all of them are settled. If C{None}, assumes all of\n"
+   "  the vertices in the graph.\n"
+   "@param directed: whether to consider directed paths.\n"
+   "@param cutoff: if it is an integer, only paths less than or equal to this\n"
+   "  length are considered,  If C{None}, all paths are considered. The\n"
+   "  sample size is computed from the smaller of the diameter and the\n"
+   "  largest number of edges of such a path.\n"
+   "@param weights: edge weights to be used. Can be a sequence or iterable or\n"
+   "  even an edge attribute name.\n"
+   "@param nobigint: if C{True}, igraph uses the longest available integer\n"
+   "  type on the current platform to count shortest paths. For some large\n"
+   "  networks that have a specific structure, the counters may overflow.\n"
+   "  To prevent this, use C{nobigint=False}, which forces igraph to use\n"
+   "  arbitrary precision integers at the expense of increased computation\n"
+   "  time.\n"
+   "@param threads: the number of threads sampling the paths.\n"
+   "@return: a list of (vertex, estimate, lower bound, upper bound, status)\n"
+   "  tuples, in the order of C{vertices}. The status is 1 if the relative\n"
+   "  error was reached, 0 if the betweenness is below C{threshold}, and -1\n"
+   "  if neither could be guaranteed within the largest sample size.\n" },
 
 
   {"diameter_approximation_motwani", (PyCFunction) igraphmodule_Graph_diameter_approximation_motwani,
     METH_VARARGS | METH_KEYWORDS,
-    "diameter_approximation_motwani()\n\n"
-    "Runs the 2/3 approxiamtion algorithm for diameter. \n\n"
-    "@param graph: the graph\n"
+    "diameter_approximation_motwani(k=-1, threads=1)\n\n"
+    "Runs the 2/3 approximation algorithm for the diameter.\n\n"
+    "The result is at least 2/3 of the diameter with high probability, and\n"
+    "never larger than the diameter.\n\n"
+    "@param k: the number of vertices reached by the truncated breadth-first\n"
+    "  searches. If not positive, the square root of M{n log n} is used.\n"
+    "@param threads: the number of threads running the searches.\n"
     "@return: the approximated value"},
 
 
@@ -13089,10 +14107,17 @@ struct PyMethodDef igraphmodule_Graph_methods[] = {
   /* interface to igraph_diameter_approx */
   {"diameter_approximation", (PyCFunction) igraphmodule_Graph_diameter_approximation,
     METH_VARARGS | METH_KEYWORDS,
-   "diameter_approximation(weights=None)\n\n"
+   "diameter_approximation(weights=None, bfs_budget=-1, directed=True)\n\n"
    "Calculates an approximation of the diameter of the graph.\n\n"
    "@param weights: edge weights to be used. Can be a sequence or iterable or\n"
    "  even an edge attribute name.\n"
+   "@param bfs_budget: the largest number of breadth-first searches used to\n"
+   "  tighten the bound after the first one in each component. If negative,\n"
+   "  a default of 64 is used. With C{0}, the bound is the sum of the two\n"
+   "  largest distances from a random vertex. Not used for directed paths,\n"
+   "  where the bound comes from the strongly connected components.\n"
+   "@param directed: whether to bound the diameter of the directed paths.\n"
+   "  Ignored for undirected graphs.\n"
    "@return: an upper bound to the diameter"},
 
   /* interfaces to igraph_diameter */
@@ -13195,6 +14220,44 @@ struct PyMethodDef igraphmodule_Graph_methods[] = {
    "@return: a list with the (exact or estimated) edge betweennesses of all\n"
    "  edges.\n"},
 
+  /* interface to igraph_edge_betweenness_sample_vc */
+  {"edge_betweenness_sample_vc", (PyCFunction) igraphmodule_Graph_edge_betweenness_sample_vc,
+   METH_VARARGS | METH_KEYWORDS,
+   "edge_betweenness_sample_vc(epsilon, delta, diameter, directed=True, cutoff=None, weights=None, nobigint=True, threads=1, bidirectional=True, group_sources=False, landmarks=None, vertex_estimates=False, as_array=False)\n\n"
+   "Estimates the edge betweennesses in a graph with sampling (VC-Dimension)\n\n"
+   "Samples pairs of vertices and one shortest path between each pair, as\n"
+   "L{betweenness_sample_vc()} does, and credits the edges of the sampled\n"
+   "paths. The sample size depends on the number of edges of the shortest\n"
+   "paths instead of their internal vertices.\n\n"
+   "@param epsilon: the accuracy parameter for the estimations.\n"
+   "@param delta: the confidence parameter for the estimations.\n"
+   "@param diameter: a bound to the number of edges of the shortest paths,\n"
+   "  -1 for approx. computation.\n"
+   "@param directed: whether to consider directed paths.\n"
+   "@param cutoff: if it is an integer, only paths less than or equal to this\n"
+   "  length are considered,  If C{None}, all paths are considered.\n"
+   "@param weights: edge weights to be used. Can be a sequence or iterable or\n"
+   "  even an edge attribute name.\n"
+   "@param nobigint, threads, bidirectional, group_sources, landmarks: as in\n"
+   "  L{betweenness_sample_vc()}.\n"
+   "@param vertex_estimates: if C{True}, the betweennesses of the vertices\n"
+   "  are estimated from the same samples, within C{epsilon} too.\n"
+   "@param as_array: if C{True}, the betweennesses are returned in NumPy\n"
+   "  arrays that share the memory of the results instead of lists.\n"
+   "@return: a tuple with the statistics in a dictionary and the estimated\n"
+   "  betweenness of every edge in a list, followed by the estimated\n"
+   "  betweenness of every vertex if C{vertex_estimates} is C{True}.\n" },
+
+  /* interface to igraph_edge_betweenness_sample_vc_sample_size */
+  {"edge_betweenness_sample_vc_sample_size", (PyCFunction) igraphmodule_Graph_edge_betweenness_sample_vc_sample_size,
+   METH_VARARGS | METH_KEYWORDS,
+   "edge_betweenness_sample_vc_sample_size(sample_size, directed=True, cutoff=None, weights=None, nobigint=True, threads=1, bidirectional=True, group_sources=False, landmarks=None, vertex_estimates=False, as_array=False)\n\n"
+   "Estimates the edge betweennesses in a graph from the given number of\n"
+   "sampled shortest paths\n\n"
+   "@param sample_size: the sample size to use.\n"
+   "The other arguments and the result are as in\n"
+   "L{edge_betweenness_sample_vc()}.\n" },
+
   /* interface to igraph_[st_]edge_connectivity */
   {"edge_connectivity", (PyCFunction) igraphmodule_Graph_edge_connectivity,
    METH_VARARGS | METH_KEYWORDS,
@@ -0,0 +1,217 @@
+#! /usr/bin/env python3
+"""query_sample.py
+
+Estimate the betweenness centrality of a few query vertices of the graph
+within a relative error, using random sampling and the VC-dimension, and the
+time needed to compute them. Sampling stops as soon as every query vertex has
+an estimate within the relative error or is known to be below a threshold.
+These values are then written to an output file.
+
+"""
+import argparse
+import logging
+import os.path
+import random
+import time
+
+import converter
+import timeout
+import util
+
+def read_query(path):
+    """Read the query vertices from the file path, one id per line.
+
+    Empty lines and lines starting with '#' are skipped. Return the list of
+    vertex ids.
+
+    """
+    query = []
+    with open(path, 'r') as query_file:
+        for line in query_file:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                query.append(int(line))
+    return query
+
+def do_betweenness(graph, epsilon, delta, threshold, query, weights_list,
+        use_approx_diameter, threads, cutoff=None):
+    # A diameter cached as a graph attribute (see util.load_metadata()) is
+    # used instead of computing it again
+    start_time = time.perf_counter()
+    start_cpu_time = time.process_time()
+    if use_approx_diameter == 1:
+        diam = graph["approx_diam"] if "approx_diam" in graph.attributes() else -1
+    elif use_approx_diameter == 0:
+        diam = graph["diam"] if "diam" in graph.attributes() else graph.diameter()
+    else:
+        diam = use_approx_diameter
+    (stats, betw) = graph.betweenness_sample_vc_query(epsilon, delta,
+            threshold, diam, vertices=query, cutoff=cutoff,
+            weights=weights_list, threads=threads)
+    stats["time"] = time.perf_counter() - start_time
+    stats["cpu_time"] = time.process_time() - start_cpu_time
+    return (stats, betw)
+
+def betweenness(graph, epsilon, delta, threshold, query, weights=None,
+        use_approx_diameter=True, set_attributes=True, time_out=0, threads=1,
+        cutoff=None):
+    """Estimate the betweenness of the query vertices using VC-Dimension.
+
+    Sample pairs of vertices until the betweenness of each vertex in query is
+    estimated within a relative error epsilon, or is known to be below
+    threshold, with probability at least 1-delta.
+
+    Return a tuple with the statistics (a dictionary) and the list of the
+    query vertices, in the order of query. Each one is a tuple (vertex,
+    estimate, lower bound, upper bound, status), where the status is 1 if the
+    relative error was reached, 0 if the betweenness is below threshold, and
+    -1 if neither could be guaranteed.
+
+    The use_approx_diameter parameter has the same meaning as in
+    vc_sample.betweenness(). If set_attributes is True (default), then set the
+    estimates of the query vertices as vertex attributes, and the time as a
+    graph attribute. If cutoff is not None, only the shortest paths of at most
+    this length are counted, as in vc_sample.betweenness().
+
+    """
+    logging.info("Computing approximate betweenness of %d vertices using VC-Dimension",
+            len(query))
+    if not time_out:
+        (stats, betw) = do_betweenness(graph, epsilon, delta, threshold, query,
+                weights, use_approx_diameter, threads, cutoff)
+    else:
+        timeout_betweenness = timeout.add_timeout(do_betweenness, time_out)
+        timeout_betweenness(graph, epsilon, delta, threshold, query, weights,
+                use_approx_diameter, threads, cutoff)
+        while (not timeout_betweenness.ready) and (not timeout_betweenness.expired):
+            time.sleep(timeout.POLL_INTERVAL)
+        if timeout_betweenness.ready:
+            (stats, betw) = timeout_betweenness.value
+            logging.info("Betweenness computed in %s seconds", stats['time'])
+            stats["timed_out"] = 0
+        else:
+            logging.info("Betweenness computation timer expired after %d seconds.", time_out)
+            betw = []
+            stats = {"time": time_out, "timed_out": 1, "forward_touched_edges": -1,
+                    "backward_touched_edges": -1, "sample_size": -1,
+                    "diameter": -1, "diameter_touched_edges": -1 }
+    stats["delta"] = delta
+    if int(use_approx_diameter) == 1:
+        stats["diam_type"] = "approx"
+        if stats["diameter"] > 0:
+            graph["approx_diam"] = stats["diameter"]
+    elif int(use_approx_diameter) == 0:
+        stats["diam_type"] = "exact"
+        if stats["diameter"] > 0:
+            graph["diam"] = stats["diameter"]
+    else:
+        stats["diam_type"] = "specif"
+    stats["epsilon"] = epsilon
+    stats["threshold"] = threshold
+    stats["cutoff"] = cutoff if cutoff is not None else -1
+
+    # Write attributes to graph, if specified
+    if set_attributes:
+        for key in stats:
+            graph["vc_" + key] = stats[key]
+        graph.vs.select([vertex[0] for vertex in betw])["vc_betw"] = [
+                vertex[1] for vertex in betw]
+
+    return (stats, betw)
+
+def main():
+    """Parse arguments, call betweenness(), write to file."""
+
+    # Parse arguments
+    parser = argparse.ArgumentParser()
+    parser.description = "Compute approximate betweenness centrality of some vertices in a graph within a relative error using sampling and VC-dimension, and the time to compute them, and write them to file"
+    parser.add_argument("epsilon", type=util.valid_interval_float,
+            help="relative accuracy parameter")
+    parser.add_argument("delta", type=util.valid_interval_float,
+            help="confidence parameter")
+    parser.add_argument("threshold", type=util.valid_interval_float,
+            help="betweenness below which the vertices are not estimated within the relative error")
+    parser.add_argument("query", help="file with the ids of the query vertices, one per line")
+    parser.add_argument("graph", help="graph file")
+    parser.add_argument("output", help="output file")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("-a", "--approximate", action="store_true",
+            default=True, help="use approximate diameter (default)")
+    group.add_argument("-d", "--diameter", type=util.positive_int, default=0,
+            help="value to use for the diameter")
+    group.add_argument("-e", "--exact", action="store_true", default=False,
+            help="use exact diameter")
+    parser.add_argument("-b", "--cutoff", type=util.positive_int, default=None,
+            help="only count the shortest paths of at most this length (number of edges, or total weight with -l), which also reduces the sample size")
+    parser.add_argument("-j", "--threads", type=util.positive_int, default=1,
+            help="number of threads sampling the pairs of vertices (default 1)")
+    parser.add_argument("-l", "--weightFile", default="-",
+            help="random weights within the interval 0 to 1, must have as many entries as the number of edges: one per line, or a binary weight file from generate_random_weights.py")
+    parser.add_argument("-m", "--maxconn", action="store_true", default=False,
+            help="if the graph is not weakly connected, only save the largest connected component")
+    parser.add_argument("-p", "--pickle", action="store_true", default=False,
+            help="use pickle reader for input file")
+    parser.add_argument("-t", "--timeout", type=util.positive_int, default=3600,
+            help="Timeout computation after specified number of seconds (default 3600 = 1h, 0 = no timeout)")
+    parser.add_argument("-u", "--undirected", action="store_true", default=False,
+            help="consider the graph as undirected ")
+    parser.add_argument("-v", "--verbose", action="count", default=0,
+            help="increase verbosity (use multiple times for more verbosity)")
+    parser.add_argument("-w", "--write", nargs="?", default=False, const="auto",
+            help="write graph (and computed attributes) to file.")
+
+    args = parser.parse_args()
+
+    # Set the desired level of logging
+    util.set_verbosity(args.verbose)
+
+    # Seed the random number generator
+    random.seed()
+
+    # Read graph
+    if args.pickle:
+        G = util.read_graph(args.graph)
+    else:
+        G = converter.convert(args.graph, not args.undirected, args.maxconn)
+
+    if args.exact:
+        args.approximate = False
+
+    # Read the query vertices and the weights
+    query = read_query(args.query)
+    weights_list = []
+    if args.weightFile != "-":
+        weights_list = util.read_weights(args.weightFile, G)
+
+    # Use the diameters cached for this graph and weights
+    fingerprint = util.graph_fingerprint(args.graph, not args.undirected,
+            args.maxconn, args.pickle,
+            args.weightFile if args.weightFile != "-" else None)
+    util.load_metadata(G, args.graph, fingerprint)
+
+    # Compute betweenness
+    if args.diameter > 0:
+        (stats, betw) = betweenness(G, args.epsilon, args.delta,
+                args.threshold, query, weights_list or None, args.diameter,
+                args.write, args.timeout, args.threads, args.cutoff)
+    else:
+        (stats, betw) = betweenness(G, args.epsilon, args.delta,
+                args.threshold, query, weights_list or None, args.approximate,
+                args.write, args.timeout, args.threads, args.cutoff)
+    util.save_metadata(G, args.graph, fingerprint)
+
+    # If specified, write betweenness as vertex attributes, and time as graph
+    # attribute back to file
+    if args.write:
+        logging.info("Writing betweenness as vertex attributes and stats as graph attribute")
+        if args.write == "auto":
+            filename = os.path.splitext(args.graph)[0] + ("-undir" if args.undirected else "dir") + ".picklez"
+            G.write(filename)
+        else:
+            G.write(args.write)
+
+    # Write stats and betweenness to output
+    util.write_to_output(stats, betw, args.output)
+
+if __name__ == "__main__":
+    main()
@@ -23,6 +23,13 @@ import multiprocessing
 
 ################################################################################
 
+# Seconds the callers sleep between two polls of "ready" and "expired". The
+# timeout is measured in wall-clock time, so the callers need not spin to
+# make it advance, and leave the cores to the function.
+POLL_INTERVAL = 0.1
+
+################################################################################
+
 def add_timeout(function, limit=60):
     """Add a timeout parameter to a function and return it.
 
@@ -62,7 +69,7 @@ class _Timeout:
         """Initialize instance in preparation for being called."""
         self.__limit = limit
         self.__function = function
-        self.__start_time = time.process_time()
+        self.__start_time = time.perf_counter()
         self.__process = multiprocessing.Process()
         self.__queue = multiprocessing.Queue()
 
@@ -80,22 +87,26 @@ class _Timeout:
                                                  kwargs=kwargs)
         self.__process.daemon = True
         self.__process.start()
-        self.__start_time = time.process_time()
+        self.__start_time = time.perf_counter()
 
     def cancel(self):
-        """Terminate any possible execution of the embedded function."""
+        """Terminate any possible execution of the embedded function.
+
+        Wait for the process to be gone, so that any memory it shares with
+        the caller is not written anymore."""
         if self.__process.is_alive():
             self.__process.terminate()
+            self.__process.join()
 
     @property
     def expired(self):
         """Read-only property indicating whether timeout is passed."""
-        return self.process_time > self.__limit
+        return self.elapsed_time > self.__limit
 
     @property
-    def process_time(self):
-        """Read-only property indicating the process time."""
-        return time.process_time() - self.__start_time
+    def elapsed_time(self):
+        """Read-only property indicating the wall-clock time since the call."""
+        return time.perf_counter() - self.__start_time
 
     @property
     def ready(self):
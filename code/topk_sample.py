@@ -1,9 +1,9 @@
 #! /usr/bin/env python3
 """topk_sample.py
 
-Compute approximations of the betweenness centrality of all the vertices in
-the graph using random sampling and the VC-dimension, and the time needed to
-compute them. These values are then written to an output file.
+Find the candidates to the k vertices with the highest betweenness centrality
+in the graph using random sampling and the VC-dimension, and the time needed
+to compute them. These values are then written to an output file.
 
 """
 import argparse
@@ -51,58 +51,68 @@ import util
 #
 #    return (stats, betw)
 
-def do_betweenness(graph, epsilon, delta, k, use_approx_diameter):
+def do_betweenness(graph, epsilon, delta, k, use_approx_diameter, threads=1,
+        cutoff=None):
+    # A diameter cached as a graph attribute (see util.load_metadata()) is
+    # used instead of computing it again. The time is the wall-clock time, as
+    # the process time adds up the time of all the threads.
+    start_time = time.perf_counter()
+    start_cpu_time = time.process_time()
     if use_approx_diameter == 1:
-        start_time = time.process_time()
-        (stats, betw) = graph.betweenness_sample_vc_topk(epsilon, delta, k, -1)
+        diam = graph["approx_diam"] if "approx_diam" in graph.attributes() else -1
     elif use_approx_diameter == 0:
-        start_time = time.process_time()
-        diam = graph.diameter()
-        (stats, betw) = graph.betweenness_sample_vc_topk(epsilon, delta, k, diam)
+        diam = graph["diam"] if "diam" in graph.attributes() else graph.diameter()
     else:
-        start_time = time.process_time()
-        (stats, betw) = graph.betweenness_sample_vc_topk(epsilon, delta, k, use_approx_diameter)
-    end_time = time.process_time()
-    stats["time"] = end_time - start_time
+        diam = use_approx_diameter
+    (stats, betw) = graph.betweenness_sample_vc_topk(epsilon, delta, k, diam,
+            cutoff=cutoff, threads=threads)
+    stats["time"] = time.perf_counter() - start_time
+    stats["cpu_time"] = time.process_time() - start_cpu_time
     return (stats, betw)
 
 def betweenness(graph, epsilon, delta, k, use_approx_diameter=True,
-        set_attributes=True, time_out=0):
+        set_attributes=True, time_out=0, threads=1, cutoff=None):
     """Compute approximate betweenness using VC-Dimension.
     
     Compute approximations of the betweenness centrality of all the vertices in
     the graph using sampling and the VC-Dimension, and the time needed to
     compute them, and some other statistics.
 
-    Return a tuple with the statistics (a dictionary) and the list
-    of betweenness values (one for each vertex in the graph).
+    Return a tuple with the statistics (a dictionary) and the list of the
+    candidates to the top k vertices, by decreasing estimate. Each candidate
+    is a tuple (vertex, estimate, lower bound, upper bound).
 
     The meaning of the use_approx_diameter parameter is peculiar. If True or
-    1 (default), compute an approximation of the diameter (only valid for
-    undirected, unweighted graphs). If False or 0, compute
-    the exact diameter (which kind of defeat the purpose of sampling, by the
+    1 (default), use the "approx_diam" graph attribute or compute an
+    approximation of the diameter (only valid for
+    undirected, unweighted graphs). If False or 0, use the "diam"
+    graph attribute or compute the exact diameter (which kind of defeat the purpose of sampling, by the
     way). If any integer > 1, use this value for the diameter, i.e. do not
     perform any computation for the diameter.
-    If set_attributes is True (default), then set the values of the betweenness
-    as vertex attributes, and the time as a graph attribute.
+    If set_attributes is True (default), then set the estimates of the
+    candidates as vertex attributes, and the time as a graph attribute.
+    The pairs of vertices of both phases are sampled by the specified number
+    of threads. If cutoff is not None, only the shortest paths of at most this
+    length are counted, as in vc_sample.betweenness().
     
     """
     logging.info("Computing approximate betweenness using VC-Dimension")
     if not time_out:
         (stats, betw) = do_betweenness(graph, epsilon, delta, k,
-                use_approx_diameter)
+                use_approx_diameter, threads, cutoff)
     else:
         timeout_betweenness = timeout.add_timeout(do_betweenness, time_out)
-        timeout_betweenness(graph, epsilon, delta, k, use_approx_diameter)
+        timeout_betweenness(graph, epsilon, delta, k, use_approx_diameter,
+                threads, cutoff)
         while (not timeout_betweenness.ready) and (not timeout_betweenness.expired):
-            pass
+            time.sleep(timeout.POLL_INTERVAL)
         if timeout_betweenness.ready:
             (stats, betw) = timeout_betweenness.value
             logging.info("Betweenness computed in %s seconds", stats['time'])
             stats["timed_out"] = 0
         else:
             logging.info("Betweenness computation timer expired after %d seconds.", time_out)
-            betw = [0] * graph.vcount()
+            betw = []
             stats = {"time": time_out, "timed_out": 1, "forward_touched_edges": -1,
                     "backward_touched_edges": -1, "sample_size_1": -1,
                     "sample_size_2": -1,
@@ -110,18 +120,24 @@ def betweenness(graph, epsilon, delta, k, use_approx_diameter=True,
     stats["delta"] = delta
     if int(use_approx_diameter) == 1:
         stats["diam_type"] = "approx" 
+        if stats["diameter"] > 0:
+            graph["approx_diam"] = stats["diameter"]
     elif int(use_approx_diameter) == 0:
         stats["diam_type"] = "exact"
+        if stats["diameter"] > 0:
+            graph["diam"] = stats["diameter"]
     else:
         stats["diam_type"] = "specif"
     stats["epsilon"] = epsilon
     stats["k"] = k
+    stats["cutoff"] = cutoff if cutoff is not None else -1
 
     # Write attributes to graph, if specified
     if set_attributes:
         for key in stats:
             graph["vc_" + key] = stats[key]
-        graph.vs["vc_betw"] = betw
+        graph.vs.select([candidate[0] for candidate in betw])["vc_betw"] = [
+                candidate[1] for candidate in betw]
 
     return (stats, betw)
 
@@ -146,6 +162,10 @@ def main():
             help="value to use for the diameter")
     group.add_argument("-e", "--exact", action="store_true", default=False,
             help="use exact diameter")
+    parser.add_argument("-b", "--cutoff", type=util.positive_int, default=None,
+            help="only count the shortest paths of at most this length, which also reduces the sample size")
+    parser.add_argument("-j", "--threads", type=util.positive_int, default=1,
+            help="number of threads sampling the pairs of vertices (default 1)")
     parser.add_argument("-m", "--maxconn", action="store_true", default=False,
             help="if the graph is not weakly connected, only save the largest connected component")
     parser.add_argument("-p", "--pickle", action="store_true", default=False,
@@ -178,6 +198,11 @@ def main():
     if args.exact:
         args.approximate = False
 
+    # Use the diameters cached for this graph
+    fingerprint = util.graph_fingerprint(args.graph, not args.undirected,
+            args.maxconn, args.pickle)
+    util.load_metadata(G, args.graph, fingerprint)
+
     # Compute betweenness
     #if args.samplesize:
     #    (stats, betw) = betweenness_sample_size(G, args.samplesize, args.write)
@@ -185,10 +210,13 @@ def main():
     if True:
         if args.diameter > 0:
             (stats, betw) = betweenness(G, args.epsilon, args.delta, args.k,
-                    args.diameter, args.write)
+                    args.diameter, args.write, threads=args.threads,
+                    cutoff=args.cutoff)
         else:
             (stats, betw) = betweenness(G, args.epsilon, args.delta, args.k,
-                    args.approximate, args.write)
+                    args.approximate, args.write, threads=args.threads,
+                    cutoff=args.cutoff)
+    util.save_metadata(G, args.graph, fingerprint)
 
     # If specified, write betweenness as vertex attributes, and time as graph
     # attribute back to file
@@ -41,6 +41,8 @@ def main():
             help="value to use for the diameter")
     group.add_argument("-e", "--exact", action="store_true", default=False,
             help="use exact diameter")
+    parser.add_argument("-b", "--cutoff", type=util.positive_int, default=None,
+            help="only count the shortest paths of at most this length, which also reduces the sample size")
     parser.add_argument("-m", "--maxconn", action="store_true", default=False,
             help="if the graph is not weakly connected, only save the largest connected component")
     parser.add_argument("-p", "--pickle", action="store_true", default=False,
@@ -80,10 +82,12 @@ def main():
         if True:
             if args.diameter > 0:
                 results.append(topk_sample.betweenness(G, args.epsilon, args.delta,
-                        args.k, args.diameter, False, args.timeout))
+                        args.k, args.diameter, False, args.timeout,
+                        cutoff=args.cutoff))
             else:
                 results.append(topk_sample.betweenness(G, args.epsilon, args.delta,
-                        args.k, args.approximate, False, args.timeout))
+                        args.k, args.approximate, False, args.timeout,
+                        cutoff=args.cutoff))
 
     # Compute aggregate statistics about the experiments
     stats = dict()
@@ -115,14 +119,20 @@ def main():
         else:
             stats[stat_name + "_stddev"] = 0.0
 
-    stats["betw_min"] = [0.0] * G.vcount()
-    stats["betw_max"] = [0.0] * G.vcount()
-    stats["betw_avg"] = [0.0] * G.vcount()
-    for i in range(G.vcount()):
-        betws = sorted([x[1][i] for x in results])
-        stats["betw_min"][i]= betws[0]
-        stats["betw_max"][i] = betws[-1]
-        stats["betw_avg"][i] = sum(betws) / args.runs
+    # The estimates of each vertex in the runs where it was a candidate
+    estimates = dict()
+    for result in results:
+        for candidate in result[1]:
+            estimates.setdefault(candidate[0], []).append(candidate[1])
+    stats["betw_min"] = dict()
+    stats["betw_max"] = dict()
+    stats["betw_avg"] = dict()
+    stats["candidate_runs"] = dict()
+    for (vertex, betws) in estimates.items():
+        stats["betw_min"][vertex] = min(betws)
+        stats["betw_max"][vertex] = max(betws)
+        stats["betw_avg"][vertex] = sum(betws) / len(betws)
+        stats["candidate_runs"][vertex] = len(betws)
 
     csvkeys="graph, runs, epsilon, delta, k, sample_size_1, sample_size_2"
     csvkeys_names= ["{0}_avg, {0}_min, {0}_stddev, {0}_max, {0}_min".format(stat_name) 
@@ -3,12 +3,26 @@
 Various useful functions.
 """
 import argparse
+import array
+import hashlib
 import logging
 import math
+import mmap
+import os
 import pickle
+import struct
 import sys
 import igraph as ig
 
+# The betweenness functions of the bindings can return the estimates in a
+# NumPy array wrapping the memory of the result, without building a list.
+# The drivers ask for it whenever NumPy is available.
+try:
+    import numpy
+except ImportError:
+    numpy = None
+HAVE_NUMPY = numpy is not None
+
 def decile(value, max_value):
     """Returns the decile of the interval [0,max_value] that value belongs to."""
     ret = math.floor(100 * value / max_value)
@@ -37,6 +51,284 @@ def dict_value_to_str(dictionary, key):
         string = str(dictionary[key])
     return string
 
+# Size of the blocks in which graph_fingerprint() reads the files
+FINGERPRINT_BLOCK = 1 << 20
+
+def graph_fingerprint(graph_path, directed=True, maxconn=False, pickled=False,
+        weights_path=None):
+    """Return a hex digest identifying the graph read from graph_path.
+
+    The digest depends on the bytes of the graph file, on the options it is
+    read with (directed, maxconn, and pickled for the pickle reader) and, if
+    given, on the bytes of the weight file. The files are hashed in blocks,
+    without building the graph or the weights in Python, so the drivers
+    compute the digest once and pass it to load_metadata(), save_metadata()
+    and load_landmarks().
+
+    """
+    digest = hashlib.sha1()
+    digest.update("{} {} {}".format(bool(directed), bool(maxconn),
+        bool(pickled)).encode())
+    for path in (graph_path, weights_path):
+        if path is None:
+            continue
+        try:
+            with open(path, 'rb') as fingerprint_file:
+                # The size separates the files in the digest
+                digest.update(" {} ".format(
+                    os.fstat(fingerprint_file.fileno()).st_size).encode())
+                for block in iter(lambda: fingerprint_file.read(
+                        FINGERPRINT_BLOCK), b""):
+                    digest.update(block)
+        except OSError as E:
+            logging.critical("Cannot read %s: %s", path, E.strerror)
+            sys.exit(2)
+    return digest.hexdigest()
+
+# Graph attributes cached in the metadata sidecar of a graph file, see
+# load_metadata(). "approx_diam" is the approximate diameter used by the
+# VC-dimension sampling, "diam" the exact one computed by diameter.diameter().
+METADATA_ATTRIBUTES = ["diam", "diam_time", "approx_diam"]
+
+def metadata_path(graph_path):
+    """Return the path of the metadata sidecar file of the graph file."""
+    return graph_path + ".meta"
+
+def read_metadata(graph_path):
+    """Read the metadata sidecar of the graph file.
+
+    Return a dictionary from graph fingerprints to metadata dictionaries,
+    which is empty if there is no sidecar or it cannot be read.
+
+    """
+    try:
+        with open(metadata_path(graph_path), 'rb') as metadata_file:
+            return pickle.load(metadata_file)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return dict()
+
+def load_metadata(graph, graph_path, fingerprint):
+    """Load the cached metadata of graph from the sidecar of graph_path.
+
+    The sidecar is keyed by the fingerprint of the graph (see
+    graph_fingerprint()), so the same file read as directed or undirected, or
+    with different weights, has separate entries. The number of vertices and
+    edges, the number of weakly connected components and the degree
+    statistics are computed if they are not cached. The cached attributes in
+    METADATA_ATTRIBUTES are set as graph attributes, so the diameter
+    computations can skip them. Return the metadata.
+
+    """
+    metadata = read_metadata(graph_path).get(fingerprint, dict())
+    if "vertices" not in metadata:
+        logging.info("Computing graph metadata")
+        degrees = graph.degree()
+        metadata["vertices"] = graph.vcount()
+        metadata["edges"] = graph.ecount()
+        metadata["components"] = len(graph.components(mode=ig.WEAK))
+        metadata["degree_min"] = min(degrees, default=0)
+        metadata["degree_max"] = max(degrees, default=0)
+        metadata["degree_avg"] = sum(degrees) / max(len(degrees), 1)
+    else:
+        logging.info("Using cached metadata from %s",
+                metadata_path(graph_path))
+    for key in METADATA_ATTRIBUTES:
+        if key in metadata and key not in graph.attributes():
+            graph[key] = metadata[key]
+    return metadata
+
+def save_metadata(graph, graph_path, fingerprint):
+    """Save the metadata of graph to the sidecar of graph_path.
+
+    The metadata computed by load_metadata() is updated with the attributes in
+    METADATA_ATTRIBUTES that graph has, and written with write_metadata().
+
+    """
+    cache = read_metadata(graph_path)
+    metadata = cache.get(fingerprint, dict())
+    if "vertices" not in metadata:
+        metadata = load_metadata(graph, graph_path, fingerprint)
+    for key in METADATA_ATTRIBUTES:
+        if key in graph.attributes():
+            metadata[key] = graph[key]
+    cache[fingerprint] = metadata
+    write_metadata(graph_path, cache)
+
+def write_metadata(graph_path, cache):
+    """Replace the metadata sidecar of the graph file with cache.
+
+    The sidecar is replaced atomically, so concurrent runs on the same graph
+    never leave it half written. A sidecar that cannot be written is only
+    logged.
+
+    """
+    path = metadata_path(graph_path)
+    temp_path = "{}.{}".format(path, os.getpid())
+    try:
+        with open(temp_path, 'wb') as metadata_file:
+            pickle.dump(cache, metadata_file, pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+    except OSError as E:
+        logging.warning("Cannot write graph metadata to %s: %s", path,
+                E.strerror)
+
+def landmarks_path(graph_path, fingerprint, count, directed=True):
+    """Return the path of the file with the landmark distances of the graph
+    file, for count landmarks and the graph with the given fingerprint."""
+    return "{}.{}.landmarks.{}.{}".format(graph_path, fingerprint, count,
+            "dir" if directed else "undir")
+
+def read_landmarks(path, graph):
+    """Memory-map the landmark distances of graph from the file path.
+
+    The file holds the raw doubles of the distances (see load_landmarks()).
+    Return a memoryview of the doubles, or None if the file cannot be read or
+    its size does not match the number of vertices of graph.
+
+    """
+    try:
+        with open(path, 'rb') as landmarks_file:
+            size = os.fstat(landmarks_file.fileno()).st_size
+            row = struct.calcsize("d") * graph.vcount()
+            if row == 0 or size == 0 or size % row:
+                return None
+            mapped = mmap.mmap(landmarks_file.fileno(), 0,
+                    access=mmap.ACCESS_READ)
+    except OSError:
+        return None
+    return memoryview(mapped).cast("d")
+
+def load_landmarks(graph, graph_path, fingerprint, weights, count,
+        directed=True):
+    """Return the landmark distances of graph for the goal-directed sampling.
+
+    The distances are computed by graph.betweenness_landmarks() with count
+    landmarks and written as raw doubles to the file given by
+    landmarks_path(), next to graph_path, so the following runs with the
+    same graph and weights skip the preprocessing. The metadata sidecar only
+    keeps the name of the file, so the runs that do not use the landmarks
+    never read the distances. Return the distances memory-mapped from the
+    file, to be passed as the landmarks argument of the VC sampling
+    functions.
+
+    """
+    path = landmarks_path(graph_path, fingerprint, count, directed)
+    key = (count, bool(directed))
+    metadata = read_metadata(graph_path).get(fingerprint, dict())
+    if metadata.get("landmarks", dict()).get(key) == os.path.basename(path):
+        landmarks = read_landmarks(path, graph)
+        if landmarks is not None:
+            logging.info("Using cached landmarks from %s", path)
+            return landmarks
+    logging.info("Computing the distances of %d landmarks", count)
+    (ids, distances) = graph.betweenness_landmarks(count, directed=directed,
+            weights=weights)
+    temp_path = "{}.{}".format(path, os.getpid())
+    try:
+        with open(temp_path, 'wb') as landmarks_file:
+            landmarks_file.write(distances)
+        os.replace(temp_path, path)
+    except OSError as E:
+        logging.warning("Cannot write landmarks to %s: %s", path, E.strerror)
+        return memoryview(distances).cast("d")
+    cache = read_metadata(graph_path)
+    metadata = cache.get(fingerprint, dict())
+    if "vertices" not in metadata:
+        metadata = load_metadata(graph, graph_path, fingerprint)
+    # Replace any reference, or distances cached in the sidecar itself by
+    # older runs, with the name of the file
+    metadata["landmarks"] = {k: v for (k, v) in
+            metadata.get("landmarks", dict()).items() if isinstance(v, str)}
+    metadata["landmarks"][key] = os.path.basename(path)
+    cache[fingerprint] = metadata
+    write_metadata(graph_path, cache)
+    return memoryview(distances).cast("d")
+
+# Binary edge weight files start with a header of 16 bytes: WEIGHTS_MAGIC,
+# the array type code of the weights ("d" or "f") padded with zeros to four
+# bytes, and the number of edges as a little-endian 64 bit integer. The
+# weights follow as a raw array in the native byte order.
+WEIGHTS_MAGIC = b"CSWT"
+WEIGHTS_HEADER = struct.Struct("<4s4sQ")
+
+def read_weights(path, graph):
+    """Read the edge weights of graph from the file path.
+
+    A binary weight file (see write_weights()) is memory-mapped and returned
+    as a memoryview of its doubles or floats, which the bindings copy to the
+    kernels without creating a float object per edge. Its number of edges
+    must be the one of graph. Any other file is read as text, with one weight
+    per line, into a list.
+
+    """
+    logging.info("Reading weights from %s", path)
+    try:
+        with open(path, 'rb') as weight_file:
+            header = weight_file.read(WEIGHTS_HEADER.size)
+            if (len(header) < WEIGHTS_HEADER.size or
+                    not header.startswith(WEIGHTS_MAGIC)):
+                weight_file.seek(0)
+                return [float(line.strip()) for line in weight_file]
+            (magic, typecode, count) = WEIGHTS_HEADER.unpack(header)
+            typecode = typecode.rstrip(b"\0").decode()
+            if typecode not in ("d", "f"):
+                logging.critical("Weight file %s has unknown type %s", path,
+                        typecode)
+                sys.exit(2)
+            if count != graph.ecount():
+                logging.critical("Weight file %s has %d weights, the graph has %d edges",
+                        path, count, graph.ecount())
+                sys.exit(2)
+            end = WEIGHTS_HEADER.size + count * struct.calcsize(typecode)
+            if os.fstat(weight_file.fileno()).st_size < end:
+                logging.critical("Weight file %s is truncated", path)
+                sys.exit(2)
+            if count == 0:
+                return []
+            mapped = mmap.mmap(weight_file.fileno(), 0, access=mmap.ACCESS_READ)
+    except OSError as E:
+        logging.critical("Cannot read weight file %s: %s", path, E.strerror)
+        sys.exit(2)
+    return memoryview(mapped)[WEIGHTS_HEADER.size:end].cast(typecode)
+
+def write_weights(path, count, chunks, typecode="d"):
+    """Write count edge weights to path as a binary weight file.
+
+    chunks is an iterable of NumPy arrays or array.array of the weights, which
+    are written as they come, so that they never have to be in memory all at
+    once. typecode is "d" for doubles (default) or "f" for floats, which halve
+    the file. Raise ValueError if the chunks do not hold count weights.
+
+    """
+    written = 0
+    with open(path, 'wb') as weight_file:
+        weight_file.write(WEIGHTS_HEADER.pack(WEIGHTS_MAGIC,
+            typecode.encode(), count))
+        for chunk in chunks:
+            if HAVE_NUMPY:
+                chunk = numpy.ascontiguousarray(chunk, dtype=typecode)
+            elif not (isinstance(chunk, array.array) and
+                    chunk.typecode == typecode):
+                chunk = array.array(typecode, chunk)
+            weight_file.write(chunk)
+            written += len(chunk)
+    if written != count:
+        raise ValueError("{} weights written instead of {}".format(written,
+            count))
+
+def min_weight(weights):
+    """Return the smallest of the weights, or None if there are none.
+
+    With NumPy, a memoryview from read_weights() is scanned in place, without
+    a float object per edge.
+
+    """
+    if not len(weights):
+        return None
+    if HAVE_NUMPY:
+        return float(numpy.asarray(weights).min())
+    return min(weights)
+
 def positive_int(string):
     """Check validity of string as positive integer. Return value if it is.
     
@@ -82,6 +374,13 @@ def set_verbosity(level):
      elif level >= 2:
          logging.basicConfig(format=log_format, level=logging.DEBUG)
 
+def zeros(length):
+    """Return a NumPy array of length zeros if NumPy is available, a list
+    otherwise."""
+    if HAVE_NUMPY:
+        return numpy.zeros(length)
+    return [0.0] * length
+
 def valid_interval_float(string):
     """Check validity of string as float between 0 and 1 (extremes excluded).
     
@@ -101,11 +400,15 @@ def valid_interval_float(string):
     return value
 
 def write_to_output(stats, betw, output_path):
-    """ Write stats and betweenness to output file."""
+    """ Write stats and betweenness to output file.
+
+    betw can be a list or a NumPy array, which is written as such.
+
+    """
     try:
         with open(output_path, 'wb') as output:
             logging.info("Writing stats and betweenness to output file")
-            pickle.dump((stats,betw), output);
+            pickle.dump((stats,betw), output, pickle.HIGHEST_PROTOCOL);
             #output.write("({}, {})\n".format(stats, betw))
     except OSError as E:
         logging.critical("Cannot write stats and betweenness to %s: %s", output_path,
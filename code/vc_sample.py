@@ -8,48 +8,306 @@ compute them. These values are then written to an output file.
 """
 import argparse
 import logging
+import math
+import multiprocessing
 import os.path
+import pickle
 import random
+import sys
 import time
 
 import converter
 import timeout
 import util
 
-def do_betweenness_sample_size(graph, sample_size):
-    start_time = time.process_time()
-    (stats, betw) = graph.betweenness_sample_vc_sample_size(sample_size)
-    end_time = time.process_time()
-    stats["time"] = end_time - start_time
+# Seconds between two checkpoints written while the samples are taken (see
+# wait_for_sampling()), so that a run that is killed loses at most this much
+# work
+CHECKPOINT_INTERVAL = 600
+
+def new_snapshot(graph):
+    """Return shared memory where the sampling publishes its partial counts.
+
+    The layout is described in the documentation of the snapshot parameter of
+    Graph.betweenness_sample_vc().
+
+    """
+    snapshot = multiprocessing.RawArray('d', 2 * (graph.vcount() + 1) + 2)
+    snapshot[0] = -1
+    return snapshot
+
+def partial_counts(graph, snapshot):
+    """Return the number of samples published in snapshot and their counts.
+
+    The counts are the (integer) numbers of sampled paths each vertex is
+    internal to, as stored in a checkpoint. If nothing was published yet, the
+    sample size is 0 and the counts are all zeros.
+
+    The sampling may still be running: the slot is read after its index, and
+    read again if the sampling was rewriting it, which sets its number of
+    samples to -1 until the counts are written.
+
+    """
+    while True:
+        slot = int(snapshot[0])
+        if slot < 0:
+            return (0, [0] * graph.vcount())
+        start = 2 + slot * (graph.vcount() + 1)
+        sample_size = int(snapshot[start])
+        counts = [int(count) for count in
+                snapshot[start + 1:start + 1 + graph.vcount()]]
+        if sample_size >= 0 and int(snapshot[start]) == sample_size:
+            return (sample_size, counts)
+
+def partial_betweenness(graph, snapshot):
+    """Return the number of samples published in snapshot and the estimate.
+
+    The estimate is the list of the fractions of the sampled paths each vertex
+    is internal to. If nothing was published yet, the sample size is 0 and the
+    estimate is all zeros.
+
+    """
+    slot = int(snapshot[0])
+    if slot < 0:
+        return (0, util.zeros(graph.vcount()))
+    start = 2 + slot * (graph.vcount() + 1)
+    sample_size = int(snapshot[start])
+    if util.HAVE_NUMPY:
+        counts = util.numpy.frombuffer(snapshot)[start + 1:start + 1 +
+                graph.vcount()]
+        return (sample_size, counts / sample_size)
+    betw = [count / sample_size for count in
+            snapshot[start + 1:start + 1 + graph.vcount()]]
+    return (sample_size, betw)
+
+def length_bound(diameter, cutoff=None, weights=None):
+    """Return the bound to the number of edges of the shortest paths counted
+    with the given cutoff.
+
+    A path no longer than the cutoff has at most cutoff edges, or at most the
+    cutoff divided by the smallest weight, so the bound is the smaller of this
+    and the diameter, as computed by Graph.betweenness_sample_vc().
+
+    """
+    if cutoff is not None and cutoff >= 0:
+        if weights:
+            smallest = util.min_weight(weights)
+            if smallest > 0:
+                diameter = min(diameter, math.floor(cutoff / smallest))
+        else:
+            diameter = min(diameter, cutoff)
+    return diameter
+
+def vc_sample_size(epsilon, delta, diameter, cutoff=None, weights=None):
+    """Return the sample size that guarantees accuracy epsilon with
+    probability 1-delta, using the bound to the VC-dimension from the
+    (vertex-)diameter, as computed by Graph.betweenness_sample_vc(). With a
+    cutoff, only the paths the cutoff keeps are bounded (see length_bound())."""
+    diameter = length_bound(diameter, cutoff, weights)
+    return math.ceil(0.5 / epsilon ** 2 *
+            (math.floor(math.log2(max(diameter, 2) - 1)) + 1 - math.log(delta)))
+
+def hit_counts(betw, sample_size):
+    """Return the number of sampled paths each vertex is internal to.
+
+    The estimates are the counts multiplied by 1/sample_size, so rounding
+    recovers the counts exactly.
+
+    """
+    return [round(value * sample_size) for value in betw]
+
+def make_checkpoint(fingerprint, counts, sample_size, rng_state, diameter=-1,
+        cutoff=None):
+    """Return a checkpoint of a run taking sample_size samples.
+
+    A checkpoint is a dictionary with the fingerprint of the graph (see
+    util.graph_fingerprint()), the number of samples, the (integer) number of
+    sampled paths each vertex is internal to, the state of the random number
+    generator to use to continue sampling, the diameter used to compute
+    the sample size (-1 if unknown), and the cutoff of the sampled paths
+    (None if all paths count). The counts can be recovered from an estimate
+    with hit_counts().
+
+    """
+    return {"fingerprint": fingerprint, "sample_size": sample_size,
+            "counts": list(counts), "rng_state": rng_state,
+            "diameter": diameter, "cutoff": cutoff}
+
+def merge_checkpoints(checkpoints):
+    """Merge checkpoints of independent runs on the same graph into one.
+
+    The counts and the sample sizes are summed. The state of the random number
+    generator is the one of the first checkpoint.
+
+    """
+    merged = dict(checkpoints[0])
+    merged["counts"] = list(merged["counts"])
+    for checkpoint in checkpoints[1:]:
+        if checkpoint["fingerprint"] != merged["fingerprint"]:
+            raise ValueError("Cannot merge checkpoints of different graphs")
+        if checkpoint.get("cutoff") != merged.get("cutoff"):
+            raise ValueError("Cannot merge checkpoints with different cutoffs")
+        merged["sample_size"] += checkpoint["sample_size"]
+        merged["counts"] = [a + b for (a, b) in zip(merged["counts"],
+            checkpoint["counts"])]
+        merged["diameter"] = max(merged["diameter"], checkpoint["diameter"])
+    return merged
+
+def read_checkpoint(path):
+    """Read a checkpoint from file."""
+    with open(path, 'rb') as checkpoint_file:
+        return pickle.load(checkpoint_file)
+
+def write_checkpoint(checkpoint, path):
+    """Write a checkpoint to file.
+
+    The file is replaced atomically, so a run killed while writing a
+    checkpoint still leaves the previous one.
+
+    """
+    logging.info("Writing checkpoint with %d samples to %s",
+            checkpoint["sample_size"], path)
+    temp_path = "{}.{}".format(path, os.getpid())
+    with open(temp_path, 'wb') as checkpoint_file:
+        pickle.dump(checkpoint, checkpoint_file)
+    os.replace(temp_path, path)
+
+def wait_for_sampling(timeout_betweenness, graph, snapshot, checkpoint=None):
+    """Wait until the sampling run by timeout_betweenness ends or expires.
+
+    If checkpoint is not None, every CHECKPOINT_INTERVAL seconds it is called
+    with the number of samples published in snapshot and their counts (see
+    partial_counts()), when more samples were published since the last call.
+
+    The loop sleeps between the polls, leaving the cores to the sampling
+    threads, as the timeout is measured in wall-clock time.
+
+    """
+    last_time = time.perf_counter()
+    last_sample_size = 0
+    while (not timeout_betweenness.ready) and (not timeout_betweenness.expired):
+        time.sleep(timeout.POLL_INTERVAL)
+        if checkpoint is not None and \
+                time.perf_counter() - last_time >= CHECKPOINT_INTERVAL:
+            last_time = time.perf_counter()
+            (sample_size, counts) = partial_counts(graph, snapshot)
+            if sample_size > last_sample_size:
+                checkpoint(sample_size, counts)
+                last_sample_size = sample_size
+
+def resume_betweenness(graph, checkpoint, sample_size, weights=None,
+        set_attributes=True, time_out=0, threads=1, bidirectional=True,
+        group_sources=False, cutoff=None, landmarks=None,
+        save_checkpoint=None):
+    """Compute approximate betweenness starting from the samples in checkpoint.
+
+    Only the samples needed to reach sample_size are taken, and the estimate is
+    computed from the counts in the checkpoint plus the new ones. The
+    "resumed_sample_size" statistic is the number of samples in the
+    checkpoint. The save_checkpoint parameter is used as in
+    betweenness_sample_size(), and receives the counts in the checkpoint plus
+    the new ones.
+
+    """
+    missing = sample_size - checkpoint["sample_size"]
+    counts = checkpoint["counts"]
+    if missing > 0:
+        logging.info("Resuming from %d samples, taking %d more",
+                checkpoint["sample_size"], missing)
+        partial_checkpoint = None
+        if save_checkpoint is not None:
+            def partial_checkpoint(new_sample_size, new_counts):
+                save_checkpoint(checkpoint["sample_size"] + new_sample_size,
+                        [a + b for (a, b) in zip(counts, new_counts)])
+        (stats, betw) = betweenness_sample_size(graph, missing, False,
+                time_out, threads, bidirectional, group_sources, weights,
+                cutoff, landmarks, partial_checkpoint)
+        new_counts = hit_counts(betw, int(stats["sample_size"]))
+        counts = [a + b for (a, b) in zip(counts, new_counts)]
+        stats["sample_size"] = checkpoint["sample_size"] + int(stats["sample_size"])
+    else:
+        logging.info("The checkpoint already has %d samples",
+                checkpoint["sample_size"])
+        stats = {"time": 0, "timed_out": 0, "forward_touched_edges": 0,
+                "backward_touched_edges": 0,
+                "sample_size": checkpoint["sample_size"]}
+    stats["resumed_sample_size"] = checkpoint["sample_size"]
+    if util.HAVE_NUMPY:
+        betw = util.numpy.array(counts, dtype=float) / stats["sample_size"]
+    else:
+        betw = [count / stats["sample_size"] for count in counts]
+
+    # Write attributes to graph, if specified
+    if set_attributes:
+        for key in stats:
+            graph["vc_" + key] = stats[key]
+        graph.vs["vc_betw"] = betw
+
+    return (stats, betw)
+
+def do_betweenness_sample_size(graph, sample_size, threads=1, bidirectional=True,
+        group_sources=False, snapshot=None, weights_list=None, cutoff=None,
+        landmarks=None):
+    start_time = time.perf_counter()
+    start_cpu_time = time.process_time()
+    (stats, betw) = graph.betweenness_sample_vc_sample_size(sample_size,
+            cutoff=cutoff, weights=weights_list, threads=threads,
+            bidirectional=bidirectional, group_sources=group_sources,
+            landmarks=landmarks, snapshot=snapshot, as_array=util.HAVE_NUMPY)
+    stats["time"] = time.perf_counter() - start_time
+    stats["cpu_time"] = time.process_time() - start_cpu_time
     return (stats, betw)
 
-def betweenness_sample_size(graph, sample_size, set_attributes=True, time_out=0):
-    """Compute approximate betweenness using VC-Dimension and a specified sample size."""
+def betweenness_sample_size(graph, sample_size, set_attributes=True, time_out=0,
+        threads=1, bidirectional=True, group_sources=False, weights=None,
+        cutoff=None, landmarks=None, save_checkpoint=None):
+    """Compute approximate betweenness using VC-Dimension and a specified sample size.
+
+    The pairs of vertices are sampled by the specified number of threads. If
+    bidirectional is True (default), the shortest paths between the vertices
+    of a pair are searched from both vertices at once. If group_sources is
+    True, all the pairs are sampled first and a single search is run from each
+    distinct source, overriding bidirectional. If cutoff is not None, only the
+    shortest paths of at most this length are counted. The landmarks are
+    used as in betweenness().
+
+    If the timeout expires, the estimate is computed from the samples taken
+    until then, and the statistics report how many they are.
+
+    If save_checkpoint is not None, the samples are taken by a child process
+    even without a timeout, and save_checkpoint is called every
+    CHECKPOINT_INTERVAL seconds with the number of samples taken so far and
+    their counts (see wait_for_sampling()).
+
+    """
     logging.info("Computing approximate betweenness using VC-Dimension, fixed sample size")
-    if not time_out:
-        (stats, betw) = do_betweenness_sample_size(graph, sample_size)
+    if not time_out and save_checkpoint is None:
+        (stats, betw) = do_betweenness_sample_size(graph, sample_size, threads,
+                bidirectional, group_sources, None, weights, cutoff, landmarks)
     else:
         logging.info("Adding timeout")
-        timeout_betweenness = timeout.add_timeout(do_betweenness_sample_size, time_out)
-        timeout_betweenness(graph, sample_size)
-        while (not timeout_betweenness.ready) and (not timeout_betweenness.expired):
-            pass
+        # Without a timeout, the child process only lets the partial counts
+        # be checkpointed
+        timeout_betweenness = timeout.add_timeout(do_betweenness_sample_size,
+                time_out or math.inf)
+        snapshot = new_snapshot(graph)
+        timeout_betweenness(graph, sample_size, threads, bidirectional,
+                group_sources, snapshot, weights, cutoff, landmarks)
+        wait_for_sampling(timeout_betweenness, graph, snapshot,
+                save_checkpoint)
         if timeout_betweenness.ready:
             (stats, betw) = timeout_betweenness.value
             logging.info("Betweenness computed in %s seconds", stats['time'])
             stats["timed_out"] = 0
         else:
             logging.info("Betweenness computation timer expired after %d seconds.", time_out)
-            #We need the partial results een if we have timeout
-            #betw = [0] * graph.vcount()
-            #try:        
-            (stats, betw) = timeout_betweenness.value
-            #except NotReadyError:
-
-            # We still the stat even in the case that the algorithm does not terminate
-            #stats = {"time": time_out, "timed_out": 1, "forward_touched_edges": -1,
-                   # "backward_touched_edges": -1, "sample_size": sample_size}
-            #stats["timed_out"] = 0
+            timeout_betweenness.cancel()
+            (partial_sample_size, betw) = partial_betweenness(graph, snapshot)
+            logging.info("Using the %d samples taken before the timeout.",
+                    partial_sample_size)
+            stats = {"time": time_out, "timed_out": 1, "forward_touched_edges": -1,
+                    "backward_touched_edges": -1, "sample_size":
+                    partial_sample_size}
     # Write attributes to graph, if specified
     if set_attributes:
         for key in stats:
@@ -58,23 +316,42 @@ def betweenness_sample_size(graph, sample_size, set_attributes=True, time_out=0)
 
     return (stats, betw)
     
-def do_betweenness(graph, epsilon, delta, weights_list=None, use_approx_diameter=True):
+def do_betweenness(graph, epsilon, delta, weights_list=None, use_approx_diameter=True,
+        threads=1, bidirectional=True, group_sources=False, progressive=False,
+        snapshot=None, cutoff=None, landmarks=None):
+    # A diameter cached as a graph attribute (see util.load_metadata()) is
+    # used instead of computing it again
+    start_time = time.perf_counter()
+    start_cpu_time = time.process_time()
     if use_approx_diameter == 1:
-        start_time = time.process_time()
-        (stats, betw) = graph.betweenness_sample_vc(epsilon, delta, -1, weights=weights_list)
+        diam = graph["approx_diam"] if "approx_diam" in graph.attributes() else -1
+        (stats, betw) = graph.betweenness_sample_vc(epsilon, delta, diam,
+                cutoff=cutoff, weights=weights_list, threads=threads,
+                bidirectional=bidirectional, group_sources=group_sources,
+                progressive=progressive, landmarks=landmarks,
+                snapshot=snapshot, as_array=util.HAVE_NUMPY)
     elif use_approx_diameter == 0:
-        start_time = time.process_time()
-        diam = graph.diameter()
-        (stats, betw) = graph.betweenness_sample_vc(epsilon, delta, diam, weights=weights_list)
+        diam = graph["diam"] if "diam" in graph.attributes() else graph.diameter()
+        (stats, betw) = graph.betweenness_sample_vc(epsilon, delta, diam,
+                cutoff=cutoff, weights=weights_list, threads=threads,
+                bidirectional=bidirectional, group_sources=group_sources,
+                progressive=progressive, landmarks=landmarks,
+                snapshot=snapshot, as_array=util.HAVE_NUMPY)
     else:
-        start_time = time.process_time()
-        (stats, betw) = graph.betweenness_sample_vc(epsilon, delta, use_approx_diameter, weights=weights_list)
-    end_time = time.process_time()
-    stats["time"] = end_time - start_time
+        (stats, betw) = graph.betweenness_sample_vc(epsilon, delta,
+                use_approx_diameter, cutoff=cutoff, weights=weights_list,
+                threads=threads, bidirectional=bidirectional,
+                group_sources=group_sources, progressive=progressive,
+                landmarks=landmarks, snapshot=snapshot,
+                as_array=util.HAVE_NUMPY)
+    stats["time"] = time.perf_counter() - start_time
+    stats["cpu_time"] = time.process_time() - start_cpu_time
     return (stats, betw)    
 
 def betweenness(graph, epsilon, delta, weights=None, use_approx_diameter=True,
-        set_attributes=True, time_out=0):
+        set_attributes=True, time_out=0, threads=1, bidirectional=True,
+        group_sources=False, progressive=False, cutoff=None, landmarks=None,
+        save_checkpoint=None):
     """Compute approximate betweenness using VC-Dimension.
     
     Compute approximations of the betweenness centrality of all the vertices in
@@ -85,48 +362,108 @@ def betweenness(graph, epsilon, delta, weights=None, use_approx_diameter=True,
     of betweenness values (one for each vertex in the graph).
 
     The meaning of the use_approx_diameter parameter is peculiar. If True or
-    1 (default), compute an approximation of the diameter (only valid for
-    undirected, unweighted graphs). If False or 0, compute
-    the exact diameter (which kind of defeat the purpose of sampling, by the
+    1 (default), use the "approx_diam" graph attribute or compute an approximation of the diameter (on directed
+    graphs, bounded through the strongly connected components; with weights,
+    of the largest number of edges of a shortest path). If False or 0, use the
+    "diam" graph attribute or compute the exact diameter (which kind of defeat the purpose of sampling, by the
     way). If any integer > 1, use this value for the diameter, i.e. do not
-    perform any computation for the diameter.
+    perform any computation for the diameter. The approximation is
+    tightened with a bounded number of breadth-first searches; the statistics
+    report the bound ("diameter"), a lower bound ("diameter_lower_bound") and
+    the number of searches ("diameter_bfs").
     If set_attributes is True (default), then set the values of the betweenness
     as vertex attributes, and the time as a graph attribute.
+
+    The pairs of vertices are sampled by the specified number of threads, each
+    with its own random number generator. The estimates have the same
+    guarantees for any number of threads. The "time" statistic is the
+    elapsed wall-clock time, which shows the speedup of the threads, and
+    "cpu_time" the processor time of all the threads together. If
+    bidirectional is True (default), the shortest paths between the vertices
+    of a pair are searched from both vertices at once, with a bidirectional
+    Dijkstra search if there are weights, which explores a much smaller part
+    of small-world graphs. If
+    group_sources is True, all the pairs are sampled first and a single
+    search is run from each distinct source for all the destinations sampled
+    with it, overriding bidirectional. If there are weights and landmarks is
+    not None, it is the landmark distances from util.load_landmarks(), and
+    each pair is searched with an A* search guided by them, which overrides
+    bidirectional and is the fastest on large road-like graphs.
+
+    If progressive is True, the sample is grown in stages until a
+    data-dependent bound guarantees the accuracy, which usually needs far
+    fewer samples than the bound based on the diameter. The stage at which
+    the sampling stopped and the value of the bound are in the statistics.
+
+    If cutoff is not None, only the shortest paths of at most this length
+    (number of edges, or total weight with weights) are counted, and the
+    searches do not go farther. The sample size is then computed from the
+    smaller of the diameter and the largest number of edges of such a path,
+    which the statistics report as "length_bound".
+
+    If the timeout expires, the estimate is computed from the samples taken
+    until then, and the statistics report how many they are and the accuracy
+    ("achieved_epsilon") that they guarantee with probability 1-delta.
+
+    The save_checkpoint parameter is used as in betweenness_sample_size().
     
     """
     logging.info("Computing approximate betweenness using VC-Dimension.")
-    if not time_out:
+    if not time_out and save_checkpoint is None:
         logging.info("No timeout")
         (stats, betw) = do_betweenness(graph, epsilon, delta,
-                weights, use_approx_diameter)
+                weights, use_approx_diameter, threads, bidirectional,
+                group_sources, progressive, None, cutoff, landmarks)
     else:
         logging.info("Adding timeout")
-        timeout_betweenness = timeout.add_timeout(do_betweenness, time_out)
-        timeout_betweenness(graph, epsilon, delta, weights, use_approx_diameter)
-        while (not timeout_betweenness.ready) and (not timeout_betweenness.expired):
-            pass
+        # Without a timeout, the child process only lets the partial counts
+        # be checkpointed
+        timeout_betweenness = timeout.add_timeout(do_betweenness,
+                time_out or math.inf)
+        snapshot = new_snapshot(graph)
+        timeout_betweenness(graph, epsilon, delta, weights, use_approx_diameter,
+                threads, bidirectional, group_sources, progressive, snapshot,
+                cutoff, landmarks)
+        wait_for_sampling(timeout_betweenness, graph, snapshot,
+                save_checkpoint)
         if timeout_betweenness.ready:
             (stats, betw) = timeout_betweenness.value
             logging.info("Betweenness computed in %s seconds", stats['time'])
             stats["timed_out"] = 0
         else:
             logging.info("Betweenness computation timer expired after %d seconds.", time_out)
-
-            #We need the partial results even if we have timeout
-            #betw = [0] * graph.vcount()
-            (stats, betw) = timeout_betweenness.value
-            logging.info("Storing partial outcome.")
-           # stats = {"time": time_out, "timed_out": 1, "forward_touched_edges": -1,
-            #        "backward_touched_edges": -1, "sample_size": -1,
-             #       "diameter": -1, "diameter_touched_edges": -1 }
+            timeout_betweenness.cancel()
+            (partial_sample_size, betw) = partial_betweenness(graph, snapshot)
+            logging.info("Using the %d samples taken before the timeout.",
+                    partial_sample_size)
+            stats = {"time": time_out, "timed_out": 1, "forward_touched_edges": -1,
+                    "backward_touched_edges": -1, "sample_size":
+                    partial_sample_size, "diameter": -1,
+                    "diameter_touched_edges": -1, "diameter_bfs": -1,
+                    "diameter_lower_bound": -1}
+            # The sample size is inversely proportional to the square of
+            # epsilon for a fixed delta and diameter, and snapshot[1] is the
+            # sample size for the requested epsilon.
+            if partial_sample_size > 0:
+                stats["achieved_epsilon"] = min(1.0,
+                        epsilon * math.sqrt(snapshot[1] / partial_sample_size))
+            else:
+                stats["achieved_epsilon"] = 1.0
     stats["delta"] = delta
+    # Remember the diameter as a graph attribute, so that the following runs
+    # and util.save_metadata() find it
     if int(use_approx_diameter) == 1:
         stats["diam_type"] = "approx"
+        if stats["diameter"] > 0:
+            graph["approx_diam"] = stats["diameter"]
     elif int(use_approx_diameter) == 0:
         stats["diam_type"] = "exact"
+        if stats["diameter"] > 0:
+            graph["diam"] = stats["diameter"]
     else:
         stats["diam_type"] = "specif"
     stats["epsilon"] = epsilon
+    stats["cutoff"] = cutoff if cutoff is not None else -1
 
     # Write attributes to graph, if specified
     if set_attributes:
@@ -155,10 +492,24 @@ def main():
             help="value to use for the diameter")
     group.add_argument("-e", "--exact", action="store_true", default=False,
             help="use exact diameter")
+    parser.add_argument("-b", "--cutoff", type=util.positive_int, default=None,
+            help="only count the shortest paths of at most this length (number of edges, or total weight with -l), which also reduces the sample size")
+    parser.add_argument("-c", "--checkpoint", default=None,
+            help="write the sampled counts, the sample size and the state of the random number generator to this file, every {} seconds while sampling and at the end (also on timeout)".format(CHECKPOINT_INTERVAL))
+    parser.add_argument("-f", "--forward", action="store_true", default=False,
+            help="search the shortest paths only from the first vertex of each sampled pair")
+    parser.add_argument("-g", "--group", action="store_true", default=False,
+            help="run a single search from each distinct source of the sampled pairs")
+    parser.add_argument("-j", "--threads", type=util.positive_int, default=1,
+            help="number of threads sampling the pairs of vertices (default 1)")
+    parser.add_argument("-k", "--landmarks", type=util.positive_int, default=0,
+            help="with weights, guide the search of each sampled pair with this many landmarks, whose distances are cached in a file next to the graph")
     parser.add_argument("-m", "--maxconn", action="store_true", default=False,
             help="if the graph is not weakly connected, only save the largest connected component")
     parser.add_argument("-p", "--pickle", action="store_true", default=False,
             help="use pickle reader for input file")
+    parser.add_argument("-r", "--progressive", action="store_true", default=False,
+            help="grow the sample in stages and stop as soon as the accuracy is guaranteed")
     parser.add_argument("-s", "--samplesize", type=util.positive_int,
             default=0, help="use specified sample size. Overrides epsilon, delta, and diameter computation")
     parser.add_argument("-t", "--timeout", type=util.positive_int, default=3600,
@@ -170,7 +521,9 @@ def main():
     parser.add_argument("-w", "--write", nargs="?", default=False, const="auto",
             help="write graph (and computed attributes) to file.")
     parser.add_argument("-l", "--weightFile", default="-",
-            help="random weights within the interval 0 to 1, must have as many entries as the number of edges")
+            help="random weights within the interval 0 to 1, must have as many entries as the number of edges: one per line, or a binary weight file from generate_random_weights.py")
+    parser.add_argument("--resume", nargs="+", default=[], metavar="CHECKPOINT",
+            help="start from the samples in these checkpoints (merged if more than one) and only take the missing ones")
 
     args = parser.parse_args()
 
@@ -192,20 +545,98 @@ def main():
     # Read the weights    
     weights_list=[]
     if args.weightFile != "-":
-        with open(args.weightFile,'r') as weight_file:
-            for line in weight_file:
-                weights_list.append(float(line.strip()))
+        weights_list = util.read_weights(args.weightFile, G)
+
+    # Use the diameters cached for this graph and weights
+    fingerprint = util.graph_fingerprint(args.graph, not args.undirected,
+            args.maxconn, args.pickle,
+            args.weightFile if args.weightFile != "-" else None)
+    util.load_metadata(G, args.graph, fingerprint)
+
+    # Compute the landmark distances, or use the cached ones
+    landmarks = None
+    if args.landmarks and weights_list:
+        landmarks = util.load_landmarks(G, args.graph, fingerprint,
+                weights_list, args.landmarks)
+
+    # Restore the samples and the random number generator from the
+    # checkpoints, if resuming
+    previous = None
+    if args.resume:
+        previous = merge_checkpoints([read_checkpoint(path) for path in args.resume])
+        if previous["fingerprint"] != fingerprint:
+            logging.critical("The checkpoints are not for graph %s", args.graph)
+            sys.exit(2)
+        if previous.get("cutoff") != args.cutoff:
+            logging.critical("The checkpoints are not for cutoff %s", args.cutoff)
+            sys.exit(2)
+        random.setstate(previous["rng_state"])
+    if args.checkpoint or args.resume:
+        # The samples are taken from a fresh seed drawn from the saved state,
+        # which is what the checkpoint stores. This way a resumed run never
+        # repeats the samples of the previous ones, even when they were taken
+        # by the child process used for the timeout.
+        seed = random.getrandbits(64)
+        rng_state = random.getstate()
+        random.seed(seed)
 
     # Compute betweenness
-    if args.samplesize:
-        (stats, betw) = betweenness_sample_size(G, args.samplesize, args.write)
+    diameter = -1
+    save_checkpoint = None
+    if args.checkpoint:
+        def save_checkpoint(sample_size, counts):
+            write_checkpoint(make_checkpoint(fingerprint, counts, sample_size,
+                rng_state, diameter, args.cutoff), args.checkpoint)
+    if previous:
+        if args.samplesize:
+            sample_size = args.samplesize
+        else:
+            if args.diameter > 0:
+                diameter = args.diameter
+            elif previous["diameter"] > 0:
+                diameter = previous["diameter"]
+            elif args.approximate:
+                if "approx_diam" not in G.attributes():
+                    G["approx_diam"] = G.diameter_approximation(weights_list or None)
+                diameter = G["approx_diam"]
+            else:
+                if "diam" not in G.attributes():
+                    G["diam"] = G.diameter()
+                diameter = G["diam"]
+            sample_size = vc_sample_size(args.epsilon, args.delta, diameter,
+                    args.cutoff, weights_list)
+        (stats, betw) = resume_betweenness(G, previous, sample_size,
+                weights_list or None, args.write, args.timeout, args.threads,
+                not args.forward, args.group, args.cutoff, landmarks,
+                save_checkpoint)
+        if not args.samplesize:
+            stats["diameter"] = diameter
+            stats["delta"] = args.delta
+            stats["epsilon"] = args.epsilon
+    elif args.samplesize:
+        (stats, betw) = betweenness_sample_size(G, args.samplesize, args.write,
+                args.timeout, args.threads, not args.forward, args.group,
+                weights_list or None, args.cutoff, landmarks, save_checkpoint)
     else:
         if args.diameter > 0:
             (stats, betw) = betweenness(G, args.epsilon, args.delta,
-                    weights_list, args.diameter, args.write)
+                    weights_list, args.diameter, args.write, args.timeout,
+                    args.threads, not args.forward, args.group,
+                    args.progressive, args.cutoff, landmarks, save_checkpoint)
         else:
             (stats, betw) = betweenness(G, args.epsilon, args.delta,
-                    weights_list, args.approximate, args.write)
+                    weights_list, args.approximate, args.write, args.timeout,
+                    args.threads, not args.forward, args.group,
+                    args.progressive, args.cutoff, landmarks, save_checkpoint)
+
+    util.save_metadata(G, args.graph, fingerprint)
+
+    # The final checkpoint, also written when the timeout expires
+    if args.checkpoint:
+        sample_size = int(stats["sample_size"])
+        write_checkpoint(make_checkpoint(fingerprint, hit_counts(betw,
+            sample_size), sample_size, rng_state, stats.get("diameter",
+                diameter), args.cutoff), args.checkpoint)
 
     # If specified, write betweenness as vertex attributes, and time as graph
     # attribute back to file
@@ -39,6 +39,8 @@ def main():
             help="value to use for the diameter")
     group.add_argument("-e", "--exact", action="store_true", default=False,
             help="use exact diameter")
+    parser.add_argument("-b", "--cutoff", type=util.positive_int, default=None,
+            help="only count the shortest paths of at most this length (number of edges, or total weight with -w), which also reduces the sample size")
     parser.add_argument("-m", "--maxconn", action="store_true", default=False,
             help="if the graph is not weakly connected, only save the largest connected component")
     parser.add_argument("-p", "--pickle", action="store_true", default=False,
@@ -52,7 +54,7 @@ def main():
     parser.add_argument("-v", "--verbose", action="count", default=0,
             help="increase verbosity (use multiple times for more verbosity)")
     parser.add_argument("-w", "--weightFile", default="-",
-            help="random weights within the interval 0 to 1, must have as many entries as the number of edges")
+            help="random weights within the interval 0 to 1, must have as many entries as the number of edges: one per line, or a binary weight file from generate_random_weights.py")
 
     args = parser.parse_args()
 
@@ -71,9 +73,13 @@ def main():
     # Read the weights    
     weights_list=[]
     if args.weightFile != "-":
-        with open(args.weightFile,'r') as weight_file:
-            for line in weight_file:
-                weights_list.append(float(line.strip()))
+        weights_list = util.read_weights(args.weightFile, G)
+
+    # Use the diameters cached for this graph and weights
+    fingerprint = util.graph_fingerprint(args.graph, not args.undirected,
+            args.maxconn, args.pickle,
+            args.weightFile if args.weightFile != "-" else None)
+    util.load_metadata(G, args.graph, fingerprint)
 
     # Perform experiment multiple times
     results = []
@@ -82,14 +88,18 @@ def main():
         # Compute betweenness
         if args.samplesize:
             results.append(vc_sample.betweenness_sample_size(G,
-                args.samplesize, False, args.timeout))
+                args.samplesize, False, args.timeout, cutoff=args.cutoff))
         else:
             if args.diameter > 0:
                 results.append(vc_sample.betweenness(G, args.epsilon, args.delta,
-                        weights_list, args.diameter, False, args.timeout))
+                        weights_list, args.diameter, False, args.timeout,
+                        cutoff=args.cutoff))
             else:
                 results.append(vc_sample.betweenness(G, args.epsilon, args.delta,
-                        weights_list, args.approximate, False, args.timeout))
+                        weights_list, args.approximate, False, args.timeout,
+                        cutoff=args.cutoff))
+
+    util.save_metadata(G, args.graph, fingerprint)
 
     # Compute aggregate statistics about the experiments
     stats = dict()
@@ -53,7 +53,7 @@ def main():
     parser.add_argument("-v", "--verbose", action="count", default=0,
             help="increase verbosity (use multiple times for more verbosity)")
     parser.add_argument("-w", "--weightFile", default="-",
-            help="random weights within the interval 0 to 1, must have as many entries as the number of edges")
+            help="random weights within the interval 0 to 1, must have as many entries as the number of edges: one per line, or a binary weight file from generate_random_weights.py")
 
     args = parser.parse_args()
 
@@ -72,9 +72,7 @@ def main():
     # Read the weights    
     weights_list=[]
     if args.weightFile != "-":
-        with open(args.weightFile,'r') as weight_file:
-            for line in weight_file:
-                weights_list.append(float(line.strip()))
+        weights_list = util.read_weights(args.weightFile, G)
     else:
         logging.critical("Must pass a weight file")
         sys.exit(2)